@@ -145,6 +145,11 @@ class BRIDealConfig(BaseSettings):
     cache_enabled: bool = Field(default=True, description="Enable caching")
     cache_ttl: int = Field(default=3600, ge=60, description="Cache TTL in seconds")
     cache_max_size: int = Field(default=1000, ge=10, description="Cache max size")
+    cache_freshness: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict,
+        description="Per cache key stale-while-revalidate limits, e.g. "
+                    '{"price_book_data": {"max_age": 3600, "max_stale": 604800}}'
+    )
     
     # Security
     encryption_key: Optional[str] = Field(default=None, description="Encryption key for sensitive data")
@@ -153,6 +158,28 @@ class BRIDealConfig(BaseSettings):
     # Performance
     max_concurrent_requests: int = Field(default=10, ge=1, le=100, description="Max concurrent API requests")
     connection_pool_size: int = Field(default=20, ge=5, le=100, description="HTTP connection pool size")
+    metrics_export_enabled: bool = Field(default=True, description="Periodically write metrics to metrics_dir")
+    metrics_export_interval: int = Field(default=60, ge=10, description="Metrics export interval in seconds")
+    metrics_dir: Optional[str] = Field(default=None, description="Metrics output directory (default: <logs_dir>/metrics)")
+    metrics_jsonl_max_bytes: int = Field(default=5242880, ge=65536, description="Size at which the JSON lines file rotates")
+    metrics_jsonl_backup_count: int = Field(default=5, ge=0, description="Rotated JSON lines files kept")
+    tracing_enabled: bool = Field(default=True, description="Record tracing spans (see app.core.tracing)")
+    tracing_buffer_size: int = Field(default=20000, ge=100, description="Finished spans kept in the trace ring buffer")
+    trace_dump_on_exit: bool = Field(default=False, description="Write a Chrome trace to <logs_dir>/traces on exit")
+    stall_detector_enabled: bool = Field(default=True, description="Watch the UI event loop for stalls")
+    stall_threshold_ms: int = Field(default=200, ge=50, description="Event loop delay reported as a stall")
+    memory_tracing_enabled: bool = Field(
+        default=False, description="Trace allocations with tracemalloc for the memory report (adds overhead)"
+    )
+    memory_tracing_frames: int = Field(default=1, ge=1, le=50, description="Stack frames kept per traced allocation")
+    memory_budgets_mb: Dict[str, float] = Field(
+        default_factory=dict,
+        description='Per-module memory budgets in MB, e.g. {"PriceBook": 200, "DealForm": 100}'
+    )
+    metrics_scrape_port: Optional[int] = Field(
+        default=None, ge=0, le=65535,
+        description="Serve OpenMetrics on http://127.0.0.1:<port>/metrics (disabled when unset)"
+    )
     
     # Development
     mock_apis: bool = Field(default=False, description="Use mock APIs for development")
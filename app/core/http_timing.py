@@ -0,0 +1,242 @@
+# app/core/http_timing.py
+"""
+Per-phase timing of outgoing HTTP requests.
+
+A RequestTiming follows one request from before its access token is fetched
+until its body has been read. finish() records the total with
+PerformanceMetrics.record_request and the phases with record_request_phases,
+both under the route template, and adds them to the request's tracing span.
+
+Phases (seconds; a request only has the phases that happened to it):
+    auth     getting the access token, including a refresh after a 401
+    dns      host name resolution (aiohttp; folded into connect for Graph)
+    queue    waiting for a free connection from the pool
+    connect  opening a new TCP connection (for aiohttp this includes TLS)
+    tls      TLS handshake (Graph; aiohttp has no separate TLS signal)
+    send     writing the request (aiohttp; folded into ttfb for Graph)
+    ttfb     request sent until the response headers arrive: server time
+    body     reading the response body
+
+aiohttp sessions get the network phases from create_trace_config(); pass the
+RequestTiming as trace_request_ctx. The requests-based Graph transport gets
+them from its timed connection pools, which find the request's timing through
+active_timing().
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from app.core.latency import normalize_route
+from app.core.performance import PerformanceMetrics, get_performance_monitor
+from app.core.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+_active_timing: contextvars.ContextVar[Optional['RequestTiming']] = contextvars.ContextVar(
+    'active_request_timing', default=None)
+# Token refresh time spent before the next request on this thread/task was started.
+_pending_auth: contextvars.ContextVar[float] = contextvars.ContextVar('pending_auth_time', default=0.0)
+
+
+class RequestTiming:
+    """Phase timings of one HTTP request."""
+
+    def __init__(self, method: str, url: str, token_refresh: bool = False,
+                 metrics: Optional[PerformanceMetrics] = None):
+        self.method = method.upper()
+        # Query strings carry download tokens and paging cursors; keep them out of metrics and spans.
+        self.url = url.split('?', 1)[0]
+        self.token_refresh = token_refresh
+        self.metrics = metrics
+        self.phases: Dict[str, float] = {}
+        self.reused: Optional[bool] = None
+        self.status: Optional[int] = None
+        self.headers_received: Optional[float] = None
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+        pending_auth = _pending_auth.get()
+        if pending_auth:
+            _pending_auth.set(0.0)
+            self.add('auth', pending_auth)
+        attributes = {'token_refresh': True} if token_refresh else {}
+        self.span = get_tracer().start_span(f"HTTP {self.method} {normalize_route(self.url)}", **attributes)
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Add time to a phase (phases repeated by redirects or retries accumulate)."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(seconds, 0.0)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block as part of phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    @contextmanager
+    def activate(self) -> Iterator['RequestTiming']:
+        """Make this the timing active_timing() returns inside the block."""
+        token = _active_timing.set(self)
+        try:
+            yield self
+        finally:
+            _active_timing.reset(token)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def finish(self, status_code: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+        """Record the request. Later calls are ignored, so it is safe in a finally block."""
+        if self.finished is not None:
+            return
+        self.finished = time.perf_counter()
+        if status_code is not None:
+            self.status = status_code
+        success = error is None and self.status is not None and self.status < 400
+        metrics = self.metrics or get_performance_monitor()
+        try:
+            metrics.record_request(self.url, self.method, self.elapsed, self.status, success)
+            metrics.record_request_phases(self.url, self.method, self.phases, self.reused, self.token_refresh)
+        except Exception as e:
+            logger.debug(f"Failed to record request timings for {self.url}: {e}")
+
+        if self.span is not None:
+            self.span.set_attribute('status_code', self.status)
+            if self.reused is not None:
+                self.span.set_attribute('connection_reused', self.reused)
+            for phase, seconds in self.phases.items():
+                self.span.set_attribute(f'{phase}_ms', round(seconds * 1000, 3))
+            self.span.end(error)
+
+    def __repr__(self):
+        phases = ', '.join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in self.phases.items())
+        return f"RequestTiming({self.method} {self.url}, status={self.status}, {phases})"
+
+
+def active_timing() -> Optional[RequestTiming]:
+    """The RequestTiming activated in the current context, if any."""
+    return _active_timing.get()
+
+
+def note_auth_time(seconds: float) -> None:
+    """
+    Charge token acquisition time to the next RequestTiming created in this
+    context, for clients whose token is fetched before the request is built.
+    """
+    _pending_auth.set(_pending_auth.get() + seconds)
+
+
+class AiohttpPhaseHooks:
+    """
+    aiohttp TraceConfig callbacks that fill in a RequestTiming.
+
+    The timing is taken from trace_request_ctx (directly, or under 'timing' when
+    the ctx is a dict, as aiohttp_retry requires). Requests sent without one are
+    timed and recorded here, up to the response headers.
+    """
+
+    def __init__(self, metrics: Optional[PerformanceMetrics] = None):
+        self.metrics = metrics
+
+    @staticmethod
+    def _timing(trace_request_ctx: Any) -> Optional[RequestTiming]:
+        if isinstance(trace_request_ctx, Mapping):
+            trace_request_ctx = trace_request_ctx.get('timing')
+        return trace_request_ctx if isinstance(trace_request_ctx, RequestTiming) else None
+
+    async def on_request_start(self, session, ctx, params) -> None:
+        timing = self._timing(getattr(ctx, 'trace_request_ctx', None))
+        ctx.owned = timing is None
+        if ctx.owned:
+            timing = RequestTiming(params.method, str(params.url), metrics=self.metrics)
+        ctx.timing = timing
+        ctx.ready = ctx.sent = time.perf_counter()
+        ctx.dns_time = 0.0
+
+    async def on_dns_resolvehost_start(self, session, ctx, params) -> None:
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(self, session, ctx, params) -> None:
+        seconds = time.perf_counter() - ctx.dns_start
+        ctx.dns_time += seconds
+        ctx.timing.add('dns', seconds)
+
+    async def on_connection_queued_start(self, session, ctx, params) -> None:
+        ctx.queued_at = time.perf_counter()
+
+    async def on_connection_queued_end(self, session, ctx, params) -> None:
+        ctx.ready = time.perf_counter()
+        ctx.timing.add('queue', ctx.ready - ctx.queued_at)
+
+    async def on_connection_create_start(self, session, ctx, params) -> None:
+        ctx.connect_start = time.perf_counter()
+        ctx.dns_before_connect = ctx.dns_time
+
+    async def on_connection_create_end(self, session, ctx, params) -> None:
+        ctx.ready = time.perf_counter()
+        # Host resolution happens inside connection creation; it is already counted as dns.
+        ctx.timing.add('connect', ctx.ready - ctx.connect_start - (ctx.dns_time - ctx.dns_before_connect))
+        ctx.timing.reused = False
+
+    async def on_connection_reuseconn(self, session, ctx, params) -> None:
+        ctx.ready = time.perf_counter()
+        if ctx.timing.reused is None:
+            ctx.timing.reused = True
+
+    async def on_request_headers_sent(self, session, ctx, params) -> None:
+        ctx.sent = time.perf_counter()
+
+    async def on_request_chunk_sent(self, session, ctx, params) -> None:
+        ctx.sent = time.perf_counter()
+
+    def _response_started(self, ctx, status: Optional[int]) -> None:
+        now = time.perf_counter()
+        timing = ctx.timing
+        sent = max(ctx.sent, ctx.ready)
+        timing.add('send', sent - ctx.ready)
+        timing.add('ttfb', now - sent)
+        timing.headers_received = ctx.body_mark = now
+        timing.status = status
+        # A redirect's follow-up request starts timing its send from here.
+        ctx.ready = ctx.sent = now
+
+    async def on_request_redirect(self, session, ctx, params) -> None:
+        self._response_started(ctx, getattr(params.response, 'status', None))
+
+    async def on_request_end(self, session, ctx, params) -> None:
+        self._response_started(ctx, getattr(params.response, 'status', None))
+        if ctx.owned:
+            ctx.timing.finish()
+
+    async def on_response_chunk_received(self, session, ctx, params) -> None:
+        if ctx.owned or getattr(ctx, 'body_mark', None) is None:
+            return
+        now = time.perf_counter()
+        ctx.timing.add('body', now - ctx.body_mark)
+        ctx.body_mark = now
+
+    async def on_request_exception(self, session, ctx, params) -> None:
+        if ctx.owned:
+            ctx.timing.finish(error=params.exception)
+
+
+def create_trace_config(metrics: Optional[PerformanceMetrics] = None):
+    """aiohttp.TraceConfig that times request phases (pass it in ClientSession(trace_configs=[...]))."""
+    import aiohttp
+
+    hooks = AiohttpPhaseHooks(metrics)
+    trace_config = aiohttp.TraceConfig()
+    for name in ('on_request_start', 'on_dns_resolvehost_start', 'on_dns_resolvehost_end',
+                 'on_connection_queued_start', 'on_connection_queued_end', 'on_connection_create_start',
+                 'on_connection_create_end', 'on_connection_reuseconn', 'on_request_headers_sent',
+                 'on_request_chunk_sent', 'on_request_redirect', 'on_request_end',
+                 'on_response_chunk_received', 'on_request_exception'):
+        signal = getattr(trace_config, name, None)
+        if signal is not None:  # on_request_headers_sent is missing before aiohttp 3.8
+            signal.append(getattr(hooks, name))
+    return trace_config
@@ -0,0 +1,173 @@
+# app/core/invalidation.py
+"""
+Dependency-aware invalidation bus.
+
+Data sources (reference CSVs, the SharePoint workbook, the recent deals log) and
+the caches and in-memory indexes derived from them are named by string keys.
+DEPENDENCIES declares which keys are derived from which; invalidating a source
+notifies the subscribers of every key that (transitively) depends on it, once,
+in dependency order. Subscribers re-populate only what they hold.
+
+Callbacks run on the thread that called invalidate(); Qt views subscribe with a
+signal's emit so the handler runs on the UI thread.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Sources
+SHAREPOINT_WORKBOOK = "sharepoint:workbook"
+RECENT_DEALS_FILE = "file:recent_deals"
+
+
+def csv_key(data_type: str) -> str:
+    """Key of a reference CSV (customers, salesmen, products, parts)."""
+    return f"csv:{data_type}"
+
+
+def cache_key(name: str) -> str:
+    """Key of a CacheHandler entry."""
+    return f"cache:{name}"
+
+
+def index_key(owner: str, name: str) -> str:
+    """Key of an in-memory index held by a view or service."""
+    return f"index:{owner}.{name}"
+
+
+# key -> keys it is derived from
+DEPENDENCIES: Dict[str, List[str]] = {
+    cache_key("price_book_data"): [SHAREPOINT_WORKBOOK],
+    cache_key("used_inventory_data"): [SHAREPOINT_WORKBOOK],
+    cache_key("recent_deals_list"): [RECENT_DEALS_FILE],
+    index_key("deal_form", "customers"): [csv_key("customers")],
+    index_key("deal_form", "salesmen"): [csv_key("salesmen")],
+    index_key("deal_form", "products"): [csv_key("products")],
+    index_key("deal_form", "parts"): [csv_key("parts")],
+}
+
+
+class InvalidationEvent:
+    """One notification: key was invalidated because source changed."""
+    __slots__ = ('key', 'source', 'reason', 'detail', 'timestamp')
+
+    def __init__(self, key: str, source: str, reason: str, detail: Any = None):
+        self.key = key
+        self.source = source
+        self.reason = reason
+        # Optional payload from the publisher (e.g. a row diff) for incremental updates.
+        self.detail = detail
+        self.timestamp = time.time()
+
+    def __repr__(self):
+        return f"InvalidationEvent(key={self.key!r}, source={self.source!r}, reason={self.reason!r})"
+
+
+class InvalidationBus:
+    """Registry of key dependencies and subscribers."""
+
+    def __init__(self, dependencies: Optional[Dict[str, Iterable[str]]] = None):
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
+        self._subscribers: Dict[str, Dict[int, Callable[[InvalidationEvent], Any]]] = defaultdict(dict)
+        self._last_invalidated: Dict[str, float] = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+        for key, sources in (dependencies or {}).items():
+            self.declare(key, sources)
+
+    def declare(self, key: str, depends_on: Iterable[str]) -> None:
+        """Record that key is derived from each key in depends_on."""
+        with self._lock:
+            for source in depends_on:
+                if source == key:
+                    raise ValueError(f"Key {key!r} cannot depend on itself")
+                self._dependents[source].add(key)
+
+    def subscribe(self, key: str, callback: Callable[[InvalidationEvent], Any]) -> int:
+        """Call callback(event) whenever key is invalidated. Returns a token for unsubscribe()."""
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[key][self._next_token] = callback
+            return self._next_token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            for callbacks in self._subscribers.values():
+                callbacks.pop(token, None)
+
+    def affected_keys(self, source: str) -> List[str]:
+        """source and every key derived from it, sources before their dependents."""
+        with self._lock:
+            order: List[str] = []
+            visiting: Set[str] = set()
+            done: Set[str] = set()
+
+            def visit(key: str) -> None:
+                if key in done:
+                    return
+                if key in visiting:
+                    raise ValueError(f"Dependency cycle through {key!r}")
+                visiting.add(key)
+                for dependent in sorted(self._dependents.get(key, ())):
+                    visit(dependent)
+                visiting.discard(key)
+                done.add(key)
+                order.append(key)
+
+            visit(source)
+            order.reverse()
+            return order
+
+    def invalidate(self, source: str, reason: str = "", detail: Any = None) -> List[str]:
+        """
+        Invalidate source and everything derived from it.
+
+        Args:
+            source: Key that changed.
+            reason: Short tag for logs and handlers (e.g. "editor_save", "outbox_flush").
+            detail: Payload passed to every handler.
+
+        Returns:
+            The affected keys, in notification order.
+        """
+        keys = self.affected_keys(source)
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._last_invalidated[key] = now
+            calls = [(key, token, callback)
+                     for key in keys for token, callback in list(self._subscribers.get(key, {}).items())]
+        logger.info(f"Invalidating {source} ({reason or 'no reason given'}): {keys}")
+
+        for key, token, callback in calls:
+            try:
+                callback(InvalidationEvent(key, source, reason, detail))
+            except RuntimeError as e:
+                # Typically the subscriber's Qt object was deleted; drop it.
+                logger.debug(f"Dropping invalidation subscriber for {key}: {e}")
+                self.unsubscribe(token)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {key} failed: {e}", exc_info=True)
+        return keys
+
+    def last_invalidated(self, key: str) -> Optional[float]:
+        """Epoch time key was last invalidated in this process, or None."""
+        with self._lock:
+            return self._last_invalidated.get(key)
+
+
+_invalidation_bus: Optional[InvalidationBus] = None
+_invalidation_bus_lock = threading.Lock()
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """Get the global invalidation bus, created with DEPENDENCIES."""
+    global _invalidation_bus
+    with _invalidation_bus_lock:
+        if _invalidation_bus is None:
+            _invalidation_bus = InvalidationBus(DEPENDENCIES)
+        return _invalidation_bus
@@ -0,0 +1,242 @@
+# app/core/latency.py
+"""
+Fixed-memory latency histograms and route normalization for PerformanceMetrics.
+
+Latencies go into log-spaced buckets (8 per doubling, 1 µs to ~70 min), so a
+histogram is a fixed array of counts however many samples it sees, and any
+percentile read from it is within about 4.5% of the true value.
+"""
+import math
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+MIN_LATENCY = 1e-6            # seconds; everything faster lands in bucket 0
+SUB_BUCKETS = 8               # buckets per doubling
+DOUBLINGS = 32                # MIN_LATENCY * 2**32 ≈ 4295 s
+BUCKET_COUNT = DOUBLINGS * SUB_BUCKETS + 2   # + underflow and overflow buckets
+
+REPORTED_PERCENTILES = (50, 90, 99)
+
+# HTTP request phases (see app.core.http_timing), in the order they happen
+REQUEST_PHASES = ('auth', 'dns', 'queue', 'connect', 'tls', 'send', 'ttfb', 'body')
+NETWORK_PHASES = ('dns', 'queue', 'connect', 'tls', 'send', 'body')
+
+
+def bucket_index(value: float) -> int:
+    """Bucket holding a latency in seconds."""
+    if value <= MIN_LATENCY:
+        return 0
+    index = 1 + int(math.log2(value / MIN_LATENCY) * SUB_BUCKETS)
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+def bucket_upper_bound(index: int) -> float:
+    """Exclusive upper bound (seconds) of a bucket; inf for the overflow bucket."""
+    if index >= BUCKET_COUNT - 1:
+        return math.inf
+    return MIN_LATENCY * 2 ** (index / SUB_BUCKETS)
+
+
+class LatencyHistogram:
+    """Count, sum, min, max, errors and a log-bucketed distribution of latencies."""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max', 'errors', 'last_recorded')
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.errors = 0
+        self.last_recorded: Optional[float] = None
+
+    def record(self, value: float, success: bool = True) -> None:
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if not success:
+            self.errors += 1
+        self.last_recorded = time.time()
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """Add other's samples to this histogram."""
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.errors += other.errors
+        if other.last_recorded is not None and (self.last_recorded is None or other.last_recorded > self.last_recorded):
+            self.last_recorded = other.last_recorded
+
+    def percentile(self, percent: float) -> float:
+        """Latency at or below which percent of the samples fall (0.0 when empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        if rank >= self.count:
+            return self.max
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        if index == 0:
+            estimate = MIN_LATENCY
+        elif index == BUCKET_COUNT - 1:
+            estimate = self.max
+        else:
+            # Geometric midpoint of the bucket
+            estimate = MIN_LATENCY * 2 ** ((index - 0.5) / SUB_BUCKETS)
+        return min(max(estimate, self.min), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """count, total, min, max, avg and the REPORTED_PERCENTILES (p50, p90, p99), in seconds."""
+        summary = {
+            'count': self.count,
+            'total_time': self.total,
+            'min_time': self.min if self.count else 0.0,
+            'max_time': self.max,
+            'avg_time': self.mean,
+            'errors': self.errors,
+        }
+        for percent in REPORTED_PERCENTILES:
+            summary[f'p{percent}'] = self.percentile(percent)
+        return summary
+
+
+class RequestHistogram(LatencyHistogram):
+    """LatencyHistogram that also counts response status codes."""
+    __slots__ = ('status_codes',)
+
+    def __init__(self):
+        super().__init__()
+        self.status_codes: Dict[int, int] = {}
+
+    def record_status(self, status_code: Optional[int]) -> None:
+        if status_code:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        super().merge(other)
+        for status_code, count in getattr(other, 'status_codes', {}).items():
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + count
+
+    def summary(self) -> Dict[str, float]:
+        summary = super().summary()
+        summary['status_codes'] = dict(sorted(self.status_codes.items()))
+        return summary
+
+
+class RequestPhases:
+    """
+    Per-phase latency histograms for one route, plus how many requests reused a
+    pooled connection and how many were retries after a token refresh.
+    """
+    __slots__ = ('count', 'phases', 'reused', 'new_connections', 'token_refresh_retries')
+
+    def __init__(self):
+        self.count = 0
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.reused = 0
+        self.new_connections = 0
+        self.token_refresh_retries = 0
+
+    def record(self, phases: Dict[str, float], reused: Optional[bool] = None, token_refresh: bool = False) -> None:
+        self.count += 1
+        for phase, seconds in phases.items():
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = LatencyHistogram()
+            histogram.record(seconds)
+        if reused is True:
+            self.reused += 1
+        elif reused is False:
+            self.new_connections += 1
+        if token_refresh:
+            self.token_refresh_retries += 1
+
+    def merge(self, other: 'RequestPhases') -> None:
+        self.count += other.count
+        for phase, histogram in other.phases.items():
+            self.phases.setdefault(phase, LatencyHistogram()).merge(histogram)
+        self.reused += other.reused
+        self.new_connections += other.new_connections
+        self.token_refresh_retries += other.token_refresh_retries
+
+    def mean_time(self, phases) -> float:
+        """Average seconds per request spent in the given phases."""
+        if not self.count:
+            return 0.0
+        return sum(self.phases[phase].total for phase in phases if phase in self.phases) / self.count
+
+    def summary(self) -> Dict[str, object]:
+        """Phase summaries in REQUEST_PHASES order and the average split into auth, network and server time."""
+        order = {phase: index for index, phase in enumerate(REQUEST_PHASES)}
+        return {
+            'count': self.count,
+            'phases': {phase: self.phases[phase].summary()
+                       for phase in sorted(self.phases, key=lambda name: order.get(name, len(order)))},
+            'connections': {'reused': self.reused, 'new': self.new_connections},
+            'token_refresh_retries': self.token_refresh_retries,
+            'breakdown': {
+                'auth': self.mean_time(('auth',)),
+                'network': self.mean_time(NETWORK_PHASES),
+                'server': self.mean_time(('ttfb',)),
+            },
+        }
+
+
+# Path segments that are never identifiers
+_VERSION_SEGMENT = re.compile(r'^v\d+(\.\d+)*$', re.IGNORECASE)
+_UUID_SEGMENT = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+# Graph function-style arguments, e.g. worksheets('Sheet1') or range(address='A1:B2')
+_CALL_ARGUMENTS = re.compile(r'\(.*\)')
+# Collections whose next segment is a record id even when it has no digits (e.g. a user principal name)
+ID_COLLECTIONS = frozenset({'quotes', 'dealers', 'drives', 'items', 'sites', 'users', 'customers', 'orders'})
+
+
+def _is_identifier(segment: str) -> bool:
+    if not segment or _VERSION_SEGMENT.match(segment):
+        return False
+    return (any(c.isdigit() for c in segment) or '@' in segment or '!' in segment
+            or bool(_UUID_SEGMENT.match(segment)))
+
+
+@lru_cache(maxsize=4096)
+def normalize_route(url: str) -> str:
+    """
+    Collapse a request URL into its route template.
+
+    The query string and fragment are dropped, and id-like path segments (anything
+    with digits, UUIDs, user principal names, and the segment after a collection
+    in ID_COLLECTIONS) become {id}, so /quotes/12345/equipments and
+    /quotes/67890/equipments share one key.
+    """
+    parts = urlsplit(url)
+    segments = parts.path.split('/')
+    normalized = []
+    previous = ''
+    for segment in segments:
+        if '(' in segment:
+            segment = _CALL_ARGUMENTS.sub('({id})', segment)
+        elif (segment and previous.lower() in ID_COLLECTIONS) or _is_identifier(segment):
+            segment = '{id}'
+        normalized.append(segment)
+        previous = segment
+    path = '/'.join(normalized)
+    return f"{parts.scheme}://{parts.netloc}{path}" if parts.netloc else path
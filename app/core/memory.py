@@ -0,0 +1,131 @@
+# app/core/memory.py
+"""
+Memory accounting helpers for ResourceMonitor.
+
+deep_sizeof estimates how many bytes an object holds, following containers,
+mappings and __slots__ (DataFrames, Series and numpy arrays report their own
+buffers). top_sites and
+diff_sites turn tracemalloc snapshots into plain dicts of allocation sites,
+largest first, with the interpreter's own allocation machinery filtered out.
+"""
+import os
+import sys
+import tracemalloc
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Set
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ROOT = os.path.dirname(APP_ROOT)
+
+_CONTAINERS = (list, tuple, set, frozenset, deque)
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+# Allocations made by tracemalloc itself and the import system aren't anyone's data.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Approximate bytes held by obj and everything reachable through containers.
+
+    Objects already in seen (ids) are not counted again, so passing one set for
+    several objects counts shared data once. Mappings are followed through their
+    items and slotted objects (e.g. CompactRecord) through their slot values;
+    the __dict__ attributes of other objects aren't followed.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, _ATOMIC):
+            total += sys.getsizeof(item)
+            continue
+        memory_usage = getattr(item, 'memory_usage', None)
+        if callable(memory_usage) and hasattr(item, 'dtypes'):
+            # pandas: deep=True counts the Python strings in object columns
+            usage = memory_usage(deep=True)
+            total += int(usage.sum() if hasattr(usage, 'sum') else usage)
+            continue
+        if hasattr(item, 'nbytes') and hasattr(item, 'dtype'):
+            # numpy arrays that view another array's buffer don't own those bytes
+            total += sys.getsizeof(item) if getattr(item, 'base', None) is None else int(item.nbytes)
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, Mapping):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+        stack.extend(_slot_values(item))
+    return total
+
+
+def _slot_values(obj: Any) -> List[Any]:
+    """Values held in obj's __slots__ (from every class in its MRO)."""
+    values = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            if name.startswith('__') and not name.endswith('__'):
+                name = f"_{cls.__name__.lstrip('_')}{name}"  # private slots are name-mangled
+            try:
+                values.append(object.__getattribute__(obj, name))
+            except AttributeError:  # slot never assigned
+                pass
+    return values
+
+
+def format_frame(frame: tracemalloc.Frame) -> str:
+    path = frame.filename
+    if path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    return f"{path}:{frame.lineno}"
+
+
+def _site(statistic, traceback_limit: int) -> Dict[str, Any]:
+    frames = list(statistic.traceback)
+    site = {
+        'location': format_frame(frames[0]) if frames else '<unknown>',
+        'size': statistic.size,
+        'count': statistic.count,
+    }
+    if len(frames) > 1 and traceback_limit > 1:
+        # Innermost first, as tracemalloc stores them
+        site['traceback'] = [format_frame(frame) for frame in frames[:traceback_limit]]
+    return site
+
+
+def top_sites(snapshot: tracemalloc.Snapshot, limit: int = 10, group_by: str = 'lineno',
+              traceback_limit: int = 5) -> List[Dict[str, Any]]:
+    """The limit allocation sites holding the most memory in snapshot."""
+    statistics = snapshot.filter_traces(_SNAPSHOT_FILTERS).statistics(group_by)
+    return [_site(statistic, traceback_limit) for statistic in statistics[:limit]]
+
+
+def diff_sites(older: tracemalloc.Snapshot, newer: tracemalloc.Snapshot, limit: int = 10,
+               group_by: str = 'lineno', traceback_limit: int = 5) -> List[Dict[str, Any]]:
+    """The limit allocation sites whose size changed most from older to newer (growth and shrinkage)."""
+    differences = newer.filter_traces(_SNAPSHOT_FILTERS).compare_to(older.filter_traces(_SNAPSHOT_FILTERS), group_by)
+    sites = []
+    for difference in differences[:limit]:
+        if not difference.size_diff and not difference.count_diff:
+            break
+        site = _site(difference, traceback_limit)
+        site['size_diff'] = difference.size_diff
+        site['count_diff'] = difference.count_diff
+        sites.append(site)
+    return sites
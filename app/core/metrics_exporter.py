@@ -0,0 +1,364 @@
+# app/core/metrics_exporter.py
+"""
+Periodic export of PerformanceMetrics, cache and thread-pool statistics.
+
+Each export writes:
+- <output_dir>/<name>.prom: the current values in OpenMetrics text, replaced
+  atomically so a node-exporter textfile collector never reads a partial file;
+- <output_dir>/<name>.jsonl: one JSON document per export, rotated by size.
+
+An optional HTTP endpoint serves the OpenMetrics text on the loopback interface
+only (GET /metrics).
+"""
+import inspect
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from app.core.latency import bucket_upper_bound
+from app.core.performance import PerformanceMetrics, get_performance_monitor
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Histogram bucket bounds (seconds) exported; the internal histograms are much finer.
+EXPORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+EXPORT_QUANTILES = (50, 90, 99)
+
+StatsSource = Callable[[], Optional[Dict[str, Any]]]
+
+
+def _metric_name(text: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', text).strip('_').lower()
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _cumulative_buckets(histogram) -> List[int]:
+    """Cumulative counts at EXPORT_BUCKETS: samples in fine buckets that end at or below each bound."""
+    cumulative = []
+    seen = 0
+    index = 0
+    counts = histogram.counts
+    for bound in EXPORT_BUCKETS:
+        while index < len(counts) and bucket_upper_bound(index) <= bound:
+            seen += counts[index]
+            index += 1
+        cumulative.append(seen)
+    return cumulative
+
+
+class MetricsExporter:
+    """
+    Collects metrics from PerformanceMetrics and registered sources and writes them out.
+
+    Sources are callables returning a flat dict of numbers (e.g. CacheHandler.get_memory_stats,
+    AsyncLRUCache.stats); non-numeric values are skipped. Register caches with add_cache_source
+    and thread pools with add_thread_pool_source.
+    """
+
+    def __init__(self, output_dir: str, metrics: Optional[PerformanceMetrics] = None,
+                 name: str = "brideal", max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5):
+        self.output_dir = output_dir
+        self.metrics = metrics or get_performance_monitor()
+        self.name = _metric_name(name)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.prom_path = os.path.join(output_dir, f"{self.name}.prom")
+        self.jsonl_path = os.path.join(output_dir, f"{self.name}.jsonl")
+
+        self._caches: Dict[str, StatsSource] = {}
+        self._thread_pools: Dict[str, StatsSource] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.last_export: Optional[float] = None
+
+    def add_cache_source(self, name: str, stats_fn: StatsSource) -> None:
+        with self._lock:
+            self._caches[name] = stats_fn
+
+    def add_thread_pool_source(self, name: str, stats_fn: StatsSource) -> None:
+        with self._lock:
+            self._thread_pools[name] = stats_fn
+
+    # Collection
+
+    @staticmethod
+    def _read_source(kind: str, name: str, stats_fn: StatsSource) -> Dict[str, float]:
+        try:
+            stats = stats_fn() or {}
+            if not isinstance(stats, Mapping):
+                # e.g. a coroutine from an async function registered by mistake
+                if inspect.iscoroutine(stats):
+                    stats.close()
+                raise TypeError(f"expected a mapping, got {type(stats).__name__}")
+            return {key: value for key, value in stats.items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)}
+        except Exception as e:
+            logger.warning(f"Metrics source {kind} '{name}' failed: {e}")
+            return {}
+
+    def collect(self) -> Dict[str, Any]:
+        """Snapshot of everything exported: histograms, request phases and source stats."""
+        functions, requests_by_route = self.metrics.snapshot()
+        request_phases = self.metrics.get_request_phases()
+        with self._lock:
+            caches = dict(self._caches)
+            thread_pools = dict(self._thread_pools)
+        return {
+            'timestamp': time.time(),
+            'functions': functions,
+            'requests': requests_by_route,
+            'request_phases': request_phases,
+            'caches': {name: self._read_source('cache', name, fn) for name, fn in caches.items()},
+            'thread_pools': {name: self._read_source('thread pool', name, fn) for name, fn in thread_pools.items()},
+        }
+
+    # Rendering
+
+    def render_openmetrics(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        snapshot = snapshot or self.collect()
+        prefix = self.name
+        lines: List[str] = []
+
+        def histogram_family(family: str, help_text: str, series: List[tuple]):
+            lines.append(f"# TYPE {family} histogram")
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# UNIT {family} seconds")
+            for labels, histogram in series:
+                for bound, count in zip(EXPORT_BUCKETS, _cumulative_buckets(histogram)):
+                    lines.append(f"{family}_bucket{_labels(**labels, le=_number(bound))} {count}")
+                lines.append(f"{family}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{family}_count{_labels(**labels)} {histogram.count}")
+                lines.append(f"{family}_sum{_labels(**labels)} {_number(histogram.total)}")
+
+        def quantile_family(family: str, help_text: str, series: List[tuple]):
+            lines.append(f"# TYPE {family} gauge")
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# UNIT {family} seconds")
+            for labels, histogram in series:
+                for percent in EXPORT_QUANTILES:
+                    value = histogram.percentile(percent)
+                    lines.append(f"{family}{_labels(**labels, quantile=_number(percent / 100))} {_number(value)}")
+                lines.append(f"{family}{_labels(**labels, quantile='1.0')} {_number(histogram.max)}")
+
+        def counter_family(family: str, help_text: str, samples: List[tuple]):
+            lines.append(f"# TYPE {family} counter")
+            lines.append(f"# HELP {family} {help_text}")
+            for labels, value in samples:
+                lines.append(f"{family}_total{_labels(**labels)} {value}")
+
+        functions = [({'function': name}, histogram) for name, histogram in sorted(snapshot['functions'].items())]
+        if functions:
+            histogram_family(f"{prefix}_function_duration_seconds", "Execution time of monitored functions.", functions)
+            quantile_family(f"{prefix}_function_duration_quantile_seconds",
+                            "Execution time percentiles of monitored functions.", functions)
+            counter_family(f"{prefix}_function_errors", "Monitored function calls that raised.",
+                           [(labels, histogram.errors) for labels, histogram in functions])
+
+        requests_by_route = []
+        for key, histogram in sorted(snapshot['requests'].items()):
+            method, _, route = key.partition(':')
+            requests_by_route.append(({'method': method, 'route': route}, histogram))
+        if requests_by_route:
+            histogram_family(f"{prefix}_http_request_duration_seconds", "HTTP request time by route template.",
+                             requests_by_route)
+            quantile_family(f"{prefix}_http_request_duration_quantile_seconds",
+                            "HTTP request time percentiles by route template.", requests_by_route)
+            counter_family(f"{prefix}_http_request_errors", "Failed HTTP requests by route template.",
+                           [(labels, histogram.errors) for labels, histogram in requests_by_route])
+            counter_family(f"{prefix}_http_responses", "HTTP responses by route template and status code.",
+                           [(dict(labels, status=status), count)
+                            for labels, histogram in requests_by_route
+                            for status, count in sorted(histogram.status_codes.items())])
+
+        phase_series, connection_samples, retry_samples = [], [], []
+        for key, rollup in sorted(snapshot.get('request_phases', {}).items()):
+            method, _, route = key.partition(':')
+            labels = {'method': method, 'route': route}
+            phase_series.extend((dict(labels, phase=phase), histogram) for phase, histogram in sorted(rollup.phases.items()))
+            connection_samples.append((dict(labels, reused='true'), rollup.reused))
+            connection_samples.append((dict(labels, reused='false'), rollup.new_connections))
+            retry_samples.append((labels, rollup.token_refresh_retries))
+        if phase_series:
+            histogram_family(f"{prefix}_http_request_phase_duration_seconds",
+                             "HTTP request time by route template and phase (auth, dns, queue, connect, tls, send, "
+                             "ttfb, body).", phase_series)
+        if connection_samples:
+            counter_family(f"{prefix}_http_connections",
+                           "HTTP requests by route template and whether they reused a pooled connection.",
+                           connection_samples)
+            counter_family(f"{prefix}_http_token_refresh_retries", "HTTP requests retried after a token refresh.",
+                           retry_samples)
+
+        for kind, family_prefix, label in (('caches', 'cache', 'cache'), ('thread_pools', 'thread_pool', 'pool')):
+            stats_by_source = snapshot[kind]
+            stat_names = sorted({stat for stats in stats_by_source.values() for stat in stats})
+            for stat in stat_names:
+                family = f"{prefix}_{family_prefix}_{_metric_name(stat)}"
+                lines.append(f"# TYPE {family} gauge")
+                for source, stats in sorted(stats_by_source.items()):
+                    if stat in stats:
+                        lines.append(f"{family}{_labels(**{label: source})} {_number(stats[stat])}")
+
+        lines.append(f"# TYPE {prefix}_metrics_export_timestamp_seconds gauge")
+        lines.append(f"{prefix}_metrics_export_timestamp_seconds {_number(snapshot['timestamp'])}")
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def render_json(self, snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        snapshot = snapshot or self.collect()
+        return {
+            'timestamp': datetime.fromtimestamp(snapshot['timestamp']).isoformat(),
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'functions': {name: histogram.summary() for name, histogram in snapshot['functions'].items()},
+            'requests': {key: histogram.summary() for key, histogram in snapshot['requests'].items()},
+            'request_phases': {key: rollup.summary() for key, rollup in snapshot.get('request_phases', {}).items()},
+            'caches': snapshot['caches'],
+            'thread_pools': snapshot['thread_pools'],
+            'sections': self.metrics.get_report_sections(),
+        }
+
+    # Output
+
+    def export(self) -> bool:
+        """Write the .prom snapshot and append a JSON line. Returns False if writing failed."""
+        try:
+            snapshot = self.collect()
+            os.makedirs(self.output_dir, exist_ok=True)
+            tmp_path = f"{self.prom_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(self.render_openmetrics(snapshot))
+            os.replace(tmp_path, self.prom_path)
+
+            line = json.dumps(self.render_json(snapshot), default=str, separators=(',', ':')) + '\n'
+            with self._lock:
+                self._rotate_if_needed(len(line.encode('utf-8')))
+                with open(self.jsonl_path, 'a', encoding='utf-8', newline='\n') as f:
+                    f.write(line)
+            self.last_export = snapshot['timestamp']
+            return True
+        except Exception as e:
+            logger.error(f"Metrics export to {self.output_dir} failed: {e}", exc_info=True)
+            return False
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        try:
+            size = os.path.getsize(self.jsonl_path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        if self.backup_count <= 0:
+            os.remove(self.jsonl_path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.jsonl_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.jsonl_path}.{index + 1}")
+        os.replace(self.jsonl_path, f"{self.jsonl_path}.1")
+
+    def start(self, interval: float = 60.0) -> None:
+        """Export every interval seconds on a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.export()
+
+        self._thread = threading.Thread(target=run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+        logger.info(f"Exporting metrics to {self.output_dir} every {interval:g}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.stop_server()
+
+    # Scrape endpoint
+
+    def start_server(self, port: int, host: str = "127.0.0.1") -> int:
+        """
+        Serve GET /metrics on host:port (port 0 picks a free port). Only loopback
+        addresses are accepted.
+
+        Returns:
+            The bound port.
+
+        Raises:
+            ValueError: if host is not a loopback address.
+        """
+        if not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"Metrics endpoint only binds to loopback addresses, not {host}")
+        if self._server:
+            return self._server.server_address[1]
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = exporter.render_openmetrics().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics endpoint: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="MetricsEndpoint", daemon=True).start()
+        bound_port = self._server.server_address[1]
+        logger.info(f"Serving metrics on http://{host}:{bound_port}/metrics")
+        return bound_port
+
+    def stop_server(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def create_metrics_exporter(config) -> Optional[MetricsExporter]:
+    """Exporter configured from metrics_* settings, or None when metrics_export_enabled is off."""
+    if config is None or not config.get("metrics_export_enabled", True):
+        return None
+    output_dir = config.get("metrics_dir", None) or os.path.join(config.get("logs_dir", "logs"), "metrics")
+    return MetricsExporter(
+        output_dir,
+        max_bytes=int(config.get("metrics_jsonl_max_bytes", 5 * 1024 * 1024)),
+        backup_count=int(config.get("metrics_jsonl_backup_count", 5)),
+    )
@@ -3,7 +3,8 @@ import asyncio
 import logging
 import time
 import threading
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
+from concurrent.futures import Future
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from functools import wraps
@@ -13,6 +14,10 @@ from typing import (
 )
 import weakref
 import gc
+import tracemalloc
+
+from app.core.latency import LatencyHistogram, RequestHistogram, RequestPhases, normalize_route
+from app.core.memory import deep_sizeof, diff_sites, top_sites
 
 try:
     import aiohttp
@@ -38,187 +43,439 @@ K = TypeVar('K')
 V = TypeVar('V')
 T = TypeVar('T')
 
+# Marks a cache miss, so None can be a cached value
+_MISSING = object()
+
+class _MetricsShard:
+    """One thread's histograms. Only the owning thread writes to it."""
+    __slots__ = ('thread', 'functions', 'requests', 'phases')
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.functions: Dict[str, LatencyHistogram] = {}
+        self.requests: Dict[str, RequestHistogram] = {}
+        self.phases: Dict[str, RequestPhases] = {}
+
+
 class PerformanceMetrics:
-    """Performance metrics collection and analysis"""
-    
+    """
+    Performance metrics collection and analysis.
+
+    Function and request latencies go into fixed-size histograms (app.core.latency).
+    Each thread records into its own shard without taking a lock; shards are merged
+    when a report is read, and shards of finished threads are folded into one.
+    Requests are keyed by method and route template, so ids in URLs don't create
+    new entries; their per-phase timings (app.core.http_timing) use the same keys.
+    """
+
+    # Distinct request routes kept; later new routes are counted under OTHER_ROUTE.
+    MAX_ROUTES = 500
+    OTHER_ROUTE = "{other}"
+
     def __init__(self):
-        self.function_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
-            'call_count': 0,
-            'total_time': 0.0,
-            'min_time': float('inf'),
-            'max_time': 0.0,
-            'avg_time': 0.0,
-            'errors': 0,
-            'last_called': None
-        })
-        self.request_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
-            'count': 0,
-            'total_time': 0.0,
-            'errors': 0,
-            'status_codes': defaultdict(int)
-        })
         self._lock = threading.Lock()
-    
+        self._local = threading.local()
+        self._generation = 0
+        self._shards: List[_MetricsShard] = []
+        self._retired = _MetricsShard(None)
+        self._routes: Set[str] = set()
+        self._report_sections: Dict[str, Callable[[], Any]] = {}
+
+    def add_report_section(self, name: str, provider: Callable[[], Any]) -> None:
+        """Include provider() under report['sections'][name] (e.g. the event-loop stall report)"""
+        with self._lock:
+            self._report_sections[name] = provider
+
+    def get_report_sections(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = dict(self._report_sections)
+        sections = {}
+        for name, provider in providers.items():
+            try:
+                sections[name] = provider()
+            except Exception as e:
+                logger.warning(f"Performance report section '{name}' failed: {e}")
+        return sections
+
+    def _shard(self) -> _MetricsShard:
+        local = self._local
+        if getattr(local, 'generation', None) == self._generation:
+            return local.shard
+        shard = _MetricsShard(threading.current_thread())
+        with self._lock:
+            self._shards.append(shard)
+            local.generation = self._generation
+        local.shard = shard
+        return shard
+
     def record_function_call(self, function_name: str, execution_time: float, success: bool = True):
         """Record function execution metrics"""
-        with self._lock:
-            stats = self.function_stats[function_name]
-            stats['call_count'] += 1
-            stats['total_time'] += execution_time
-            stats['min_time'] = min(stats['min_time'], execution_time)
-            stats['max_time'] = max(stats['max_time'], execution_time)
-            stats['avg_time'] = stats['total_time'] / stats['call_count']
-            stats['last_called'] = datetime.now()
-            
-            if not success:
-                stats['errors'] += 1
+        functions = self._shard().functions
+        histogram = functions.get(function_name)
+        if histogram is None:
+            histogram = functions[function_name] = LatencyHistogram()
+        histogram.record(execution_time, success)
     
+    def _route_key(self, url: str, method: str) -> str:
+        key = f"{method.upper()}:{normalize_route(url)}"
+        if key not in self._routes:
+            with self._lock:
+                if len(self._routes) < self.MAX_ROUTES:
+                    self._routes.add(key)
+                elif key not in self._routes:
+                    key = f"{method.upper()}:{self.OTHER_ROUTE}"
+        return key
+
     def record_request(self, url: str, method: str, execution_time: float, 
                       status_code: Optional[int] = None, success: bool = True):
-        """Record HTTP request metrics"""
-        key = f"{method.upper()}:{url}"
-        with self._lock:
-            stats = self.request_stats[key]
-            stats['count'] += 1
-            stats['total_time'] += execution_time
-            
-            if status_code:
-                stats['status_codes'][status_code] += 1
-            
-            if not success:
-                stats['errors'] += 1
-    
-    def get_slow_functions(self, threshold: float = 1.0) -> List[Tuple[str, float]]:
-        """Get functions that exceed the time threshold"""
+        """Record HTTP request metrics under the route template of url"""
+        key = self._route_key(url, method)
+        requests_by_route = self._shard().requests
+        histogram = requests_by_route.get(key)
+        if histogram is None:
+            histogram = requests_by_route[key] = RequestHistogram()
+        histogram.record(execution_time, success)
+        histogram.record_status(status_code)
+
+    def record_request_phases(self, url: str, method: str, phases: Dict[str, float],
+                              reused: Optional[bool] = None, token_refresh: bool = False):
+        """Record one request's phase timings (seconds by phase name) under the route template of url"""
+        key = self._route_key(url, method)
+        phases_by_route = self._shard().phases
+        rollup = phases_by_route.get(key)
+        if rollup is None:
+            rollup = phases_by_route[key] = RequestPhases()
+        rollup.record(phases, reused, token_refresh)
+
+    def _collect_shards(self) -> List[_MetricsShard]:
         with self._lock:
-            slow_functions = []
-            for func_name, stats in self.function_stats.items():
-                if stats['avg_time'] > threshold:
-                    slow_functions.append((func_name, stats['avg_time']))
-            return sorted(slow_functions, key=lambda x: x[1], reverse=True)
+            live = []
+            for shard in self._shards:
+                if shard.thread is not None and not shard.thread.is_alive():
+                    # A finished thread can't record again; keep its data in the retired shard.
+                    self._merge_into(self._retired, shard)
+                else:
+                    live.append(shard)
+            self._shards = live
+            return [self._retired] + live
+
+    def snapshot(self) -> Tuple[Dict[str, LatencyHistogram], Dict[str, RequestHistogram]]:
+        """Merged (function histograms, request histograms by "METHOD:route") across all threads."""
+        shards = self._collect_shards()
+        functions: Dict[str, LatencyHistogram] = {}
+        requests_by_route: Dict[str, RequestHistogram] = {}
+        for shard in shards:
+            for name, histogram in dict(shard.functions).items():
+                functions.setdefault(name, LatencyHistogram()).merge(histogram)
+            for key, histogram in dict(shard.requests).items():
+                requests_by_route.setdefault(key, RequestHistogram()).merge(histogram)
+        return functions, requests_by_route
+
+    def get_request_phases(self) -> Dict[str, RequestPhases]:
+        """Merged request phase timings by "METHOD:route" across all threads."""
+        phases_by_route: Dict[str, RequestPhases] = {}
+        for shard in self._collect_shards():
+            for key, rollup in dict(shard.phases).items():
+                phases_by_route.setdefault(key, RequestPhases()).merge(rollup)
+        return phases_by_route
+
+    @staticmethod
+    def _merge_into(target: _MetricsShard, shard: _MetricsShard) -> None:
+        for name, histogram in shard.functions.items():
+            target.functions.setdefault(name, LatencyHistogram()).merge(histogram)
+        for key, histogram in shard.requests.items():
+            target.requests.setdefault(key, RequestHistogram()).merge(histogram)
+        for key, rollup in shard.phases.items():
+            target.phases.setdefault(key, RequestPhases()).merge(rollup)
+
+    def get_slow_functions(self, threshold: float = 1.0, percentile: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Get functions whose average (or given percentile) time exceeds the threshold"""
+        functions, _ = self.snapshot()
+        slow_functions = []
+        for func_name, histogram in functions.items():
+            value = histogram.mean if percentile is None else histogram.percentile(percentile)
+            if value > threshold:
+                slow_functions.append((func_name, value))
+        return sorted(slow_functions, key=lambda x: x[1], reverse=True)
     
     def get_performance_report(self) -> Dict[str, Any]:
         """Generate comprehensive performance report"""
-        with self._lock:
-            return {
-                'functions': dict(self.function_stats),
-                'requests': dict(self.request_stats),
-                'summary': {
-                    'total_functions_monitored': len(self.function_stats),
-                    'total_requests_made': sum(stats['count'] for stats in self.request_stats.values()),
-                    'total_function_calls': sum(stats['call_count'] for stats in self.function_stats.values())
-                }
-            }
+        functions, requests_by_route = self.snapshot()
+        function_report = {}
+        for name, histogram in sorted(functions.items()):
+            stats = histogram.summary()
+            stats['call_count'] = stats.pop('count')
+            stats['last_called'] = (datetime.fromtimestamp(histogram.last_recorded)
+                                    if histogram.last_recorded is not None else None)
+            function_report[name] = stats
+        return {
+            'functions': function_report,
+            'requests': {key: histogram.summary() for key, histogram in sorted(requests_by_route.items())},
+            'request_phases': {key: rollup.summary() for key, rollup in sorted(self.get_request_phases().items())},
+            'summary': {
+                'total_functions_monitored': len(functions),
+                'total_requests_made': sum(histogram.count for histogram in requests_by_route.values()),
+                'total_function_calls': sum(histogram.count for histogram in functions.values())
+            },
+            'sections': self.get_report_sections()
+        }
     
     def clear_metrics(self):
         """Clear all collected metrics"""
         with self._lock:
-            self.function_stats.clear()
-            self.request_stats.clear()
+            # Threads notice the new generation and start fresh shards on their next record.
+            self._generation += 1
+            self._shards = []
+            self._retired = _MetricsShard(None)
+            self._routes.clear()
 
 
 class AsyncLRUCache(Generic[K, V]):
-    """Async LRU cache with TTL support"""
+    """
+    LRU cache with per-entry TTL and single-flight loading.
+
+    Every entry carries its own expiry. Concurrent misses for the same key run the
+    factory once; the other callers (coroutines on any event loop, or threads using
+    the *_sync methods) wait for that result. The lock is a threading.Lock held only
+    for dictionary updates, never across an await or a factory call, so Qt worker
+    threads and event loops can share one instance.
+    
+    delete, clear and set detach the in-flight loads of the keys they touch: those
+    loads still answer their callers, but their (older) result is not cached.
+    """
     
     def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
         self.maxsize = maxsize
         self.ttl = ttl
-        self.cache: OrderedDict[K, Tuple[V, float]] = OrderedDict()
-        self._lock = asyncio.Lock()
+        # key -> (value, expires_at on the time.monotonic clock, or None)
+        self.cache: OrderedDict[K, Tuple[V, Optional[float]]] = OrderedDict()
+        self._inflight: Dict[K, Future] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl is not None else None
+    
+    def _lookup(self, key: K) -> Any:
+        """Return the live value or _MISSING. Caller holds the lock."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.cache[key]
+            self.expirations += 1
+            return _MISSING
+        self.cache.move_to_end(key)
+        return value
+    
+    def _store(self, key: K, value: V, ttl: Optional[float]) -> None:
+        """Insert as most recently used and evict down to maxsize. Caller holds the lock."""
+        self.cache.pop(key, None)
+        self.cache[key] = (value, self._expires_at(ttl))
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+    
+    def _claim(self, key: K) -> Tuple[Any, Optional[Future], bool]:
+        """
+        Look up key, or join / start the in-flight load for it.
+        
+        Returns (value, flight, leader): value is set on a hit; otherwise flight is the
+        shared future and leader tells whether this caller must run the factory.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value, None, False
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return _MISSING, flight, False
+            self.misses += 1
+            flight = Future()
+            self._inflight[key] = flight
+            return _MISSING, flight, True
+    
+    def _settle(self, key: K, flight: Future, result: Any = _MISSING,
+                error: Optional[BaseException] = None, ttl: Optional[float] = None) -> None:
+        """Finish a load started by _claim: store the result and release the waiters."""
+        with self._lock:
+            # A load detached by delete/clear/set must not bring back what they replaced.
+            current = self._inflight.get(key) is flight
+            if current:
+                del self._inflight[key]
+            if error is None and current:
+                self._store(key, result, ttl)
+        if error is None:
+            flight.set_result(result)
+        elif isinstance(error, asyncio.CancelledError):
+            flight.cancel()
+        else:
+            flight.set_exception(error)
     
     async def get(self, key: K) -> Optional[V]:
         """Get value from cache"""
-        async with self._lock:
-            if key not in self.cache:
-                return None
-            
-            value, timestamp = self.cache[key]
-            
-            # Check TTL
-            if self.ttl and (time.time() - timestamp) > self.ttl:
-                del self.cache[key]
-                return None
-            
-            # Move to end (most recently used)
-            self.cache.move_to_end(key)
-            return value
+        return self.get_sync(key)
     
-    async def set(self, key: K, value: V) -> None:
-        """Set value in cache"""
-        async with self._lock:
-            # Remove if exists to update position
-            if key in self.cache:
-                del self.cache[key]
-            
-            # Add new item
-            self.cache[key] = (value, time.time())
-            
-            # Maintain size limit
-            while len(self.cache) > self.maxsize:
-                self.cache.popitem(last=False)
+    async def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Set value in cache, optionally with its own TTL"""
+        self.set_sync(key, value, ttl)
     
     async def get_or_set(self, 
                         key: K, 
                         factory: Callable[[], Union[V, Awaitable[V]]], 
                         ttl_override: Optional[float] = None) -> V:
-        """Get value or set using factory function"""
-        # Try to get existing value
-        value = await self.get(key)
-        if value is not None:
-            return value
+        """
+        Get value or set it using factory.
         
-        # Generate new value
-        result = factory()
-        if asyncio.iscoroutine(result):
-            result = await result
-        
-        # Store with custom TTL if provided
-        original_ttl = self.ttl
-        if ttl_override is not None:
-            self.ttl = ttl_override
-        
-        await self.set(key, result)
-        
-        # Restore original TTL
-        if ttl_override is not None:
-            self.ttl = original_ttl
+        Only one caller runs the factory for a missing key; concurrent callers await
+        its result (or its exception). ttl_override applies to this entry only.
+        """
+        value, flight, leader = self._claim(key)
+        if flight is None:
+            return value
+        if not leader:
+            # shield: a cancelled waiter must not cancel the shared load
+            return await asyncio.shield(asyncio.wrap_future(flight))
         
+        try:
+            result = factory()
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                result = await result
+        except BaseException as e:
+            self._settle(key, flight, error=e)
+            raise
+        self._settle(key, flight, result, ttl=ttl_override)
         return result
     
     async def delete(self, key: K) -> bool:
         """Delete key from cache"""
-        async with self._lock:
-            if key in self.cache:
-                del self.cache[key]
-                return True
-            return False
+        return self.delete_sync(key)
     
     async def clear(self) -> None:
         """Clear all cache entries"""
-        async with self._lock:
-            self.cache.clear()
+        self.clear_sync()
     
     async def size(self) -> int:
         """Get current cache size"""
-        async with self._lock:
-            return len(self.cache)
+        return len(self)
     
     async def cleanup_expired(self) -> int:
         """Remove expired entries and return count removed"""
-        if not self.ttl:
-            return 0
+        return self.cleanup_expired_sync()
+    
+    # Synchronous front door for threads without an event loop (e.g. Qt workers).
+    # Don't call get_or_set_sync from a thread running the event loop that is loading the same key.
+    
+    def get_sync(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+    
+    def set_sync(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, value, ttl)
+    
+    def get_or_set_sync(self, 
+                        key: K, 
+                        factory: Callable[[], Union[V, Awaitable[V]]], 
+                        ttl_override: Optional[float] = None,
+                        timeout: Optional[float] = None) -> V:
+        """Blocking get_or_set; a coroutine factory is run to completion with asyncio.run."""
+        value, flight, leader = self._claim(key)
+        if flight is None:
+            return value
+        if not leader:
+            return flight.result(timeout)
         
-        async with self._lock:
-            current_time = time.time()
+        try:
+            result = factory()
+            if asyncio.iscoroutine(result):
+                result = asyncio.run(result)
+        except BaseException as e:
+            self._settle(key, flight, error=e)
+            raise
+        self._settle(key, flight, result, ttl=ttl_override)
+        return result
+    
+    def delete_sync(self, key: K) -> bool:
+        with self._lock:
+            self._inflight.pop(key, None)
+            return self.cache.pop(key, None) is not None
+    
+    def clear_sync(self) -> None:
+        with self._lock:
+            self._inflight.clear()
+            self.cache.clear()
+    
+    def cleanup_expired_sync(self) -> int:
+        with self._lock:
+            now = time.monotonic()
             expired_keys = [
-                key for key, (_, timestamp) in self.cache.items()
-                if (current_time - timestamp) > self.ttl
+                key for key, (_, expires_at) in self.cache.items()
+                if expires_at is not None and now >= expires_at
             ]
-            
             for key in expired_keys:
                 del self.cache[key]
-            
+            self.expirations += len(expired_keys)
             return len(expired_keys)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.cache)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit/miss/coalesced/eviction/expiration counters"""
+        with self._lock:
+            return {
+                'size': len(self.cache),
+                'maxsize': self.maxsize,
+                'in_flight': len(self._inflight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+    
+    def start_sweeper(self, interval: float = 60.0) -> None:
+        """Remove expired entries every interval seconds on a daemon thread"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+        
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                try:
+                    removed = self.cleanup_expired_sync()
+                    if removed:
+                        logger.debug(f"AsyncLRUCache sweeper removed {removed} expired entries")
+                except Exception as e:
+                    logger.error(f"AsyncLRUCache sweeper error: {e}")
+        
+        self._sweeper = threading.Thread(target=sweep, name="AsyncLRUCacheSweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self) -> None:
+        """Stop the background sweeper, if running"""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
 
 
 class HTTPClientManager:
@@ -250,19 +507,23 @@ class HTTPClientManager:
                     del self.sessions[session_name]
             
             # Create new session
+            from app.core.http_timing import create_trace_config  # http_timing imports this module
             timeout_config = ClientTimeout(total=timeout or self.default_timeout)
             connector = TCPConnector(limit=self.max_connections)
+            trace_configs = [create_trace_config(self.performance_metrics)]
             
             if RETRY_AVAILABLE and RetryClient:
                 session = RetryClient(
                     connector=connector,
                     timeout=timeout_config,
-                    retry_options=ExponentialRetry(attempts=retry_attempts)
+                    retry_options=ExponentialRetry(attempts=retry_attempts),
+                    trace_configs=trace_configs
                 )
             else:
                 session = ClientSession(
                     connector=connector,
-                    timeout=timeout_config
+                    timeout=timeout_config,
+                    trace_configs=trace_configs
                 )
             
             self.sessions[session_name] = session
@@ -274,25 +535,19 @@ class HTTPClientManager:
                      url: str, 
                      session_name: str = "default",
                      **kwargs) -> Optional[Any]:
-        """Make HTTP request with performance tracking"""
-        start_time = time.time()
+        """Make HTTP request with performance tracking (total time and per-phase timings by route)"""
+        from app.core.http_timing import RequestTiming
         session = await self.get_session(session_name)
         
         if not session:
             return None
         
+        timing = RequestTiming(method, url, metrics=self.performance_metrics)
         try:
-            async with session.request(method, url, **kwargs) as response:
+            # Under a 'timing' key: aiohttp_retry merges its own entries into trace_request_ctx.
+            async with session.request(method, url, trace_request_ctx={'timing': timing}, **kwargs) as response:
                 data = await response.text()
-                execution_time = time.time() - start_time
-                
-                self.performance_metrics.record_request(
-                    url=url,
-                    method=method,
-                    execution_time=execution_time,
-                    status_code=response.status,
-                    success=response.status < 400
-                )
+                timing.finish(response.status)
                 
                 if response.status >= 400:
                     logger.warning(f"HTTP {response.status} for {method} {url}")
@@ -304,13 +559,7 @@ class HTTPClientManager:
                 }
         
         except Exception as e:
-            execution_time = time.time() - start_time
-            self.performance_metrics.record_request(
-                url=url,
-                method=method,
-                execution_time=execution_time,
-                success=False
-            )
+            timing.finish(error=e)
             logger.error(f"HTTP request failed for {method} {url}: {e}")
             return None
     
@@ -346,28 +595,28 @@ def performance_monitor(function_name: Optional[str] = None):
         if asyncio.iscoroutinefunction(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs) -> T:
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = await func(*args, **kwargs)
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     _performance_monitor.record_function_call(name, execution_time, True)
                     return result
                 except Exception as e:
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     _performance_monitor.record_function_call(name, execution_time, False)
                     raise
             return async_wrapper
         else:
             @wraps(func)
             def sync_wrapper(*args, **kwargs) -> T:
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     _performance_monitor.record_function_call(name, execution_time, True)
                     return result
                 except Exception as e:
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     _performance_monitor.record_function_call(name, execution_time, False)
                     raise
             return sync_wrapper
@@ -375,12 +624,41 @@ def performance_monitor(function_name: Optional[str] = None):
     return decorator
 
 
+class _MemoryOwner:
+    """Attributes of one object whose deep size is reported under a module name."""
+    __slots__ = ('ref', 'module', 'attributes', 'sizes', 'measured_at')
+
+    def __init__(self, owner: Any, module: str, attributes: Tuple[str, ...]):
+        self.ref = weakref.ref(owner)
+        self.module = module
+        self.attributes = attributes
+        self.sizes: Dict[str, int] = {}
+        self.measured_at: Optional[float] = None
+
+
 class ResourceMonitor:
-    """Monitor system resources and memory usage"""
+    """
+    Monitor system resources and memory usage.
+
+    Besides weakref tracking and gc statistics this offers:
+    - tracemalloc snapshots, kept under labels, with top allocation sites and
+      diffs between two snapshots (start_allocation_tracing first);
+    - a registry of the data objects modules own (register_owner), measured with
+      deep_sizeof and compared against per-module budgets in get_memory_budget_report.
+    """
+
+    # Labelled snapshots kept; the oldest is dropped first.
+    MAX_SNAPSHOTS = 10
     
-    def __init__(self):
+    def __init__(self, size_refresh_interval: float = 300.0):
         self.tracked_objects: Set[weakref.ref] = set()
         self.creation_times: Dict[int, float] = {}
+        self.size_refresh_interval = size_refresh_interval
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._top_sites: Dict[str, List[Dict[str, Any]]] = {}
+        self._owners: List[_MemoryOwner] = []
+        self._budgets: Dict[str, int] = {}
     
     def track_object(self, obj: Any) -> None:
         """Track an object for memory monitoring"""
@@ -401,12 +679,15 @@ class ResourceMonitor:
         alive_objects = sum(1 for ref in self.tracked_objects if ref() is not None)
         gc_stats = gc.get_stats()
         
-        return {
+        info = {
             'tracked_objects': len(self.tracked_objects),
             'alive_objects': alive_objects,
             'garbage_collector_stats': gc_stats,
             'garbage_count': len(gc.garbage)
         }
+        if tracemalloc.is_tracing():
+            info['traced_current'], info['traced_peak'] = tracemalloc.get_traced_memory()
+        return info
     
     def force_garbage_collection(self) -> Dict[str, int]:
         """Force garbage collection and return stats"""
@@ -416,6 +697,179 @@ class ResourceMonitor:
             'garbage_remaining': len(gc.garbage)
         }
 
+    # Allocation tracing
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_allocation_tracing(self, frames: int = 1) -> None:
+        """Start tracemalloc, storing frames stack frames per allocation (more frames cost more memory)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"Allocation tracing started ({frames} frame(s) per allocation)")
+
+    def stop_allocation_tracing(self) -> None:
+        """Stop tracemalloc and drop the stored snapshots"""
+        with self._lock:
+            self._snapshots.clear()
+            self._top_sites.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Allocation tracing is not running; call start_allocation_tracing() first")
+        return tracemalloc.take_snapshot()
+
+    def take_snapshot(self, label: Optional[str] = None) -> str:
+        """
+        Take a tracemalloc snapshot and keep it under label (replacing an older one).
+
+        Returns:
+            The label, by default the snapshot time.
+
+        Raises:
+            RuntimeError: if allocation tracing is not running.
+        """
+        snapshot = self._take_snapshot()
+        label = label or datetime.now().strftime('%H:%M:%S.%f')
+        with self._lock:
+            self._snapshots.pop(label, None)
+            self._top_sites.pop(label, None)
+            self._snapshots[label] = snapshot
+            while len(self._snapshots) > self.MAX_SNAPSHOTS:
+                dropped, _ = self._snapshots.popitem(last=False)
+                self._top_sites.pop(dropped, None)
+        return label
+
+    def get_snapshot_labels(self) -> List[str]:
+        with self._lock:
+            return list(self._snapshots)
+
+    def _snapshot(self, label: Optional[str]) -> tracemalloc.Snapshot:
+        if label is None:
+            return self._take_snapshot()
+        with self._lock:
+            if label not in self._snapshots:
+                raise KeyError(f"No memory snapshot labelled '{label}'")
+            return self._snapshots[label]
+
+    def get_top_allocations(self, limit: int = 10, label: Optional[str] = None,
+                            group_by: str = 'lineno') -> List[Dict[str, Any]]:
+        """
+        Allocation sites holding the most memory, from the snapshot under label (a
+        new one if None). group_by is 'lineno', 'filename' or 'traceback'.
+        """
+        return top_sites(self._snapshot(label), limit, group_by)
+
+    def diff_snapshots(self, older: str, newer: Optional[str] = None, limit: int = 10,
+                       group_by: str = 'lineno') -> List[Dict[str, Any]]:
+        """Allocation sites that grew or shrank most between two labelled snapshots (newer=None: now)"""
+        return diff_sites(self._snapshot(older), self._snapshot(newer), limit, group_by)
+
+    # Data owned by modules
+
+    def register_owner(self, owner: Any, *attributes: str, module: Optional[str] = None) -> None:
+        """
+        Report the deep size of owner's attributes under module (default: the owner's
+        class name). Only a weak reference to owner is kept; attributes are read when
+        sizes are measured, so reassigning them needs no new registration.
+        """
+        module = module or type(owner).__name__
+        with self._lock:
+            self._owners = [entry for entry in self._owners if entry.ref() is not None and entry.ref() is not owner]
+            self._owners.append(_MemoryOwner(owner, module, tuple(attributes)))
+
+    def unregister_owner(self, owner: Any) -> None:
+        with self._lock:
+            self._owners = [entry for entry in self._owners if entry.ref() is not None and entry.ref() is not owner]
+
+    def set_budget(self, module: str, max_bytes: Optional[int]) -> None:
+        """Set (or with None, remove) the memory budget of a module"""
+        with self._lock:
+            if max_bytes is None:
+                self._budgets.pop(module, None)
+            else:
+                self._budgets[module] = int(max_bytes)
+
+    def get_owned_sizes(self, refresh: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Bytes per attribute by module. Sizes are re-measured at most every
+        size_refresh_interval seconds unless refresh is set.
+        """
+        with self._lock:
+            self._owners = [entry for entry in self._owners if entry.ref() is not None]
+            owners = list(self._owners)
+
+        now = time.monotonic()
+        by_module: Dict[str, Dict[str, int]] = {}
+        for entry in owners:
+            owner = entry.ref()
+            if owner is None:
+                continue
+            if refresh or entry.measured_at is None or now - entry.measured_at >= self.size_refresh_interval:
+                entry.sizes = self._measure(owner, entry.attributes)
+                entry.measured_at = now
+            sizes = by_module.setdefault(entry.module, {})
+            for attribute, size in entry.sizes.items():
+                sizes[attribute] = sizes.get(attribute, 0) + size
+        return by_module
+
+    @staticmethod
+    def _measure(owner: Any, attributes: Tuple[str, ...]) -> Dict[str, int]:
+        seen: Set[int] = set()   # data shared between the owner's attributes is counted once
+        sizes = {}
+        for attribute in attributes:
+            value = getattr(owner, attribute, None)
+            if value is None:
+                continue
+            try:
+                sizes[attribute] = deep_sizeof(value, seen)
+            except Exception as e:
+                # e.g. a dict resized by the UI thread while it was being walked
+                logger.debug(f"Could not measure {type(owner).__name__}.{attribute}: {e}")
+        return sizes
+
+    def get_memory_budget_report(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Per-module memory budget report: owned bytes by attribute, the module's
+        budget and whether it is exceeded, largest modules first. With allocation
+        tracing on, also the traced totals and the top allocation sites of the
+        newest labelled snapshot (none is taken here; reports may be frequent).
+        """
+        owned = self.get_owned_sizes(refresh)
+        with self._lock:
+            budgets = dict(self._budgets)
+        modules = {}
+        for module, items in sorted(owned.items(), key=lambda item: sum(item[1].values()), reverse=True):
+            total = sum(items.values())
+            budget = budgets.get(module)
+            modules[module] = {
+                'bytes': total,
+                'budget': budget,
+                'over_budget': budget is not None and total > budget,
+                'items': dict(sorted(items.items(), key=lambda item: item[1], reverse=True)),
+            }
+        report = {
+            'modules': modules,
+            'total_owned_bytes': sum(module['bytes'] for module in modules.values()),
+        }
+        if tracemalloc.is_tracing():
+            report['traced_current'], report['traced_peak'] = tracemalloc.get_traced_memory()
+            labels = self.get_snapshot_labels()
+            if labels:
+                label = labels[-1]
+                with self._lock:
+                    sites = self._top_sites.get(label)
+                if sites is None:
+                    sites = self.get_top_allocations(label=label)
+                    with self._lock:
+                        if label in self._snapshots:
+                            self._top_sites[label] = sites
+                report['top_allocations'] = {'snapshot': label, 'sites': sites}
+        return report
+
 
 # Global instances
 _performance_monitor = PerformanceMetrics()
@@ -438,13 +892,20 @@ def get_resource_monitor() -> ResourceMonitor:
     """Get global resource monitor instance"""
     return _resource_monitor
 
-def get_async_cache(maxsize: int = 128, ttl: Optional[float] = None) -> AsyncLRUCache:
-    """Get global async cache instance"""
+def get_async_cache(maxsize: int = 128, ttl: Optional[float] = None,
+                    sweep_interval: Optional[float] = None) -> AsyncLRUCache:
+    """Get global async cache instance, optionally with a background expiry sweeper"""
     global _async_cache
     if _async_cache is None:
         _async_cache = AsyncLRUCache(maxsize=maxsize, ttl=ttl)
+    if sweep_interval:
+        _async_cache.start_sweeper(sweep_interval)
     return _async_cache
 
+def get_async_cache_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the global async cache, or None if it hasn't been created"""
+    return _async_cache.stats() if _async_cache is not None else None
+
 async def cleanup_performance_resources() -> None:
     """Cleanup all performance monitoring resources"""
     global _http_client_manager, _async_cache
@@ -457,6 +918,7 @@ async def cleanup_performance_resources() -> None:
         
         # Clear cache
         if _async_cache:
+            _async_cache.stop_sweeper()
             await _async_cache.clear()
             _async_cache = None
         
@@ -471,12 +933,12 @@ async def cleanup_performance_resources() -> None:
 @asynccontextmanager
 async def performance_context(name: str):
     """Context manager for performance monitoring"""
-    start_time = time.time()
+    start_time = time.perf_counter()
     try:
         yield
-        execution_time = time.time() - start_time
+        execution_time = time.perf_counter() - start_time
         _performance_monitor.record_function_call(name, execution_time, True)
     except Exception as e:
-        execution_time = time.time() - start_time
+        execution_time = time.perf_counter() - start_time
         _performance_monitor.record_function_call(name, execution_time, False)
         raise
\ No newline at end of file
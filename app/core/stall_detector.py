@@ -0,0 +1,225 @@
+# app/core/stall_detector.py
+"""
+Qt event-loop stall detector.
+
+A timer on the UI thread beats every heartbeat_interval. The delay between when
+a beat was due and when the event loop got to it is the time the loop spent
+blocked. A watchdog thread notices overdue beats while the stall is still going
+on and samples the main thread's stack (sys._current_frames), so each stall is
+attributed to the code that was running. Stalls are aggregated by their top
+frames in report(), which is exposed as the "event_loop_stalls" section of the
+PerformanceMetrics report.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.performance import PerformanceMetrics, get_performance_monitor
+
+logger = logging.getLogger(__name__)
+
+# Frames under this directory count as application code when building stall signatures.
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ROOT = os.path.dirname(APP_ROOT)
+
+Signature = Tuple[str, ...]
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    path = frame.filename
+    if path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    return f"{path}:{frame.lineno} in {frame.name}"
+
+
+class _Stall:
+    __slots__ = ('started', 'samples')
+
+    def __init__(self, started: float):
+        self.started = started
+        self.samples: Dict[Signature, int] = {}
+
+
+class _Location:
+    __slots__ = ('frames', 'stalls', 'samples', 'total_time', 'max_time', 'example')
+
+    def __init__(self, frames: Signature, example: str):
+        self.frames = frames
+        self.stalls = 0
+        self.samples = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.example = example
+
+
+class StallDetector:
+    """
+    Heartbeat-based stall detector for the Qt event loop.
+
+    Args:
+        threshold: Seconds a beat may be late before the loop counts as stalled.
+        heartbeat_interval: Seconds between beats.
+        sample_interval: Seconds between main-thread stack samples during a stall.
+        depth: Number of top frames that identify a stall location.
+        max_locations: Distinct locations kept; later new ones are counted as "other".
+    """
+
+    UNSAMPLED: Signature = ("(stall ended before it was sampled)",)
+    OTHER: Signature = ("(other locations)",)
+
+    def __init__(self, threshold: float = 0.2, heartbeat_interval: float = 0.1, sample_interval: float = 0.05,
+                 depth: int = 3, max_locations: int = 200, metrics: Optional[PerformanceMetrics] = None):
+        self.threshold = threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.sample_interval = sample_interval
+        self.depth = depth
+        self.max_locations = max_locations
+        self.metrics = metrics or get_performance_monitor()
+
+        self._lock = threading.Lock()
+        self._main_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._current: Optional[_Stall] = None
+        self._locations: Dict[Signature, _Location] = {}
+        self._stall_count = 0
+        self._stall_time = 0.0
+        self._max_stall = 0.0
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._timer = None
+
+    # Lifecycle
+
+    def start(self) -> None:
+        """Start beating on the calling (UI) thread and start the watchdog thread."""
+        from PyQt6.QtCore import Qt, QTimer
+
+        if self._timer is not None:
+            return
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self.beat)
+        self._timer.start(int(self.heartbeat_interval * 1000))
+        self.start_watchdog(self._main_thread_id)
+        self.metrics.add_report_section("event_loop_stalls", self.report)
+        logger.info(f"Event loop stall detector started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def start_watchdog(self, main_thread_id: int) -> None:
+        """Start sampling main_thread_id when beats are overdue (start() does this for the Qt loop)."""
+        self._main_thread_id = main_thread_id
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="StallWatchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self._stop.set()
+        if self._watchdog:
+            self._watchdog.join(timeout=2)
+            self._watchdog = None
+
+    # Heartbeat (UI thread)
+
+    def beat(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            delay = max(0.0, now - self._last_beat - self.heartbeat_interval)
+            self._last_beat = now
+            stall, self._current = self._current, None
+        self.metrics.record_function_call("qt.event_loop_delay", delay)
+        if stall is not None or delay >= self.threshold:
+            self._finish_stall(stall, delay)
+
+    # Watchdog thread
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Sample the main thread's stack if the current beat is overdue."""
+        with self._lock:
+            overdue = time.monotonic() - self._last_beat - self.heartbeat_interval
+            if overdue < self.threshold:
+                return
+            if self._current is None:
+                self._current = _Stall(self._last_beat + self.heartbeat_interval)
+            stall = self._current
+        frame = sys._current_frames().get(self._main_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        del frame
+        signature = self._signature(stack)
+        with self._lock:
+            stall.samples[signature] = stall.samples.get(signature, 0) + 1
+            if signature not in self._locations and len(self._locations) < self.max_locations:
+                self._locations[signature] = _Location(signature, ''.join(traceback.format_list(stack[-15:])))
+
+    def _signature(self, stack: List[traceback.FrameSummary]) -> Signature:
+        """Top `depth` application frames (innermost first); top frames of any code if none are ours."""
+        innermost_first = list(reversed(stack))
+        ours = [frame for frame in innermost_first
+                if frame.filename.startswith(APP_ROOT) and not frame.filename.startswith(os.path.abspath(__file__))]
+        return tuple(_format_frame(frame) for frame in (ours or innermost_first)[:self.depth])
+
+    def _finish_stall(self, stall: Optional[_Stall], duration: float) -> None:
+        samples = stall.samples if stall and stall.samples else {self.UNSAMPLED: 0}
+        total_samples = sum(samples.values()) or 1
+        with self._lock:
+            self._stall_count += 1
+            self._stall_time += duration
+            self._max_stall = max(self._max_stall, duration)
+            for signature, count in samples.items():
+                location = self._locations.get(signature)
+                if location is None:
+                    if len(self._locations) < self.max_locations or signature == self.UNSAMPLED:
+                        location = self._locations[signature] = _Location(signature, '')
+                    else:
+                        location = self._locations.setdefault(self.OTHER, _Location(self.OTHER, ''))
+                # Split the stall's time across where its samples landed.
+                share = duration * (count or 1) / total_samples
+                location.stalls += 1
+                location.samples += count
+                location.total_time += share
+                location.max_time = max(location.max_time, duration)
+        self.metrics.record_function_call("qt.event_loop_stall", duration)
+        top = max(samples, key=samples.get)
+        log = logger.warning if duration >= 1.0 else logger.debug
+        log(f"UI thread blocked for {duration * 1000:.0f} ms at {top[0]}")
+
+    # Reporting
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Stall totals and the `limit` locations with the most stall time."""
+        with self._lock:
+            locations = sorted(self._locations.values(), key=lambda l: l.total_time, reverse=True)
+            return {
+                'threshold': self.threshold,
+                'stalls': self._stall_count,
+                'total_stall_time': self._stall_time,
+                'max_stall': self._max_stall,
+                'locations': [{
+                    'frames': list(location.frames),
+                    'stalls': location.stalls,
+                    'samples': location.samples,
+                    'total_time': location.total_time,
+                    'max_time': location.max_time,
+                    'example': location.example,
+                } for location in locations[:limit] if location.stalls],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._locations.clear()
+            self._stall_count = 0
+            self._stall_time = 0.0
+            self._max_stall = 0.0
@@ -1,5 +1,6 @@
 # app/core/threading.py
 import asyncio
+import contextvars
 import logging
 import threading
 import queue
@@ -11,6 +12,8 @@ from dataclasses import dataclass
 from datetime import datetime
 import weakref
 
+from app.core.tracing import bind, span
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -36,6 +39,9 @@ class Worker(QRunnable):
         worker.signals.result.connect(handle_result)
         worker.signals.error.connect(handle_error)
         QThreadPool.globalInstance().start(worker)
+    
+    The caller's context (including its current tracing span) is captured here
+    and the function runs inside it, in a span named span_name.
     """
     
     class Signals(QObject):
@@ -53,14 +59,20 @@ class Worker(QRunnable):
         self.kwargs = kwargs
         self.signals = self.Signals()
         self.is_cancelled = False
+        self.span_name = getattr(fn, '__qualname__', None) or repr(fn)
+        self._context = contextvars.copy_context()
         
     def run(self):
-        """Execute the worker function"""
+        """Execute the worker function in the context it was created in"""
+        self._context.run(self._run)
+    
+    def _run(self):
         try:
             if self.is_cancelled:
                 return
-                
-            result = self.fn(*self.args, **self.kwargs)
+            
+            with span(f"worker: {self.span_name}"):
+                result = self.fn(*self.args, **self.kwargs)
             
             if not self.is_cancelled:
                 self.signals.result.emit(result)
@@ -83,6 +95,8 @@ class AsyncWorker(QThread):
         worker.result_ready.connect(handle_result)
         worker.error_occurred.connect(handle_error)
         worker.start()
+    
+    Like Worker, the coroutine runs in the creator's context, in a span named span_name.
     """
     
     result_ready = pyqtSignal(object)
@@ -97,18 +111,25 @@ class AsyncWorker(QThread):
         self.kwargs = kwargs
         self.is_cancelled = False
         self._loop = None
+        self.span_name = getattr(async_fn, '__qualname__', None) or repr(async_fn)
+        self._context = contextvars.copy_context()
         
     def run(self):
         """Run the async function in a new event loop"""
+        self._context.run(self._run)
+    
+    async def _traced_call(self):
+        with span(f"async worker: {self.span_name}"):
+            return await self.async_fn(*self.args, **self.kwargs)
+    
+    def _run(self):
         try:
             # Create new event loop for this thread
             self._loop = asyncio.new_event_loop()
             asyncio.set_event_loop(self._loop)
             
-            # Run the async function
-            result = self._loop.run_until_complete(
-                self.async_fn(*self.args, **self.kwargs)
-            )
+            # Run the async function; its tasks inherit this thread's (captured) context
+            result = self._loop.run_until_complete(self._traced_call())
             
             if not self.is_cancelled:
                 self.result_ready.emit(result)
@@ -158,12 +179,13 @@ class TaskManager:
         task_name = task_name or f"Task {task_id}"
         
         worker = Worker(fn, *args, **kwargs)
+        worker.span_name = task_name
         
-        # Connect signals
+        # Connect signals; callbacks run in the caller's tracing context
         if on_result:
-            worker.signals.result.connect(on_result)
+            worker.signals.result.connect(bind(on_result))
         if on_error:
-            worker.signals.error.connect(on_error)
+            worker.signals.error.connect(bind(on_error))
             
         # Track completion
         def on_finished():
@@ -189,12 +211,13 @@ class TaskManager:
         task_name = task_name or f"AsyncTask {task_id}"
         
         worker = AsyncWorker(async_fn, *args, **kwargs)
+        worker.span_name = task_name
         
-        # Connect signals
+        # Connect signals; callbacks run in the caller's tracing context
         if on_result:
-            worker.result_ready.connect(on_result)
+            worker.result_ready.connect(bind(on_result))
         if on_error:
-            worker.error_occurred.connect(on_error)
+            worker.error_occurred.connect(bind(on_error))
             
         # Track completion
         def on_finished():
@@ -227,6 +250,14 @@ class TaskManager:
         """Get number of active tasks"""
         return len(self.active_tasks)
     
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Thread pool occupancy, for metrics export"""
+        return {
+            'active_threads': self.thread_pool.activeThreadCount(),
+            'max_threads': self.thread_pool.maxThreadCount(),
+            'active_tasks': len(self.active_tasks),
+        }
+    
     def cancel_all_tasks(self):
         """Cancel all running tasks"""
         for task_id in list(self.active_tasks.keys()):
@@ -269,7 +300,8 @@ class AsyncTaskManager:
         async def wrapped_task():
             start_time = time.time()
             try:
-                result = await coro_fn(*args, **kwargs)
+                with span(f"task: {task_name}"):
+                    result = await coro_fn(*args, **kwargs)
                 execution_time = time.time() - start_time
                 
                 task_result = TaskResult(
@@ -317,7 +349,9 @@ class AsyncTaskManager:
         async def wrapped_task():
             start_time = time.time()
             try:
-                result = await loop.run_in_executor(self._executor, fn, *args)
+                with span(f"task: {task_name}"):
+                    # run_in_executor doesn't carry contextvars over to the executor thread
+                    result = await loop.run_in_executor(self._executor, contextvars.copy_context().run, fn, *args)
                 execution_time = time.time() - start_time
                 
                 task_result = TaskResult(
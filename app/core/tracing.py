@@ -0,0 +1,244 @@
+# app/core/tracing.py
+"""
+Lightweight tracing spans with context propagation across threads.
+
+The current span lives in a contextvar. Worker, AsyncWorker and the task
+managers (app.core.threading) capture the caller's context when work is
+queued, so a span opened on the UI thread becomes the parent of the spans the
+background work opens. Qt slots run outside that context; wrap them with bind()
+to run them in the context that was current when they were connected.
+
+Finished spans go into a fixed-size ring buffer and can be written out as
+Chrome trace-event JSON (chrome://tracing, Perfetto) to see one user action as
+a waterfall across the UI and worker threads.
+"""
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed operation. Times are perf_counter_ns values."""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'thread_id', 'thread_name', 'attributes', 'error', '_tracer')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        thread = threading.current_thread()
+        self.thread_id = threading.get_ident()
+        self.thread_name = thread.name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish the span and hand it to the ring buffer. Later calls are ignored."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self._tracer._record(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds, or None while the span is open."""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else None
+
+    def __repr__(self):
+        return f"Span({self.name!r}, trace={self.trace_id}, id={self.span_id}, parent={self.parent_id})"
+
+
+class Tracer:
+    """Creates spans and keeps the last `capacity` finished ones."""
+
+    def __init__(self, capacity: int = 20000, enabled: bool = True):
+        self.enabled = enabled
+        self._spans: deque = deque(maxlen=capacity)
+        self._origin_ns = time.perf_counter_ns()
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def resize(self, capacity: int) -> None:
+        self._spans = deque(self._spans, maxlen=capacity)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Optional[Span]:
+        """
+        Open a span without making it current (end it with span.end()). Useful for an
+        operation that finishes in a later callback. The parent defaults to the current span.
+        Returns None while tracing is disabled.
+        """
+        if not self.enabled:
+            return None
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Time the block as a child of the current span, and make it current inside the block."""
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _record(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        """Finished spans, oldest first."""
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def chrome_trace(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """
+        Spans as Chrome trace-event JSON: one complete ("X") event per span, thread
+        name metadata, and flow arrows from a parent to children on other threads.
+        """
+        spans = self.spans() if spans is None else spans
+        pid = os.getpid()
+        by_id = {span.span_id: span for span in spans}
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+
+        def micros(ns: int) -> float:
+            return (ns - self._origin_ns) / 1000.0
+
+        for span in spans:
+            threads.setdefault(span.thread_id, span.thread_name)
+            args = {'trace_id': span.trace_id, 'span_id': span.span_id, 'parent_id': span.parent_id}
+            args.update({key: value if isinstance(value, (int, float, bool)) or value is None else str(value)
+                         for key, value in span.attributes.items()})
+            if span.error:
+                args['error'] = span.error
+            events.append({
+                'name': span.name, 'cat': 'span', 'ph': 'X', 'pid': pid, 'tid': span.thread_id,
+                'ts': micros(span.start_ns), 'dur': (span.end_ns - span.start_ns) / 1000.0, 'args': args,
+            })
+
+            parent = by_id.get(span.parent_id)
+            if parent is not None and parent.thread_id != span.thread_id:
+                # The arrow must start inside the parent's slice.
+                start_ns = max(parent.start_ns, min(span.start_ns, parent.end_ns))
+                events.append({'name': 'context', 'cat': 'flow', 'ph': 's', 'id': span.span_id,
+                               'pid': pid, 'tid': parent.thread_id, 'ts': micros(start_ns)})
+                events.append({'name': 'context', 'cat': 'flow', 'ph': 'f', 'bp': 'e', 'id': span.span_id,
+                               'pid': pid, 'tid': span.thread_id, 'ts': micros(span.start_ns)})
+
+        for thread_id, thread_name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'name': thread_name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump_chrome_trace(self, path: str) -> str:
+        """Write chrome_trace() to path (directories are created). Returns the path."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+        logger.info(f"Wrote {len(self._spans)} spans to {path}")
+        return path
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the global tracer"""
+    return _tracer
+
+
+def configure_tracing(enabled: bool = True, capacity: Optional[int] = None) -> Tracer:
+    """Enable or disable the global tracer and optionally resize its ring buffer."""
+    _tracer.enabled = enabled
+    if capacity and capacity != _tracer.capacity:
+        _tracer.resize(capacity)
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Context manager timing a block on the global tracer (see Tracer.span)."""
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def activate(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Make an existing span (e.g. from start_span) current inside the block."""
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Wrap fn so it runs in the context current now (e.g. a Qt slot connected to a
+    worker signal, which Qt calls later on the UI thread).
+    """
+    context = contextvars.copy_context()
+
+    @wraps(fn)
+    def bound(*args, **kwargs):
+        # A context can't be entered twice at once, so run each call in its own copy.
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running a function (sync or async) inside a span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+        return sync_wrapper
+    return decorator
@@ -3,6 +3,7 @@ import sys
 import os
 import logging
 import asyncio
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -27,7 +28,10 @@ from app.core.threading import get_task_manager, AsyncTaskManager
 from app.core.exceptions import (BRIDealException, AuthenticationError, 
                                  ValidationError, ErrorSeverity, ErrorContext, ErrorCategory) # APIError removed as it's not in the original, added Context, Category
 from app.core.security import SecureConfig
-from app.core.performance import get_http_client_manager, get_performance_monitor, cleanup_performance_resources
+from app.core.performance import get_async_cache_stats, get_http_client_manager, get_performance_monitor, get_resource_monitor, cleanup_performance_resources
+from app.core.metrics_exporter import create_metrics_exporter
+from app.core.tracing import configure_tracing, get_tracer, span
+from app.core.stall_detector import StallDetector
 
 # Utility imports
 from app.utils.theme_manager import ThemeManager
@@ -115,7 +119,11 @@ class MainWindow(QMainWindow):
        
        # Performance monitoring
        self.performance_monitor = get_performance_monitor()
+       self.resource_monitor = get_resource_monitor()
        self.http_client_manager = get_http_client_manager()
+       self.metrics_exporter = None
+       self.stall_detector = None
+       configure_tracing(self.config.get("tracing_enabled", True), self.config.get("tracing_buffer_size", 20000))
        
        # Status tracking
        self.service_status: Dict[str, bool] = {}
@@ -299,8 +307,60 @@ class MainWindow(QMainWindow):
        self.performance_report_timer.timeout.connect(self._generate_performance_report)
        self.performance_report_timer.start(1800000)  # 30 minutes
        
+       self._setup_metrics_exporter()
+       
+       # Event loop stall detection (heartbeat on this thread, watchdog samples its stack)
+       if self.config.get("stall_detector_enabled", True):
+           try:
+               self.stall_detector = StallDetector(threshold=self.config.get("stall_threshold_ms", 200) / 1000.0)
+               self.stall_detector.start()
+           except Exception as e:
+               self.logger.error(f"Error starting stall detector: {e}", exc_info=True)
+               self.stall_detector = None
+       
+       self._setup_memory_accounting()
+       
        self.logger.info("Periodic tasks configured")
 
+   def _setup_memory_accounting(self):
+       """Memory budget report (per-module owned data, optional tracemalloc) as a performance report section"""
+       try:
+           budgets = self.config.get("memory_budgets_mb", {}) or {}
+           for module, megabytes in budgets.items():
+               self.resource_monitor.set_budget(module, int(float(megabytes) * 1024 * 1024))
+           if self.config.get("memory_tracing_enabled", False):
+               self.resource_monitor.start_allocation_tracing(int(self.config.get("memory_tracing_frames", 1)))
+               self.resource_monitor.take_snapshot("last_report")
+           self.performance_monitor.add_report_section("memory", self.resource_monitor.get_memory_budget_report)
+       except Exception as e:
+           self.logger.error(f"Error setting up memory accounting: {e}", exc_info=True)
+
+   def _setup_metrics_exporter(self):
+       """Export function, HTTP, cache and thread-pool metrics to metrics_dir (and optionally a localhost endpoint)"""
+       try:
+           self.metrics_exporter = create_metrics_exporter(self.config)
+           if not self.metrics_exporter:
+               self.logger.info("Metrics export disabled")
+               return
+           
+           if self.cache_handler and hasattr(self.cache_handler, 'get_memory_stats'):
+               self.metrics_exporter.add_cache_source("cache_handler_memory", self.cache_handler.get_memory_stats)
+           self.metrics_exporter.add_cache_source("async_lru", get_async_cache_stats)
+           if hasattr(self.task_manager, 'get_pool_stats'):
+               self.metrics_exporter.add_thread_pool_source("task_manager", self.task_manager.get_pool_stats)
+           global_pool = QThreadPool.globalInstance()
+           self.metrics_exporter.add_thread_pool_source("qt_global", lambda: {
+               'active_threads': global_pool.activeThreadCount(),
+               'max_threads': global_pool.maxThreadCount()
+           })
+           
+           self.metrics_exporter.start(self.config.get("metrics_export_interval", 60))
+           scrape_port = self.config.get("metrics_scrape_port", None)
+           if scrape_port is not None:
+               self.metrics_exporter.start_server(int(scrape_port))
+       except Exception as e:
+           self.logger.error(f"Error setting up metrics export: {e}", exc_info=True)
+
    async def _check_service_status_async(self, *args, **kwargs):
        """Asynchronously check service status - fixed to accept parameters"""
        # Ignore any extra parameters passed by Worker
@@ -375,21 +435,70 @@ class MainWindow(QMainWindow):
            # Log summary with better error handling
            if report and isinstance(report, dict):
                try:
-                   total_calls = sum(
-                       data.get('call_count', 0) 
-                       for data in report.values() 
-                       if isinstance(data, dict) and 'call_count' in data
+                   summary = report['summary']
+                   self.logger.info(
+                       f"Performance summary: {summary['total_functions_monitored']} functions monitored, "
+                       f"{summary['total_function_calls']} total calls, {summary['total_requests_made']} HTTP requests"
                    )
-                   self.logger.info(f"Performance summary: {len(report)} functions monitored, {total_calls} total calls")
                except (KeyError, TypeError, AttributeError) as e:
                    self.logger.warning(f"Performance report format issue: {e}")
-                   self.logger.info(f"Performance summary: {len(report)} functions monitored")
            else:
                self.logger.info("Performance report not available or empty")
            
+           stalls = report.get('sections', {}).get('event_loop_stalls') if isinstance(report, dict) else None
+           if stalls and stalls['stalls']:
+               self.logger.warning(
+                   f"UI event loop stalled {stalls['stalls']} times ({stalls['total_stall_time']:.1f}s total, "
+                   f"max {stalls['max_stall']:.2f}s)"
+               )
+               for location in stalls['locations'][:5]:
+                   self.logger.warning(f"  {location['total_time']:.2f}s in {location['stalls']} stalls at {location['frames'][0]}")
+
+           memory = report.get('sections', {}).get('memory') if isinstance(report, dict) else None
+           if memory:
+               for module, usage in memory['modules'].items():
+                   if usage['over_budget']:
+                       self.logger.warning(
+                           f"{module} holds {usage['bytes'] / 1048576:.1f} MB, over its "
+                           f"{usage['budget'] / 1048576:.1f} MB budget: "
+                           + ", ".join(f"{name} {size / 1048576:.1f} MB" for name, size in usage['items'].items())
+                       )
+           if self.resource_monitor.is_tracing:
+               # Allocation growth since the previous report
+               for site in self.resource_monitor.diff_snapshots("last_report", limit=5):
+                   self.logger.info(f"Memory {site['size_diff'] / 1024:+.0f} KiB at {site['location']} "
+                                    f"({site['count_diff']:+d} blocks)")
+               self.resource_monitor.take_snapshot("last_report")
+
+           # Where slow routes spend their time: getting tokens, on the network, or waiting on the server
+           phases_by_route = report.get('request_phases', {}) if isinstance(report, dict) else {}
+           slow_routes = sorted(((key, phases) for key, phases in phases_by_route.items()
+                                 if sum(phases['breakdown'].values()) > 1.0),
+                                key=lambda item: sum(item[1]['breakdown'].values()), reverse=True)
+           for key, phases in slow_routes[:5]:
+               split = phases['breakdown']
+               self.logger.warning(
+                   f"Slow HTTP route {key}: avg auth {split['auth']:.2f}s, network {split['network']:.2f}s, "
+                   f"server {split['server']:.2f}s ({phases['connections']['new']} new connections, "
+                   f"{phases['token_refresh_retries']} token-refresh retries)"
+               )
+
+           if self.metrics_exporter and self.metrics_exporter.export():
+               self.logger.info(f"Metrics exported to {self.metrics_exporter.output_dir}")
+           
        except Exception as e:
            self.logger.error(f"Error generating performance report: {e}", exc_info=True)
 
+   def dump_trace(self) -> Optional[str]:
+       """Write the buffered tracing spans as Chrome trace-event JSON under <logs_dir>/traces"""
+       try:
+           path = os.path.join(self.config.get("logs_dir", "logs"), "traces",
+                               f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+           return get_tracer().dump_chrome_trace(path)
+       except Exception as e:
+           self.logger.error(f"Error writing trace: {e}", exc_info=True)
+           return None
+
    def _add_module_to_stack(self, name: str, widget: QWidget, icon_name: Optional[str] = None):
        """Add module to the navigation stack with enhanced error handling"""
        try:
@@ -685,19 +794,21 @@ class MainWindow(QMainWindow):
        try:
            module_name = item.text()
            if module_name in self.modules:
-               current_module_widget = self.modules[module_name]
-               self.stacked_widget.setCurrentWidget(current_module_widget)
-               
-               self.logger.debug(f"Switched to module: {module_name}")
-               self.show_status_message(f"Viewing: {module_name}", "info")
-               
-               # Load module data if available
-               if hasattr(current_module_widget, 'load_module_data') and callable(current_module_widget.load_module_data):
-                   try:
-                       current_module_widget.load_module_data()
-                   except Exception as e:
-                       self.logger.error(f"Error loading data for module {module_name}: {e}", exc_info=True)
-                       self.show_status_message(f"Warning: Failed to load data for {module_name}", "warning")
+               # Root span of the action; background loads and their callbacks join this trace
+               with span(f"open {module_name}", module=module_name):
+                   current_module_widget = self.modules[module_name]
+                   self.stacked_widget.setCurrentWidget(current_module_widget)
+                   
+                   self.logger.debug(f"Switched to module: {module_name}")
+                   self.show_status_message(f"Viewing: {module_name}", "info")
+                   
+                   # Load module data if available
+                   if hasattr(current_module_widget, 'load_module_data') and callable(current_module_widget.load_module_data):
+                       try:
+                           current_module_widget.load_module_data()
+                       except Exception as e:
+                           self.logger.error(f"Error loading data for module {module_name}: {e}", exc_info=True)
+                           self.show_status_message(f"Warning: Failed to load data for {module_name}", "warning")
            else:
                self.logger.error(f"Module '{module_name}' not found in modules dictionary")
                
@@ -915,6 +1026,8 @@ class MainWindow(QMainWindow):
            # Stop periodic timers
            self.status_check_timer.stop()
            self.performance_report_timer.stop()
+           if self.stall_detector:
+               self.stall_detector.stop()
            
            # Shutdown task manager
            if self.task_manager:
@@ -926,6 +1039,12 @@ class MainWindow(QMainWindow):
            except Exception as e:
                self.logger.warning(f"Error generating final performance report: {e}")
            
+           if self.metrics_exporter:
+               self.metrics_exporter.stop()
+           
+           if self.config.get("trace_dump_on_exit", False):
+               self.dump_trace()
+           
            # Save configuration if needed
            try:
                if hasattr(self.config, 'save_user_preferences'):
@@ -6,6 +6,7 @@ from typing import Optional, Dict, List, Any
 import aiohttp
 from app.core.config import BRIDealConfig, get_config
 from app.core.exceptions import BRIDealException, ErrorSeverity
+from app.core.http_timing import RequestTiming, create_trace_config
 from app.core.result import Result
 from app.services.integrations.jd_auth_manager import JDAuthManager
 
@@ -29,7 +30,7 @@ class JDMaintainQuoteApiClient:
     async def _ensure_session(self) -> None:
         async with self._lock:
             if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession(timeout=self.timeout)
+                self.session = aiohttp.ClientSession(timeout=self.timeout, trace_configs=[create_trace_config()])
 
     async def _close_session(self) -> None:
         async with self._lock:
@@ -73,8 +74,10 @@ class JDMaintainQuoteApiClient:
         full_url = f"{self.base_url}{endpoint}"
 
         for attempt in range(2): # Allow one retry for token refresh
+            timing = RequestTiming(method, full_url, token_refresh=attempt > 0)
             try:
-                headers = await self._get_headers()
+                with timing.phase('auth'):
+                    headers = await self._get_headers()
 
                 request_kwargs = {"headers": headers}
                 if params:
@@ -82,13 +85,16 @@ class JDMaintainQuoteApiClient:
                 if method.upper() in ["POST", "PUT", "PATCH"]: # Handle methods that can have a body
                     request_kwargs["json"] = data
 
-                async with self.session.request(method, full_url, **request_kwargs) as response:
+                async with self.session.request(method, full_url, **request_kwargs, trace_request_ctx=timing) as response:
                     if response.status == 401 and attempt == 0:
                         logger.info(f"Token expired/invalid for {full_url}, attempting refresh.")
-                        await self.auth_manager.refresh_token()
+                        with timing.phase('auth'):
+                            await self.auth_manager.refresh_token()
+                        timing.finish(response.status)
                         continue
 
                     response_text = await response.text()
+                    timing.finish(response.status)
 
                     if response.status >= 400:
                         logger.error(f"API Error: {method} {full_url} - Status: {response.status} - Response: {response_text[:500]}")
@@ -128,6 +134,8 @@ class JDMaintainQuoteApiClient:
                     severity=ErrorSeverity.CRITICAL,
                     details={"url": full_url, "method": method, "error_type": type(e).__name__}
                 ))
+            finally:
+                timing.finish()
 
         return Result.failure(BRIDealException("Request failed after token refresh attempt.", ErrorSeverity.ERROR, {"url": full_url, "method": method}))
 
@@ -6,6 +6,7 @@ from typing import Optional, Dict, List, Any
 import aiohttp
 from app.core.config import BRIDealConfig, get_config
 from app.core.exceptions import BRIDealException, ErrorSeverity
+from app.core.http_timing import RequestTiming, create_trace_config
 from app.core.result import Result
 from app.services.integrations.jd_auth_manager import JDAuthManager
 
@@ -31,7 +32,7 @@ class JDPODataApiClient:
         """Ensure aiohttp session is initialized."""
         async with self._lock:
             if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession(timeout=self.timeout)
+                self.session = aiohttp.ClientSession(timeout=self.timeout, trace_configs=[create_trace_config()])
 
     async def _close_session(self) -> None:
         """Close aiohttp session if initialized."""
@@ -87,20 +88,25 @@ class JDPODataApiClient:
         full_url = f"{self.base_url}{endpoint}"
 
         for attempt in range(2): # Allow one retry for token refresh
+            timing = RequestTiming(method, full_url, token_refresh=attempt > 0)
             try:
-                headers = await self._get_headers()
+                with timing.phase('auth'):
+                    headers = await self._get_headers()
 
                 request_kwargs = {"params": params, "headers": headers}
                 if method.upper() in ["POST", "PUT", "PATCH"]:
                     request_kwargs["json"] = data # aiohttp sets Content-Type to application/json
 
-                async with self.session.request(method, full_url, **request_kwargs) as response:
+                async with self.session.request(method, full_url, **request_kwargs, trace_request_ctx=timing) as response:
                     if response.status == 401 and attempt == 0:
                         logger.info(f"Token expired or invalid for {full_url}, attempting refresh.")
-                        await self.auth_manager.refresh_token()
+                        with timing.phase('auth'):
+                            await self.auth_manager.refresh_token()
+                        timing.finish(response.status)
                         continue
 
                     response_text = await response.text()
+                    timing.finish(response.status)
 
                     if response.status >= 400:
                         logger.error(
@@ -173,6 +179,8 @@ class JDPODataApiClient:
                         details={"url": full_url, "method": method, "error": str(e)},
                     )
                 )
+            finally:
+                timing.finish()
 
         return Result.failure(BRIDealException(f"Failed after retry for {full_url}", severity=ErrorSeverity.ERROR))
 
@@ -8,6 +8,7 @@ from datetime import datetime
 
 # Import the Result type and exceptions
 from app.core.exceptions import BRIDealException, ErrorContext, ErrorSeverity
+from app.core.http_timing import RequestTiming, create_trace_config
 from app.core.result import Result
 from app.services.integrations.jd_auth_manager import JDAuthManager
 
@@ -42,7 +43,7 @@ class JDQuoteApiClient:
     async def _ensure_session(self):
         """Ensure aiohttp session exists"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(timeout=self.timeout)
+            self.session = aiohttp.ClientSession(timeout=self.timeout, trace_configs=[create_trace_config()])
     
     async def _close_session(self):
         """Close aiohttp session"""
@@ -77,10 +78,12 @@ class JDQuoteApiClient:
     async def _request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Result[Dict, BRIDealException]:
         """Make authenticated request to JD API"""
         await self._ensure_session()
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        timing = RequestTiming(method, url)
         
         try:
-            headers = await self._get_headers()
-            url = f"{self.base_url}/{endpoint.lstrip('/')}"
+            with timing.phase('auth'):
+                headers = await self._get_headers()
             
             kwargs = {
                 "headers": headers,
@@ -92,19 +95,23 @@ class JDQuoteApiClient:
             
             logger.debug(f"Making {method} request to: {url}")
             
-            async with self.session.request(method, url, **kwargs) as response:
+            async with self.session.request(method, url, trace_request_ctx=timing, **kwargs) as response:
                 response_text = await response.text()
+                timing.finish(response.status)
                 
                 if response.status == 401:
                     # Token might be expired, try to refresh
+                    retry_timing = RequestTiming(method, url, token_refresh=True)
                     try:
-                        await self.auth_manager.refresh_access_token()
-                        # Retry with new token
-                        headers = await self._get_headers()
+                        with retry_timing.phase('auth'):
+                            await self.auth_manager.refresh_access_token()
+                            # Retry with new token
+                            headers = await self._get_headers()
                         kwargs["headers"] = headers
                         
-                        async with self.session.request(method, url, **kwargs) as retry_response:
+                        async with self.session.request(method, url, trace_request_ctx=retry_timing, **kwargs) as retry_response:
                             retry_text = await retry_response.text()
+                            retry_timing.finish(retry_response.status)
                             if retry_response.status >= 400:
                                 return Result.failure(BRIDealException(ErrorContext(
                                     code="JD_API_ERROR",
@@ -123,6 +130,8 @@ class JDQuoteApiClient:
                             severity=ErrorSeverity.HIGH,
                             details={"error": str(refresh_error)}
                         )))
+                    finally:
+                        retry_timing.finish()
                 
                 if response.status >= 400:
                     return Result.failure(BRIDealException(ErrorContext(
@@ -160,6 +169,8 @@ class JDQuoteApiClient:
                 severity=ErrorSeverity.HIGH,
                 details={"endpoint": endpoint, "method": method}
             )))
+        finally:
+            timing.finish()
     
     # API Methods
     async def get_quote_details(self, quote_id: str) -> Result[Dict, BRIDealException]:
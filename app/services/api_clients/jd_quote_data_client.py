@@ -6,6 +6,7 @@ from typing import Optional, Dict, List, Any
 import aiohttp
 from app.core.config import BRIDealConfig, get_config
 from app.core.exceptions import BRIDealException, ErrorSeverity
+from app.core.http_timing import RequestTiming, create_trace_config
 from app.core.result import Result
 from app.services.integrations.jd_auth_manager import JDAuthManager
 
@@ -29,7 +30,7 @@ class JDQuoteDataApiClient:
         """Ensure aiohttp session is initialized."""
         async with self._lock:
             if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession(timeout=self.timeout)
+                self.session = aiohttp.ClientSession(timeout=self.timeout, trace_configs=[create_trace_config()])
 
     async def _close_session(self) -> None:
         """Close aiohttp session if initialized."""
@@ -84,18 +85,23 @@ class JDQuoteDataApiClient:
         full_url = f"{self.base_url}{endpoint}"
 
         for attempt in range(2): # Allow one retry for token refresh
+            timing = RequestTiming(method, full_url, token_refresh=attempt > 0)
             try:
-                headers = await self._get_headers()
+                with timing.phase('auth'):
+                    headers = await self._get_headers()
                 async with self.session.request(
-                    method, full_url, json=data, params=params, headers=headers
+                    method, full_url, json=data, params=params, headers=headers, trace_request_ctx=timing
                 ) as response:
 
                     if response.status == 401 and attempt == 0:
                         logger.info("Token expired or invalid, attempting refresh.")
-                        await self.auth_manager.refresh_token() # Force refresh
+                        with timing.phase('auth'):
+                            await self.auth_manager.refresh_token() # Force refresh
+                        timing.finish(response.status)
                         continue # Retry the request with the new token
 
                     response_text = await response.text()
+                    timing.finish(response.status)
 
                     if response.status >= 400:
                         logger.error(
@@ -158,6 +164,8 @@ class JDQuoteDataApiClient:
                         details={"url": full_url, "method": method, "error": str(e)},
                     )
                 )
+            finally:
+                timing.finish()
 
         # Should not be reached if retry logic is correct
         return Result.failure(BRIDealException("Failed after retry", severity=ErrorSeverity.ERROR))
@@ -3,79 +3,191 @@ Authentication module for Microsoft Graph API.
 Provides functions to authenticate with Azure AD and obtain access tokens.
 """
 
+import logging
 import os
-import traceback
+import threading
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
+from app.core.http_timing import note_auth_time
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file if not already loaded
 if 'AZURE_CLIENT_ID' not in os.environ:
     try:
         load_dotenv()
-        print("Loaded environment variables from .env file")
+        logger.debug("Loaded environment variables from .env file")
     except Exception as e:
-        print(f"Warning: Could not load .env file: {e}")
+        logger.warning(f"Could not load .env file: {e}")
 
-def get_access_token():
+GRAPH_SCOPES = ['https://graph.microsoft.com/.default']
+
+
+class GraphTokenProvider:
     """
-    Gets an access token for Microsoft Graph API using MSAL.
-    
-    Returns:
-        str: The access token if successful, None otherwise.
+    Process-wide app-only Graph token source.
+
+    - One msal.ConfidentialClientApplication (and its in-memory token cache) is reused.
+    - get_token() returns the cached token while it is valid; no network call.
+    - A background timer refreshes the token refresh_margin seconds before expiry.
+    - Concurrent callers that need a refresh share a single in-flight request.
+    - After a failure, callers get None for failure_backoff seconds instead of
+      hammering Azure AD.
     """
-    try:
-        # Try to import MSAL
+
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None,
+                 tenant_id: Optional[str] = None, refresh_margin: float = 240, failure_backoff: float = 30):
+        self.client_id = client_id or os.environ.get('AZURE_CLIENT_ID')
+        self.client_secret = client_secret or os.environ.get('AZURE_CLIENT_SECRET')
+        self.tenant_id = tenant_id or os.environ.get('AZURE_TENANT_ID')
+        self.refresh_margin = refresh_margin
+        self.failure_backoff = failure_backoff
+
+        self._lock = threading.Lock()
+        self._app = None
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._failed_at = 0.0
+        self._inflight: Optional[threading.Event] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def get_token(self, force_refresh: bool = False) -> Optional[str]:
+        """Return a valid access token, refreshing it (once, shared) if needed."""
+        with self._lock:
+            now = time.time()
+            if not force_refresh and self._token and now < self._expires_at:
+                return self._token
+            if not force_refresh and now - self._failed_at < self.failure_backoff:
+                return None
+        started = time.perf_counter()
+        self._refresh()
+        # Charged to the caller's next Graph request as its auth phase.
+        note_auth_time(time.perf_counter() - started)
+        with self._lock:
+            return self._token if time.time() < self._expires_at else None
+
+    def invalidate(self) -> None:
+        """Drop the cached token (e.g. after a 401) so the next call fetches a new one."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _refresh(self) -> None:
+        with self._lock:
+            inflight = self._inflight
+            if inflight is None:
+                self._inflight = threading.Event()
+        if inflight is not None:
+            # Another thread is already fetching; wait for its result.
+            inflight.wait(timeout=60)
+            return
+
+        token, expires_in = None, 0
         try:
+            token, expires_in = self._acquire()
+        finally:
+            with self._lock:
+                now = time.time()
+                if token:
+                    self._token = token
+                    self._expires_at = now + expires_in
+                    self._failed_at = 0.0
+                    self._schedule_refresh(expires_in)
+                else:
+                    self._failed_at = now
+                    if self._token and now < self._expires_at:
+                        # Still holding a usable token: retry the background refresh shortly.
+                        self._schedule_refresh(self.refresh_margin + self.failure_backoff)
+                done, self._inflight = self._inflight, None
+            done.set()
+
+    def _schedule_refresh(self, expires_in: float) -> None:
+        """Arm the background refresh timer. Caller holds self._lock."""
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(expires_in - self.refresh_margin, 30)
+        self._timer = threading.Timer(delay, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _get_app(self):
+        if self._app is None:
             import msal
+            self._app = msal.ConfidentialClientApplication(
+                client_id=self.client_id,
+                client_credential=self.client_secret,
+                authority=f"https://login.microsoftonline.com/{self.tenant_id}"
+            )
+        return self._app
+
+    def _acquire(self):
+        """Fetch a token from MSAL. Returns (token, expires_in) or (None, 0)."""
+        if not all([self.client_id, self.client_secret, self.tenant_id]):
+            logger.error(
+                "Azure AD credentials not found in environment variables "
+                f"(AZURE_CLIENT_ID: {'present' if self.client_id else 'missing'}, "
+                f"AZURE_CLIENT_SECRET: {'present' if self.client_secret else 'missing'}, "
+                f"AZURE_TENANT_ID: {'present' if self.tenant_id else 'missing'})."
+            )
+            return None, 0
+        try:
+            app = self._get_app()
         except ImportError:
-            print("ERROR: msal package not installed. Install it with 'pip install msal'")
-            return None
-        
-        # Get Azure AD credentials from environment variables
-        client_id = os.environ.get('AZURE_CLIENT_ID')
-        client_secret = os.environ.get('AZURE_CLIENT_SECRET')
-        tenant_id = os.environ.get('AZURE_TENANT_ID')
-        
-        if not all([client_id, client_secret, tenant_id]):
-            print("ERROR: Azure AD credentials not found in environment variables.")
-            print(f"AZURE_CLIENT_ID: {'Present' if client_id else 'Missing'}")
-            print(f"AZURE_CLIENT_SECRET: {'Present' if client_secret else 'Missing'}")
-            print(f"AZURE_TENANT_ID: {'Present' if tenant_id else 'Missing'}")
-            return None
-        
-        print(f"Authenticating with Azure AD: Tenant ID {tenant_id}, Client ID {client_id[:5]}...")
-        
-        # Initialize MSAL app
-        app = msal.ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{tenant_id}"
-        )
-        
-        # Get token silently (no user interaction)
-        scopes = ['https://graph.microsoft.com/.default']
-        result = app.acquire_token_for_client(scopes=scopes)
-        
+            logger.error("msal package not installed. Install it with 'pip install msal'")
+            return None, 0
+
+        try:
+            # MSAL serves this from its own cache until the token is close to expiry.
+            result = app.acquire_token_for_client(scopes=GRAPH_SCOPES)
+        except Exception as e:
+            logger.error(f"Exception while acquiring Graph access token: {e}", exc_info=True)
+            return None, 0
+
         if "access_token" in result:
-            token = result["access_token"]
-            token_preview = f"{token[:10]}...{token[-10:]}" if len(token) > 20 else "token"
-            print(f"Successfully acquired access token: {token_preview}")
-            return token
-        else:
-            error_description = result.get("error_description", "Unknown error")
-            error_code = result.get("error", "Unknown error code")
-            print(f"ERROR: Unable to get token: {error_code} - {error_description}")
-            return None
-    
-    except Exception as e:
-        print(f"ERROR: Exception in get_access_token: {e}")
-        traceback.print_exc()
-        return None
+            expires_in = float(result.get("expires_in", 3599))
+            logger.info(f"Acquired Graph access token (expires in {int(expires_in)}s).")
+            return result["access_token"], expires_in
+
+        error_description = result.get("error_description", "Unknown error")
+        error_code = result.get("error", "Unknown error code")
+        logger.error(f"Unable to get Graph access token: {error_code} - {error_description}")
+        return None, 0
+
+
+_token_provider: Optional[GraphTokenProvider] = None
+_token_provider_lock = threading.Lock()
+
+
+def get_graph_token_provider() -> GraphTokenProvider:
+    """Get the process-wide Graph token provider."""
+    global _token_provider
+    if _token_provider is None:
+        with _token_provider_lock:
+            if _token_provider is None:
+                _token_provider = GraphTokenProvider()
+    return _token_provider
+
+
+def get_access_token():
+    """
+    Gets an access token for Microsoft Graph API using MSAL.
+
+    Served from the shared GraphTokenProvider, so repeated calls are cheap.
+
+    Returns:
+        str: The access token if successful, None otherwise.
+    """
+    return get_graph_token_provider().get_token()
+
 
 if __name__ == "__main__":
     # Test the authentication if run directly
+    logging.basicConfig(level=logging.INFO)
     print("Testing authentication...")
     token = get_access_token()
     if token:
         print("Authentication successful!")
     else:
-        print("Authentication failed.")
\ No newline at end of file
+        print("Authentication failed.")
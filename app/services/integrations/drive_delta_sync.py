@@ -0,0 +1,181 @@
+"""
+Drive delta sync for SharePoint reference files.
+
+Tracks a small set of drive items through the Microsoft Graph drive /delta
+endpoint so callers only re-download files that actually changed. The delta
+token and the ids of the tracked items are persisted to a JSON state file
+between runs.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Set
+
+import requests
+
+from .graph_transport import get_graph_transport
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+
+class DriveDeltaSync:
+    """
+    Change detector for tracked drive items built on the Graph /delta endpoint.
+
+    Typical flow:
+        changed = sync.changed_keys(drive_id, token, tracked_paths)
+        if changed is None:
+            sync.start_tracking(drive_id, token)  # no usable token: download everything
+        ... download `changed` (or everything), then record their metadata ...
+        sync.record_items(metadata_by_key)
+        sync.commit()                             # only after the downloads succeeded
+
+    The new delta link is held back until commit() so a failed download is
+    reported again on the next run instead of being lost.
+    """
+
+    def __init__(self, state_path: str, graph_base_url: str = GRAPH_BASE_URL, timeout: int = 30, transport=None):
+        self.state_path = state_path
+        self.graph_base_url = graph_base_url.rstrip('/')
+        self.timeout = timeout
+        self.transport = transport or get_graph_transport()
+        self._state = self._load_state()
+        self._pending_delta_link: Optional[str] = None
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if isinstance(state, dict):
+                state.setdefault('items', {})
+                return state
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable delta state {self.state_path}: {e}")
+        return {'drive_id': None, 'delta_link': None, 'items': {}}
+
+    def _save_state(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"Failed to persist delta state to {self.state_path}: {e}")
+
+    @property
+    def has_token(self) -> bool:
+        return bool(self._state.get('delta_link'))
+
+    def reset(self) -> None:
+        """Forget the stored token and item ids, forcing a full download next time."""
+        self._state = {'drive_id': None, 'delta_link': None, 'items': {}}
+        self._pending_delta_link = None
+        self._save_state()
+
+    def start_tracking(self, drive_id: str, access_token: str) -> bool:
+        """
+        Fetch a delta link representing the drive's current state (token=latest)
+        without enumerating it. Call before a full download so changes made while
+        downloading are picked up on the next run.
+        """
+        url = f"{self.graph_base_url}/drives/{drive_id}/root/delta?token=latest"
+        try:
+            response = self.transport.get(url, headers=self._headers(access_token), timeout=self.timeout)
+            response.raise_for_status()
+            delta_link = response.json().get('@odata.deltaLink')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Failed to obtain latest delta token for drive {drive_id[:10]}...: {e}")
+            return False
+        if not delta_link:
+            logger.error("Graph returned no @odata.deltaLink for token=latest.")
+            return False
+        self._state['drive_id'] = drive_id
+        self._state['items'] = {}
+        self._pending_delta_link = delta_link
+        return True
+
+    def changed_keys(self, drive_id: str, access_token: str, tracked_paths: Dict[str, str]) -> Optional[Set[str]]:
+        """
+        Return the keys of tracked_paths whose items changed since the stored token.
+
+        Args:
+            drive_id: Drive the items live in.
+            access_token: Graph bearer token.
+            tracked_paths: key -> item path relative to the drive root (e.g. "App resources/parts.csv").
+
+        Returns:
+            Set of changed keys, or None if there is no usable token (first run, drive
+            changed, token expired) and the caller must download everything.
+        """
+        if not self.has_token or self._state.get('drive_id') != drive_id:
+            return None
+
+        ids_to_keys = {meta.get('id'): key for key, meta in self._state['items'].items() if meta.get('id')}
+        paths_to_keys = {self._normalize_path(path): key for key, path in tracked_paths.items()}
+        changed: Set[str] = set()
+        url = self._state['delta_link']
+        pages = 0
+        try:
+            while url:
+                response = self.transport.get(url, headers=self._headers(access_token), timeout=self.timeout)
+                if response.status_code == 410:
+                    logger.info("Delta token expired (410 Gone); a full resync is required.")
+                    self.reset()
+                    return None
+                response.raise_for_status()
+                page = response.json()
+                pages += 1
+                for item in page.get('value', []):
+                    key = ids_to_keys.get(item.get('id')) or paths_to_keys.get(self._item_path(item))
+                    if key and key in tracked_paths:
+                        changed.add(key)
+                url = page.get('@odata.nextLink')
+                if not url:
+                    self._pending_delta_link = page.get('@odata.deltaLink')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Drive delta query failed: {e}")
+            return None
+
+        # Items we never recorded (e.g. a previous download failed) are treated as changed.
+        changed.update(key for key in tracked_paths if key not in self._state['items'])
+        logger.info(f"Drive delta: {pages} page(s) scanned, changed tracked items: {sorted(changed) or 'none'}")
+        return changed
+
+    def record_items(self, metadata_by_key: Dict[str, Dict[str, Any]]) -> None:
+        """Remember the id/eTag of downloaded items so later delta pages can be matched by id."""
+        for key, metadata in metadata_by_key.items():
+            if metadata and metadata.get('id'):
+                self._state['items'][key] = {'id': metadata.get('id'), 'eTag': metadata.get('eTag')}
+
+    def forget_items(self, keys) -> None:
+        """Drop recorded items so they are reported as changed on the next run."""
+        for key in keys:
+            self._state['items'].pop(key, None)
+
+    def commit(self) -> None:
+        """Persist the delta link obtained by the last changed_keys()/start_tracking() call."""
+        if self._pending_delta_link:
+            self._state['delta_link'] = self._pending_delta_link
+            self._pending_delta_link = None
+        self._save_state()
+
+    @staticmethod
+    def _headers(access_token: str) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return path.strip('/').lower()
+
+    @classmethod
+    def _item_path(cls, item: Dict[str, Any]) -> str:
+        """Item path relative to the drive root, from parentReference.path ('/drive/root:/folder')."""
+        parent_path = (item.get('parentReference') or {}).get('path') or ''
+        if ':' in parent_path:
+            parent_path = parent_path.split(':', 1)[1]
+        return cls._normalize_path(f"{parent_path}/{item.get('name', '')}")
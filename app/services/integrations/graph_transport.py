@@ -0,0 +1,222 @@
+"""
+Shared HTTP transport for Microsoft Graph / SharePoint traffic.
+
+All SharePoint code paths go through one pooled requests.Session so TCP and TLS
+connections to graph.microsoft.com (and the SharePoint download hosts) are kept
+alive and reused instead of being re-established on every call.
+
+requests has no tracing hooks, so the session's connection pools are urllib3
+subclasses that charge pool waits, connection setup and TLS handshakes to the
+request's RequestTiming (app.core.http_timing).
+"""
+import http.cookiejar
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.core.http_timing import RequestTiming, active_timing
+from app.core.performance import get_performance_monitor
+
+logger = logging.getLogger(__name__)
+
+# Hook signature: hook(event) where event has method, url, status_code, elapsed, error,
+# phases (seconds by phase name) and connection_reused.
+RequestHook = Callable[[Dict[str, Any]], None]
+
+_SETUP_PHASES = ('queue', 'connect', 'tls')
+
+
+def _setup_time(timing: RequestTiming) -> float:
+    return sum(timing.phases.get(phase, 0.0) for phase in _SETUP_PHASES)
+
+
+class _TimedConnectionMixin:
+    """Charges opening a connection to the active RequestTiming: connect (DNS + TCP), then tls."""
+    _tls = False
+
+    def _new_conn(self):
+        timing = active_timing()
+        if timing is None:
+            return super()._new_conn()
+        with timing.phase('connect'):
+            return super()._new_conn()
+
+    def connect(self):
+        timing = active_timing()
+        if timing is None:
+            return super().connect()
+        timing.reused = False
+        connect_before = timing.phases.get('connect', 0.0)
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self._tls:
+                # What connect() spent outside _new_conn is the TLS handshake.
+                timing.add('tls', time.perf_counter() - start - (timing.phases.get('connect', 0.0) - connect_before))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    _tls = True
+
+
+class _TimedPoolMixin:
+    """Charges waiting for a pooled connection (pool_block) to the active RequestTiming."""
+
+    def _get_conn(self, timeout=None):
+        timing = active_timing()
+        if timing is None:
+            return super()._get_conn(timeout)
+        with timing.phase('queue'):
+            return super()._get_conn(timeout)
+
+
+class _TimedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter using the timed pools; the time to response headers not spent on setup is ttfb."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        timing = active_timing()
+        if timing is None:
+            return super().send(request, *args, **kwargs)
+        setup_before = _setup_time(timing)
+        start = time.perf_counter()
+        response = super().send(request, *args, **kwargs)
+        # send() returns once the response headers are in.
+        timing.headers_received = time.perf_counter()
+        timing.add('ttfb', timing.headers_received - start - (_setup_time(timing) - setup_before))
+        if timing.reused is None:
+            timing.reused = True
+        return response
+
+
+class GraphTransport:
+    """
+    Thread-safe, pooled keep-alive transport.
+
+    - One HTTPAdapter pool per host, at most pool_maxsize connections each; callers
+      beyond that wait for a free connection instead of opening more.
+    - Cookies are never stored, so concurrent callers share no mutable session state.
+    - Every request is reported to PerformanceMetrics, with its phase timings, and
+      to any registered hooks. For stream=True requests the elapsed time covers the
+      response headers only and there is no body phase.
+    """
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 8, default_timeout: float = 30):
+        self.default_timeout = default_timeout
+        self._session = requests.Session()
+        self._session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._hooks: List[RequestHook] = []
+        self._hooks_lock = threading.Lock()
+
+    def add_hook(self, hook: RequestHook) -> None:
+        with self._hooks_lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        with self._hooks_lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared session. Accepts the same kwargs as requests.request."""
+        kwargs.setdefault('timeout', self.default_timeout)
+        timing = RequestTiming(method, url, metrics=get_performance_monitor())
+        response = None
+        error = None
+        try:
+            with timing.activate():
+                response = self._session.request(method, url, **kwargs)
+            if timing.headers_received is not None and not kwargs.get('stream'):
+                # Without stream=True, requests has read the whole body by now.
+                timing.add('body', time.perf_counter() - timing.headers_received)
+            return response
+        except requests.exceptions.RequestException as e:
+            error = e
+            raise
+        finally:
+            self._report(timing, response, error)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _report(self, timing: RequestTiming, response: Optional[requests.Response],
+                error: Optional[Exception]) -> None:
+        status_code = response.status_code if response is not None else None
+        # Records total and phase timings under the URL without its query string.
+        timing.finish(status_code, error)
+
+        with self._hooks_lock:
+            hooks = list(self._hooks)
+        if not hooks:
+            return
+        event = {
+            'method': timing.method,
+            'url': timing.url,
+            'status_code': status_code,
+            'elapsed': timing.elapsed,
+            'error': error,
+            'phases': dict(timing.phases),
+            'connection_reused': timing.reused,
+        }
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Graph transport hook {hook!r} failed: {e}")
+
+
+_graph_transport: Optional[GraphTransport] = None
+_graph_transport_lock = threading.Lock()
+
+
+def get_graph_transport() -> GraphTransport:
+    """Get the process-wide Graph transport, creating it on first use."""
+    global _graph_transport
+    if _graph_transport is None:
+        with _graph_transport_lock:
+            if _graph_transport is None:
+                _graph_transport = GraphTransport()
+    return _graph_transport
@@ -8,17 +8,23 @@ import os
 # import requests # Duplicate import removed
 import pandas as pd
 from datetime import datetime
-import io
+import urllib.parse
 import traceback
 import time
-import json
 import logging
+import tempfile
+import threading
 logger = logging.getLogger(__name__)
 # ... other imports ...
 # from .auth import get_access_token # Original relative import
 from dotenv import load_dotenv
 # *** Use RELATIVE import since auth.py is in the same 'modules' directory ***
-from .auth import get_access_token # This is fine if 'auth.py' is in the same directory as sharepoint_manager.py within a package structure
+from .auth import get_graph_token_provider
+from .graph_transport import get_graph_transport
+from .upload_session import DEFAULT_CHUNK_SIZE, ResumableUpload, UploadSessionError
+from .sharepoint_outbox import SharePointOutbox
+from app.core.invalidation import SHAREPOINT_WORKBOOK, get_invalidation_bus
+from app.utils.excel_stream import read_sheet
 
 # Load environment variables if not already loaded
 if 'SHAREPOINT_SITE_ID' not in os.environ:
@@ -49,6 +55,195 @@ if 'SHAREPOINT_SITE_ID' not in os.environ:
         if logger.handlers: logger.warning(log_msg)
         else: print(log_msg)
 
+class _WorkbookEntry:
+    """Downloaded workbook bytes for one driveItem version plus the sheets parsed from them."""
+
+    def __init__(self, item_id, etag, ctag, content):
+        self.item_id = item_id
+        self.etag = etag
+        self.ctag = ctag
+        self.content = content
+        self.sheets = {}  # (sheet target, columns, stop_at_blank_row) -> parsed DataFrame
+        self.lock = threading.Lock()
+
+    def matches(self, file_info):
+        """True if file_info describes the same content version as this entry."""
+        ctag = file_info.get('cTag')
+        if ctag and self.ctag:
+            return ctag == self.ctag
+        etag = file_info.get('eTag')
+        return bool(etag) and etag == self.etag
+
+    def get_sheet(self, sheet_target, columns=None, stop_at_blank_row=False):
+        """Stream sheet_target from the cached bytes on first use and return a copy."""
+        key = (sheet_target, tuple(columns) if columns else None, stop_at_blank_row)
+        with self.lock:
+            df = self.sheets.get(key)
+            if df is None:
+                df = read_sheet(self.content, sheet_name=sheet_target, columns=columns,
+                                stop_at_blank_row=stop_at_blank_row)
+                self.sheets[key] = df
+        return df.copy()
+
+
+class _WorkbookCache:
+    """
+    Process-wide cache of downloaded workbooks keyed by driveItem id.
+
+    Only the latest known version of each item is kept. Callers validate an entry
+    against fresh file metadata (eTag/cTag) before using it, so a changed file is
+    downloaded again while an unchanged one is parsed from the bytes already held.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._item_locks = {}
+        self._lock = threading.Lock()
+
+    def item_lock(self, item_id):
+        """Lock serialising downloads of one item so concurrent readers share a single fetch."""
+        with self._lock:
+            return self._item_locks.setdefault(item_id, threading.Lock())
+
+    def lookup(self, file_info):
+        with self._lock:
+            entry = self._entries.get(file_info.get('id'))
+        if entry is not None and entry.matches(file_info):
+            return entry
+        return None
+
+    def peek(self, item_id):
+        """The entry held for item_id whatever its version, for a conditional re-download."""
+        with self._lock:
+            return self._entries.get(item_id)
+
+    def revalidated(self, entry, file_info):
+        """Keep entry (and its parsed sheets) after the server said its content is unchanged."""
+        entry.etag = file_info.get('eTag') or entry.etag
+        entry.ctag = file_info.get('cTag') or entry.ctag
+        return entry
+
+    def store(self, file_info, content):
+        entry = _WorkbookEntry(file_info.get('id'), file_info.get('eTag'), file_info.get('cTag'), content)
+        with self._lock:
+            previous = self._entries.get(entry.item_id)
+            self._entries[entry.item_id] = entry
+        if previous is not None:
+            # A different version replaced one we had parsed: data derived from it is out of date.
+            get_invalidation_bus().invalidate(SHAREPOINT_WORKBOOK, reason="workbook_changed",
+                                              detail={'item_id': entry.item_id})
+        return entry
+
+    def invalidate(self, item_id=None):
+        with self._lock:
+            if item_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(item_id, None)
+
+
+_workbook_cache = _WorkbookCache()
+
+
+class GraphBatchRequest:
+    """
+    Builder for Microsoft Graph JSON batch requests ($batch).
+
+    Independent calls are bundled into one HTTP round trip of at most
+    MAX_REQUESTS_PER_BATCH requests and the responses are demultiplexed by
+    request id. Requests may declare dependsOn ids; Graph then runs them in
+    order and fails dependents with 424 when a prerequisite fails. More than
+    MAX_REQUESTS_PER_BATCH requests are sent as consecutive batches, in which
+    case a dependency on a request from an earlier batch is already satisfied
+    and is dropped from the payload.
+
+    Usage:
+        batch = GraphBatchRequest(graph_base_url)
+        info_id = batch.add("GET", f"/sites/{site_id}/drive/root:/{quote(path, safe='/')}")
+        batch.add("GET", f"/sites/{site_id}/drive/root:/{quote(folder, safe='/')}:/children")
+        responses = batch.execute(auth_headers)
+        if responses[info_id]['status'] == 200: ...
+    """
+
+    MAX_REQUESTS_PER_BATCH = 20
+
+    def __init__(self, graph_base_url="https://graph.microsoft.com/v1.0", transport=None):
+        self.graph_base_url = graph_base_url.rstrip('/')
+        self.transport = transport or get_graph_transport()
+        self._requests = []
+
+    def __len__(self):
+        return len(self._requests)
+
+    def add(self, method, url, headers=None, body=None, depends_on=None, request_id=None):
+        """
+        Queue a request and return its id.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute Graph URL or a path relative to the Graph version root.
+            headers (dict, optional): Per-request headers (e.g. Workbook-Session-Id).
+            body (dict, optional): JSON body; Content-Type defaults to application/json.
+            depends_on (list, optional): Ids of requests that must complete first.
+            request_id (str, optional): Explicit id; defaults to a sequence number.
+
+        Returns:
+            str: The request id used to look up its response.
+        """
+        request_id = str(request_id) if request_id is not None else str(len(self._requests) + 1)
+        if any(r['id'] == request_id for r in self._requests):
+            raise ValueError(f"Duplicate batch request id: {request_id}")
+
+        relative_url = url[len(self.graph_base_url):] if url.startswith(self.graph_base_url) else url
+        request = {'id': request_id, 'method': method.upper(), 'url': '/' + relative_url.lstrip('/')}
+        request_headers = dict(headers or {})
+        if body is not None:
+            request['body'] = body
+            request_headers.setdefault('Content-Type', 'application/json')
+        if request_headers:
+            request['headers'] = request_headers
+        if depends_on:
+            request['dependsOn'] = [str(d) for d in depends_on]
+        self._requests.append(request)
+        return request_id
+
+    def execute(self, auth_headers, timeout=30):
+        """
+        Send the queued requests and return their responses keyed by request id.
+
+        Args:
+            auth_headers (dict): Headers containing the Graph Authorization bearer token.
+            timeout (int): Timeout in seconds for each $batch round trip.
+
+        Returns:
+            dict: request id -> {'status': int, 'headers': dict, 'body': parsed body or None}.
+        """
+        responses = {}
+        batch_headers = {'Authorization': auth_headers['Authorization'], 'Content-Type': 'application/json'}
+        for chunk_start in range(0, len(self._requests), self.MAX_REQUESTS_PER_BATCH):
+            chunk = self._requests[chunk_start:chunk_start + self.MAX_REQUESTS_PER_BATCH]
+            chunk_ids = {r['id'] for r in chunk}
+            payload = []
+            for request in chunk:
+                request = dict(request)
+                if 'dependsOn' in request:
+                    request['dependsOn'] = [d for d in request['dependsOn'] if d in chunk_ids]
+                    if not request['dependsOn']:
+                        del request['dependsOn']
+                payload.append(request)
+
+            response = self.transport.post(f"{self.graph_base_url}/$batch", headers=batch_headers,
+                                           json={'requests': payload}, timeout=timeout)
+            response.raise_for_status()
+            for item in response.json().get('responses', []):
+                responses[str(item.get('id'))] = {
+                    'status': item.get('status'),
+                    'headers': item.get('headers', {}),
+                    'body': item.get('body'),
+                }
+        return responses
+
+
 class SharePointExcelManager:
     def __init__(self):
         """Initialize the SharePoint Excel Manager."""
@@ -66,6 +261,19 @@ class SharePointExcelManager:
         self.excel_file_path = os.environ.get('FILE_PATH')  # Path to Excel file in SharePoint
         self.sender_email = os.environ.get('SENDER_EMAIL', '')
 
+        try:
+            self.append_block_size = max(1, int(os.environ.get('SHAREPOINT_APPEND_BLOCK_SIZE', '100')))
+        except ValueError:
+            self.append_block_size = 100
+        self.last_append_timings = []
+        try:
+            self.upload_chunk_size = int(os.environ.get('SHAREPOINT_UPLOAD_CHUNK_SIZE', str(DEFAULT_CHUNK_SIZE)))
+        except ValueError:
+            self.upload_chunk_size = DEFAULT_CHUNK_SIZE
+        # Shared keep-alive connection pool and token cache for all Graph calls.
+        self.http = get_graph_transport()
+        self.token_provider = get_graph_token_provider()
+
         self.local_backup_dir = os.path.join(os.path.expanduser("~"), "brideal_sp_backups") # Changed from "ams_backup" for consistency
         if not os.path.exists(self.local_backup_dir):
             try:
@@ -78,6 +286,15 @@ class SharePointExcelManager:
                 if logger.handlers: logger.warning(log_msg)
                 else: print(log_msg)
 
+        # Appends are journaled here and flushed to SharePoint in the background.
+        try:
+            self.outbox = SharePointOutbox(self.local_backup_dir, self._append_rows)
+        except OSError as e:
+            self.outbox = None
+            log_msg = f"Warning: Could not create SharePoint outbox, appends will be sent synchronously: {e}"
+            if logger.handlers: logger.warning(log_msg)
+            else: print(log_msg)
+
         missing_vars = []
         required_env_vars = ['SHAREPOINT_SITE_ID', 'FILE_PATH'] # SENDER_EMAIL is optional for core file ops
         for var_name in required_env_vars:
@@ -88,7 +305,6 @@ class SharePointExcelManager:
             log_msg = f"SharePointExcelManager: Missing required environment variables: {', '.join(missing_vars)}. Manager will not be operational."
             if logger.handlers: logger.error(log_msg)
             else: print(f"ERROR: {log_msg}")
-            self.access_token = None
             return
 
         log_msg_sp_config = f"SharePoint config loaded: Site ID: {self.site_id}, File: {self.excel_file_path}"
@@ -104,14 +320,12 @@ class SharePointExcelManager:
             log_msg_openpyxl_err = "Required dependency 'openpyxl' is missing. SharePointExcelManager will not be operational. Please install with: pip install openpyxl"
             if logger.handlers: logger.error(log_msg_openpyxl_err)
             else: print(f"ERROR: {log_msg_openpyxl_err}")
-            self.access_token = None
             return
 
         self.graph_base_url = "https://graph.microsoft.com/v1.0"
 
         try:
-            self.access_token = get_access_token()
-            if not self.access_token:
+            if not self.token_provider.get_token():
                 log_msg_token_fail = "Failed to acquire access token during initialization. SharePoint operations will fail."
                 if logger.handlers: logger.error(log_msg_token_fail)
                 else: print(f"ERROR: {log_msg_token_fail}")
@@ -121,13 +335,19 @@ class SharePointExcelManager:
                 if logger.handlers: logger.info(log_msg_token_ok)
                 else: print(log_msg_token_ok)
                 self.is_operational = True  # Set to True on success
+                if self.outbox and self.outbox.pending_count():
+                    self.outbox.start()  # Deliver appends left over from a previous run
         except Exception as auth_err:
              log_msg_token_ex = f"Exception during initial token acquisition: {auth_err}"
              if logger.handlers: logger.error(log_msg_token_ex, exc_info=True)
              else: print(f"ERROR: {log_msg_token_ex}\n{traceback.format_exc()}")
-             self.access_token = None
              # self.is_operational remains False
 
+    @property
+    def access_token(self):
+        """Current Graph bearer token, served from the shared GraphTokenProvider cache."""
+        return self.token_provider.get_token()
+
     def _get_headers(self):
         """
         Generate headers for Graph API requests.
@@ -136,28 +356,22 @@ class SharePointExcelManager:
             dict: Request headers with access token.
         """
         log_prefix = "SharePointManager (_get_headers): "
-        # Refresh token if needed (or if initial acquisition failed)
-        if not self.access_token:
-            try:
-                log_msg_refresh = "Attempting to refresh/acquire access token..."
-                if logger.handlers: logger.info(f"{log_prefix}{log_msg_refresh}")
-                else: print(f"{log_prefix}{log_msg_refresh}")
-
-                self.access_token = get_access_token()
-                if not self.access_token:
-                    log_msg_refresh_fail = "Failed to refresh/acquire access token."
-                    if logger.handlers: logger.error(f"{log_prefix}{log_msg_refresh_fail}")
-                    else: print(f"ERROR: {log_prefix}{log_msg_refresh_fail}")
-                    return None # Return None if token cannot be obtained
-            except Exception as auth_err:
-                log_msg_refresh_ex = f"Exception during token refresh/acquisition: {auth_err}"
-                if logger.handlers: logger.error(f"{log_prefix}{log_msg_refresh_ex}", exc_info=True)
-                else: print(f"ERROR: {log_prefix}{log_msg_refresh_ex}\n{traceback.format_exc()}")
-                self.access_token = None
-                return None # Return None
+        # The provider returns its cached token and refreshes it before expiry.
+        try:
+            access_token = self.token_provider.get_token()
+        except Exception as auth_err:
+            log_msg_refresh_ex = f"Exception during token refresh/acquisition: {auth_err}"
+            if logger.handlers: logger.error(f"{log_prefix}{log_msg_refresh_ex}", exc_info=True)
+            else: print(f"ERROR: {log_prefix}{log_msg_refresh_ex}\n{traceback.format_exc()}")
+            return None # Return None
+        if not access_token:
+            log_msg_refresh_fail = "Failed to refresh/acquire access token."
+            if logger.handlers: logger.error(f"{log_prefix}{log_msg_refresh_fail}")
+            else: print(f"ERROR: {log_prefix}{log_msg_refresh_fail}")
+            return None # Return None if token cannot be obtained
 
         return {
-            'Authorization': f'Bearer {self.access_token}',
+            'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json' # Default for Graph JSON bodies
         }
 
@@ -182,21 +396,6 @@ class SharePointExcelManager:
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_lookup}")
             else: print(f"{log_prefix}{log_msg_lookup}")
 
-            url = f"{self.graph_base_url}/sites/{self.site_id}/drive/root:/{file_path}" # Path needs to be URL encoded if it contains special chars
-            
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                file_data = response.json()
-                log_msg_found = f"Found file with ID: {file_data.get('id')}"
-                if logger.handlers: logger.info(f"{log_prefix}{log_msg_found}")
-                else: print(f"{log_prefix}{log_msg_found}")
-                return file_data
-
-            # If direct access fails, log it and proceed to search (original logic preserved for now)
-            log_msg_direct_fail = f"Direct access to '{file_path}' failed with status {response.status_code}. Trying folder search."
-            if logger.handlers: logger.warning(f"{log_prefix}{log_msg_direct_fail}")
-            else: print(f"WARNING: {log_prefix}{log_msg_direct_fail}")
-
             parts = file_path.split('/')
             if len(parts) == 1:
                 file_name = parts[0]
@@ -204,16 +403,32 @@ class SharePointExcelManager:
             else:
                 folder_path = '/'.join(parts[:-1])
                 file_name = parts[-1]
-                search_url = f"{self.graph_base_url}/sites/{self.site_id}/drive/root:/{folder_path}:/children" # Path needs to be URL encoded
+                search_url = f"{self.graph_base_url}/sites/{self.site_id}/drive/root:/{urllib.parse.quote(folder_path, safe='/')}:/children"
+
+            # The folder listing can be large, so it is only fetched when the direct lookup misses.
+            direct_url = f"{self.graph_base_url}/sites/{self.site_id}/drive/root:/{urllib.parse.quote(file_path, safe='/')}"
+            direct_response = self.http.get(direct_url, headers=headers)
+            if direct_response.status_code == 200:
+                file_data = direct_response.json()
+                log_msg_found = f"Found file with ID: {file_data.get('id')}"
+                if logger.handlers: logger.info(f"{log_prefix}{log_msg_found}")
+                else: print(f"{log_prefix}{log_msg_found}")
+                return file_data
+
+            # If direct access fails, log it and use the search results (original logic preserved for now)
+            log_msg_direct_fail = f"Direct access to '{file_path}' failed with status {direct_response.status_code}. Trying folder search."
+            if logger.handlers: logger.warning(f"{log_prefix}{log_msg_direct_fail}")
+            else: print(f"WARNING: {log_prefix}{log_msg_direct_fail}")
 
             log_msg_search = f"Searching for {file_name} in folder via URL: {search_url}"
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_search}")
             else: print(f"{log_prefix}{log_msg_search}")
 
-            response = requests.get(search_url, headers=headers)
-            response.raise_for_status() # Will raise for 4xx/5xx errors
+            search_response = self.http.get(search_url, headers=headers)
+            if search_response.status_code != 200:
+                raise Exception(f"Folder search failed. Status: {search_response.status_code}, Resp: {search_response.text}")
 
-            for item in response.json().get('value', []):
+            for item in search_response.json().get('value', []):
                 if item.get('name') == file_name:
                     log_msg_found_search = f"Found file via search with ID: {item.get('id')}"
                     if logger.handlers: logger.info(f"{log_prefix}{log_msg_found_search}")
@@ -231,13 +446,19 @@ class SharePointExcelManager:
             else: print(f"ERROR: {log_prefix}{log_msg_ex}\n{traceback.format_exc()}")
             return None
 
-    def get_excel_data(self, sheet_name=None):
+    def get_excel_data(self, sheet_name=None, columns=None, stop_at_blank_row=False):
         """
         Get current data from the Excel file.
 
+        The workbook is downloaded once per file version and shared between callers;
+        each sheet is streamed lazily (read-only, that sheet only) from the cached
+        bytes on first request.
+
         Args:
             sheet_name (str or int, optional): The name or index of the sheet to read.
                                                Defaults to None (reads the first sheet if 0 is not specified).
+            columns (list, optional): Header names to keep. Defaults to all columns.
+            stop_at_blank_row (bool): Stop reading at the first empty row.
         Returns:
             pd.DataFrame: DataFrame containing the Excel data if successful, None otherwise.
         """
@@ -269,123 +490,170 @@ class SharePointExcelManager:
             return None
 
 
-        url = f"{self.graph_base_url}/sites/{self.site_id}/drive/items/{file_id}/content"
-        log_msg_download = "Downloading Excel file content..."
-        if logger.handlers: logger.info(f"{log_prefix}{log_msg_download}")
-        else: print(f"{log_prefix}{log_msg_download}")
-        
-        # For file content download, only Authorization header is typically needed.
-        # Graph API's /content endpoint usually doesn't expect 'Content-Type: application/json'.
-        download_headers = {'Authorization': graph_headers['Authorization']}
-        
-        response = requests.get(url, headers=download_headers)
-        response.raise_for_status()
+        try:
+            workbook = self._get_cached_workbook(file_info, graph_headers)
+        except Exception as e:
+            log_msg_ex_dl = f"Failed to download Excel file content: {e}"
+            if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex_dl}", exc_info=True)
+            else: print(f"ERROR: {log_prefix}{log_msg_ex_dl}\n{traceback.format_exc()}")
+            return None
 
-        excel_data = io.BytesIO(response.content)
         try:
             current_sheet_target = sheet_name if sheet_name is not None else 0
             log_msg_parse = f"Parsing Excel data (Sheet target: {current_sheet_target})..."
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_parse}")
             else: print(f"{log_prefix}{log_msg_parse}")
 
-            df = pd.read_excel(excel_data, engine='openpyxl', sheet_name=current_sheet_target)
+            df = workbook.get_sheet(current_sheet_target, columns=columns, stop_at_blank_row=stop_at_blank_row)
             log_msg_success = f"Successfully read Excel sheet with {len(df)} rows and {len(df.columns)} columns."
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_success}")
             else: print(f"{log_prefix}{log_msg_success}")
             return df
         except Exception as ex:
-            log_msg_ex_parse = f"Error in pandas read_excel (Target sheet: {sheet_name}): {ex}"
+            log_msg_ex_parse = f"Error reading Excel sheet (Target sheet: {sheet_name}): {ex}"
             if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex_parse}", exc_info=True)
             else: print(f"ERROR: {log_prefix}{log_msg_ex_parse}\n{traceback.format_exc()}")
             return None
 
-        except Exception as e:
-            log_msg_ex_gen = f"Failed to get Excel data: {e}"
-            if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex_gen}", exc_info=True)
-            else: print(f"ERROR: {log_prefix}{log_msg_ex_gen}\n{traceback.format_exc()}")
-            return None
+    def _get_cached_workbook(self, file_info, graph_headers):
+        """
+        Return the workbook entry for file_info, downloading it only if the cached
+        copy is missing or its eTag/cTag no longer matches the file metadata.
+
+        When a copy of another version is held, the download is conditional
+        (If-None-Match on its cTag/eTag); a 304 keeps that copy. The eTag also
+        changes on metadata-only edits (rename, properties), which leave the
+        content and cTag as they were.
+
+        Args:
+            file_info (dict): driveItem metadata from get_excel_file_info.
+            graph_headers (dict): Graph API headers containing Authorization.
+
+        Returns:
+            _WorkbookEntry: Cached workbook bytes and already-parsed sheets.
+        """
+        log_prefix = "SharePointManager (_get_cached_workbook): "
+        file_id = file_info.get('id')
+
+        with _workbook_cache.item_lock(file_id):
+            workbook = _workbook_cache.lookup(file_info)
+            if workbook is not None:
+                log_msg_hit = f"Workbook {file_id} unchanged (eTag {workbook.etag}); reusing cached content."
+                if logger.handlers: logger.info(f"{log_prefix}{log_msg_hit}")
+                else: print(f"{log_prefix}{log_msg_hit}")
+                return workbook
+
+            url = f"{self.graph_base_url}/sites/{self.site_id}/drive/items/{file_id}/content"
+            log_msg_download = "Downloading Excel file content..."
+            if logger.handlers: logger.info(f"{log_prefix}{log_msg_download}")
+            else: print(f"{log_prefix}{log_msg_download}")
+
+            # For file content download, only Authorization header is typically needed.
+            # Graph API's /content endpoint usually doesn't expect 'Content-Type: application/json'.
+            download_headers = {'Authorization': graph_headers['Authorization']}
+            held = _workbook_cache.peek(file_id)
+            if held is not None and (held.ctag or held.etag):
+                download_headers['If-None-Match'] = held.ctag or held.etag
+
+            response = self.http.get(url, headers=download_headers)
+            if response.status_code == 304 and held is not None:
+                log_msg_not_modified = f"Workbook {file_id} content not modified (304); reusing cached content."
+                if logger.handlers: logger.info(f"{log_prefix}{log_msg_not_modified}")
+                else: print(f"{log_prefix}{log_msg_not_modified}")
+                return _workbook_cache.revalidated(held, file_info)
+            response.raise_for_status()
+            return _workbook_cache.store(file_info, response.content)
 
     def _update_excel_file_direct(self, updated_df, file_id, max_retries=3, retry_delay=2):
         """
         Update the Excel file directly with new data, with retry logic.
 
+        The workbook is serialized once to a temp file and streamed through a Graph
+        upload session in fixed-size chunks; a failed chunk resumes from the last
+        acknowledged byte instead of re-sending the whole file.
+
         Args:
             updated_df (pd.DataFrame): DataFrame with updated data.
             file_id (str): ID of the file to update.
-            max_retries (int): Maximum number of retries.
+            max_retries (int): Maximum number of attempts to start an upload (e.g. while the file is locked).
             retry_delay (int): Delay in seconds between retries.
 
         Returns:
             bool: True if successful, False otherwise.
         """
         log_prefix = "SharePointManager (_update_excel_file_direct): "
-        for attempt in range(max_retries):
-            graph_headers_for_put = self._get_headers()
-            if graph_headers_for_put is None:
-                log_msg = f"Attempt {attempt+1}: Cannot update without valid authentication headers."
-                if logger.handlers: logger.error(f"{log_prefix}{log_msg}")
-                else: print(f"ERROR: {log_prefix}{log_msg}")
-                if attempt < max_retries - 1: time.sleep(retry_delay); continue
-                else: return False
-            
-            # For file PUT, only Authorization is typically needed. Content-Type will be set by requests based on data.
-            upload_headers = {'Authorization': graph_headers_for_put['Authorization']}
-
-            try:
-                log_msg_convert = f"Converting DataFrame to Excel format (attempt {attempt+1}/{max_retries})..."
-                if logger.handlers: logger.info(f"{log_prefix}{log_msg_convert}")
-                else: print(f"{log_prefix}{log_msg_convert}")
+        tmp_path = None
+        try:
+            log_msg_convert = "Converting DataFrame to Excel format..."
+            if logger.handlers: logger.info(f"{log_prefix}{log_msg_convert}")
+            else: print(f"{log_prefix}{log_msg_convert}")
+            fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", prefix="brideal_upload_")
+            os.close(fd)
+            updated_df.to_excel(tmp_path, index=False, engine='openpyxl')
+        except Exception as e:
+            log_msg_ex = f"Failed to serialize Excel file for upload: {e}"
+            if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex}", exc_info=True)
+            else: print(f"ERROR: {log_prefix}{log_msg_ex}\n{traceback.format_exc()}")
+            if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+            return False
 
-                excel_bytes = io.BytesIO()
-                updated_df.to_excel(excel_bytes, index=False, engine='openpyxl')
-                excel_bytes.seek(0)
-                excel_content = excel_bytes.getvalue()
+        create_session_url = f"{self.graph_base_url}/sites/{self.site_id}/drive/items/{file_id}/createUploadSession"
+        uploader = ResumableUpload(transport=self.http, chunk_size=self.upload_chunk_size)
+        try:
+            for attempt in range(max_retries):
+                graph_headers_for_put = self._get_headers()
+                if graph_headers_for_put is None:
+                    log_msg = f"Attempt {attempt+1}: Cannot update without valid authentication headers."
+                    if logger.handlers: logger.error(f"{log_prefix}{log_msg}")
+                    else: print(f"ERROR: {log_prefix}{log_msg}")
+                    if attempt < max_retries - 1: time.sleep(retry_delay); continue
+                    else: return False
 
-                url = f"{self.graph_base_url}/sites/{self.site_id}/drive/items/{file_id}/content"
-                
-                log_msg_upload = f"Uploading updated Excel file ({len(excel_content)} bytes)..."
-                if logger.handlers: logger.info(f"{log_prefix}{log_msg_upload}")
-                else: print(f"{log_prefix}{log_msg_upload}")
+                try:
+                    log_msg_upload = f"Uploading updated Excel file ({os.path.getsize(tmp_path)} bytes) via upload session (attempt {attempt+1}/{max_retries})..."
+                    if logger.handlers: logger.info(f"{log_prefix}{log_msg_upload}")
+                    else: print(f"{log_prefix}{log_msg_upload}")
 
-                response = requests.put(url, headers=upload_headers, data=excel_content)
+                    uploader.upload_file(create_session_url, graph_headers_for_put, tmp_path)
 
-                if response.status_code in (200, 201):
                     log_msg_ok = "Successfully updated Excel file."
                     if logger.handlers: logger.info(f"{log_prefix}{log_msg_ok}")
                     else: print(f"{log_prefix}{log_msg_ok}")
                     return True
-                elif response.status_code == 423:  # Locked resource
-                    log_msg_lock = f"File is locked (attempt {attempt+1}/{max_retries}). Waiting {retry_delay}s before retry..."
-                    if logger.handlers: logger.warning(f"{log_prefix}{log_msg_lock}")
-                    else: print(f"WARNING: {log_prefix}{log_msg_lock}")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    log_msg_fail = f"Failed to update Excel file. Status code: {response.status_code}. Response: {response.text}"
-                    if logger.handlers: logger.error(f"{log_prefix}{log_msg_fail}")
-                    else: print(f"ERROR: {log_prefix}{log_msg_fail}")
+                except UploadSessionError as e:
+                    if e.status_code == 423:  # Locked resource
+                        log_msg_fail = f"File is locked (attempt {attempt+1}/{max_retries}). Waiting {retry_delay}s before retry..."
+                        if logger.handlers: logger.warning(f"{log_prefix}{log_msg_fail}")
+                        else: print(f"WARNING: {log_prefix}{log_msg_fail}")
+                    else:
+                        log_msg_fail = f"Failed to update Excel file (attempt {attempt+1}/{max_retries}): {e}"
+                        if logger.handlers: logger.error(f"{log_prefix}{log_msg_fail}")
+                        else: print(f"ERROR: {log_prefix}{log_msg_fail}")
                     if attempt < max_retries - 1: time.sleep(retry_delay)
-                    else: return False
+            return False
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
 
-            except Exception as e:
-                log_msg_ex = f"Failed to update Excel file (attempt {attempt+1}/{max_retries}): {e}"
-                if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex}", exc_info=True)
-                else: print(f"ERROR: {log_prefix}{log_msg_ex}\n{traceback.format_exc()}")
-                if attempt < max_retries - 1: time.sleep(retry_delay)
-                else: return False
-        return False
-
-    def _update_excel_via_session(self, updated_df, file_info, target_sheet_name=None):
+    def _update_excel_via_session(self, updated_df, file_info, target_sheet_name=None, block_size=None):
         """
         Update Excel using the Excel session API, appending ALL provided rows to a specified sheet.
 
+        Rows are written as contiguous blocks, one range PATCH per block. Per-block
+        timings are logged and kept in self.last_append_timings for tuning.
+
         Args:
             updated_df (pd.DataFrame): DataFrame with ALL new rows to append.
             file_info (dict): File information including ID and parentReference.
             target_sheet_name (str, optional): The name of the sheet to append to. 
                                              If None, uses the first sheet.
+            block_size (int, optional): Rows per range PATCH. Defaults to self.append_block_size.
         Returns:
-            bool: True if successful, False otherwise.
+            int: Number of leading rows of updated_df written to the sheet. Equal to
+                 len(updated_df) on success; a failed block stops the append, so the
+                 caller only has to write updated_df.iloc[rows_written:].
         """
         log_prefix = "SharePointManager (_update_excel_via_session): "
         session_headers = self._get_headers() # Base headers with Content-Type: application/json
@@ -393,9 +661,10 @@ class SharePointExcelManager:
             log_msg = "Cannot update without valid authentication headers."
             if logger.handlers: logger.error(f"{log_prefix}{log_msg}")
             else: print(f"ERROR: {log_prefix}{log_msg}")
-            return False
+            return 0
 
         session_id = None
+        rows_written = 0
         drive_id = file_info.get('parentReference', {}).get('driveId')
         file_id = file_info.get('id')
 
@@ -409,31 +678,43 @@ class SharePointExcelManager:
                 log_msg_ids_missing = "Missing file ID or drive ID for Excel session API."
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg_ids_missing}")
                 else: print(f"ERROR: {log_prefix}{log_msg_ids_missing}")
-                return False
+                return 0
 
             if updated_df.empty:
                 log_msg_empty_df = "Updated DataFrame is empty, nothing to append."
                 if logger.handlers: logger.warning(f"{log_prefix}{log_msg_empty_df}")
                 else: print(f"WARNING: {log_prefix}{log_msg_empty_df}")
-                return True
+                return 0
 
             num_cols = len(updated_df.columns)
             if num_cols == 0:
                 log_msg_no_cols = "DataFrame has no columns."
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg_no_cols}")
                 else: print(f"ERROR: {log_prefix}{log_msg_no_cols}")
-                return False
-
-            session_url = f"{self.graph_base_url}/drives/{drive_id}/items/{file_id}/workbook/createSession"
-            session_data = {"persistChanges": True}
-            session_response = requests.post(session_url, headers=session_headers, json=session_data)
+                return 0
+
+            # createSession and the first sheet lookup (used range of a known sheet, or the
+            # worksheet list) go out in one $batch; the lookup depends on the session so it
+            # is skipped if the session cannot be created.
+            workbook_path = f"/drives/{drive_id}/items/{file_id}/workbook"
+            setup_batch = GraphBatchRequest(self.graph_base_url, transport=self.http)
+            session_req_id = setup_batch.add("POST", f"{workbook_path}/createSession",
+                                             body={"persistChanges": True}, request_id="session")
+            if target_sheet_name:
+                lookup_req_id = setup_batch.add("GET", f"{workbook_path}/worksheets('{target_sheet_name}')/usedRange(valuesOnly=true)",
+                                                depends_on=[session_req_id], request_id="usedRange")
+            else:
+                lookup_req_id = setup_batch.add("GET", f"{workbook_path}/worksheets",
+                                                depends_on=[session_req_id], request_id="worksheets")
+            setup_responses = setup_batch.execute(session_headers)
 
-            if session_response.status_code != 201:
-                log_msg_session_fail = f"Failed to create Excel session. Status: {session_response.status_code}, Resp: {session_response.text}"
+            session_response = setup_responses.get(session_req_id, {})
+            if session_response.get('status') != 201:
+                log_msg_session_fail = f"Failed to create Excel session. Status: {session_response.get('status')}, Resp: {session_response.get('body')}"
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg_session_fail}")
                 else: print(f"ERROR: {log_prefix}{log_msg_session_fail}")
-                return False
-            session_id = session_response.json().get('id')
+                return 0
+            session_id = (session_response.get('body') or {}).get('id')
             log_msg_session_ok = f"Created Excel session with ID: {session_id}"
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_session_ok}")
             else: print(f"{log_prefix}{log_msg_session_ok}")
@@ -442,13 +723,15 @@ class SharePointExcelManager:
             current_session_headers = session_headers.copy()
             current_session_headers['Workbook-Session-Id'] = session_id
 
+            lookup_response = setup_responses.get(lookup_req_id, {})
+            if lookup_response.get('status') != 200:
+                raise Exception(f"Failed to get {lookup_req_id}. Status: {lookup_response.get('status')}, Resp: {lookup_response.get('body')}")
+
             worksheet_name_to_use = target_sheet_name
-            if not worksheet_name_to_use:
-                worksheets_url = f"{self.graph_base_url}/drives/{drive_id}/items/{file_id}/workbook/worksheets"
-                worksheets_response = requests.get(worksheets_url, headers=current_session_headers)
-                if worksheets_response.status_code != 200:
-                    raise Exception(f"Failed to get worksheets. Status: {worksheets_response.status_code}, Resp: {worksheets_response.text}")
-                worksheets = worksheets_response.json().get('value', [])
+            if worksheet_name_to_use:
+                range_data = lookup_response.get('body') or {}
+            else:
+                worksheets = (lookup_response.get('body') or {}).get('value', [])
                 if not worksheets:
                     raise Exception("No worksheets found in the Excel file.")
                 worksheet_name_to_use = worksheets[0].get('name')
@@ -457,12 +740,13 @@ class SharePointExcelManager:
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_ws_name}")
             else: print(f"{log_prefix}{log_msg_ws_name}")
 
-            range_url = f"{self.graph_base_url}/drives/{drive_id}/items/{file_id}/workbook/worksheets('{worksheet_name_to_use}')/usedRange(valuesOnly=true)"
-            range_response = requests.get(range_url, headers=current_session_headers)
-            if range_response.status_code != 200:
-                raise Exception(f"Failed to get used range. Status: {range_response.status_code}, Resp: {range_response.text}")
-            
-            range_data = range_response.json()
+            range_url = f"{self.graph_base_url}{workbook_path}/worksheets('{worksheet_name_to_use}')/usedRange(valuesOnly=true)"
+            if not target_sheet_name:
+                range_response = self.http.get(range_url, headers=current_session_headers)
+                if range_response.status_code != 200:
+                    raise Exception(f"Failed to get used range. Status: {range_response.status_code}, Resp: {range_response.text}")
+                range_data = range_response.json()
+
             current_row_count = range_data.get('rowCount', 0)
             start_row_excel = current_row_count + 1
 
@@ -472,32 +756,51 @@ class SharePointExcelManager:
 
             end_col_letter = self._col_num_to_letter(num_cols)
 
-            for index, row_data in updated_df.iterrows():
-                row_values_list = [row_data.tolist()] # Ensure data is in list of lists format
-                current_excel_row_to_add = start_row_excel + index
-                range_address = f"{worksheet_name_to_use}!A{current_excel_row_to_add}:{end_col_letter}{current_excel_row_to_add}"
-                
-                log_msg_append_row = f"Appending row {index+1}/{len(updated_df)} to range: {range_address}"
-                if logger.handlers: logger.debug(f"{log_prefix}{log_msg_append_row}") # Changed to debug for less noise
-                else: print(f"{log_prefix}{log_msg_append_row}")
+            block_size = max(1, int(block_size or self.append_block_size))
+            self.last_append_timings = []
+            for block_start in range(0, len(updated_df), block_size):
+                block_df = updated_df.iloc[block_start:block_start + block_size]
+                first_excel_row = start_row_excel + block_start
+                last_excel_row = first_excel_row + len(block_df) - 1
+                range_address = f"{worksheet_name_to_use}!A{first_excel_row}:{end_col_letter}{last_excel_row}"
 
                 update_url = f"{self.graph_base_url}/drives/{drive_id}/items/{file_id}/workbook/worksheets('{worksheet_name_to_use}')/range(address='{range_address}')"
-                update_payload = { "values": row_values_list }
+                update_payload = {"values": self._df_to_range_values(block_df)}
 
-                update_response = requests.patch(update_url, headers=current_session_headers, json=update_payload)
+                block_started = time.perf_counter()
+                try:
+                    update_response = self.http.patch(update_url, headers=current_session_headers, json=update_payload)
+                except requests.exceptions.RequestException:
+                    # No reply, but the PATCH may still have been applied. Count the block if
+                    # the sheet now reaches its last row, so a retry does not append it twice.
+                    check_response = self.http.get(range_url, headers=current_session_headers)
+                    if check_response.status_code != 200 or check_response.json().get('rowCount', 0) < last_excel_row:
+                        raise
+                    log_msg_block_landed = f"No reply for {range_address}, but the used range shows it was written."
+                    if logger.handlers: logger.warning(f"{log_prefix}{log_msg_block_landed}")
+                    else: print(f"WARNING: {log_prefix}{log_msg_block_landed}")
+                    update_response = check_response
+                block_elapsed = time.perf_counter() - block_started
                 if update_response.status_code != 200:
-                    raise Exception(f"Failed to update row {index+1}. Status: {update_response.status_code}, Resp: {update_response.text}")
+                    raise Exception(f"Failed to update rows {block_start+1}-{block_start+len(block_df)}. Status: {update_response.status_code}, Resp: {update_response.text}")
+
+                rows_written += len(block_df)
+                self.last_append_timings.append({'range': range_address, 'rows': len(block_df), 'seconds': block_elapsed})
+                log_msg_append_block = f"Appended rows {block_start+1}-{block_start+len(block_df)}/{len(updated_df)} to {range_address} in {block_elapsed:.3f}s"
+                if logger.handlers: logger.info(f"{log_prefix}{log_msg_append_block}")
+                else: print(f"{log_prefix}{log_msg_append_block}")
 
-            log_msg_append_ok = f"Successfully appended {len(updated_df)} rows to '{worksheet_name_to_use}' via session API."
+            total_block_time = sum(t['seconds'] for t in self.last_append_timings)
+            log_msg_append_ok = f"Successfully appended {len(updated_df)} rows to '{worksheet_name_to_use}' via session API in {len(self.last_append_timings)} block(s) of up to {block_size} rows ({total_block_time:.3f}s)."
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_append_ok}")
             else: print(f"{log_prefix}{log_msg_append_ok}")
-            return True
+            return rows_written
 
         except Exception as e:
-            log_msg_ex_gen = f"Failed during Excel session update: {e}"
+            log_msg_ex_gen = f"Failed during Excel session update after {rows_written}/{len(updated_df)} rows: {e}"
             if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex_gen}", exc_info=True)
             else: print(f"ERROR: {log_prefix}{log_msg_ex_gen}\n{traceback.format_exc()}")
-            return False
+            return rows_written
         finally:
             if session_id and drive_id and file_id:
                 try:
@@ -509,16 +812,14 @@ class SharePointExcelManager:
                     # For closeSession, a POST with session ID in header is needed, no body.
                     # Use a base set of headers (like self._get_headers without Content-Type if it causes issues)
                     # and add the Workbook-Session-Id.
-                    base_headers_for_close = {'Authorization': self.access_token} # Minimal headers
-                    if not self.access_token : # try to get it again if it became none
-                         temp_h = self._get_headers()
-                         if temp_h and temp_h.get('Authorization'): base_headers_for_close = {'Authorization': temp_h['Authorization']}
-                         else: print(f"Warning: {log_prefix}Could not get headers to close session."); return # cannot close if no auth
+                    temp_h = self._get_headers()
+                    if temp_h and temp_h.get('Authorization'): base_headers_for_close = {'Authorization': temp_h['Authorization']} # Minimal headers
+                    else: raise RuntimeError("Could not get headers to close session.") # cannot close if no auth; no return here, it would replace rows_written
 
                     closing_headers = base_headers_for_close.copy()
                     closing_headers['Workbook-Session-Id'] = session_id
                     
-                    close_response = requests.post(close_url, headers=closing_headers)
+                    close_response = self.http.post(close_url, headers=closing_headers)
                     if close_response.status_code == 204:
                         log_msg_close_ok = "Closed session successfully."
                         if logger.handlers: logger.info(f"{log_prefix}{log_msg_close_ok}")
@@ -532,6 +833,27 @@ class SharePointExcelManager:
                     if logger.handlers: logger.error(f"{log_prefix}{log_msg_close_ex}", exc_info=True)
                     else: print(f"ERROR: {log_prefix}{log_msg_close_ex}\n{traceback.format_exc()}")
 
+    @staticmethod
+    def _df_to_range_values(df):
+        """Convert a DataFrame block to a JSON-safe 2D values list for a range PATCH."""
+        values = []
+        for row in df.itertuples(index=False, name=None):
+            row_values = []
+            for value in row:
+                if not pd.api.types.is_scalar(value):
+                    # list/dict/array cells: pd.isna would return an array; a cell takes text
+                    row_values.append(str(value))
+                elif value is None or (not isinstance(value, str) and pd.isna(value)):
+                    row_values.append("")
+                elif isinstance(value, (pd.Timestamp, datetime)):
+                    row_values.append(value.isoformat())
+                elif hasattr(value, 'item'):  # numpy scalar
+                    row_values.append(value.item())
+                else:
+                    row_values.append(value)
+            values.append(row_values)
+        return values
+
     def _col_num_to_letter(self, n):
         string = ""
         while n > 0:
@@ -539,71 +861,90 @@ class SharePointExcelManager:
             string = chr(65 + remainder) + string
         return string
 
-    def _save_local_backup(self, data, filename=None):
-        log_prefix = "SharePointManager (_save_local_backup): "
+    def update_excel_data(self, new_data, target_sheet_name_for_append=None):
+        """
+        Queue new rows for a specific Excel sheet and return immediately.
+
+        The rows are journaled to the outbox under local_backup_dir (brideal_sp_backups)
+        and appended by its background flusher via _append_rows, coalesced with any
+        other queued rows for the same sheet and retried with backoff while SharePoint
+        is unavailable.
+
+        Returns:
+            bool: True once the rows are durably queued (or, without an outbox, appended).
+        """
+        log_prefix = "SharePointManager (update_excel_data): "
+        if not new_data: # Assumes new_data is a list of dicts or similar for DataFrame
+            log_msg = "No data provided to update Excel file."
+            if logger.handlers: logger.error(f"{log_prefix}{log_msg}")
+            else: print(f"ERROR: {log_prefix}{log_msg}")
+            return False
+
+        if self.outbox is None:
+            return self._append_rows(list(new_data), target_sheet_name_for_append) == len(new_data)
+
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename_base = filename or f"ams_backup_{timestamp}" # Consider making "ams_backup" configurable
-            csv_path = os.path.join(self.local_backup_dir, f"{filename_base}.csv")
-            df = pd.DataFrame(data) # Assumes data is suitable for DataFrame constructor
-            df.to_csv(csv_path, index=False)
-            json_path = os.path.join(self.local_backup_dir, f"{filename_base}.json")
-            with open(json_path, 'w') as f:
-                json.dump(data, f, indent=2) # Assumes data is JSON serializable
-            log_msg = f"Local backup saved to: {csv_path} and {json_path}"
-            if logger.handlers: logger.info(f"{log_prefix}{log_msg}")
-            else: print(f"{log_prefix}{log_msg}")
-            return csv_path
-        except Exception as e:
-            log_msg_ex = f"Failed to save local backup: {e}"
-            if logger.handlers: logger.error(f"{log_prefix}{log_msg_ex}", exc_info=True)
-            else: print(f"ERROR: {log_prefix}{log_msg_ex}\n{traceback.format_exc()}")
-            return None
+            journal_path = self.outbox.enqueue(list(new_data), target_sheet_name_for_append)
+        except (OSError, TypeError, ValueError) as e:
+            log_msg_journal_fail = f"CRITICAL ERROR: Failed to journal {len(new_data)} rows. Aborting update: {e}"
+            if logger.handlers: logger.critical(f"{log_prefix}{log_msg_journal_fail}", exc_info=True)
+            else: print(f"CRITICAL ERROR: {log_prefix}{log_msg_journal_fail}")
+            return False
 
-    def update_excel_data(self, new_data, target_sheet_name_for_append=None):
+        log_msg_queued = f"Queued {len(new_data)} new rows for sheet {target_sheet_name_for_append or 'first sheet'} (journal: {journal_path})."
+        if logger.handlers: logger.info(f"{log_prefix}{log_msg_queued}")
+        else: print(f"{log_prefix}{log_msg_queued}")
+        return True
+
+    def _append_rows(self, new_data, target_sheet_name_for_append=None):
         """
-        Add new rows to a specific Excel sheet with fallback options.
+        Append rows to a specific Excel sheet with fallback options (outbox flush target).
         If target_sheet_name_for_append is None, direct update rewrites the first sheet.
         Session update will use target_sheet_name_for_append or default to the first sheet.
+
+        Returns:
+            int: Number of leading rows SharePoint accepted (len(new_data) on success). The
+                 outbox records this progress and retries only the remaining rows, since
+                 appends are not idempotent.
         """
-        log_prefix = "SharePointManager (update_excel_data): "
-        backup_path = None # Initialize to avoid UnboundLocalError
+        log_prefix = "SharePointManager (_append_rows): "
+        total_rows = len(new_data) if new_data else 0
+        rows_written = 0
         try:
             if not new_data: # Assumes new_data is a list of dicts or similar for DataFrame
                 log_msg = "No data provided to update Excel file."
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg}")
                 else: print(f"ERROR: {log_prefix}{log_msg}")
-                return False
+                return 0
             
             log_msg_start = f"Updating Excel with {len(new_data)} new rows. Target sheet for append: {target_sheet_name_for_append if target_sheet_name_for_append else 'first sheet (default for session append)'}"
             if logger.handlers: logger.info(f"{log_prefix}{log_msg_start}")
             else: print(f"{log_prefix}{log_msg_start}")
 
-            backup_path = self._save_local_backup(new_data)
-            if backup_path is None:
-                log_msg_backup_fail = "CRITICAL ERROR: Failed to save local backup. Aborting update."
-                if logger.handlers: logger.critical(f"{log_prefix}{log_msg_backup_fail}")
-                else: print(f"CRITICAL ERROR: {log_prefix}{log_msg_backup_fail}")
-                return False
-
             file_info = self.get_excel_file_info()
             if not file_info:
-                log_msg_file_info_fail = f"Failed to get Excel file info. Update aborted. Backup available at: {backup_path}"
+                log_msg_file_info_fail = "Failed to get Excel file info. Rows stay queued."
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg_file_info_fail}")
                 else: print(f"ERROR: {log_prefix}{log_msg_file_info_fail}")
-                return False
+                return 0
             file_id = file_info.get('id')
 
             df_for_session_append = pd.DataFrame(new_data)
-            if self._update_excel_via_session(df_for_session_append, file_info, target_sheet_name=target_sheet_name_for_append):
+            rows_written = self._update_excel_via_session(df_for_session_append, file_info, target_sheet_name=target_sheet_name_for_append)
+            if rows_written >= len(new_data):
                 log_msg_session_ok = "Update successful via Session API."
                 if logger.handlers: logger.info(f"{log_prefix}{log_msg_session_ok}")
                 else: print(f"{log_prefix}{log_msg_session_ok}")
-                return True
-            else:
-                log_msg_session_fallback = "Session API append failed. Falling back to direct update (full rewrite of the first sheet)..."
-                if logger.handlers: logger.warning(f"{log_prefix}{log_msg_session_fallback}")
-                else: print(f"WARNING: {log_prefix}{log_msg_session_fallback}")
+                self._publish_workbook_change(file_id, len(new_data))
+                return total_rows
+
+            log_msg_session_fallback = f"Session API append failed after {rows_written}/{len(new_data)} rows. Falling back to direct update (full rewrite of the first sheet) for the rest..."
+            if logger.handlers: logger.warning(f"{log_prefix}{log_msg_session_fallback}")
+            else: print(f"WARNING: {log_prefix}{log_msg_session_fallback}")
+            if rows_written:
+                # The rewrite starts from the sheet as it is now, which already has those rows.
+                self._publish_workbook_change(file_id, rows_written)
+                new_data = new_data[rows_written:]
             
             # Fallback to Direct Update (rewriting the FIRST sheet)
             log_msg_direct_attempt = "Attempting update via direct file upload (rewriting the first sheet)..."
@@ -612,10 +953,10 @@ class SharePointExcelManager:
 
             current_df = self.get_excel_data(sheet_name=0) # Reads the first sheet
             if current_df is None:
-                log_msg_get_current_fail = f"Failed to get current Excel data (first sheet) for direct update. Update aborted. Backup: {backup_path}"
+                log_msg_get_current_fail = "Failed to get current Excel data (first sheet) for direct update. Rows stay queued."
                 if logger.handlers: logger.error(f"{log_prefix}{log_msg_get_current_fail}")
                 else: print(f"ERROR: {log_prefix}{log_msg_get_current_fail}")
-                return False
+                return rows_written
 
             # This assumes new_data is meant to be appended to the structure of the first sheet.
             new_df_prepared_for_concat = pd.DataFrame(new_data)
@@ -633,29 +974,25 @@ class SharePointExcelManager:
                 log_msg_direct_ok = "Update successful via Direct Upload (first sheet rewritten)."
                 if logger.handlers: logger.info(f"{log_prefix}{log_msg_direct_ok}")
                 else: print(f"{log_prefix}{log_msg_direct_ok}")
-                return True
+                self._publish_workbook_change(file_id, len(new_data))
+                return total_rows
 
-            log_msg_all_fail = f"Both Session API and Direct Upload failed. Data saved locally at {backup_path}"
+            log_msg_all_fail = f"Both Session API and Direct Upload failed. {total_rows - rows_written} row(s) stay queued in the outbox."
             if logger.handlers: logger.warning(f"{log_prefix}{log_msg_all_fail}")
             else: print(f"WARNING: {log_prefix}{log_msg_all_fail}")
-            return False
+            return rows_written
 
         except Exception as e:
-            log_msg_unhandled_ex = f"Unhandled exception in update_excel_data: {e}"
+            log_msg_unhandled_ex = f"Unhandled exception in _append_rows: {e}"
             if logger.handlers: logger.error(f"{log_prefix}{log_msg_unhandled_ex}", exc_info=True)
             else: print(f"ERROR: {log_prefix}{log_msg_unhandled_ex}\n{traceback.format_exc()}")
-            
-            if backup_path is None and 'new_data' in locals() and new_data is not None:
-                 try:
-                     backup_path_emergency = self._save_local_backup(new_data, filename="emergency_backup")
-                     log_msg_emergency_backup = f"Emergency backup saved due to error: {backup_path_emergency}"
-                     if logger.handlers: logger.info(f"{log_prefix}{log_msg_emergency_backup}")
-                     else: print(f"{log_prefix}{log_msg_emergency_backup}")
-                 except Exception as backup_ex:
-                     log_msg_emergency_backup_fail = f"Failed to save emergency backup: {backup_ex}"
-                     if logger.handlers: logger.error(f"{log_prefix}{log_msg_emergency_backup_fail}")
-                     else: print(f"ERROR: {log_prefix}{log_msg_emergency_backup_fail}")
-            return False
+            return rows_written
+
+    def _publish_workbook_change(self, file_id, row_count):
+        """Drop the cached copy of a workbook we just wrote and invalidate data derived from it."""
+        _workbook_cache.invalidate(file_id)
+        get_invalidation_bus().invalidate(SHAREPOINT_WORKBOOK, reason="outbox_flush",
+                                          detail={'item_id': file_id, 'rows': row_count})
 
     def send_html_email(self, recipients, subject, html_body):
         log_prefix = "SharePointManager (send_html_email): "
@@ -685,7 +1022,7 @@ class SharePointExcelManager:
                 }
             }
             url = f"{self.graph_base_url}/users/{self.sender_email}/sendMail"
-            response = requests.post(url, headers=headers_for_email, json=email_message) # Uses JSON headers
+            response = self.http.post(url, headers=headers_for_email, json=email_message) # Uses JSON headers
             if response.status_code == 202: # Accepted
                 log_msg_ok = f"Successfully sent email to {len(recipients)} recipients."
                 if logger.handlers: logger.info(f"{log_prefix}{log_msg_ok}")
@@ -743,7 +1080,7 @@ class SharePointExcelManager:
                 print(f"{log_prefix}{log_msg_download}")
                 print(f"DEBUG: {log_prefix}{log_msg_headers}")
             
-            response = requests.get(file_url, headers=final_headers, timeout=30)
+            response = self.http.get(file_url, headers=final_headers, timeout=30)
             
             log_msg_status = f"Response status: {response.status_code}"
             if hasattr(self, 'logger') and self.logger.handlers: self.logger.debug(f"{log_prefix}{log_msg_status}")
@@ -0,0 +1,216 @@
+"""
+Durable write-behind outbox for SharePoint Excel appends.
+
+Rows are journaled to disk before the caller returns; a background thread
+coalesces everything queued for the same sheet into one batched append and
+retries with exponential backoff while SharePoint is unreachable. Journal
+entries survive restarts and are archived once SharePoint has accepted them.
+
+Appends are not idempotent, so a flush that got only some rows in reports how
+many; that progress is written back to the journal entries and a retry sends
+only the rest.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# flush_fn(rows, target_sheet) -> True/False, or the number of leading rows SharePoint accepted
+FlushFunction = Callable[[List[Dict[str, Any]], Optional[str]], Union[bool, int]]
+
+
+class SharePointOutbox:
+    """
+    Journaled queue of pending Excel appends.
+
+    Layout under journal_dir:
+        outbox/<seq>_<id>.json        pending entries {id, created_at, target_sheet, rows, rows_sent}
+        outbox/sent/<seq>_<id>.json   entries SharePoint accepted (kept sent_retention_days)
+    """
+
+    def __init__(self, journal_dir: str, flush_fn: FlushFunction, max_batch_rows: int = 500,
+                 base_delay: float = 5, max_delay: float = 600, sent_retention_days: int = 30):
+        self.pending_dir = os.path.join(journal_dir, "outbox")
+        self.sent_dir = os.path.join(self.pending_dir, "sent")
+        os.makedirs(self.sent_dir, exist_ok=True)
+        self.flush_fn = flush_fn
+        self.max_batch_rows = max_batch_rows
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sent_retention_days = sent_retention_days
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._failures = 0
+        self.last_error: Optional[str] = None
+
+    def enqueue(self, rows: List[Dict[str, Any]], target_sheet: Optional[str] = None) -> str:
+        """Journal rows durably and schedule a flush. Returns the journal file path."""
+        entry_id = uuid.uuid4().hex
+        entry = {
+            'id': entry_id,
+            'created_at': datetime.now().isoformat(),
+            'target_sheet': target_sheet,
+            'rows': rows,
+        }
+        # Nanosecond prefix keeps entries in enqueue order when listed.
+        path = os.path.join(self.pending_dir, f"{time.time_ns():020d}_{entry_id}.json")
+        self._write_entry(path, entry)
+        logger.info(f"Queued {len(rows)} row(s) for SharePoint in {path}")
+        self.start()
+        self._wakeup.set()
+        return path
+
+    @staticmethod
+    def _write_entry(path: str, entry: Dict[str, Any]) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def pending_count(self) -> int:
+        return len(self._pending_files())
+
+    def start(self) -> None:
+        """Start the background flusher (no-op if it is already running)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="SharePointOutboxFlusher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5) -> None:
+        self._stop = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wake the flusher now and wait until the outbox is empty. Returns True if it emptied."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._pending_files():
+            self.start()
+            self._failures = 0
+            self._wakeup.set()
+        while self._pending_files():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def _pending_files(self) -> List[str]:
+        try:
+            names = [n for n in os.listdir(self.pending_dir) if n.endswith('.json')]
+        except OSError:
+            return []
+        return [os.path.join(self.pending_dir, n) for n in sorted(names)]
+
+    def _run(self) -> None:
+        self._prune_sent()
+        while not self._stop:
+            delay = self._flush_once()
+            if delay is None:
+                self._wakeup.wait()
+            else:
+                self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def _flush_once(self) -> Optional[float]:
+        """Send one coalesced batch. Returns seconds to wait before the next attempt, or None when idle."""
+        files = self._pending_files()
+        if not files:
+            return None
+
+        batch, rows, target_sheet = self._next_batch(files)
+        if not batch:
+            return None
+        try:
+            result = self.flush_fn(rows, target_sheet) if rows else True
+            accepted = len(rows) if result is True else min(int(result or 0), len(rows))
+            self.last_error = None if accepted == len(rows) else f"flush accepted {accepted}/{len(rows)} row(s)"
+        except Exception as e:
+            logger.error(f"SharePoint outbox flush raised: {e}", exc_info=True)
+            accepted = 0
+            self.last_error = str(e)
+
+        self._record_progress(batch, accepted)
+        if accepted < len(rows):
+            self._failures += 1
+            delay = min(self.max_delay, self.base_delay * (2 ** (self._failures - 1)))
+            delay *= random.uniform(0.8, 1.2)
+            logger.warning(f"SharePoint outbox flush of {len(rows)} row(s) failed after {accepted} row(s) "
+                           f"(attempt {self._failures}); retrying the rest in {delay:.0f}s.")
+            return delay
+
+        self._failures = 0
+        logger.info(f"SharePoint outbox flushed {len(rows)} row(s) from {len(batch)} entr(y/ies).")
+        return 0
+
+    def _record_progress(self, batch: List[Tuple[str, Dict[str, Any]]], accepted: int) -> None:
+        """Archive entries whose rows were all accepted and note rows_sent on a partly sent one."""
+        for path, entry in batch:
+            sent = entry.get('rows_sent', 0)
+            remaining = len(entry.get('rows', [])) - sent
+            if accepted < remaining:
+                if accepted:
+                    entry['rows_sent'] = sent + accepted
+                    try:
+                        self._write_entry(path, entry)
+                    except OSError as e:
+                        logger.error(f"Could not record progress of outbox entry {path}; "
+                                     f"{accepted} row(s) may be appended again: {e}")
+                return
+            accepted -= remaining
+            try:
+                os.replace(path, os.path.join(self.sent_dir, os.path.basename(path)))
+            except OSError as e:
+                logger.error(f"Could not archive outbox entry {path}: {e}")
+
+    def _next_batch(self, files: List[str]):
+        """
+        Coalesce the oldest entries sharing one target sheet, up to max_batch_rows.
+
+        Returns [(path, entry)], the rows still to send (rows past each entry's
+        rows_sent) and the target sheet.
+        """
+        batch, rows = [], []
+        target_sheet = None
+        for path in files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable outbox entry {path} moved aside: {e}")
+                os.replace(path, f"{path}.corrupt")
+                continue
+            if batch and entry.get('target_sheet') != target_sheet:
+                continue
+            entry_rows = entry.get('rows', [])[entry.get('rows_sent', 0):]
+            if batch and len(rows) + len(entry_rows) > self.max_batch_rows:
+                break
+            target_sheet = entry.get('target_sheet')
+            batch.append((path, entry))
+            rows.extend(entry_rows)
+        return batch, rows, target_sheet
+
+    def _prune_sent(self) -> None:
+        cutoff = time.time() - self.sent_retention_days * 86400
+        try:
+            for name in os.listdir(self.sent_dir):
+                path = os.path.join(self.sent_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        except OSError as e:
+            logger.debug(f"Pruning sent outbox entries failed: {e}")
@@ -0,0 +1,171 @@
+"""
+Resumable large-file uploads to OneDrive/SharePoint via Graph createUploadSession.
+
+The body is streamed from a file in fixed-size chunks. After a failed chunk the
+session is queried for nextExpectedRanges and the upload resumes from the last
+byte Graph acknowledged instead of starting over.
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from .graph_transport import get_graph_transport
+
+logger = logging.getLogger(__name__)
+
+# Graph requires every chunk except the last to be a multiple of 320 KiB.
+UPLOAD_CHUNK_ALIGNMENT = 320 * 1024
+DEFAULT_CHUNK_SIZE = 10 * UPLOAD_CHUNK_ALIGNMENT  # 3.2 MiB
+
+
+class UploadSessionError(Exception):
+    """Raised when a resumable upload cannot be completed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ResumableUpload:
+    """
+    Upload a local file through a Graph upload session.
+
+    Usage:
+        uploader = ResumableUpload()
+        item = uploader.upload_file(f"{graph}/drives/{drive}/items/{item_id}/createUploadSession",
+                                    {'Authorization': f'Bearer {token}'}, "/tmp/file.xlsx")
+    """
+
+    # Chunk responses that retrying the same bytes cannot fix.
+    NON_RETRYABLE_STATUSES = (400, 401, 403, 413)
+
+    def __init__(self, transport=None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_retries: int = 5, retry_delay: float = 2, chunk_timeout: float = 120):
+        self.transport = transport or get_graph_transport()
+        self.chunk_size = max(UPLOAD_CHUNK_ALIGNMENT, chunk_size - chunk_size % UPLOAD_CHUNK_ALIGNMENT)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.chunk_timeout = chunk_timeout
+
+    def upload_file(self, create_session_url: str, auth_headers: Dict[str, str], file_path: str,
+                    conflict_behavior: str = "replace", if_match: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Upload file_path and return the resulting driveItem.
+
+        Args:
+            create_session_url: Graph URL ending in /createUploadSession (item id or path addressed).
+            auth_headers: Headers containing the Graph Authorization bearer token.
+            file_path: Local file to stream.
+            conflict_behavior: Graph @microsoft.graph.conflictBehavior for the target item.
+            if_match: Only create the session if the target item still has this eTag;
+                otherwise UploadSessionError with status_code 412 is raised.
+
+        Raises:
+            UploadSessionError: if the session cannot be created or the upload does not
+                complete within max_retries consecutive failures.
+        """
+        total_size = os.path.getsize(file_path)
+        if total_size == 0:
+            raise UploadSessionError("Upload sessions cannot be used for empty files.")
+        upload_url = self._create_session(create_session_url, auth_headers, conflict_behavior, if_match)
+        offset = 0
+        failures = 0
+
+        with open(file_path, 'rb') as f:
+            while True:
+                f.seek(offset)
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    self._cancel(upload_url)
+                    raise UploadSessionError(f"Upload session expects bytes from {offset}, past the end of the file ({total_size}).")
+                end = offset + len(chunk) - 1
+                headers = {
+                    'Content-Length': str(len(chunk)),
+                    'Content-Range': f"bytes {offset}-{end}/{total_size}",
+                }
+                try:
+                    # The upload URL is pre-authenticated; Graph rejects an Authorization header here.
+                    response = self.transport.put(upload_url, headers=headers, data=chunk, timeout=self.chunk_timeout)
+                except requests.exceptions.RequestException as e:
+                    response = None
+                    error = str(e)
+                else:
+                    error = f"HTTP {response.status_code}: {response.text[:200]}"
+
+                if response is not None and response.status_code in (200, 201):
+                    logger.info(f"Upload session completed: {total_size} bytes.")
+                    return response.json()
+                if response is not None and response.status_code == 202:
+                    failures = 0
+                    offset = self._next_offset(response.json(), default=end + 1)
+                    logger.debug(f"Uploaded bytes {headers['Content-Range']}; next offset {offset}.")
+                    continue
+
+                failures += 1
+                if response is not None and response.status_code in self.NON_RETRYABLE_STATUSES:
+                    self._cancel(upload_url)
+                    raise UploadSessionError(f"Upload rejected: {error}", response.status_code)
+                if response is not None and response.status_code == 404:
+                    # Session expired or was discarded server side: start a new one from scratch.
+                    logger.warning("Upload session no longer exists; creating a new one.")
+                    upload_url = self._create_session(create_session_url, auth_headers, conflict_behavior, if_match)
+                    offset = 0
+                elif failures <= self.max_retries:
+                    delay = self.retry_delay * (2 ** (failures - 1))
+                    logger.warning(f"Chunk {headers['Content-Range']} failed ({error}); "
+                                   f"resuming in {delay:.0f}s (attempt {failures}/{self.max_retries}).")
+                    time.sleep(delay)
+                    offset = self._query_offset(upload_url, default=offset)
+
+                if failures > self.max_retries:
+                    self._cancel(upload_url)
+                    raise UploadSessionError(f"Upload failed after {self.max_retries} retries: {error}",
+                                             response.status_code if response is not None else None)
+
+    def _create_session(self, create_session_url: str, auth_headers: Dict[str, str], conflict_behavior: str,
+                        if_match: Optional[str] = None) -> str:
+        headers = {'Authorization': auth_headers['Authorization'], 'Content-Type': 'application/json'}
+        if if_match:
+            headers['If-Match'] = if_match
+        body = {'item': {'@microsoft.graph.conflictBehavior': conflict_behavior}}
+        try:
+            response = self.transport.post(create_session_url, headers=headers, json=body)
+        except requests.exceptions.RequestException as e:
+            raise UploadSessionError(f"Could not create upload session: {e}")
+        if response.status_code != 200:
+            raise UploadSessionError(f"Could not create upload session: HTTP {response.status_code}: {response.text[:200]}",
+                                     response.status_code)
+        upload_url = response.json().get('uploadUrl')
+        if not upload_url:
+            raise UploadSessionError("createUploadSession returned no uploadUrl.")
+        return upload_url
+
+    def _query_offset(self, upload_url: str, default: int) -> int:
+        """Ask the session which bytes it still expects."""
+        try:
+            response = self.transport.get(upload_url, timeout=30)
+            if response.status_code == 200:
+                return self._next_offset(response.json(), default)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.debug(f"Upload session status query failed: {e}")
+        return default
+
+    def _cancel(self, upload_url: str) -> None:
+        try:
+            self.transport.delete(upload_url, timeout=30)
+        except requests.exceptions.RequestException:
+            pass
+
+    @staticmethod
+    def _next_offset(status: Dict[str, Any], default: int) -> int:
+        """First byte of the first entry in nextExpectedRanges ("12345-" or "12345-67890")."""
+        ranges = status.get('nextExpectedRanges') or []
+        if not ranges:
+            return default
+        try:
+            return int(str(ranges[0]).split('-', 1)[0])
+        except ValueError:
+            return default
@@ -0,0 +1,74 @@
+"""
+Memory/latency benchmark: pd.read_excel(engine='openpyxl') vs app.utils.excel_stream.read_sheet.
+
+Builds a workbook shaped like the SharePoint price book (a large "App Source" sheet
+plus other styled sheets) and reads the one sheet both ways.
+
+    python -m app.tests.benchmarks.bench_excel_stream --rows 20000 --repeat 3
+"""
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Font, PatternFill
+
+from app.utils.excel_stream import read_sheet
+
+SHEET = "App Source"
+COLUMNS = ["Part Number", "Description", "Category", "List Price", "Cost", "Qty", "Updated"]
+
+
+def build_workbook(rows: int) -> bytes:
+    workbook = openpyxl.Workbook()
+    bold, fill = Font(bold=True), PatternFill("solid", fgColor="DDEEFF")
+    for title in ("Summary", "Used AMS", SHEET):
+        sheet = workbook.create_sheet(title)
+        sheet.append(COLUMNS)
+        for cell in sheet[1]:
+            cell.font, cell.fill = bold, fill
+        for i in range(rows if title == SHEET else rows // 2):
+            sheet.append([f"P{i:06d}", f"Part description {i}", f"Cat {i % 40}",
+                          round(10 + i * 0.37, 2), round(7 + i * 0.21, 2), i % 17,
+                          pd.Timestamp("2024-01-01") + pd.Timedelta(days=i % 365)])
+    workbook.remove(workbook["Sheet"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(label: str, fn, repeat: int) -> None:
+    timings, peaks = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = fn()
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<38} {statistics.median(timings) * 1000:9.1f} ms   peak {max(peaks) / 2**20:7.1f} MiB   "
+          f"frame {df.memory_usage(deep=True).sum() / 2**20:6.1f} MiB   {len(df)} rows")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = build_workbook(args.rows)
+    print(f"Workbook: {len(content) / 2**20:.1f} MiB, {args.rows} rows in '{SHEET}'")
+    measure("pd.read_excel (current path)",
+            lambda: pd.read_excel(io.BytesIO(content), engine="openpyxl", sheet_name=SHEET), args.repeat)
+    measure("read_sheet", lambda: read_sheet(content, sheet_name=SHEET), args.repeat)
+    measure("read_sheet, stop_at_blank_row",
+            lambda: read_sheet(content, sheet_name=SHEET, stop_at_blank_row=True), args.repeat)
+    measure("read_sheet, 3 columns",
+            lambda: read_sheet(content, sheet_name=SHEET, columns=COLUMNS[:2] + ["List Price"]), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from app.core.performance import AsyncLRUCache
+
+
+class TestAsyncLRUCache(unittest.TestCase):
+
+    def test_concurrent_misses_run_the_factory_once(self):
+        cache = AsyncLRUCache(maxsize=8)
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def main():
+            return await asyncio.gather(*(cache.get_or_set("k", factory) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(main()), ["value"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['coalesced'], 9)
+
+    def test_factory_error_reaches_every_waiter_and_is_not_cached(self):
+        cache = AsyncLRUCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def main():
+            return await asyncio.gather(*(cache.get_or_set("k", failing) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(cache.get_or_set_sync("k", lambda: "ok"), "ok")
+
+    def test_ttl_override_is_per_entry(self):
+        cache = AsyncLRUCache(ttl=60)
+        cache.get_or_set_sync("short", lambda: 1, ttl_override=0.01)
+        cache.set_sync("long", 2)
+        time.sleep(0.02)
+
+        self.assertEqual(cache.ttl, 60)
+        self.assertIsNone(cache.get_sync("short"))
+        self.assertEqual(cache.get_sync("long"), 2)
+        self.assertEqual(cache.cleanup_expired_sync(), 0)
+
+    def test_threads_share_one_load(self):
+        cache = AsyncLRUCache()
+        calls, results = [], []
+        started = threading.Event()
+
+        def slow_factory():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 42
+
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_set_sync("k", slow_factory)))
+        leader.start()
+        started.wait(1)
+        followers = [threading.Thread(target=lambda: results.append(cache.get_or_set_sync("k", slow_factory)))
+                     for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join(2)
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidation_during_load_is_not_undone(self):
+        cache = AsyncLRUCache()
+        loading, release = threading.Event(), threading.Event()
+
+        def stale_factory():
+            loading.set()
+            release.wait(1)
+            return "stale"
+
+        cases = [(lambda: cache.delete_sync("k"), None), (cache.clear_sync, None),
+                 (lambda: cache.set_sync("k", "fresh"), "fresh")]
+        for invalidate, expected in cases:
+            loading.clear()
+            release.clear()
+            results = []
+            loader = threading.Thread(target=lambda: results.append(cache.get_or_set_sync("k", stale_factory)))
+            loader.start()
+            loading.wait(1)
+            invalidate()
+            release.set()
+            loader.join(2)
+
+            self.assertEqual(results, ["stale"])  # the caller still gets its answer
+            self.assertEqual(cache.get_sync("k"), expected)
+            cache.clear_sync()
+
+    def test_zero_ttl_is_not_cached(self):
+        cache = AsyncLRUCache(ttl=60)
+        cache.set_sync("k", "v", ttl=0)
+        self.assertIsNone(cache.get_sync("k"))
+        self.assertEqual(cache.get_or_set_sync("k", lambda: "loaded", ttl_override=0), "loaded")
+        self.assertIsNone(cache.get_sync("k"))
+
+    def test_sweeper_removes_expired_entries(self):
+        cache = AsyncLRUCache(ttl=0.01)
+        cache.set_sync("k", "v")
+        cache.start_sweeper(interval=0.02)
+        self.addCleanup(cache.stop_sweeper)
+        time.sleep(0.1)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
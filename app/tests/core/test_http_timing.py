@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.core.http_timing import AiohttpPhaseHooks, RequestTiming, note_auth_time
+from app.core.metrics_exporter import MetricsExporter
+from app.core.performance import PerformanceMetrics
+
+QUOTE_URL = "https://jd/om/quotedata/api/v1/quotes/Q1/quote-details"
+QUOTE_KEY = "GET:https://jd/om/quotedata/api/v1/quotes/{id}/quote-details"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class TestRequestTiming(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = PerformanceMetrics()
+        self.clock = _Clock()
+        patcher = patch('app.core.http_timing.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hooks = AiohttpPhaseHooks(self.metrics)
+
+    def fire(self, hook, ctx, at, **params):
+        self.clock.now = at
+        asyncio.run(getattr(self.hooks, hook)(None, ctx, SimpleNamespace(**params)))
+
+    def test_trace_hooks_split_request_into_phases(self):
+        timing = RequestTiming("GET", QUOTE_URL + "?token=secret", metrics=self.metrics)
+        with timing.phase('auth'):
+            self.clock.now = 0.2
+        ctx = SimpleNamespace(trace_request_ctx=timing)
+        self.fire('on_request_start', ctx, 0.2, method="GET", url=QUOTE_URL)
+        self.fire('on_connection_queued_start', ctx, 0.2)
+        self.fire('on_connection_queued_end', ctx, 0.25)
+        self.fire('on_connection_create_start', ctx, 0.25)
+        self.fire('on_dns_resolvehost_start', ctx, 0.25)
+        self.fire('on_dns_resolvehost_end', ctx, 0.3)
+        self.fire('on_connection_create_end', ctx, 0.4)
+        self.fire('on_request_headers_sent', ctx, 0.41)
+        self.fire('on_request_end', ctx, 1.41, response=SimpleNamespace(status=200))
+        self.fire('on_response_chunk_received', ctx, 1.5)
+        self.fire('on_response_chunk_received', ctx, 1.6)
+        timing.finish()
+
+        expected = {'auth': 0.2, 'queue': 0.05, 'dns': 0.05, 'connect': 0.1, 'send': 0.01, 'ttfb': 1.0, 'body': 0.19}
+        for phase, seconds in expected.items():
+            self.assertAlmostEqual(timing.phases[phase], seconds, places=6, msg=phase)
+        self.assertFalse(timing.reused)
+
+        _, requests_by_route = self.metrics.snapshot()
+        self.assertEqual(requests_by_route[QUOTE_KEY].status_codes, {200: 1})
+        summary = self.metrics.get_request_phases()[QUOTE_KEY].summary()
+        self.assertEqual(list(summary['phases']), ['auth', 'dns', 'queue', 'connect', 'send', 'ttfb', 'body'])
+        self.assertEqual(summary['connections'], {'reused': 0, 'new': 1})
+        self.assertAlmostEqual(summary['breakdown']['auth'], 0.2, places=6)
+        self.assertAlmostEqual(summary['breakdown']['network'], 0.4, places=6)
+        self.assertAlmostEqual(summary['breakdown']['server'], 1.0, places=6)
+        self.assertIn(QUOTE_KEY, self.metrics.get_performance_report()['request_phases'])
+
+    def test_untimed_request_is_recorded_at_response_headers(self):
+        ctx = SimpleNamespace(trace_request_ctx={'current_attempt': 1})
+        self.fire('on_request_start', ctx, 0.0, method="post", url="https://jd/quotes/Q2/copy-quote")
+        self.fire('on_connection_reuseconn', ctx, 0.01)
+        self.fire('on_request_end', ctx, 0.5, response=SimpleNamespace(status=503))
+
+        rollup = self.metrics.get_request_phases()["POST:https://jd/quotes/{id}/copy-quote"]
+        self.assertEqual((rollup.count, rollup.reused), (1, 1))
+        _, requests_by_route = self.metrics.snapshot()
+        self.assertEqual(requests_by_route["POST:https://jd/quotes/{id}/copy-quote"].errors, 1)
+
+    def test_token_refresh_retry_and_pending_auth_time(self):
+        note_auth_time(0.3)
+        timing = RequestTiming("GET", QUOTE_URL, token_refresh=True, metrics=self.metrics)
+        self.assertAlmostEqual(timing.phases['auth'], 0.3)
+        self.assertNotIn('auth', RequestTiming("GET", QUOTE_URL, metrics=self.metrics).phases)
+
+        timing.finish(200)
+        timing.finish(500)  # ignored
+        rollup = self.metrics.get_request_phases()[QUOTE_KEY]
+        self.assertEqual((rollup.count, rollup.token_refresh_retries), (1, 1))
+
+        text = MetricsExporter("unused", metrics=self.metrics).render_openmetrics()
+        self.assertIn('brideal_http_request_phase_duration_seconds_count{method="GET",'
+                      'route="https://jd/om/quotedata/api/v1/quotes/{id}/quote-details",phase="auth"} 1', text)
+        self.assertIn('brideal_http_token_refresh_retries_total{method="GET",'
+                      'route="https://jd/om/quotedata/api/v1/quotes/{id}/quote-details"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from app.core.invalidation import InvalidationBus, cache_key, csv_key, index_key
+from app.utils.cache_handler import CacheHandler, MemoryLRU
+from app.utils.freshness import FRESH, STALE, FreshnessPolicy, load_cached
+
+
+class TestInvalidationBus(unittest.TestCase):
+
+    def test_notifies_dependents_transitively_in_dependency_order(self):
+        bus = InvalidationBus({
+            "index:b": ["cache:a"],
+            "cache:a": ["src"],
+            "index:c": ["src", "index:b"],
+        })
+        seen = []
+        for key in ("index:c", "index:b", "cache:a", "other"):
+            bus.subscribe(key, lambda event: seen.append((event.key, event.source, event.reason)))
+
+        keys = bus.invalidate("src", reason="changed")
+
+        self.assertEqual(keys, ["src", "cache:a", "index:b", "index:c"])
+        self.assertEqual(seen, [("cache:a", "src", "changed"), ("index:b", "src", "changed"),
+                                ("index:c", "src", "changed")])
+
+    def test_detail_reaches_handlers_and_failing_subscribers_are_isolated(self):
+        bus = InvalidationBus({index_key("deal_form", "parts"): [csv_key("parts")]})
+        received = []
+
+        def deleted_widget(event):
+            raise RuntimeError("wrapped C/C++ object has been deleted")
+
+        bus.subscribe(index_key("deal_form", "parts"), deleted_widget)
+        bus.subscribe(index_key("deal_form", "parts"), lambda event: received.append(event.detail))
+        bus.invalidate(csv_key("parts"), detail={'rows': [["P1"]]})
+        bus.invalidate(csv_key("parts"), detail={'rows': []})
+
+        self.assertEqual(received, [{'rows': [["P1"]]}, {'rows': []}])
+
+    def test_unsubscribe_and_cycles(self):
+        bus = InvalidationBus({"b": ["a"]})
+        calls = []
+        token = bus.subscribe("b", calls.append)
+        bus.unsubscribe(token)
+        bus.invalidate("a")
+        self.assertEqual(calls, [])
+        self.assertIsNotNone(bus.last_invalidated("b"))
+        self.assertIsNone(bus.last_invalidated("c"))
+
+        bus.declare("a", ["b"])
+        with self.assertRaises(ValueError):
+            bus.affected_keys("a")
+
+
+class TestFreshnessAfterInvalidation(unittest.TestCase):
+
+    def test_entry_written_before_invalidation_is_stale(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = CacheHandler(cache_dir=tmp.name, backend="file")
+        cache.memory = MemoryLRU()
+        cache.set("price_book_data", [{"Part": "A"}], subfolder="app_data")
+        bus = InvalidationBus({cache_key("price_book_data"): ["sharepoint:workbook"]})
+        policy = FreshnessPolicy(max_age=3600)
+
+        with mock.patch("app.utils.freshness.get_invalidation_bus", return_value=bus):
+            self.assertEqual(load_cached(cache, "price_book_data", policy, subfolder="app_data")[1], FRESH)
+            bus.invalidate("sharepoint:workbook", reason="workbook_changed")
+            value, state = load_cached(cache, "price_book_data", policy, subfolder="app_data")
+            self.assertEqual((value, state), ([{"Part": "A"}], STALE))
+
+
+if __name__ == '__main__':
+    unittest.main()
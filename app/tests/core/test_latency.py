@@ -0,0 +1,90 @@
+import random
+import threading
+import unittest
+
+from app.core.latency import LatencyHistogram, normalize_route
+from app.core.performance import PerformanceMetrics
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_are_within_bucket_precision(self):
+        rng = random.Random(7)
+        samples = [rng.lognormvariate(-4, 1.2) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        samples.sort()
+        for percent in (50, 90, 99):
+            exact = samples[int(len(samples) * percent / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent) / exact, 1.0, delta=0.05)
+        self.assertEqual(histogram.percentile(100), samples[-1])
+        self.assertEqual(histogram.count, len(samples))
+
+    def test_empty_and_out_of_range_values(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.summary()['p99'], 0.0)
+        histogram.record(0.0)
+        histogram.record(10 ** 6, success=False)
+        self.assertEqual(histogram.percentile(99), 10 ** 6)
+        self.assertEqual(histogram.summary()['min_time'], 0.0)
+        self.assertEqual(histogram.errors, 1)
+
+
+class TestNormalizeRoute(unittest.TestCase):
+
+    def test_ids_collapse_into_templates(self):
+        base = "https://jdquote2-api.deere.com/om/maintainquote/api/v1"
+        self.assertEqual(normalize_route(f"{base}/quotes/12345/equipments?x=1"),
+                         f"{base}/quotes/{{id}}/equipments")
+        self.assertEqual(normalize_route(f"{base}/quotes/98765/dealers/XRACF"),
+                         f"{base}/quotes/{{id}}/dealers/{{id}}")
+        self.assertEqual(normalize_route("/v1.0/users/sales@example.com/sendMail"), "/v1.0/users/{id}/sendMail")
+        self.assertEqual(normalize_route("/v1.0/drives/b!x1/items/01ABC/workbook/worksheets('Deals')/range(address='A1:B2')"),
+                         "/v1.0/drives/{id}/items/{id}/workbook/worksheets({id})/range({id})")
+        self.assertEqual(normalize_route("/v1.0/$batch"), "/v1.0/$batch")
+
+
+class TestPerformanceMetrics(unittest.TestCase):
+
+    def test_threads_record_into_shards_that_merge(self):
+        metrics = PerformanceMetrics()
+
+        def work():
+            for i in range(1000):
+                metrics.record_function_call("load", 0.01)
+                metrics.record_request(f"https://api/quotes/{i}", "get", 0.2, 200)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        metrics.record_function_call("load", 1.0, success=False)
+        for thread in threads:
+            thread.join()
+
+        report = metrics.get_performance_report()
+        load = report['functions']['load']
+        self.assertEqual((load['call_count'], load['errors'], load['max_time']), (4001, 1, 1.0))
+        self.assertAlmostEqual(load['p50'], 0.01, delta=0.0005)
+        self.assertEqual(list(report['requests']), ["GET:https://api/quotes/{id}"])
+        self.assertEqual(report['requests']["GET:https://api/quotes/{id}"]['status_codes'], {200: 4000})
+        # Finished threads were folded into one shard; the totals are unchanged.
+        self.assertEqual(metrics.get_performance_report()['summary']['total_requests_made'], 4000)
+
+        metrics.clear_metrics()
+        self.assertEqual(metrics.get_performance_report()['functions'], {})
+        metrics.record_function_call("load", 0.5)
+        self.assertEqual(metrics.get_slow_functions(0.4, percentile=99), [("load", 0.5)])
+
+    def test_route_count_is_capped(self):
+        metrics = PerformanceMetrics()
+        metrics.MAX_ROUTES = 2
+        for path in ("a", "b", "c", "d"):
+            metrics.record_request(f"https://api/{path}", "GET", 0.1)
+        self.assertEqual(sorted(metrics.get_performance_report()['requests']),
+                         ["GET:https://api/a", "GET:https://api/b", "GET:{other}"])
+
+
+if __name__ == '__main__':
+    unittest.main()
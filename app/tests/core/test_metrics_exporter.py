@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from app.core.metrics_exporter import MetricsExporter
+from app.core.performance import PerformanceMetrics, get_async_cache, get_async_cache_stats
+from app.utils.cache_handler import CacheHandler
+
+
+class TestMetricsExporter(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.metrics = PerformanceMetrics()
+        self.exporter = MetricsExporter(self._tmp.name, metrics=self.metrics, max_bytes=2048, backup_count=2)
+        self.addCleanup(self.exporter.stop)
+        for value in (0.004, 0.02, 0.3):
+            self.metrics.record_function_call("load_price_book", value)
+        self.metrics.record_request("https://api/quotes/123?x=1", "GET", 0.2, 200)
+        self.metrics.record_request("https://api/quotes/456", "GET", 0.7, 503, success=False)
+        self.exporter.add_cache_source("memory", lambda: {'hits': 3, 'misses': 1, 'budget': "n/a"})
+        self.exporter.add_thread_pool_source("broken", lambda: 1 / 0)
+
+    def test_openmetrics_text(self):
+        text = self.exporter.render_openmetrics()
+        lines = text.splitlines()
+
+        self.assertEqual(lines[-1], "# EOF")
+        self.assertIn('brideal_function_duration_seconds_bucket{function="load_price_book",le="0.005"} 1', lines)
+        self.assertIn('brideal_function_duration_seconds_bucket{function="load_price_book",le="+Inf"} 3', lines)
+        self.assertIn('brideal_function_duration_seconds_count{function="load_price_book"} 3', lines)
+        self.assertIn('brideal_http_responses_total{method="GET",route="https://api/quotes/{id}",status="503"} 1', lines)
+        self.assertIn('brideal_http_request_errors_total{method="GET",route="https://api/quotes/{id}"} 1', lines)
+        self.assertIn('brideal_cache_hits{cache="memory"} 3', lines)
+        self.assertFalse(any('budget' in line or 'thread_pool' in line for line in lines))
+
+    def test_export_writes_snapshot_and_rotating_json_lines(self):
+        for _ in range(6):
+            self.assertTrue(self.exporter.export())
+
+        with open(self.exporter.prom_path, encoding='utf-8') as f:
+            self.assertTrue(f.read().endswith("# EOF\n"))
+        with open(self.exporter.jsonl_path, encoding='utf-8') as f:
+            document = json.loads(f.readline())
+        self.assertEqual(document['functions']['load_price_book']['count'], 3)
+        self.assertEqual(document['requests']['GET:https://api/quotes/{id}']['status_codes'], {'200': 1, '503': 1})
+        self.assertTrue(os.path.exists(f"{self.exporter.jsonl_path}.1"))
+        self.assertFalse(os.path.exists(f"{self.exporter.jsonl_path}.3"))
+
+    def test_scrape_endpoint_is_loopback_only(self):
+        with self.assertRaises(ValueError):
+            self.exporter.start_server(0, host="0.0.0.0")
+        port = self.exporter.start_server(0)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            self.assertTrue(response.headers['Content-Type'].startswith("application/openmetrics-text"))
+            self.assertIn(b"brideal_function_duration_seconds_sum", response.read())
+
+    def test_application_sources(self):
+        # The sources main.py registers
+        exporter = MetricsExporter(self._tmp.name, metrics=self.metrics)
+        cache_handler = CacheHandler(cache_dir=os.path.join(self._tmp.name, "cache"))
+        get_async_cache()
+        exporter.add_cache_source("cache_handler_memory", cache_handler.get_memory_stats)
+        exporter.add_cache_source("async_lru", get_async_cache_stats)
+
+        caches = exporter.collect()['caches']
+        self.assertIn('hits', caches['cache_handler_memory'])
+        self.assertIn('maxsize', caches['async_lru'])
+        self.assertTrue(exporter.export())
+
+    def test_source_returning_non_mapping_is_skipped(self):
+        async def stats():
+            return {'hits': 1}
+
+        self.exporter.add_cache_source("async", stats)
+        self.exporter.add_cache_source("list", lambda: [('hits', 1)])
+        caches = self.exporter.collect()['caches']
+        self.assertEqual((caches['async'], caches['list']), ({}, {}))
+        self.assertTrue(self.exporter.export())
+
+
+if __name__ == '__main__':
+    unittest.main()
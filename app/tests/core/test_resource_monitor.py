@@ -0,0 +1,110 @@
+import gc
+import sys
+import tracemalloc
+import unittest
+
+from app.core.memory import deep_sizeof
+from app.core.performance import ResourceMonitor
+from app.utils.csv_stream import CompactRecord, RecordSchema
+
+
+class _Frame:
+    """Stands in for a DataFrame: deep_sizeof uses its memory_usage."""
+    dtypes = {}
+
+    def __init__(self, nbytes):
+        self.nbytes_total = nbytes
+
+    def memory_usage(self, deep=False):
+        return self.nbytes_total if deep else 0
+
+
+class _Owner:
+    def __init__(self):
+        self.rows = {'a': ['x' * 100, 'y' * 100]}
+        self.frame = _Frame(5000)
+        self.empty = None
+
+
+class TestDeepSizeof(unittest.TestCase):
+
+    def test_follows_containers_and_counts_shared_data_once(self):
+        text = 'z' * 1000
+        shallow = sys.getsizeof([text])
+        self.assertGreaterEqual(deep_sizeof([text]), shallow + sys.getsizeof(text))
+        self.assertEqual(deep_sizeof([text, text]), sys.getsizeof([text, text]) + sys.getsizeof(text))
+
+        seen = set()
+        first = deep_sizeof({'k': text}, seen)
+        self.assertLess(deep_sizeof((text,), seen), first)
+        self.assertEqual(deep_sizeof(_Frame(1234)), 1234)
+
+    def test_follows_mappings_and_slots(self):
+        schema = RecordSchema(['Part Number', 'Description', 'Price'])
+        values = ('P-100', 'Hydraulic filter ' * 10, '12.50')
+        record = CompactRecord(schema, values)
+
+        held = sys.getsizeof(record) + sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+        self.assertGreaterEqual(deep_sizeof(record), held)
+        # The schema is shared: a second record only adds its own tuple and values
+        seen = set()
+        deep_sizeof(record, seen)
+        other = CompactRecord(schema, ('P-200', 'Belt', '3.10'))
+        self.assertLess(deep_sizeof(other, seen), deep_sizeof(other))
+
+
+class TestResourceMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = ResourceMonitor()
+
+    def test_budget_report_by_module(self):
+        owner = _Owner()
+        self.monitor.register_owner(owner, 'rows', 'frame', 'empty', module='PriceBook')
+        self.monitor.set_budget('PriceBook', 1000)
+
+        report = self.monitor.get_memory_budget_report()
+        module = report['modules']['PriceBook']
+        self.assertEqual(list(module['items']), ['frame', 'rows'])
+        self.assertEqual(module['items']['frame'], 5000)
+        self.assertTrue(module['over_budget'])
+        self.assertEqual(report['total_owned_bytes'], module['bytes'])
+
+        # Sizes are cached until refreshed
+        owner.frame = _Frame(10)
+        self.assertEqual(self.monitor.get_owned_sizes()['PriceBook']['frame'], 5000)
+        self.assertEqual(self.monitor.get_owned_sizes(refresh=True)['PriceBook']['frame'], 10)
+
+        del owner
+        gc.collect()
+        self.assertEqual(self.monitor.get_memory_budget_report()['modules'], {})
+
+    def test_snapshots_require_tracing(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc already running")
+        with self.assertRaises(RuntimeError):
+            self.monitor.take_snapshot()
+
+    def test_snapshot_diff_finds_growth(self):
+        was_tracing = tracemalloc.is_tracing()
+        self.monitor.start_allocation_tracing()
+        if not was_tracing:
+            self.addCleanup(self.monitor.stop_allocation_tracing)
+
+        self.monitor.take_snapshot('before')
+        retained = [bytearray(1024) for _ in range(2000)]
+        self.monitor.take_snapshot('after')
+
+        growth = self.monitor.diff_snapshots('before', 'after', limit=3)
+        self.assertIn('test_resource_monitor.py', growth[0]['location'])
+        self.assertGreater(growth[0]['size_diff'], 1024 * 1000)
+        self.assertEqual(self.monitor.get_snapshot_labels(), ['before', 'after'])
+        self.assertTrue(self.monitor.get_top_allocations(limit=5, label='after'))
+        self.assertEqual(self.monitor.get_memory_budget_report()['top_allocations']['snapshot'], 'after')
+        with self.assertRaises(KeyError):
+            self.monitor.diff_snapshots('missing')
+        del retained
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import threading
+import time
+import unittest
+
+from app.core.performance import PerformanceMetrics
+from app.core.stall_detector import StallDetector
+
+
+def slow_table_fill(seconds):
+    time.sleep(seconds)
+
+
+class TestStallDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = PerformanceMetrics()
+        self.detector = StallDetector(threshold=0.1, heartbeat_interval=0.02, sample_interval=0.01,
+                                      metrics=self.metrics)
+        self.addCleanup(self.detector.stop)
+
+    def _run_loop(self, block_for):
+        """Stand-in for the Qt loop: beat on time, block once, beat again."""
+        def loop():
+            self.detector.start_watchdog(threading.get_ident())
+            for _ in range(3):
+                self.detector.beat()
+                time.sleep(0.02)
+            slow_table_fill(block_for)
+            self.detector.beat()
+        thread = threading.Thread(target=loop)
+        thread.start()
+        thread.join()
+
+    def test_stall_is_sampled_and_attributed_to_the_blocking_frame(self):
+        self._run_loop(0.3)
+
+        report = self.detector.report()
+        self.assertEqual(report['stalls'], 1)
+        self.assertGreater(report['max_stall'], 0.2)
+        top = report['locations'][0]
+        self.assertIn("slow_table_fill", top['frames'][0])
+        self.assertGreater(top['samples'], 3)
+        self.assertIn("time.sleep(seconds)", top['example'])
+
+        self.metrics.add_report_section("event_loop_stalls", self.detector.report)
+        performance = self.metrics.get_performance_report()
+        self.assertEqual(performance['sections']['event_loop_stalls']['stalls'], 1)
+        self.assertEqual(performance['functions']['qt.event_loop_stall']['call_count'], 1)
+        self.assertEqual(performance['functions']['qt.event_loop_delay']['call_count'], 4)
+
+    def test_short_delays_are_not_stalls(self):
+        self._run_loop(0.03)
+        self.assertEqual(self.detector.report()['stalls'], 0)
+        self.assertEqual(self.detector.report()['locations'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from app.core.tracing import Tracer, activate, bind
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer(capacity=100)
+
+    def test_nested_spans_share_a_trace(self):
+        with self.tracer.span("click") as root:
+            with self.tracer.span("load", key="price_book") as child:
+                pass
+        spans = self.tracer.spans()
+
+        self.assertEqual([s.name for s in spans], ["load", "click"])
+        self.assertEqual((child.parent_id, child.trace_id), (root.span_id, root.span_id))
+        self.assertEqual(child.attributes, {'key': "price_book"})
+        self.assertGreaterEqual(root.duration, child.duration)
+
+    def test_context_crosses_threads_callbacks_and_tasks(self):
+        results = {}
+
+        def worker_body():
+            with self.tracer.span("fetch") as fetch:
+                results['fetch'] = fetch
+
+        def on_result():
+            with self.tracer.span("render") as render:
+                results['render'] = render
+
+        async def coroutine():
+            await asyncio.sleep(0)
+            with self.tracer.span("async") as async_span:
+                results['async'] = async_span
+
+        with self.tracer.span("open") as root:
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(worker_body,))
+            callback = bind(on_result)
+            thread.start()
+            thread.join()
+            asyncio.run(coroutine())
+        callback()
+
+        for name in ('fetch', 'render', 'async'):
+            self.assertEqual(results[name].parent_id, root.span_id, name)
+        self.assertNotEqual(results['fetch'].thread_id, root.thread_id)
+
+    def test_failed_block_records_the_error(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("parse"):
+                raise ValueError("bad row")
+        self.assertEqual(self.tracer.spans()[0].error, "ValueError: bad row")
+
+    def test_ring_buffer_and_disabled_tracer(self):
+        for i in range(150):
+            with self.tracer.span(f"s{i}"):
+                pass
+        self.assertEqual(len(self.tracer.spans()), 100)
+        self.assertEqual(self.tracer.spans()[0].name, "s50")
+
+        self.tracer.enabled = False
+        with self.tracer.span("off") as off:
+            self.assertIsNone(off)
+        with activate(None):
+            pass
+        self.assertEqual(self.tracer.spans()[-1].name, "s149")
+
+    def test_chrome_trace_has_slices_threads_and_flows(self):
+        with self.tracer.span("open") as root:
+            context = contextvars.copy_context()
+
+            def work():
+                with self.tracer.span("fetch"):
+                    pass
+            thread = threading.Thread(target=context.run, args=(work,), name="pool-1")
+            thread.start()
+            thread.join()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.tracer.dump_chrome_trace(os.path.join(tmp, "traces", "t.json"))
+            with open(path, encoding='utf-8') as f:
+                events = json.load(f)['traceEvents']
+
+        slices = {e['name']: e for e in events if e['ph'] == 'X'}
+        self.assertEqual(slices['fetch']['args']['parent_id'], root.span_id)
+        self.assertGreaterEqual(slices['fetch']['ts'], slices['open']['ts'])
+        self.assertEqual(sorted(e['ph'] for e in events if e.get('cat') == 'flow'), ['f', 's'])
+        self.assertIn("pool-1", [e['args']['name'] for e in events if e['ph'] == 'M'])
+
+
+if __name__ == '__main__':
+    unittest.main()
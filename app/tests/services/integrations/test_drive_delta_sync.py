@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.services.integrations.drive_delta_sync import DriveDeltaSync
+
+
+def _page(status=200, **body):
+    response = MagicMock()
+    response.status_code = status
+    response.json.return_value = body
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestDriveDeltaSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp_dir.name, 'delta_state.json')
+        self.tracked = {'customers': 'App resources/customers.csv', 'parts': 'App resources/parts.csv'}
+        self.transport = MagicMock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _tracked_sync(self):
+        """Return a sync object that has a committed token and both items recorded."""
+        self.transport.get.return_value = _page(**{'@odata.deltaLink': 'https://graph/delta?token=t1'})
+        sync = DriveDeltaSync(self.state_path, transport=self.transport)
+        self.assertTrue(sync.start_tracking('drive1', 'tok'))
+        sync.record_items({'customers': {'id': 'c1', 'eTag': 'e1'}, 'parts': {'id': 'p1', 'eTag': 'e2'}})
+        sync.commit()
+        return sync
+
+    def test_no_token_requires_full_download(self):
+        sync = DriveDeltaSync(self.state_path, transport=self.transport)
+        self.assertIsNone(sync.changed_keys('drive1', 'tok', self.tracked))
+
+    def test_changed_items_are_matched_by_id_across_pages(self):
+        self._tracked_sync()
+        sync = DriveDeltaSync(self.state_path, transport=self.transport)  # reload persisted state
+        self.transport.get.side_effect = [
+            _page(value=[{'id': 'unrelated'}], **{'@odata.nextLink': 'https://graph/delta?page=2'}),
+            _page(value=[{'id': 'p1', 'name': 'parts.csv'}], **{'@odata.deltaLink': 'https://graph/delta?token=t2'}),
+        ]
+
+        changed = sync.changed_keys('drive1', 'tok', self.tracked)
+
+        self.assertEqual(changed, {'parts'})
+        sync.commit()
+        self.assertEqual(DriveDeltaSync(self.state_path, transport=self.transport)._state['delta_link'], 'https://graph/delta?token=t2')
+
+    def test_token_is_not_advanced_without_commit(self):
+        self._tracked_sync()
+        sync = DriveDeltaSync(self.state_path, transport=self.transport)
+        self.transport.get.side_effect = None
+        self.transport.get.return_value = _page(value=[], **{'@odata.deltaLink': 'https://graph/delta?token=t2'})
+
+        self.assertEqual(sync.changed_keys('drive1', 'tok', self.tracked), set())
+        self.assertEqual(DriveDeltaSync(self.state_path, transport=self.transport)._state['delta_link'], 'https://graph/delta?token=t1')
+
+    def test_expired_token_resets_state(self):
+        sync = self._tracked_sync()
+        self.transport.get.return_value = _page(status=410)
+
+        self.assertIsNone(sync.changed_keys('drive1', 'tok', self.tracked))
+        self.assertFalse(DriveDeltaSync(self.state_path, transport=self.transport).has_token)
+
+    def test_forgotten_items_are_reported_as_changed(self):
+        sync = self._tracked_sync()
+        sync.forget_items(['customers'])
+        self.transport.get.return_value = _page(value=[], **{'@odata.deltaLink': 'https://graph/delta?token=t2'})
+
+        self.assertEqual(sync.changed_keys('drive1', 'tok', self.tracked), {'customers'})
+
+
+if __name__ == '__main__':
+    unittest.main()
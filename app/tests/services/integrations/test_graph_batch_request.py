@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.services.integrations.sharepoint_manager import GraphBatchRequest
+
+
+def _batch_reply(requests_payload):
+    """Build a fake $batch HTTP response echoing a 200 for every sub-request, in reverse order."""
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {
+        'responses': [
+            {'id': r['id'], 'status': 200, 'headers': {}, 'body': {'url': r['url']}}
+            for r in reversed(requests_payload)
+        ]
+    }
+    return response
+
+
+class TestGraphBatchRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.base_url = "https://graph.microsoft.com/v1.0"
+        self.auth_headers = {'Authorization': 'Bearer test_token', 'Content-Type': 'application/json'}
+        self.transport = MagicMock()
+        self.transport.post.side_effect = lambda url, headers, json, timeout: _batch_reply(json['requests'])
+
+    def test_add_makes_urls_relative_and_sets_json_content_type(self):
+        batch = GraphBatchRequest(self.base_url, transport=self.transport)
+        request_id = batch.add("post", f"{self.base_url}/drives/d1/items/i1/workbook/createSession",
+                               body={"persistChanges": True})
+
+        self.assertEqual(request_id, "1")
+        queued = batch._requests[0]
+        self.assertEqual(queued['method'], "POST")
+        self.assertEqual(queued['url'], "/drives/d1/items/i1/workbook/createSession")
+        self.assertEqual(queued['headers']['Content-Type'], "application/json")
+
+    def test_duplicate_request_id_is_rejected(self):
+        batch = GraphBatchRequest(self.base_url, transport=self.transport)
+        batch.add("GET", "/me", request_id="a")
+        with self.assertRaises(ValueError):
+            batch.add("GET", "/me/drive", request_id="a")
+
+    def test_execute_demultiplexes_out_of_order_responses(self):
+        mock_post = self.transport.post
+        batch = GraphBatchRequest(self.base_url, transport=self.transport)
+        first = batch.add("GET", "/sites/s1/drive/root:/a.xlsx")
+        second = batch.add("GET", "/sites/s1/drive/root/children", depends_on=[first])
+
+        responses = batch.execute(self.auth_headers)
+
+        mock_post.assert_called_once()
+        sent = mock_post.call_args.kwargs['json']['requests']
+        self.assertEqual(sent[1]['dependsOn'], [first])
+        self.assertEqual(responses[first]['body']['url'], "/sites/s1/drive/root:/a.xlsx")
+        self.assertEqual(responses[second]['body']['url'], "/sites/s1/drive/root/children")
+
+    def test_execute_splits_into_batches_of_twenty(self):
+        mock_post = self.transport.post
+        batch = GraphBatchRequest(self.base_url, transport=self.transport)
+        ids = [batch.add("GET", f"/items/{i}") for i in range(25)]
+        # Depends on a request that will land in the first chunk.
+        last = batch.add("GET", "/items/last", depends_on=[ids[0]])
+
+        responses = batch.execute(self.auth_headers)
+
+        self.assertEqual(mock_post.call_count, 2)
+        second_chunk = mock_post.call_args_list[1].kwargs['json']['requests']
+        self.assertEqual(len(second_chunk), 6)
+        self.assertNotIn('dependsOn', second_chunk[-1])
+        self.assertEqual(len(responses), 26)
+        self.assertIn(last, responses)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.services.integrations.auth import GraphTokenProvider
+
+
+class TestGraphTokenProvider(unittest.TestCase):
+
+    def _provider(self, msal_app, **kwargs):
+        provider = GraphTokenProvider(client_id="cid", client_secret="secret", tenant_id="tid", **kwargs)
+        provider._app = msal_app
+        self.addCleanup(lambda: provider._timer and provider._timer.cancel())
+        return provider
+
+    def test_token_is_cached_while_valid(self):
+        msal_app = MagicMock()
+        msal_app.acquire_token_for_client.return_value = {'access_token': 't1', 'expires_in': 3600}
+        provider = self._provider(msal_app)
+
+        self.assertEqual(provider.get_token(), 't1')
+        self.assertEqual(provider.get_token(), 't1')
+        self.assertEqual(msal_app.acquire_token_for_client.call_count, 1)
+        self.assertTrue(provider._timer.is_alive())
+
+    def test_concurrent_callers_share_one_refresh(self):
+        release = threading.Event()
+        msal_app = MagicMock()
+
+        def slow_acquire(scopes):
+            release.wait(2)
+            return {'access_token': 'shared', 'expires_in': 3600}
+        msal_app.acquire_token_for_client.side_effect = slow_acquire
+        provider = self._provider(msal_app)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(provider.get_token())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(2)
+
+        self.assertEqual(results, ['shared'] * 5)
+        self.assertEqual(msal_app.acquire_token_for_client.call_count, 1)
+
+    def test_failure_backs_off(self):
+        msal_app = MagicMock()
+        msal_app.acquire_token_for_client.return_value = {'error': 'invalid_client'}
+        provider = self._provider(msal_app, failure_backoff=60)
+
+        self.assertIsNone(provider.get_token())
+        self.assertIsNone(provider.get_token())
+        self.assertEqual(msal_app.acquire_token_for_client.call_count, 1)
+
+    def test_invalidate_forces_new_token(self):
+        msal_app = MagicMock()
+        msal_app.acquire_token_for_client.side_effect = [
+            {'access_token': 'old', 'expires_in': 3600},
+            {'access_token': 'new', 'expires_in': 3600},
+        ]
+        provider = self._provider(msal_app)
+
+        self.assertEqual(provider.get_token(), 'old')
+        provider.invalidate()
+        self.assertEqual(provider.get_token(), 'new')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from app.services.integrations.graph_transport import GraphTransport
+
+
+class TestGraphTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = GraphTransport()
+        self.transport._session = MagicMock()
+        self.events = []
+        self.transport.add_hook(self.events.append)
+
+    @patch('app.services.integrations.graph_transport.get_performance_monitor')
+    def test_request_reports_to_hooks_and_metrics_without_query(self, mock_monitor):
+        self.transport._session.request.return_value = MagicMock(status_code=200)
+
+        self.transport.get("https://graph.microsoft.com/v1.0/drives/d1/items/i1?tempauth=secret")
+
+        _, kwargs = self.transport._session.request.call_args
+        self.assertEqual(kwargs['timeout'], self.transport.default_timeout)
+        self.assertEqual(self.events[0]['url'], "https://graph.microsoft.com/v1.0/drives/d1/items/i1")
+        self.assertEqual(self.events[0]['status_code'], 200)
+        args = mock_monitor.return_value.record_request.call_args[0]
+        self.assertEqual(args[:2], ("https://graph.microsoft.com/v1.0/drives/d1/items/i1", 'GET'))
+        self.assertTrue(args[4])
+
+    @patch('app.services.integrations.graph_transport.get_performance_monitor')
+    def test_failed_request_is_reported_and_reraised(self, mock_monitor):
+        self.transport._session.request.side_effect = requests.exceptions.RequestException("boom")
+
+        with self.assertRaises(requests.exceptions.RequestException):
+            self.transport.post("https://graph.microsoft.com/v1.0/$batch")
+
+        self.assertIsNotNone(self.events[0]['error'])
+        self.assertFalse(mock_monitor.return_value.record_request.call_args[0][4])
+
+    @patch('app.services.integrations.graph_transport.get_performance_monitor')
+    def test_failing_hook_does_not_break_request(self, mock_monitor):
+        self.transport._session.request.return_value = MagicMock(status_code=204)
+        self.transport.add_hook(MagicMock(side_effect=RuntimeError("hook")))
+
+        self.assertEqual(self.transport.delete("https://graph.microsoft.com/v1.0/x").status_code, 204)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import requests
+
+from app.services.integrations import sharepoint_manager
+from app.services.integrations.sharepoint_manager import SharePointExcelManager, _WorkbookCache, _WorkbookEntry
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+FILE_INFO = {'id': 'item1', 'parentReference': {'driveId': 'drive1'}}
+
+
+def _response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload or {}
+    response.text = str(payload)
+    response.raise_for_status.return_value = None
+    return response
+
+
+def _manager(block_size=2, used_rows=10):
+    """A SharePointExcelManager wired to a fake transport, without the environment setup of __init__."""
+    manager = SharePointExcelManager.__new__(SharePointExcelManager)
+    manager.graph_base_url = GRAPH
+    manager.append_block_size = block_size
+    manager.last_append_timings = []
+    manager._get_headers = lambda: {'Authorization': 'Bearer t', 'Content-Type': 'application/json'}
+    manager.http = MagicMock()
+
+    def post(url, headers=None, json=None, timeout=None):
+        if url.endswith('/$batch'):
+            return _response(200, {'responses': [
+                {'id': 'session', 'status': 201, 'body': {'id': 'S1'}},
+                {'id': 'usedRange', 'status': 200, 'body': {'rowCount': used_rows}},
+            ]})
+        return _response(204)  # closeSession
+
+    manager.http.post.side_effect = post
+    manager.http.patch.return_value = _response(200)
+    return manager
+
+
+class TestWorkbookCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = _WorkbookCache()
+        patcher = patch.object(sharepoint_manager, '_workbook_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = _manager()
+        self.manager.site_id = "site1"
+        self.manager.http.get.return_value = _response(200)
+        self.manager.http.get.return_value.content = b"xlsx-v1"
+        self.headers = {'Authorization': 'Bearer t'}
+
+    def test_entry_matches_ctag_before_etag(self):
+        entry = _WorkbookEntry('item1', '"e1"', '"c1"', b"")
+        self.assertTrue(entry.matches({'eTag': '"e2"', 'cTag': '"c1"'}))  # metadata-only edit
+        self.assertFalse(entry.matches({'eTag': '"e1"', 'cTag': '"c2"'}))
+        self.assertTrue(_WorkbookEntry('item1', '"e1"', None, b"").matches({'eTag': '"e1"', 'cTag': '"c9"'}))
+        self.assertFalse(_WorkbookEntry('item1', None, None, b"").matches({}))
+
+    def test_unchanged_file_is_not_downloaded_again(self):
+        info = {'id': 'item1', 'eTag': '"e1"', 'cTag': '"c1"'}
+        first = self.manager._get_cached_workbook(info, self.headers)
+        second = self.manager._get_cached_workbook(dict(info), self.headers)
+
+        self.assertIs(first, second)
+        self.assertEqual(first.content, b"xlsx-v1")
+        self.manager.http.get.assert_called_once()
+        self.assertNotIn('If-None-Match', self.manager.http.get.call_args.kwargs['headers'])
+
+    def test_changed_file_is_downloaded_and_replaces_the_entry(self):
+        self.manager._get_cached_workbook({'id': 'item1', 'eTag': '"e1"', 'cTag': '"c1"'}, self.headers)
+        self.manager.http.get.return_value = _response(200)
+        self.manager.http.get.return_value.content = b"xlsx-v2"
+
+        with patch.object(sharepoint_manager, 'get_invalidation_bus') as bus:
+            entry = self.manager._get_cached_workbook({'id': 'item1', 'eTag': '"e2"', 'cTag': '"c2"'}, self.headers)
+
+        self.assertEqual(entry.content, b"xlsx-v2")
+        self.assertEqual(self.manager.http.get.call_args.kwargs['headers']['If-None-Match'], '"c1"')
+        self.assertIs(self.cache.peek('item1'), entry)
+        bus.return_value.invalidate.assert_called_once()
+
+    def test_not_modified_keeps_the_entry_and_its_sheets(self):
+        entry = self.manager._get_cached_workbook({'id': 'item1', 'eTag': '"e1"'}, self.headers)
+        entry.sheets['parsed'] = pd.DataFrame()
+        self.manager.http.get.return_value = _response(304)
+
+        revalidated = self.manager._get_cached_workbook({'id': 'item1', 'eTag': '"e2"'}, self.headers)
+
+        self.assertIs(revalidated, entry)
+        self.assertIn('parsed', revalidated.sheets)
+        self.assertEqual(self.manager.http.get.call_args.kwargs['headers']['If-None-Match'], '"e1"')
+        # The new eTag now matches without a request
+        self.manager._get_cached_workbook({'id': 'item1', 'eTag': '"e2"'}, self.headers)
+        self.assertEqual(self.manager.http.get.call_count, 2)
+
+    def test_invalidate_evicts_entries(self):
+        self.cache.store({'id': 'a', 'eTag': '"1"'}, b"a")
+        self.cache.store({'id': 'b', 'eTag': '"1"'}, b"b")
+
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.lookup({'id': 'a', 'eTag': '"1"'}))
+        self.assertIsNotNone(self.cache.lookup({'id': 'b', 'eTag': '"1"'}))
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.peek('b'))
+
+    def test_sheets_are_parsed_once_per_option_set(self):
+        entry = _WorkbookEntry('item1', '"e1"', None, b"xlsx")
+        frame = pd.DataFrame({'Name': ['a'], 'Qty': [1]})
+        with patch.object(sharepoint_manager, 'read_sheet', return_value=frame) as read_sheet:
+            first = entry.get_sheet('Sales', columns=['Name'])
+            first['Name'] = 'changed'  # callers get copies
+            again = entry.get_sheet('Sales', columns=['Name'])
+            entry.get_sheet('Sales', columns=['Name'], stop_at_blank_row=True)
+            entry.get_sheet(0)
+
+        self.assertEqual(again['Name'].tolist(), ['a'])
+        self.assertEqual(read_sheet.call_count, 3)
+
+
+class TestSessionAppend(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'Name': ['a', 'b', 'c', 'd', 'e'], 'Qty': [1, 2, 3, 4, 5]})
+
+    def test_rows_are_written_in_contiguous_blocks(self):
+        manager = _manager(block_size=2)
+
+        self.assertEqual(manager._update_excel_via_session(self.df, FILE_INFO, target_sheet_name='Sales'), 5)
+
+        addresses = [call.args[0].split("address='")[1].rstrip("')") for call in manager.http.patch.call_args_list]
+        self.assertEqual(addresses, ['Sales!A11:B12', 'Sales!A13:B14', 'Sales!A15:B15'])
+        self.assertEqual(manager.http.patch.call_args_list[2].kwargs['json'], {'values': [['e', 5]]})
+        self.assertTrue(all(call.kwargs['headers']['Workbook-Session-Id'] == 'S1'
+                            for call in manager.http.patch.call_args_list))
+        self.assertEqual([t['rows'] for t in manager.last_append_timings], [2, 2, 1])
+        self.assertTrue(manager.http.post.call_args_list[-1].args[0].endswith('/workbook/closeSession'))
+
+    def test_failed_block_reports_rows_already_written(self):
+        manager = _manager(block_size=2)
+        manager.http.patch.side_effect = [_response(200), _response(500), _response(200)]
+
+        self.assertEqual(manager._update_excel_via_session(self.df, FILE_INFO, target_sheet_name='Sales'), 2)
+        self.assertEqual(manager.http.patch.call_count, 2)
+        self.assertTrue(manager.http.post.call_args_list[-1].args[0].endswith('/workbook/closeSession'))
+
+    def test_failed_session_returns_zero(self):
+        manager = _manager()
+        manager.http.post.side_effect = lambda url, **kwargs: _response(200, {'responses': [
+            {'id': 'session', 'status': 503, 'body': None}]})
+
+        self.assertEqual(manager._update_excel_via_session(self.df, FILE_INFO, target_sheet_name='Sales'), 0)
+        manager.http.patch.assert_not_called()
+
+    def test_fallback_rewrite_appends_only_unwritten_rows(self):
+        manager = _manager()
+        manager.get_excel_file_info = MagicMock(return_value=FILE_INFO)
+        manager._update_excel_via_session = MagicMock(return_value=2)
+        # The sheet as re-read after the partial append already holds the first two rows.
+        manager.get_excel_data = MagicMock(return_value=pd.DataFrame({'Name': ['old', 'a', 'b'], 'Qty': [0, 1, 2]}))
+        manager._update_excel_file_direct = MagicMock(return_value=True)
+
+        with patch.object(manager, '_publish_workbook_change') as publish:
+            self.assertEqual(manager._append_rows(self.df.to_dict('records'), 'Sales'), 5)
+
+        rewritten = manager._update_excel_file_direct.call_args.args[0]
+        self.assertEqual(rewritten['Name'].tolist(), ['old', 'a', 'b', 'c', 'd', 'e'])
+        # The cached workbook is dropped before the sheet is re-read for the rewrite
+        self.assertEqual(publish.call_args_list[0].args, ('item1', 2))
+
+    def test_failed_fallback_reports_session_progress(self):
+        manager = _manager()
+        manager.get_excel_file_info = MagicMock(return_value=FILE_INFO)
+        manager._update_excel_via_session = MagicMock(return_value=2)
+        manager.get_excel_data = MagicMock(return_value=None)
+
+        with patch.object(manager, '_publish_workbook_change'):
+            self.assertEqual(manager._append_rows(self.df.to_dict('records'), 'Sales'), 2)
+
+    def test_unanswered_block_that_landed_is_counted(self):
+        manager = _manager(block_size=2)
+        manager.http.patch.side_effect = [_response(200), requests.exceptions.ReadTimeout("read timed out"),
+                                          requests.exceptions.ConnectionError("reset")]
+        # After the timeout the sheet has rows up to 14 (block 2 landed); block 3 did not.
+        manager.http.get.side_effect = [_response(200, {'rowCount': 14}), _response(200, {'rowCount': 14})]
+
+        self.assertEqual(manager._update_excel_via_session(self.df, FILE_INFO, target_sheet_name='Sales'), 4)
+        self.assertEqual(manager.http.patch.call_count, 3)
+
+
+class TestFileInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = _manager()
+        self.manager.site_id = "site1"
+        self.manager.excel_file_path = "/Sales Docs/Q1 #2 report.xlsx"
+
+    def test_path_is_quoted_and_listing_skipped_on_hit(self):
+        self.manager.http.get.return_value = _response(200, {'id': 'item1'})
+
+        self.assertEqual(self.manager.get_excel_file_info(), {'id': 'item1'})
+        self.manager.http.get.assert_called_once()
+        self.assertEqual(self.manager.http.get.call_args.args[0],
+                         f"{GRAPH}/sites/site1/drive/root:/Sales%20Docs/Q1%20%232%20report.xlsx")
+
+    def test_folder_listing_on_miss(self):
+        self.manager.http.get.side_effect = [
+            _response(404, {'error': 'itemNotFound'}),
+            _response(200, {'value': [{'name': 'other.xlsx', 'id': 'x'}, {'name': 'Q1 #2 report.xlsx', 'id': 'item1'}]}),
+        ]
+
+        self.assertEqual(self.manager.get_excel_file_info()['id'], 'item1')
+        self.assertEqual(self.manager.http.get.call_args.args[0], f"{GRAPH}/sites/site1/drive/root:/Sales%20Docs:/children")
+
+
+class TestRangeValues(unittest.TestCase):
+
+    def test_values_are_json_safe(self):
+        df = pd.DataFrame({
+            'Text': ['x', None, 'z'],
+            'Qty': np.array([1, 2, 3], dtype=np.int64),
+            'Price': [1.5, np.nan, 2.0],
+            'When': [pd.Timestamp('2024-01-02 03:04:05'), pd.NaT, datetime(2024, 5, 6)],
+            'Tags': [['a', 'b'], [], {'k': 1}],
+        })
+
+        values = SharePointExcelManager._df_to_range_values(df)
+
+        self.assertEqual(values[0], ['x', 1, 1.5, '2024-01-02T03:04:05', "['a', 'b']"])
+        self.assertEqual(values[1], ['', 2, '', '', '[]'])
+        self.assertEqual(values[2], ['z', 3, 2.0, '2024-05-06T00:00:00', "{'k': 1}"])
+        self.assertIs(type(values[0][1]), int)
+
+
+if __name__ == '__main__':
+    unittest.main()
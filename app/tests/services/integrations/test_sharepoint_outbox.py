@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.services.integrations.sharepoint_outbox import SharePointOutbox
+
+
+class TestSharePointOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.flush_fn = MagicMock(return_value=True)
+        self.outbox = SharePointOutbox(self.tmp_dir.name, self.flush_fn, max_batch_rows=3)
+        # Drive the flusher by hand instead of through the background thread.
+        self.outbox.start = MagicMock()
+
+    def test_entries_for_the_same_sheet_are_coalesced_in_order(self):
+        self.outbox.enqueue([{'n': 1}], 'Sheet1')
+        self.outbox.enqueue([{'n': 'other'}], 'Sheet2')
+        self.outbox.enqueue([{'n': 2}, {'n': 3}], 'Sheet1')
+        self.outbox.enqueue([{'n': 4}], 'Sheet1')
+
+        self.assertEqual(self.outbox._flush_once(), 0)
+        self.flush_fn.assert_called_once_with([{'n': 1}, {'n': 2}, {'n': 3}], 'Sheet1')
+        self.assertEqual(self.outbox.pending_count(), 2)
+        self.assertEqual(len(os.listdir(self.outbox.sent_dir)), 2)
+
+    def test_failed_flush_keeps_entries_and_backs_off(self):
+        self.flush_fn.return_value = False
+        self.outbox.enqueue([{'n': 1}])
+
+        first_delay = self.outbox._flush_once()
+        second_delay = self.outbox._flush_once()
+
+        self.assertEqual(self.outbox.pending_count(), 1)
+        self.assertGreater(second_delay, first_delay)
+
+    def test_exception_in_flush_is_treated_as_failure(self):
+        self.flush_fn.side_effect = RuntimeError("offline")
+        self.outbox.enqueue([{'n': 1}])
+
+        self.assertIsNotNone(self.outbox._flush_once())
+        self.assertEqual(self.outbox.last_error, "offline")
+        self.assertEqual(self.outbox.pending_count(), 1)
+
+    def test_partial_flush_records_progress_and_retries_only_the_rest(self):
+        first = self.outbox.enqueue([{'n': 1}], 'Sheet1')
+        second = self.outbox.enqueue([{'n': 2}, {'n': 3}], 'Sheet1')
+        self.flush_fn.return_value = 2
+
+        self.assertGreater(self.outbox._flush_once(), 0)
+        self.assertFalse(os.path.exists(first))
+        with open(second, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows_sent'], 1)
+
+        # A restarted outbox resumes after the acknowledged rows
+        reopened = SharePointOutbox(self.tmp_dir.name, self.flush_fn)
+        self.flush_fn.return_value = True
+        self.assertEqual(reopened._flush_once(), 0)
+        self.flush_fn.assert_called_with([{'n': 3}], 'Sheet1')
+        self.assertEqual(reopened.pending_count(), 0)
+
+    def test_pending_entries_survive_a_restart(self):
+        self.outbox.enqueue([{'n': 1}], 'Sheet1')
+        reopened = SharePointOutbox(self.tmp_dir.name, self.flush_fn)
+
+        self.assertEqual(reopened._flush_once(), 0)
+        self.flush_fn.assert_called_once_with([{'n': 1}], 'Sheet1')
+        self.assertEqual(reopened.pending_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app.utils.cache_backends import CacheBackend, SQLiteCacheBackend
+from app.utils.cache_handler import CacheHandler, MemoryLRU
+
+
+class TestMemoryLRU(unittest.TestCase):
+
+    def test_evicts_least_recently_used_within_budget(self):
+        lru = MemoryLRU(budget_bytes=100)
+        lru.put("a", "A", 40, (1, 40))
+        lru.put("b", "B", 40, (1, 40))
+        self.assertEqual(lru.get("a", (1, 40)), "A")  # a becomes most recent
+        lru.put("c", "C", 40, (1, 40))
+
+        self.assertIsNone(lru.get("b", (1, 40)))
+        self.assertEqual(lru.get("c", (1, 40)), "C")
+        stats = lru.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (2, 80, 1))
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_stale_stamp_and_oversized_entries_are_not_served(self):
+        lru = MemoryLRU(budget_bytes=100)
+        lru.put("a", "A", 10, (1, 10))
+        self.assertIsNone(lru.get("a", (2, 10)))
+        lru.put("big", "B", 101, (1, 101))
+        self.assertIsNone(lru.get("big", (1, 101)))
+
+
+class TestCacheHandlerMemoryTier(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache = CacheHandler(cache_dir=self._tmp.name, backend="file")
+        self.cache.memory = MemoryLRU()
+
+    def test_exists_then_get_reads_the_file_once(self):
+        self.cache.set("deals", [{"id": 1}], subfolder="app_data")
+        self.cache.memory = MemoryLRU()  # cold memory, warm file
+
+        with mock.patch("app.utils.cache_handler.json.loads", wraps=__import__("json").loads) as load:
+            self.assertTrue(self.cache.exists("deals", subfolder="app_data"))
+            self.assertEqual(self.cache.get("deals", subfolder="app_data"), [{"id": 1}])
+            self.assertEqual(self.cache.get("deals", subfolder="app_data"), [{"id": 1}])
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(self.cache.get_memory_stats()['hits'], 2)
+
+    def test_write_through_and_invalidation(self):
+        self.cache.set("token", {"v": 1}, subfolder="tokens")
+        self.assertEqual(self.cache.get("token", subfolder="tokens"), {"v": 1})
+        self.cache.set("token", {"v": 2}, subfolder="tokens")
+        self.assertEqual(self.cache.get("token", subfolder="tokens"), {"v": 2})
+
+        self.cache.delete("token", subfolder="tokens")
+        self.assertIsNone(self.cache.get("token", subfolder="tokens"))
+
+        self.cache.set("token", {"v": 3}, subfolder="tokens")
+        self.cache.clear("tokens")
+        self.assertEqual(self.cache.get_memory_stats()['entries'], 0)
+        self.assertIsNone(self.cache.get("token", subfolder="tokens"))
+
+    def test_age_prefers_frame_entry_over_legacy_json(self):
+        self.assertIsNone(self.cache.get_age("prices", subfolder="app_data"))
+        self.cache.set("prices", '{"columns": []}', subfolder="app_data")
+
+        def write_frame(df, base_path):
+            with open(f"{base_path}.bin", 'wb') as f:
+                f.write(b"")
+            return f"{base_path}.bin", {'format': 'raw', 'rows': 0}
+
+        self.assertFalse(self.cache.has_frame("prices", subfolder="app_data"))
+        with mock.patch("app.utils.cache_handler.write_frame", side_effect=write_frame):
+            self.assertTrue(self.cache.set_frame("prices", object(), subfolder="app_data"))
+        self.assertTrue(self.cache.has_frame("prices", subfolder="app_data"))
+        header_path = self.cache._get_frame_header_path("prices", subfolder="app_data")
+        with open(header_path, encoding='utf-8') as f:
+            header = json.load(f)
+        header['timestamp'] = (datetime.now() - timedelta(hours=1)).isoformat()
+        with open(header_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+
+        self.assertGreaterEqual(self.cache.get_age("prices", subfolder="app_data"), 3600)
+
+    def test_set_frame_keeps_given_timestamp(self):
+        def write_frame(df, base_path):
+            with open(f"{base_path}.bin", 'wb') as f:
+                f.write(b"")
+            return f"{base_path}.bin", {'format': 'raw', 'rows': 0}
+
+        written = datetime.now() - timedelta(days=10)
+        with mock.patch("app.utils.cache_handler.write_frame", side_effect=write_frame):
+            self.assertTrue(self.cache.set_frame("prices", object(), subfolder="app_data", timestamp=written))
+        self.assertGreaterEqual(self.cache.get_age("prices", subfolder="app_data"), 10 * 86400)
+
+    def test_external_file_change_is_picked_up(self):
+        self.cache.set("k", "old")
+        path = os.path.join(self._tmp.name, "k.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"value": "newer", "timestamp": "2024-01-01T00:00:00", "ttl": null}')
+        self.assertEqual(self.cache.get("k"), "newer")
+
+
+class TestCacheBackend(unittest.TestCase):
+
+    def test_incomplete_backend_cannot_be_instantiated(self):
+        class ReadOnlyBackend(CacheBackend):
+            def stamp(self, subfolder, key):
+                return None
+
+            def read(self, subfolder, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            ReadOnlyBackend()
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _backend(self) -> SQLiteCacheBackend:
+        backend = SQLiteCacheBackend(os.path.join(self._tmp.name, "cache.sqlite3"), import_dir=self._tmp.name)
+        self.addCleanup(backend.close)
+        return backend
+
+    def _handler(self, backend) -> CacheHandler:
+        cache = CacheHandler(cache_dir=self._tmp.name, backend=backend)
+        cache.memory = MemoryLRU()
+        return cache
+
+    def test_round_trip_list_and_clear(self):
+        cache = self._handler(self._backend())
+        rows = [{"Part Number": f"P{i}", "Price": i * 1.5} for i in range(200)]
+        self.assertTrue(cache.set("price_book", rows, subfolder="app_data"))
+        cache.set("token", {"v": 1})
+
+        cache.memory = MemoryLRU()
+        self.assertEqual(cache.get("price_book", subfolder="app_data"), rows)
+        self.assertEqual(cache.list_keys("app_data"), ["price_book"])
+        self.assertEqual(cache.list_keys(), ["token"])
+        stats = cache.get_stats()
+        self.assertEqual((stats['backend'], stats['total_files']), ("sqlite", 2))
+        self.assertLess(stats['total_size'], stats['uncompressed_size'])
+
+        cache.clear("app_data")
+        self.assertIsNone(cache.get("price_book", subfolder="app_data"))
+        self.assertEqual(cache.get("token"), {"v": 1})
+
+    def test_cleanup_expired_is_a_single_query(self):
+        cache = self._handler(self._backend())
+        cache.set("short", 1, subfolder="app_data", ttl=-1)
+        cache.set("long", 2, subfolder="app_data", ttl=3600)
+        cache.set("forever", 3, subfolder="app_data")
+        self.assertEqual(cache.cleanup_expired("app_data"), 1)
+        self.assertEqual(cache.list_keys("app_data"), ["forever", "long"])
+
+    def test_existing_json_files_are_imported_once(self):
+        self._handler("file").set("deals", [{"id": 1}], subfolder="app_data")
+        cache = self._handler(self._backend())
+        self.assertEqual(cache.get("deals", subfolder="app_data"), [{"id": 1}])
+
+        cache.delete("deals", subfolder="app_data")
+        self.assertIsNone(self._handler(self._backend()).get("deals", subfolder="app_data"))
+
+    def test_handlers_sharing_a_database_see_each_others_writes(self):
+        backend = self._backend()
+        first, second = self._handler(backend), self._handler(backend)
+        first.set("k", "old")
+        self.assertEqual(second.get("k"), "old")
+        first.set("k", "new")
+        self.assertEqual(second.get("k"), "new")
+
+
+if __name__ == '__main__':
+    unittest.main()
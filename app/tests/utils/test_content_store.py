@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from app.utils.content_store import ContentAddressedStore
+
+URL = "https://graph.microsoft.com/v1.0/drives/d1/root:/App%20resources/parts.csv:/content"
+
+
+class TestContentAddressedStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.store = ContentAddressedStore(self._tmp.name)
+
+    def write(self, key, chunks, etag='"e1"'):
+        with self.store.open_writer(key, etag=etag) as sink:
+            for chunk in chunks:
+                sink.write(chunk)
+        return sink
+
+    def read(self, key):
+        return b"".join(self.store.iter_object(self.store.lookup(key)['digest'], chunk_size=4))
+
+    def temp_files(self):
+        return [name for _, _, names in os.walk(self.store.objects_dir) for name in names if name.startswith('.tmp_')]
+
+    def test_streamed_body_is_stored_under_its_digest(self):
+        sink = self.write(URL, [b"part,", b"qty\n", b"P1,4\n"])
+
+        body = b"part,qty\nP1,4\n"
+        self.assertEqual(sink.digest, hashlib.sha256(body).hexdigest())
+        entry = self.store.lookup(URL)
+        self.assertEqual((entry['digest'], entry['etag'], entry['size']), (sink.digest, '"e1"', len(body)))
+        self.assertEqual(self.read(URL), body)
+        self.assertEqual(self.temp_files(), [])
+        # The index survives a restart
+        self.assertEqual(ContentAddressedStore(self._tmp.name).lookup(URL)['digest'], sink.digest)
+
+    def test_failed_write_keeps_the_previous_body(self):
+        self.write(URL, [b"v1"])
+        with self.assertRaises(ConnectionError):
+            with self.store.open_writer(URL, etag='"e2"') as sink:
+                sink.write(b"v2 partial")
+                raise ConnectionError("connection reset")
+
+        self.assertEqual(self.store.lookup(URL)['etag'], '"e1"')
+        self.assertEqual(self.read(URL), b"v1")
+        self.assertEqual(self.temp_files(), [])
+
+    def test_abandoned_generator_discards_partial_write(self):
+        def tee(chunks):
+            with self.store.open_writer(URL, etag='"e1"') as sink:
+                for chunk in chunks:
+                    sink.write(chunk)
+                    yield chunk
+
+        stream = tee([b"a", b"b", b"c"])
+        self.assertEqual(next(stream), b"a")
+        stream.close()
+
+        self.assertIsNone(self.store.lookup(URL))
+        self.assertEqual(self.temp_files(), [])
+
+    def test_shared_content_and_invalidate(self):
+        first = self.write(URL, [b"same"])
+        self.write("other", [b"same"])
+        self.write(URL, [b"new"])
+        # Still referenced by "other"
+        self.assertTrue(os.path.exists(self.store._object_path(first.digest)))
+
+        self.store.invalidate("other")
+        self.assertIsNone(self.store.lookup("other"))
+        self.assertFalse(os.path.exists(self.store._object_path(first.digest)))
+        self.assertEqual(self.read(URL), b"new")
+
+    def test_corrupt_object_is_detected_and_dropped(self):
+        sink = self.write(URL, [b"part,qty\n"])
+        self.write("copy", [b"part,qty\n"])
+        with open(self.store._object_path(sink.digest), 'wb') as f:
+            f.write(b"part,qtz\n")
+
+        with self.assertRaises(ValueError):
+            self.read(URL)
+        self.assertIsNone(self.store.lookup(URL))
+        self.assertIsNone(self.store.lookup("copy"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from app.utils.csv_stream import CompactRecord, build_records, iter_text_lines, patch_records, read_csv_records
+from app.utils.table_diff import diff_tables
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestCsvStream(unittest.TestCase):
+
+    def test_lines_survive_chunk_boundaries_and_bom(self):
+        data = '\ufeffPart Number,Description\r\nA1,"Bolt, ¾"""\r\nB2,Nut\r\n'.encode('utf-8')
+        lines = list(iter_text_lines(_chunks(data, 3)))
+        self.assertEqual(lines[0], 'Part Number,Description\r\n')
+        self.assertEqual(''.join(lines), data.decode('utf-8-sig'))
+
+    def test_falls_back_to_cp1252_for_the_rest_of_the_stream(self):
+        data = 'Name\nJosé\n'.encode('cp1252')
+        self.assertEqual(list(iter_text_lines(_chunks(data, 4))), ['Name\n', 'José\n'])
+
+    def test_records_are_keyed_stripped_and_share_values(self):
+        data = (b'Part No , Description,Branch\n'
+                b' P1 , Filter ,North\n'
+                b',Skipped,North\n'
+                b'P2,"Multi\nline"\n')
+        headers, key_column, records = read_csv_records(iter_text_lines(_chunks(data, 5)), ['Part Number', 'Part No'])
+
+        self.assertEqual(headers, ['Part No', 'Description', 'Branch'])
+        self.assertEqual(key_column, 'Part No')
+        self.assertEqual(list(records), ['P1', 'P2'])
+        self.assertIsInstance(records['P1'], CompactRecord)
+        self.assertEqual(dict(records['P1']), {'Part No': 'P1', 'Description': 'Filter', 'Branch': 'North'})
+        self.assertEqual(records['P2']['Description'], 'Multi\nline')
+        self.assertEqual(records['P2'].get('Branch'), '')
+        self.assertIsNone(records['P2'].get('Missing'))
+
+    def test_missing_key_column_raises(self):
+        with self.assertRaises(ValueError):
+            read_csv_records(iter(['Other\n', 'x\n']), ['Part Number'])
+
+    def test_patch_records_applies_a_diff_without_touching_the_original(self):
+        columns = ['Part Number', 'Description']
+        before = [['P1', 'Filter'], ['P2', 'Nut'], ['P3', 'Bolt']]
+        after = [['P1', 'Oil filter'], ['P3', 'Bolt'], ['P4', ' Washer ']]
+        _, key_column, records = build_records(columns, before, ['Part Number'])
+
+        patched = patch_records(records, diff_tables(columns, before, after), key_column)
+
+        self.assertEqual({key: dict(record) for key, record in patched.items()},
+                         {key: dict(record) for key, record in build_records(columns, after, ['Part Number'])[2].items()})
+        self.assertIs(patched['P3'], records['P3'])
+        self.assertEqual(records['P1']['Description'], 'Filter')
+        self.assertIsNone(patch_records(records, diff_tables(columns, before, after, 'Description'), key_column))
+
+
+if __name__ == '__main__':
+    unittest.main()
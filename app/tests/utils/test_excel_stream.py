@@ -0,0 +1,64 @@
+import io
+import unittest
+from datetime import datetime
+
+import openpyxl
+
+from app.utils.excel_stream import read_sheet
+
+
+def _workbook_bytes() -> bytes:
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Cover"
+    workbook.active.append(["not", "this", "sheet"])
+    sheet = workbook.create_sheet("App Source")
+    sheet.append(["Part Number", "Description", "Qty", "Price", "Updated", None, "Qty"])
+    sheet.append(["P1", "Filter", 4, 12.5, datetime(2024, 1, 2), "x", 1])
+    sheet.append(["P2", "Belt", 1, 30, datetime(2024, 2, 3), None, 2])
+    sheet.append([None, None, None, None, None, None, None])
+    sheet.append(["P3", "Bolt", None, 0.25, None, None, 3])
+    sheet.append([None] * 7)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class TestExcelStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.content = _workbook_bytes()
+
+    def test_reads_named_sheet_with_pandas_style_headers_and_dtypes(self):
+        df = read_sheet(self.content, sheet_name="App Source")
+
+        self.assertEqual(list(df.columns), ["Part Number", "Description", "Qty", "Price", "Updated", "Unnamed: 5", "Qty.1"])
+        # Interior blank row kept, trailing blank row dropped.
+        self.assertEqual(len(df), 4)
+        self.assertEqual(str(df["Qty"].dtype), "float64")
+        self.assertEqual(str(df["Price"].dtype), "float64")
+        self.assertEqual(str(df["Qty.1"].dtype), "float64")
+        self.assertEqual(str(df["Updated"].dtype), "datetime64[ns]")
+        self.assertEqual(df["Description"].dtype, object)
+
+    def test_selects_columns_and_stops_at_first_blank_row(self):
+        df = read_sheet(self.content, sheet_name="App Source", columns=["Price", "Part Number"],
+                        stop_at_blank_row=True)
+
+        self.assertEqual(list(df.columns), ["Price", "Part Number"])
+        self.assertEqual(df["Part Number"].tolist(), ["P1", "P2"])
+        self.assertEqual(str(df["Price"].dtype), "float64")
+
+    def test_int_columns_without_blanks_stay_integer(self):
+        df = read_sheet(self.content, sheet_name=1, columns=["Qty.1"], stop_at_blank_row=True)
+        self.assertEqual(str(df["Qty.1"].dtype), "int64")
+
+    def test_missing_sheet_or_column_raises(self):
+        with self.assertRaises(ValueError):
+            read_sheet(self.content, sheet_name="Nope")
+        with self.assertRaises(ValueError):
+            read_sheet(self.content, sheet_name="App Source", columns=["Missing"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.utils.cache_handler import CacheHandler
+from app.utils.frame_store import FORMAT_COLUMNS, read_frame, write_frame
+
+
+def _sample_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Part Number': ['P1', 'P2', None],
+        'Qty': np.array([4, 1, 7], dtype=np.int64),
+        'Price': [12.5, np.nan, 0.25],
+        'In Stock': [True, False, True],
+        'Updated': pd.to_datetime(['2024-01-02', None, '2024-03-04']),
+        'Branch': pd.Categorical(['North', 'South', 'North']),
+        'Mixed': ['A', 2, None],
+    })
+
+
+class TestFrameStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = self._tmp.name
+
+    def test_column_layout_round_trips_values_and_dtypes(self):
+        df = _sample_frame()
+        data_path, header = write_frame(df, os.path.join(self.dir, "entry"), prefer_feather=False)
+        self.assertEqual(header['format'], FORMAT_COLUMNS)
+
+        for mmap in (True, False):
+            loaded = read_frame(data_path, header, mmap=mmap)
+            pd.testing.assert_frame_equal(loaded.drop(columns=['Mixed']), df.drop(columns=['Mixed']))
+            self.assertEqual(loaded['Mixed'].tolist()[:2], ['A', 2])
+
+    def test_non_default_index_is_restored(self):
+        df = _sample_frame().set_index('Part Number')
+        data_path, header = write_frame(df.drop(columns=['Mixed']), os.path.join(self.dir, "entry"),
+                                        prefer_feather=False)
+        loaded = read_frame(data_path, header)
+        self.assertEqual(loaded.index.name, 'Part Number')
+        self.assertEqual(loaded.index.tolist()[:2], ['P1', 'P2'])
+
+    def test_cache_handler_frame_entries(self):
+        cache = CacheHandler(cache_dir=self.dir)
+        df = _sample_frame().drop(columns=['Mixed'])
+        self.assertTrue(cache.set_frame("price_book", df, subfolder="app_data"))
+        self.assertTrue(cache.set_frame("price_book", df.head(2), subfolder="app_data"))
+
+        pd.testing.assert_frame_equal(cache.get_frame("price_book", subfolder="app_data"), df.head(2))
+        self.assertEqual(cache.list_keys("app_data"), ["price_book"])
+        self.assertTrue(cache.exists("price_book", subfolder="app_data"))
+        # Only the latest data file is kept.
+        self.assertEqual(len(os.listdir(os.path.join(self.dir, "app_data"))), 2)
+
+        cache.delete("price_book", subfolder="app_data")
+        self.assertIsNone(cache.get_frame("price_book", subfolder="app_data"))
+        self.assertEqual(os.listdir(os.path.join(self.dir, "app_data")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app.utils.cache_handler import CacheHandler, MemoryLRU
+from app.utils.freshness import EXPIRED, FRESH, MISSING, STALE, FreshnessPolicy, get_policy, load_cached
+
+
+class _Config(dict):
+    def get(self, key, default=None, var_type=None):
+        return super().get(key, default)
+
+
+class TestFreshnessPolicy(unittest.TestCase):
+
+    def test_states(self):
+        policy = FreshnessPolicy(max_age=60, max_stale=300)
+        self.assertEqual(policy.state(None), MISSING)
+        self.assertEqual(policy.state(10), FRESH)
+        self.assertEqual(policy.state(120), STALE)
+        self.assertEqual(policy.state(400), EXPIRED)
+        self.assertEqual(FreshnessPolicy(max_age=60).state(10 ** 9), STALE)
+
+    def test_config_overrides_defaults_per_key(self):
+        config = _Config(cache_freshness={"price_book_data": {"max_age": 10, "max_stale": None}})
+        policy = get_policy(config, "price_book_data")
+        self.assertEqual((policy.max_age, policy.max_stale), (10.0, None))
+        self.assertEqual(get_policy(config, "used_inventory_data").max_age, 900)
+
+        config = _Config(cache_freshness='{"recent_deals_list": {"max_stale": 0}}')
+        policy = get_policy(config, "recent_deals_list")
+        self.assertEqual((policy.max_age, policy.max_stale), (300, 0.0))
+
+
+class TestLoadCached(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache = CacheHandler(cache_dir=self._tmp.name)
+        self.cache.memory = MemoryLRU()
+
+    def test_classifies_by_entry_age(self):
+        policy = FreshnessPolicy(max_age=60, max_stale=600)
+        self.assertEqual(load_cached(self.cache, "deals", policy, subfolder="app_data"), (None, MISSING))
+
+        self.cache.set("deals", [1, 2], subfolder="app_data")
+        self.assertEqual(load_cached(self.cache, "deals", policy, subfolder="app_data"), ([1, 2], FRESH))
+
+        for minutes, expected in ((5, ([1, 2], STALE)), (30, (None, EXPIRED))):
+            later = datetime.now() + timedelta(minutes=minutes)
+            with mock.patch("app.utils.cache_handler.datetime", wraps=datetime) as patched:
+                patched.now.return_value = later
+                self.assertEqual(load_cached(self.cache, "deals", policy, subfolder="app_data"), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from app.utils.table_diff import apply_table_diff, diff_tables
+
+COLUMNS = ['PartNumber', 'PartName', 'Quantity']
+BASE = [['P1', 'Filter', '4'], ['P2', 'Belt', '1'], ['P3', 'Bolt', '10']]
+
+
+class TestTableDiff(unittest.TestCase):
+
+    def test_detects_inserted_deleted_and_modified_cells(self):
+        after = [['P1', 'Filter', '5'], ['P3', 'Bolt', '10'], ['P4', 'Nut', '7']]
+        diff = diff_tables(COLUMNS, BASE, after)
+
+        self.assertEqual(diff.inserted, [['P4', 'Nut', '7']])
+        self.assertEqual(diff.deleted, ['P2'])
+        self.assertEqual(diff.modified, {'P1': {'Quantity': '5'}})
+        self.assertEqual(diff.changed_rows, 3)
+        self.assertTrue(diff_tables(COLUMNS, BASE, [list(r) for r in BASE]).is_empty())
+
+    def test_duplicate_or_empty_keys_cannot_be_diffed(self):
+        self.assertIsNone(diff_tables(COLUMNS, BASE, BASE + [['P1', 'Again', '1']]))
+        self.assertIsNone(diff_tables(COLUMNS, BASE, BASE + [['', 'New row', '']]))
+
+    def test_apply_preserves_concurrent_remote_edits(self):
+        diff = diff_tables(COLUMNS, BASE, [['P1', 'Filter', '5'], ['P3', 'Bolt', '10'], ['P4', 'Nut', '7']])
+        # Someone else renamed P1 and added P9 on SharePoint in the meantime.
+        remote = [['P1', 'Oil filter', '4'], ['P2', 'Belt', '1'], ['P3', 'Bolt', '10'], ['P9', 'Washer', '3']]
+        merged, skipped = apply_table_diff(COLUMNS, remote, diff)
+
+        self.assertEqual(merged, [['P1', 'Oil filter', '5'], ['P3', 'Bolt', '10'],
+                                  ['P9', 'Washer', '3'], ['P4', 'Nut', '7']])
+        self.assertEqual(skipped, [])
+
+    def test_apply_reports_rows_deleted_remotely_and_rejects_other_columns(self):
+        diff = diff_tables(COLUMNS, BASE, [['P1', 'Filter', '5'], ['P2', 'Belt', '1'], ['P3', 'Bolt', '10']])
+        merged, skipped = apply_table_diff(COLUMNS, [['P2', 'Belt', '1']], diff)
+        self.assertEqual(merged, [['P2', 'Belt', '1']])
+        self.assertEqual(skipped, ['P1'])
+        with self.assertRaises(ValueError):
+            apply_table_diff(['PartNumber', 'PartName'], BASE, diff)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,303 @@
+# cache_backends.py - storage backends for CacheHandler JSON entries
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (version, size): changes whenever an entry is rewritten; size is the uncompressed payload size.
+Stamp = Tuple[int, int]
+
+
+def _expires_at(payload: str) -> Optional[float]:
+    """Expiry (epoch seconds) of a serialized cache document, None if it never expires."""
+    document = json.loads(payload)
+    if document.get('ttl') is None:
+        return None
+    return datetime.fromisoformat(document['timestamp']).timestamp() + document['ttl']
+
+
+class CacheBackend(ABC):
+    """
+    Storage for serialized cache documents ({"value", "timestamp", "ttl"} as JSON text).
+
+    Entries are addressed by (subfolder, key); subfolder None is the cache root.
+    """
+    name = "base"
+    # Indentation CacheHandler uses when serializing documents for this backend.
+    json_indent: Optional[int] = None
+
+    @abstractmethod
+    def stamp(self, subfolder: Optional[str], key: str) -> Optional[Stamp]:
+        ...
+
+    @abstractmethod
+    def read(self, subfolder: Optional[str], key: str) -> Optional[Tuple[str, Stamp]]:
+        ...
+
+    @abstractmethod
+    def write(self, subfolder: Optional[str], key: str, payload: str, expires_at: Optional[float]) -> Stamp:
+        ...
+
+    @abstractmethod
+    def delete(self, subfolder: Optional[str], key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, subfolder: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def list_keys(self, subfolder: Optional[str] = None) -> List[str]:
+        ...
+
+    @abstractmethod
+    def delete_expired(self, subfolder: Optional[str] = None) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """{'total_files', 'total_size', 'subfolders': {name: {'files', 'size'}}}"""
+
+
+class FileCacheBackend(CacheBackend):
+    """One pretty-printed <key>.json file per entry, in <cache_dir>/<subfolder>/."""
+    name = "file"
+    json_indent = 2
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, subfolder: Optional[str], key: str, create: bool = False) -> str:
+        directory = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{key}.json")
+
+    def stamp(self, subfolder, key):
+        try:
+            stat = os.stat(self._path(subfolder, key))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read(self, subfolder, key):
+        try:
+            with open(self._path(subfolder, key), 'r', encoding='utf-8') as f:
+                stat = os.fstat(f.fileno())
+                return f.read(), (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def write(self, subfolder, key, payload, expires_at):
+        path = self._path(subfolder, key, create=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def delete(self, subfolder, key):
+        try:
+            os.remove(self._path(subfolder, key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, subfolder=None):
+        directory = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        if not subfolder:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def list_keys(self, subfolder=None):
+        directory = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
+        if not os.path.exists(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+
+    def delete_expired(self, subfolder=None):
+        now = time.time()
+        removed = 0
+        for key in self.list_keys(subfolder):
+            try:
+                entry = self.read(subfolder, key)
+                expires_at = _expires_at(entry[0]) if entry else None
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Error checking expiry for cache key '{key}': {e}")
+                continue
+            if expires_at is not None and expires_at < now:
+                self.delete(subfolder, key)
+                removed += 1
+        return removed
+
+    def stats(self):
+        stats = {'total_files': 0, 'total_size': 0, 'subfolders': {}}
+        for root, _, files in os.walk(self.cache_dir):
+            folder_name = os.path.relpath(root, self.cache_dir)
+            if folder_name == '.':
+                folder_name = 'root'
+            sizes = [os.path.getsize(os.path.join(root, name)) for name in files if name.endswith('.json')]
+            if sizes:
+                stats['subfolders'][folder_name] = {'files': len(sizes), 'size': sum(sizes)}
+                stats['total_files'] += len(sizes)
+                stats['total_size'] += sum(sizes)
+        return stats
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    All entries in one SQLite database (WAL mode) with zlib-compressed payloads.
+
+    Expiry, key listing and stats are indexed queries, and every write is a single
+    transaction. On first use, existing <key>.json files under import_dir are
+    imported once (the files are left in place).
+    """
+    name = "sqlite"
+    json_indent = None
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            folder      TEXT    NOT NULL,
+            key         TEXT    NOT NULL,
+            payload     BLOB    NOT NULL,
+            size        INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            expires_at  REAL,
+            version     INTEGER NOT NULL,
+            PRIMARY KEY (folder, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at) WHERE expires_at IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, db_path: str, import_dir: Optional[str] = None, compress_level: int = 6):
+        self.db_path = db_path
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        if import_dir:
+            self._import_files(import_dir)
+
+    @staticmethod
+    def _folder(subfolder: Optional[str]) -> str:
+        return subfolder or ''
+
+    def _execute(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetchone(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def stamp(self, subfolder, key):
+        row = self._fetchone("SELECT version, size FROM entries WHERE folder = ? AND key = ?",
+                             (self._folder(subfolder), key))
+        return (row[0], row[1]) if row else None
+
+    def read(self, subfolder, key):
+        row = self._fetchone("SELECT payload, version, size FROM entries WHERE folder = ? AND key = ?",
+                             (self._folder(subfolder), key))
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8'), (row[1], row[2])
+
+    def write(self, subfolder, key, payload, expires_at):
+        raw = payload.encode('utf-8')
+        blob = zlib.compress(raw, self.compress_level)
+        version = time.time_ns()
+        self._execute(
+            "INSERT OR REPLACE INTO entries (folder, key, payload, size, stored_size, expires_at, version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._folder(subfolder), key, blob, len(raw), len(blob), expires_at, version))
+        return (version, len(raw))
+
+    def delete(self, subfolder, key):
+        self._execute("DELETE FROM entries WHERE folder = ? AND key = ?", (self._folder(subfolder), key))
+
+    def clear(self, subfolder=None):
+        if subfolder:
+            self._execute("DELETE FROM entries WHERE folder = ?", (subfolder,))
+        else:
+            self._execute("DELETE FROM entries")
+
+    def list_keys(self, subfolder=None):
+        rows = self._fetchall("SELECT key FROM entries WHERE folder = ? ORDER BY key", (self._folder(subfolder),))
+        return [row[0] for row in rows]
+
+    def delete_expired(self, subfolder=None):
+        sql = "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?"
+        params: tuple = (time.time(),)
+        if subfolder is not None:
+            sql += " AND folder = ?"
+            params += (subfolder,)
+        return self._execute(sql, params)
+
+    def stats(self):
+        rows = self._fetchall("SELECT folder, COUNT(*), SUM(stored_size), SUM(size) FROM entries GROUP BY folder")
+        stats = {'total_files': 0, 'total_size': 0, 'uncompressed_size': 0, 'subfolders': {},
+                 'db_path': self.db_path}
+        for folder, count, stored_size, size in rows:
+            stats['subfolders'][folder or 'root'] = {'files': count, 'size': stored_size}
+            stats['total_files'] += count
+            stats['total_size'] += stored_size
+            stats['uncompressed_size'] += size
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _import_files(self, import_dir: str) -> None:
+        if self._fetchone("SELECT 1 FROM meta WHERE name = 'files_imported'"):
+            return
+        imported = 0
+        for root, _, files in os.walk(import_dir):
+            folder = os.path.relpath(root, import_dir)
+            subfolder = None if folder == '.' else folder.replace(os.sep, '/')
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                        payload = f.read()
+                    self.write(subfolder, name[:-5], payload, _expires_at(payload))
+                    imported += 1
+                except (OSError, ValueError, KeyError, AttributeError) as e:
+                    logger.warning(f"Skipped importing cache file {name}: {e}")
+        self._execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('files_imported', ?)",
+                      (datetime.now().isoformat(),))
+        if imported:
+            logger.info(f"Imported {imported} cache file(s) from {import_dir} into {self.db_path}")
+
+
+_sqlite_backends: Dict[str, SQLiteCacheBackend] = {}
+_sqlite_backends_lock = threading.Lock()
+
+
+def get_sqlite_backend(cache_dir: str, filename: str = "cache.sqlite3") -> SQLiteCacheBackend:
+    """Shared SQLite backend for cache_dir (one connection per database per process)."""
+    db_path = os.path.join(os.path.abspath(cache_dir), filename)
+    with _sqlite_backends_lock:
+        backend = _sqlite_backends.get(db_path)
+        if backend is None:
+            backend = SQLiteCacheBackend(db_path, import_dir=os.path.dirname(db_path))
+            _sqlite_backends[db_path] = backend
+        return backend
@@ -2,26 +2,139 @@
 import os
 import json
 import logging
-import shutil
-from typing import Any, Optional, Union
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+from app.utils.cache_backends import CacheBackend, FileCacheBackend, get_sqlite_backend
+from app.utils.frame_store import read_frame, write_frame
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_MEMORY_BUDGET_BYTES = 8 * 1024 * 1024
+DEFAULT_BACKEND = "sqlite"
+
+
+class MemoryLRU:
+    """
+    Byte-budgeted LRU of parsed cache entries.
+
+    Each entry remembers the backend's (version, size) stamp when it was loaded or
+    written; a lookup with a different stamp is a miss, so writes from other handlers
+    or processes are never masked. Sizes are the entries' serialized JSON sizes.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int, Tuple[int, int]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str, stamp: Tuple[int, int]) -> Any:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[2] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, path: str, data: Any, size: int, stamp: Tuple[int, int]) -> None:
+        with self._lock:
+            self._pop(path)
+            if size > self.budget_bytes:
+                return
+            self._entries[path] = (data, size, stamp)
+            self._bytes += size
+            while self._bytes > self.budget_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._pop(path)
+
+    def discard_prefix(self, prefix: str) -> None:
+        """Drop every entry whose key starts with prefix."""
+        with self._lock:
+            for path in [p for p in self._entries if p.startswith(prefix)]:
+                self._pop(path)
+
+    def resize(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            while self._entries and self._bytes > self.budget_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _pop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+# Shared by every CacheHandler so handlers over the same cache see one another's writes.
+_memory_tier = MemoryLRU()
+
+
 class CacheHandler:
     """
     Enhanced cache handler with proper delete and clear methods for managing cached data.
+
+    DataFrames have their own entry type (set_frame/get_frame): a small JSON header
+    in <key>.frame plus a columnar binary data file that can be memory-mapped.
+
+    JSON entries live in a pluggable backend: one SQLite database in WAL mode with
+    compressed payloads (default), or one <key>.json file per key. A process-wide
+    in-memory LRU (write-through, invalidated on set/delete/clear) sits in front of
+    it. Values returned from get() may be shared with the cache and must not be
+    mutated by callers.
     """
     
-    def __init__(self, config=None, cache_dir: Optional[str] = None):
+    def __init__(self, config=None, cache_dir: Optional[str] = None, memory_budget: Optional[int] = None,
+                 backend: Union[str, CacheBackend, None] = None):
         """
         Initialize the cache handler.
         
         Args:
             config: Configuration object with cache settings
             cache_dir: Override cache directory path
+            memory_budget: Byte budget of the shared in-memory tier
+                           (default: CACHE_MEMORY_BUDGET_BYTES from config, 0 disables it)
+            backend: "sqlite", "file" or a CacheBackend instance
+                     (default: CACHE_BACKEND from config, else "sqlite")
         """
         self.config = config
+        self.memory = _memory_tier
+        if memory_budget is None and config and hasattr(config, 'get'):
+            memory_budget = config.get("CACHE_MEMORY_BUDGET_BYTES", None)
+        if memory_budget is not None:
+            try:
+                self.memory.resize(int(memory_budget))
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring invalid CACHE_MEMORY_BUDGET_BYTES: {memory_budget!r}")
         
         # Determine cache directory
         if cache_dir:
@@ -42,6 +155,9 @@ class CacheHandler:
             self.cache_dir = os.path.join(tempfile.gettempdir(), "brideal_cache")
             os.makedirs(self.cache_dir, exist_ok=True)
             logger.warning(f"Using fallback cache directory: {self.cache_dir}")
+        self.cache_dir = os.path.abspath(self.cache_dir)
+        self.backend = self._create_backend(backend)
+        self._memory_prefix = f"{self.backend.name}\0{self.cache_dir}\0"
     
     def _get_cache_path(self, key: str, subfolder: Optional[str] = None) -> str:
         """
@@ -60,6 +176,180 @@ class CacheHandler:
             return os.path.join(cache_subdir, f"{key}.json")
         else:
             return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _get_frame_header_path(self, key: str, subfolder: Optional[str] = None) -> str:
+        """Path of the JSON header describing a DataFrame entry."""
+        return self._get_cache_path(key, subfolder)[:-len(".json")] + ".frame"
+
+    def _create_backend(self, backend: Union[str, CacheBackend, None]) -> CacheBackend:
+        """Resolve the backend argument / CACHE_BACKEND setting ("sqlite" or "file")."""
+        if isinstance(backend, CacheBackend):
+            return backend
+        if backend is None and self.config and hasattr(self.config, 'get'):
+            backend = self.config.get("CACHE_BACKEND", None)
+        backend = (backend or DEFAULT_BACKEND).lower()
+        if backend == "sqlite":
+            try:
+                return get_sqlite_backend(self.cache_dir)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open SQLite cache in {self.cache_dir}: {e}. Using file backend.")
+        elif backend != "file":
+            logger.warning(f"Unknown CACHE_BACKEND '{backend}'. Using file backend.")
+        return FileCacheBackend(self.cache_dir)
+
+    def _memory_key(self, key: str, subfolder: Optional[str] = None) -> str:
+        return f"{self._memory_prefix}{subfolder or ''}\0{key}"
+
+    def _read_entry(self, key: str, subfolder: Optional[str] = None) -> Optional[dict]:
+        """Return the parsed cache document from memory, or from the backend (then remembered)."""
+        memory_key = self._memory_key(key, subfolder)
+        stamp = self.backend.stamp(subfolder, key)
+        if stamp is None:
+            self.memory.discard(memory_key)
+            return None
+        cache_data = self.memory.get(memory_key, stamp)
+        if cache_data is not None:
+            return cache_data
+        entry = self.backend.read(subfolder, key)
+        if entry is None:
+            return None
+        serialized, stamp = entry
+        cache_data = json.loads(serialized)
+        self.memory.put(memory_key, cache_data, stamp[1], stamp)
+        return cache_data
+
+    def _clear_frames(self, subfolder: Optional[str] = None) -> None:
+        """Remove DataFrame entry files under a subfolder (or the whole cache)."""
+        directory = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith('.frame') or '.frame-' in name:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError as e:
+                        logger.debug(f"Could not remove frame file {name}: {e}")
+
+    def get_age(self, key: str, subfolder: Optional[str] = None) -> Optional[float]:
+        """
+        Seconds since an entry (JSON or DataFrame) was written, or None if there is none.
+        
+        Expiry (ttl) is not applied; callers use this for their own freshness rules.
+        A DataFrame entry takes precedence over a JSON entry under the same key, which
+        is typically a legacy copy not yet migrated.
+        """
+        try:
+            header_path = self._get_frame_header_path(key, subfolder)
+            if os.path.exists(header_path):
+                with open(header_path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+            else:
+                cache_data = self._read_entry(key, subfolder)
+                if cache_data is None:
+                    return None
+            written = datetime.fromisoformat(cache_data['timestamp'])
+            return max(0.0, (datetime.now() - written).total_seconds())
+        except Exception as e:
+            logger.error(f"Error reading cache age for key '{key}': {e}", exc_info=True)
+            return None
+
+    def get_memory_stats(self) -> dict:
+        """Hit/miss/eviction counters and size of the in-memory tier."""
+        return self.memory.stats()
+
+    @staticmethod
+    def _is_expired(cache_data: dict) -> bool:
+        if cache_data.get('ttl') is None:
+            return False
+        timestamp = datetime.fromisoformat(cache_data['timestamp'])
+        return datetime.now() > timestamp + timedelta(seconds=cache_data['ttl'])
+
+    def _remove_frame_data(self, header_path: str, keep: Optional[str] = None) -> None:
+        """Delete data files of a DataFrame entry, except `keep`."""
+        directory = os.path.dirname(header_path)
+        prefix = f"{os.path.basename(header_path)}-"
+        for filename in os.listdir(directory):
+            if filename.startswith(prefix) and filename != keep:
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError as e:
+                    # Still memory-mapped by a reader (Windows); removed on a later write.
+                    logger.debug(f"Could not remove old frame data {filename}: {e}")
+
+    def set_frame(self, key: str, df, subfolder: Optional[str] = None, ttl: Optional[int] = None,
+                  timestamp: Optional[datetime] = None) -> bool:
+        """
+        Store a pandas DataFrame as a columnar binary entry.
+
+        Data is written as Feather when pyarrow is available, otherwise as aligned raw
+        column buffers; dtypes (including datetimes and categories) are preserved.
+        The header is replaced atomically, so readers never see a partial entry.
+
+        Args:
+            key: Cache key identifier
+            df: DataFrame to cache
+            subfolder: Optional subfolder within cache directory
+            ttl: Time to live in seconds (optional)
+            timestamp: When the data was written, e.g. when migrating an older entry (defaults to now)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            header_path = self._get_frame_header_path(key, subfolder)
+            data_path, header = write_frame(df, f"{header_path}-{uuid.uuid4().hex[:12]}")
+            header.update({
+                'data_file': os.path.basename(data_path),
+                'timestamp': (timestamp or datetime.now()).isoformat(),
+                'ttl': ttl
+            })
+            tmp_path = f"{header_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(header, f)
+            os.replace(tmp_path, header_path)
+            self._remove_frame_data(header_path, keep=header['data_file'])
+
+            logger.debug(f"Cached DataFrame ({header['format']}, {header['rows']} rows) for key '{key}' in {data_path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error caching DataFrame for key '{key}': {e}", exc_info=True)
+            return False
+
+    def get_frame(self, key: str, subfolder: Optional[str] = None, default: Any = None, mmap: bool = True) -> Any:
+        """
+        Retrieve a DataFrame stored with set_frame.
+
+        Args:
+            key: Cache key identifier
+            subfolder: Optional subfolder within cache directory
+            default: Default value if key not found or expired
+            mmap: Memory-map the data file instead of reading it into memory
+
+        Returns:
+            Cached DataFrame or default
+        """
+        try:
+            header_path = self._get_frame_header_path(key, subfolder)
+
+            if not os.path.exists(header_path):
+                logger.debug(f"Cache miss for DataFrame key '{key}' - file not found")
+                return default
+
+            with open(header_path, 'r', encoding='utf-8') as f:
+                header = json.load(f)
+
+            if self._is_expired(header):
+                logger.debug(f"Cache expired for DataFrame key '{key}'")
+                self.delete(key, subfolder)
+                return default
+
+            df = read_frame(os.path.join(os.path.dirname(header_path), header['data_file']), header, mmap=mmap)
+            logger.debug(f"Cache hit for DataFrame key '{key}'")
+            return df
+
+        except Exception as e:
+            logger.error(f"Error retrieving cached DataFrame for key '{key}': {e}", exc_info=True)
+            return default
     
     def set(self, key: str, value: Any, subfolder: Optional[str] = None, ttl: Optional[int] = None) -> bool:
         """
@@ -75,20 +365,23 @@ class CacheHandler:
             True if successful, False otherwise
         """
         try:
-            cache_path = self._get_cache_path(key, subfolder)
-            
             # Prepare cache data with metadata
+            now = datetime.now()
             cache_data = {
                 'value': value,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'ttl': ttl
             }
             
-            # Write to cache file
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2, default=str)
+            # Write through the backend, then to memory as read back from JSON
+            serialized = json.dumps(cache_data, indent=self.backend.json_indent, default=str)
+            memory_key = self._memory_key(key, subfolder)
+            self.memory.discard(memory_key)
+            expires_at = now.timestamp() + ttl if ttl is not None else None
+            stamp = self.backend.write(subfolder, key, serialized, expires_at)
+            self.memory.put(memory_key, json.loads(serialized), stamp[1], stamp)
             
-            logger.debug(f"Cached data for key '{key}' in {cache_path}")
+            logger.debug(f"Cached data for key '{key}' ({self.backend.name} backend)")
             return True
             
         except Exception as e:
@@ -108,24 +401,17 @@ class CacheHandler:
             Cached value or default
         """
         try:
-            cache_path = self._get_cache_path(key, subfolder)
-            
-            if not os.path.exists(cache_path):
-                logger.debug(f"Cache miss for key '{key}' - file not found")
+            # Read cache entry (memory tier first)
+            cache_data = self._read_entry(key, subfolder)
+            if cache_data is None:
+                logger.debug(f"Cache miss for key '{key}' - entry not found")
                 return default
             
-            # Read cache file
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
             # Check if cache has expired
-            if 'ttl' in cache_data and cache_data['ttl'] is not None:
-                timestamp = datetime.fromisoformat(cache_data['timestamp'])
-                ttl_seconds = cache_data['ttl']
-                if datetime.now() > timestamp + timedelta(seconds=ttl_seconds):
-                    logger.debug(f"Cache expired for key '{key}'")
-                    self.delete(key, subfolder)  # Clean up expired cache
-                    return default
+            if self._is_expired(cache_data):
+                logger.debug(f"Cache expired for key '{key}'")
+                self.delete(key, subfolder)  # Clean up expired cache
+                return default
             
             logger.debug(f"Cache hit for key '{key}'")
             return cache_data.get('value', default)
@@ -146,15 +432,17 @@ class CacheHandler:
             True if successful, False otherwise
         """
         try:
-            cache_path = self._get_cache_path(key, subfolder)
+            self.memory.discard(self._memory_key(key, subfolder))
+            self.backend.delete(subfolder, key)
+
+            header_path = self._get_frame_header_path(key, subfolder)
+            if os.path.exists(header_path):
+                os.remove(header_path)
+                self._remove_frame_data(header_path)
+                logger.debug(f"Deleted DataFrame cache entry: {header_path}")
             
-            if os.path.exists(cache_path):
-                os.remove(cache_path)
-                logger.debug(f"Deleted cache file: {cache_path}")
-                return True
-            else:
-                logger.debug(f"Cache file not found for deletion: {cache_path}")
-                return True  # Consider it successful if file doesn't exist
+            logger.debug(f"Deleted cache entry for key '{key}'")
+            return True
                 
         except Exception as e:
             logger.error(f"Error deleting cache for key '{key}': {e}", exc_info=True)
@@ -171,18 +459,13 @@ class CacheHandler:
             True if successful, False otherwise
         """
         try:
+            self.memory.discard_prefix(self._memory_key("", subfolder) if subfolder else self._memory_prefix)
+            self.backend.clear(subfolder)
+            self._clear_frames(subfolder)
             if subfolder:
-                cache_subdir = os.path.join(self.cache_dir, subfolder)
-                if os.path.exists(cache_subdir):
-                    shutil.rmtree(cache_subdir)
-                    logger.info(f"Cleared cache subfolder: {cache_subdir}")
-                else:
-                    logger.debug(f"Cache subfolder not found: {cache_subdir}")
+                logger.info(f"Cleared cache subfolder: {subfolder}")
             else:
-                if os.path.exists(self.cache_dir):
-                    shutil.rmtree(self.cache_dir)
-                    os.makedirs(self.cache_dir, exist_ok=True)
-                    logger.info(f"Cleared entire cache directory: {self.cache_dir}")
+                logger.info(f"Cleared entire cache: {self.cache_dir}")
             
             return True
             
@@ -202,6 +485,10 @@ class CacheHandler:
         """
         return self.clear(subfolder)
     
+    def has_frame(self, key: str, subfolder: Optional[str] = None) -> bool:
+        """Whether a DataFrame entry exists for the key; only the header file is checked, nothing is loaded."""
+        return os.path.exists(self._get_frame_header_path(key, subfolder))
+
     def exists(self, key: str, subfolder: Optional[str] = None) -> bool:
         """
         Check if a cache entry exists and is not expired.
@@ -214,22 +501,16 @@ class CacheHandler:
             True if cache entry exists and is valid, False otherwise
         """
         try:
-            cache_path = self._get_cache_path(key, subfolder)
-            
-            if not os.path.exists(cache_path):
-                return False
-            
-            # Check if expired
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            if 'ttl' in cache_data and cache_data['ttl'] is not None:
-                timestamp = datetime.fromisoformat(cache_data['timestamp'])
-                ttl_seconds = cache_data['ttl']
-                if datetime.now() > timestamp + timedelta(seconds=ttl_seconds):
+            # The parsed entry stays in memory for a following get
+            cache_data = self._read_entry(key, subfolder)
+            if cache_data is None:
+                header_path = self._get_frame_header_path(key, subfolder)
+                if not os.path.exists(header_path):
                     return False
+                with open(header_path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
             
-            return True
+            return not self._is_expired(cache_data)
             
         except Exception as e:
             logger.error(f"Error checking cache existence for key '{key}': {e}", exc_info=True)
@@ -246,16 +527,10 @@ class CacheHandler:
             List of cache keys
         """
         try:
+            keys = set(self.backend.list_keys(subfolder))
             cache_dir = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
-            
-            if not os.path.exists(cache_dir):
-                return []
-            
-            keys = []
-            for filename in os.listdir(cache_dir):
-                if filename.endswith('.json'):
-                    key = filename[:-5]  # Remove .json extension
-                    keys.append(key)
+            if os.path.exists(cache_dir):
+                keys.update(name[:-6] for name in os.listdir(cache_dir) if name.endswith('.frame'))
             
             return sorted(keys)
             
@@ -273,36 +548,27 @@ class CacheHandler:
         try:
             stats = {
                 'cache_dir': self.cache_dir,
+                'backend': self.backend.name,
                 'total_files': 0,
                 'total_size': 0,
-                'subfolders': {}
+                'subfolders': {},
+                'memory': self.get_memory_stats()
             }
+            stats.update(self.backend.stats())
             
-            if not os.path.exists(self.cache_dir):
-                return stats
-            
+            # DataFrame entries are files under cache_dir whatever the backend
             for root, dirs, files in os.walk(self.cache_dir):
                 folder_name = os.path.relpath(root, self.cache_dir)
                 if folder_name == '.':
                     folder_name = 'root'
-                
-                folder_files = 0
-                folder_size = 0
-                
-                for file in files:
-                    if file.endswith('.json'):
-                        file_path = os.path.join(root, file)
-                        file_size = os.path.getsize(file_path)
-                        folder_files += 1
-                        folder_size += file_size
-                        stats['total_files'] += 1
-                        stats['total_size'] += file_size
-                
-                if folder_files > 0:
-                    stats['subfolders'][folder_name] = {
-                        'files': folder_files,
-                        'size': folder_size
-                    }
+                sizes = [os.path.getsize(os.path.join(root, name)) for name in files
+                         if name.endswith(('.frame', '.feather', '.cols'))]
+                if sizes:
+                    folder = stats['subfolders'].setdefault(folder_name, {'files': 0, 'size': 0})
+                    folder['files'] += len(sizes)
+                    folder['size'] += sum(sizes)
+                    stats['total_files'] += len(sizes)
+                    stats['total_size'] += sum(sizes)
             
             return stats
             
@@ -321,25 +587,19 @@ class CacheHandler:
             Number of expired entries cleaned up
         """
         try:
-            cleaned_count = 0
-            keys = self.list_keys(subfolder)
+            cleaned_count = self.backend.delete_expired(subfolder)
             
-            for key in keys:
-                cache_path = self._get_cache_path(key, subfolder)
-                
+            cache_dir = os.path.join(self.cache_dir, subfolder) if subfolder else self.cache_dir
+            frame_keys = [name[:-6] for name in os.listdir(cache_dir) if name.endswith('.frame')] \
+                if os.path.exists(cache_dir) else []
+            for key in frame_keys:
                 try:
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    # Check if expired
-                    if 'ttl' in cache_data and cache_data['ttl'] is not None:
-                        timestamp = datetime.fromisoformat(cache_data['timestamp'])
-                        ttl_seconds = cache_data['ttl']
-                        if datetime.now() > timestamp + timedelta(seconds=ttl_seconds):
-                            self.delete(key, subfolder)
-                            cleaned_count += 1
-                            logger.debug(f"Cleaned up expired cache: {key}")
-                
+                    with open(self._get_frame_header_path(key, subfolder), 'r', encoding='utf-8') as f:
+                        header = json.load(f)
+                    if self._is_expired(header):
+                        self.delete(key, subfolder)
+                        cleaned_count += 1
+                        logger.debug(f"Cleaned up expired DataFrame cache: {key}")
                 except Exception as e:
                     logger.warning(f"Error checking expiry for cache key '{key}': {e}")
                     continue
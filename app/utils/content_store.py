@@ -0,0 +1,189 @@
+# content_store.py - on-disk, content-addressed store for downloaded file bodies
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ContentAddressedStore:
+    """
+    Stores response bodies on disk under their SHA-256 digest, plus an index that maps
+    a resource key (e.g. a SharePoint URL) to the digest and eTag it was last served with.
+
+    Identical bodies are stored once. Objects no longer referenced by any key are
+    removed when a key moves to new content. Objects are checked against their
+    digest as they are read back, so a file damaged on disk is never served twice.
+
+    Layout:
+        <root>/objects/ab/abcdef...   raw bytes
+        <root>/index.json             {key: {"digest", "etag", "size", "stored_at"}}
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, "objects")
+        self.index_path = os.path.join(root_dir, "index.json")
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.objects_dir, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Failed to create content store directory {self.objects_dir}: {e}")
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Content store index unreadable, starting empty: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+        self._atomic_write(self.index_path, json.dumps(self._index, indent=2).encode('utf-8'))
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the index entry (digest, etag, size, stored_at) for key, if its object still exists."""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry and os.path.exists(self._object_path(entry['digest'])):
+            return dict(entry)
+        return None
+
+    def iter_object(self, digest: str, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Yield a stored object in chunks without loading it whole.
+
+        The chunks are hashed as they are read. If the object no longer matches its
+        digest it is dropped, together with the keys pointing at it, and ValueError
+        is raised after the last chunk so the caller discards what it consumed.
+        """
+        content_hash = hashlib.sha256()
+        with open(self._object_path(digest), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                content_hash.update(chunk)
+                yield chunk
+        if content_hash.hexdigest() != digest:
+            self._drop_object(digest)
+            raise ValueError(f"Content store object {digest[:12]} is corrupt and was removed")
+
+    def open_writer(self, key: str, etag: Optional[str] = None) -> "ContentWriter":
+        """
+        Return a context manager that streams a new body for key to disk.
+
+        The body is hashed while it is written and only becomes visible under key when
+        the with-block exits cleanly; an exception (or an abandoned generator) discards it.
+        """
+        return ContentWriter(self, key, etag)
+
+    def _commit(self, key: str, digest: str, size: int, etag: Optional[str]) -> None:
+        with self._lock:
+            previous = self._index.get(key)
+            self._index[key] = {
+                'digest': digest,
+                'etag': etag,
+                'size': size,
+                'stored_at': datetime.now().isoformat()
+            }
+            self._save_index()
+            stale_digest = previous.get('digest') if previous else None
+            if stale_digest and stale_digest != digest and \
+                    not any(e.get('digest') == stale_digest for e in self._index.values()):
+                try:
+                    os.remove(self._object_path(stale_digest))
+                except OSError:
+                    pass
+
+    def _drop_object(self, digest: str) -> None:
+        with self._lock:
+            for key in [k for k, e in self._index.items() if e.get('digest') == digest]:
+                del self._index[key]
+            self._save_index()
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+        logger.warning(f"Dropped corrupt content store object {digest[:12]}")
+
+    def invalidate(self, key: str) -> None:
+        """Drop key from the index (its object is removed if unreferenced)."""
+        with self._lock:
+            entry = self._index.pop(key, None)
+            self._save_index()
+            if entry and not any(e.get('digest') == entry['digest'] for e in self._index.values()):
+                try:
+                    os.remove(self._object_path(entry['digest']))
+                except OSError:
+                    pass
+
+
+class ContentWriter:
+    """Streaming writer returned by ContentAddressedStore.open_writer()."""
+
+    def __init__(self, store: ContentAddressedStore, key: str, etag: Optional[str]):
+        self.store = store
+        self.key = key
+        self.etag = etag
+        self.size = 0
+        self.digest: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._file = None
+        self._tmp_path = None
+
+    def __enter__(self) -> "ContentWriter":
+        fd, self._tmp_path = tempfile.mkstemp(dir=self.store.objects_dir, prefix=".tmp_")
+        self._file = os.fdopen(fd, 'wb')
+        return self
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._file.close()
+        if exc_type is not None:
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
+            return False
+
+        self.digest = self._hash.hexdigest()
+        object_path = self.store._object_path(self.digest)
+        if os.path.exists(object_path):
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(self._tmp_path, object_path)
+        self.store._commit(self.key, self.digest, self.size, self.etag)
+        return False
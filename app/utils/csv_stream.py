@@ -0,0 +1,189 @@
+# csv_stream.py - incremental CSV ingestion for large reference catalogs
+import codecs
+import csv
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def iter_text_lines(chunks: Iterable[bytes], encoding: str = 'utf-8-sig',
+                    fallback_encoding: str = 'cp1252') -> Iterator[str]:
+    """
+    Decode an iterable of byte chunks incrementally and yield text lines (with their '\\n').
+
+    Only one line's worth of text is buffered at a time. If a chunk fails to decode
+    with `encoding`, the remainder of the stream (including bytes the decoder was
+    holding back) is decoded with `fallback_encoding` instead.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    switched = False
+    pending = ""
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            if switched:
+                raise
+            held_back = decoder.getstate()[0]
+            logger.warning(f"{encoding} decoding failed ({e}); decoding the rest of the stream as {fallback_encoding}.")
+            decoder = codecs.getincrementaldecoder(fallback_encoding)(errors='replace')
+            switched = True
+            text = decoder.decode(held_back + chunk)
+
+        pending += text
+        if '\n' not in text:
+            continue
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+class RecordSchema:
+    """Field names shared by every record of one file."""
+    __slots__ = ('fields', 'index')
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self.index = {name: position for position, name in enumerate(self.fields)}
+
+
+class CompactRecord(Mapping):
+    """
+    Read-only row mapping backed by a tuple of values and a shared RecordSchema.
+
+    Behaves like the dict-per-row it replaces (get, [], keys, items, iteration)
+    at a fraction of the per-row overhead.
+    """
+    __slots__ = ('_schema', '_values')
+
+    def __init__(self, schema: RecordSchema, values: Tuple[str, ...]):
+        self._schema = schema
+        self._values = values
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._schema.index[key]]
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._schema.fields)
+
+    def __len__(self):
+        return len(self._schema.fields)
+
+    def __repr__(self):
+        return f"CompactRecord({dict(self)!r})"
+
+
+def find_header(headers: Sequence[str], candidates: Sequence[str]) -> Optional[str]:
+    """Return the first header matching one of candidates (case/whitespace/BOM-insensitive)."""
+    normalized = {header.lstrip('\ufeff').strip().lower(): header for header in headers if header is not None}
+    for candidate in candidates:
+        header = normalized.get(candidate.lower().strip())
+        if header is not None:
+            return header
+    return None
+
+
+def read_csv_records(lines: Iterable[str], key_candidates: Sequence[str]) -> Tuple[List[str], str, Dict[str, CompactRecord]]:
+    """
+    Parse CSV lines into {key: CompactRecord}, keyed by the first column matching key_candidates.
+
+    Values are stripped and de-duplicated through a per-file pool so repeated values
+    (categories, branches, units...) share one string object. Rows with an empty key
+    are skipped; later rows win on duplicate keys.
+
+    Returns:
+        (headers, key_column, records)
+
+    Raises:
+        ValueError: if there is no header row or no column matches key_candidates.
+    """
+    reader = csv.reader(lines)
+    return build_records(next(reader, None), reader, key_candidates)
+
+
+def build_records(raw_headers: Optional[Sequence[str]], rows: Iterable[Sequence[str]],
+                  key_candidates: Sequence[str]) -> Tuple[List[str], str, Dict[str, CompactRecord]]:
+    """
+    Build {key: CompactRecord} from already-split rows, as read_csv_records does for CSV text.
+
+    Raises:
+        ValueError: if raw_headers is empty or no column matches key_candidates.
+    """
+    if not raw_headers or not any(h.strip() for h in raw_headers):
+        raise ValueError("CSV content has no header line.")
+
+    headers = [header.lstrip('\ufeff').strip() for header in raw_headers]
+    key_column = find_header(headers, key_candidates)
+    if key_column is None:
+        raise ValueError(f"No column matching {list(key_candidates)} in CSV headers {headers}")
+
+    schema = RecordSchema(headers)
+    key_position = schema.index[key_column]
+    width = len(headers)
+    pool: Dict[str, str] = {}
+    intern = pool.setdefault
+    records: Dict[str, CompactRecord] = {}
+
+    for row in rows:
+        if not row:
+            continue
+        row = list(row[:width])
+        if len(row) < width:
+            row.extend([''] * (width - len(row)))
+        values = tuple(intern(value, value) for value in map(str.strip, row))
+        key = values[key_position]
+        if key:
+            records[key] = CompactRecord(schema, values)
+
+    return headers, key_column, records
+
+
+def patch_records(records: Dict[str, CompactRecord], diff, key_column: str) -> Optional[Dict[str, CompactRecord]]:
+    """
+    Apply a TableDiff (app.utils.table_diff) to a record collection.
+
+    The input is left untouched; a new dict sharing the unchanged records is returned,
+    so it can be swapped in like a freshly parsed collection.
+
+    Returns:
+        The patched collection, or None when the diff can't be applied (it is keyed on a
+        different column or its columns differ from the records'). Rebuild from the
+        full table in that case.
+    """
+    columns = [column.strip() for column in diff.columns]
+    if diff.key_column.strip() != key_column:
+        return None
+    schema = next(iter(records.values()))._schema if records else RecordSchema(columns)
+    if list(schema.fields) != columns:
+        return None
+
+    key_position = schema.index[key_column]
+    patched = dict(records)
+    for key in diff.deleted:
+        patched.pop(key.strip(), None)
+    for key, cells in diff.modified.items():
+        record = patched.get(key.strip())
+        if record is None:
+            continue
+        values = list(record._values)
+        for column, value in cells.items():
+            values[schema.index[column.strip()]] = str(value).strip()
+        patched[key.strip()] = CompactRecord(schema, tuple(values))
+    for row in diff.inserted:
+        values = tuple(str(value).strip() for value in row)
+        if values[key_position]:
+            patched[values[key_position]] = CompactRecord(schema, values)
+    return patched
@@ -0,0 +1,145 @@
+# excel_stream.py - streaming single-sheet reader for SharePoint workbooks
+import io
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SheetTarget = Union[str, int]
+
+
+def _header_names(raw_headers: Sequence[Any]) -> List[str]:
+    """Column names the way pandas.read_excel builds them (Unnamed: i, duplicate.1...)."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for position, value in enumerate(raw_headers):
+        name = f"Unnamed: {position}" if value is None or str(value).strip() == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _column_array(values: List[Any]) -> Any:
+    """
+    Build a typed column from cell values in one pass over the types openpyxl produced.
+
+    bool/int/float/datetime columns become numpy arrays directly; a column with mixed
+    or text values stays object dtype with blanks as NaN, as pandas.read_excel does.
+    """
+    kinds = set()
+    has_missing = False
+    for value in values:
+        if value is None:
+            has_missing = True
+        elif isinstance(value, bool):
+            kinds.add(bool)
+        elif isinstance(value, int):
+            kinds.add(int)
+        elif isinstance(value, float):
+            kinds.add(float)
+        elif isinstance(value, datetime):
+            kinds.add(datetime)
+        else:
+            kinds.add(object)
+            break
+
+    if kinds == {bool} and not has_missing:
+        return np.fromiter(values, dtype=bool, count=len(values))
+    if kinds == {int} and not has_missing:
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if kinds and kinds <= {int, float}:
+        return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=len(values))
+    if kinds == {datetime}:
+        return pd.to_datetime(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = [np.nan if v is None else v for v in values]
+    return array
+
+
+def read_sheet(source: Union[bytes, io.BytesIO, str], sheet_name: SheetTarget = 0,
+               columns: Optional[Sequence[str]] = None, header_row: int = 1,
+               stop_at_blank_row: bool = False, dtypes: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Read one worksheet into a DataFrame without loading the rest of the workbook.
+
+    The workbook is opened read-only (no styles, other sheets are never parsed) and
+    rows are streamed with iter_rows(values_only=True). Only the selected columns are
+    kept and each column is built with its final dtype as it is materialized.
+
+    Args:
+        source: Workbook bytes, a binary file object, or a path.
+        sheet_name: Sheet name or zero-based index.
+        columns: Header names to keep, in the order given. None keeps every column.
+        header_row: 1-based row holding the column names.
+        stop_at_blank_row: Stop at the first row whose selected cells are all empty
+            instead of reading to the sheet's last used row.
+        dtypes: Optional {column: dtype} applied after the columns are built.
+
+    Raises:
+        ValueError: if the sheet or a requested column does not exist.
+    """
+    import openpyxl  # type: ignore
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        if isinstance(sheet_name, int):
+            try:
+                worksheet = workbook.worksheets[sheet_name]
+            except IndexError:
+                raise ValueError(f"Worksheet index {sheet_name} is invalid, {len(workbook.worksheets)} worksheets found") from None
+        elif sheet_name in workbook.sheetnames:
+            worksheet = workbook[sheet_name]
+        else:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+        rows = worksheet.iter_rows(min_row=header_row, values_only=True)
+        headers = _header_names(next(rows, ()))
+        if columns is None:
+            names = headers
+            positions = list(range(len(headers)))
+        else:
+            missing = [name for name in columns if name not in headers]
+            if missing:
+                raise ValueError(f"Columns {missing} not found in sheet '{worksheet.title}' (headers: {headers})")
+            names = list(columns)
+            positions = [headers.index(name) for name in names]
+
+        cells: List[List[Any]] = [[] for _ in positions]
+        blank_run = 0
+        for row in rows:
+            values = [row[p] if p < len(row) else None for p in positions]
+            if all(_is_blank(v) for v in values):
+                if stop_at_blank_row:
+                    break
+                blank_run += 1
+            else:
+                blank_run = 0
+            for column_cells, value in zip(cells, values):
+                column_cells.append(value)
+    finally:
+        workbook.close()
+
+    if blank_run:
+        # Like pandas, drop trailing empty rows (formatting often extends the used range).
+        cells = [column_cells[:-blank_run] for column_cells in cells]
+
+    df = pd.DataFrame({name: _column_array(column_cells) for name, column_cells in zip(names, cells)},
+                      columns=names)
+    if dtypes:
+        df = df.astype({name: dtype for name, dtype in dtypes.items() if name in df.columns})
+    logger.debug(f"Streamed sheet '{worksheet.title}': {len(df)} rows x {len(names)} columns.")
+    return df
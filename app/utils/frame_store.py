@@ -0,0 +1,166 @@
+# frame_store.py - columnar binary encoding for cached DataFrames
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_FEATHER = "feather"
+FORMAT_COLUMNS = "columns"
+# Column buffers start on a 64-byte boundary so memory-mapped views are aligned for any dtype.
+BUFFER_ALIGNMENT = 64
+
+
+def _prepare(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """Move a non-default index into columns; returns (frame, index column names)."""
+    if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1 and df.index.name is None:
+        return df, []
+    names = [name if name is not None else f"__index_level_{i}__" for i, name in enumerate(df.index.names)]
+    return df.rename_axis(names).reset_index(), [str(name) for name in names]
+
+
+def _restore_index(df: pd.DataFrame, index_columns: List[str]) -> pd.DataFrame:
+    if not index_columns:
+        return df
+    df = df.set_index(index_columns)
+    df.index.names = [None if name.startswith("__index_level_") else name for name in df.index.names]
+    return df
+
+
+def write_frame(df: pd.DataFrame, base_path: str, prefer_feather: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    Write df next to base_path in a columnar binary layout.
+
+    Uses uncompressed Feather (Arrow IPC) when pyarrow is installed, otherwise a
+    single file of aligned raw column buffers. Returns (data_path, header) where
+    header is the small JSON-serializable description read_frame() needs.
+    """
+    if any(not isinstance(column, str) for column in df.columns):
+        df = df.rename(columns=str)
+    if df.columns.duplicated().any():
+        raise ValueError("Cannot cache a DataFrame with duplicate column names.")
+    prepared, index_columns = _prepare(df)
+    header: Dict[str, Any] = {'rows': len(prepared), 'index_columns': index_columns,
+                              'dtypes': {name: str(dtype) for name, dtype in prepared.dtypes.items()}}
+
+    if prefer_feather and feather is not None:
+        data_path = f"{base_path}.feather"
+        # Uncompressed so the file can be memory-mapped without decoding.
+        feather.write_feather(prepared, data_path, compression='uncompressed')
+        header['format'] = FORMAT_FEATHER
+        return data_path, header
+
+    data_path = f"{base_path}.cols"
+    columns = []
+    with open(data_path, 'wb') as f:
+        def add_buffer(array: np.ndarray) -> Dict[str, Any]:
+            padding = -f.tell() % BUFFER_ALIGNMENT
+            f.write(b"\0" * padding)
+            array = np.ascontiguousarray(array)
+            spec = {'offset': f.tell(), 'dtype': array.dtype.str, 'count': int(array.size)}
+            f.write(array.tobytes())
+            return spec
+
+        for name in prepared.columns:
+            columns.append(_encode_column(name, prepared[name], add_buffer))
+        f.flush()
+        os.fsync(f.fileno())
+    header['format'] = FORMAT_COLUMNS
+    header['columns'] = columns
+    return data_path, header
+
+
+def _is_text_or_missing(value: Any) -> bool:
+    return value is None or isinstance(value, str) or (isinstance(value, float) and np.isnan(value))
+
+
+def _encode_column(name: str, series: pd.Series, add_buffer) -> Dict[str, Any]:
+    dtype = series.dtype
+    spec: Dict[str, Any] = {'name': name, 'dtype': str(dtype)}
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        spec.update(kind='category', ordered=bool(dtype.ordered), categories_dtype=str(dtype.categories.dtype),
+                    categories=json.loads(pd.Series(dtype.categories).to_json(orient='values', date_format='iso')),
+                    codes=add_buffer(series.cat.codes.to_numpy()))
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        spec.update(kind='datetime', tz=str(dtype.tz),
+                    values=add_buffer(series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy().view('i8')))
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        spec.update(kind='numpy', values=add_buffer(series.to_numpy()))
+    elif dtype == object and series.map(_is_text_or_missing).all():
+        mask = series.isna().to_numpy()
+        encoded = [b"" if missing else value.encode('utf-8') for value, missing in zip(series.tolist(), mask)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        spec.update(kind='utf8', data=add_buffer(np.frombuffer(b"".join(encoded), dtype=np.uint8)),
+                    offsets=add_buffer(offsets), mask=add_buffer(mask))
+    else:
+        # Mixed or extension-typed values: keep them as JSON and restore the dtype on load.
+        payload = series.to_json(orient='values', date_format='iso').encode('utf-8')
+        spec.update(kind='json', data=add_buffer(np.frombuffer(payload, dtype=np.uint8)))
+    return spec
+
+
+def read_frame(data_path: str, header: Dict[str, Any], mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a DataFrame written by write_frame().
+
+    With mmap=True numeric and datetime columns are read-only views onto the
+    memory-mapped file instead of copies; text columns are always decoded.
+    """
+    if header.get('format') == FORMAT_FEATHER:
+        if feather is None:
+            raise ImportError("pyarrow is required to read a Feather cache entry.")
+        df = feather.read_table(data_path, memory_map=mmap).to_pandas()
+        return _restore_index(df, header.get('index_columns', []))
+
+    if mmap and os.path.getsize(data_path) > 0:
+        # Plain ndarray views (not np.memmap) so columns behave like any other array
+        buffer = np.memmap(data_path, dtype=np.uint8, mode='r').view(np.ndarray)
+    else:
+        with open(data_path, 'rb') as f:
+            buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+    def view(spec: Dict[str, Any]) -> np.ndarray:
+        dtype = np.dtype(spec['dtype'])
+        start = spec['offset']
+        return buffer[start:start + spec['count'] * dtype.itemsize].view(dtype)
+
+    data = {}
+    for spec in header['columns']:
+        data[spec['name']] = _decode_column(spec, view, header['rows'])
+    df = pd.DataFrame(data, columns=[spec['name'] for spec in header['columns']], copy=False)
+    return _restore_index(df, header.get('index_columns', []))
+
+
+def _decode_column(spec: Dict[str, Any], view, rows: int) -> Any:
+    kind = spec['kind']
+    if kind == 'numpy':
+        return view(spec['values'])
+    if kind == 'datetime':
+        return pd.Series(view(spec['values']).view('M8[ns]')).dt.tz_localize('UTC').dt.tz_convert(spec['tz'])
+    if kind == 'category':
+        categories = pd.Series(spec['categories']).astype(spec.get('categories_dtype', object))
+        return pd.Categorical.from_codes(view(spec['codes']), categories=categories, ordered=spec['ordered'])
+    if kind == 'utf8':
+        raw = view(spec['data']).tobytes()
+        offsets = view(spec['offsets'])
+        mask = view(spec['mask'])
+        values = np.empty(rows, dtype=object)
+        for i in range(rows):
+            values[i] = np.nan if mask[i] else raw[offsets[i]:offsets[i + 1]].decode('utf-8')
+        return values
+    values = pd.Series(json.loads(view(spec['data']).tobytes().decode('utf-8')))
+    try:
+        return values.astype(spec['dtype']) if spec['dtype'] != 'object' else values.to_numpy(dtype=object)
+    except (TypeError, ValueError):
+        return values.to_numpy(dtype=object)
@@ -0,0 +1,120 @@
+# freshness.py - stale-while-revalidate policy for cached module data
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.invalidation import cache_key, get_invalidation_bus
+from app.utils.table_diff import TableDiff, diff_tables
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"        # younger than max_age: render, no revalidation
+STALE = "stale"        # within max_stale past max_age: render now, revalidate in the background
+EXPIRED = "expired"    # too old to show: fetch before rendering
+MISSING = "missing"    # nothing cached
+
+# Used when the cache_freshness setting has no entry for a key.
+DEFAULT_POLICIES: Dict[str, Tuple[float, Optional[float]]] = {
+    "price_book_data": (3600, 7 * 24 * 3600),
+    "used_inventory_data": (900, 24 * 3600),
+    "recent_deals_list": (300, None),
+}
+DEFAULT_MAX_AGE = 300
+
+
+class FreshnessPolicy:
+    """
+    How long a cached entry may be served.
+
+    max_age: seconds an entry is served as-is. max_stale: further seconds a stale
+    entry may still be rendered while it is revalidated (None = no limit, 0 =
+    never render stale data).
+    """
+    __slots__ = ('max_age', 'max_stale')
+
+    def __init__(self, max_age: float, max_stale: Optional[float] = None):
+        self.max_age = max_age
+        self.max_stale = max_stale
+
+    def state(self, age: Optional[float]) -> str:
+        if age is None:
+            return MISSING
+        if age < self.max_age:
+            return FRESH
+        if self.max_stale is None or age < self.max_age + self.max_stale:
+            return STALE
+        return EXPIRED
+
+    def __repr__(self):
+        return f"FreshnessPolicy(max_age={self.max_age}, max_stale={self.max_stale})"
+
+
+def get_policy(config, key: str) -> FreshnessPolicy:
+    """Policy for a cache key from the cache_freshness setting, falling back to DEFAULT_POLICIES."""
+    max_age, max_stale = DEFAULT_POLICIES.get(key, (DEFAULT_MAX_AGE, None))
+    settings = config.get("cache_freshness", None) if config and hasattr(config, 'get') else None
+    if isinstance(settings, str):
+        try:
+            settings = json.loads(settings)
+        except ValueError:
+            logger.warning(f"Ignoring cache_freshness setting that is not valid JSON: {settings!r}")
+            settings = None
+    entry = settings.get(key) if isinstance(settings, dict) else None
+    if isinstance(entry, dict):
+        try:
+            max_age = float(entry.get('max_age', max_age))
+            if 'max_stale' in entry:
+                max_stale = None if entry['max_stale'] is None else float(entry['max_stale'])
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid cache_freshness entry for '{key}': {entry!r}")
+    return FreshnessPolicy(max_age, max_stale)
+
+
+def load_cached(cache_handler, key: str, policy: FreshnessPolicy, subfolder: Optional[str] = None,
+                frame: bool = False) -> Tuple[Any, str]:
+    """
+    Read a cache entry and classify it under policy.
+
+    An entry written before its key was last invalidated on the invalidation bus
+    is at best STALE, whatever its age.
+
+    Returns:
+        (value, state). value is None when the state is MISSING or EXPIRED.
+    """
+    if cache_handler is None:
+        return None, MISSING
+    age = cache_handler.get_age(key, subfolder=subfolder)
+    state = policy.state(age)
+    invalidated_at = get_invalidation_bus().last_invalidated(cache_key(key))
+    if state == FRESH and invalidated_at is not None and time.time() - age <= invalidated_at:
+        state = STALE
+    if state in (MISSING, EXPIRED):
+        return None, state
+    value = cache_handler.get_frame(key, subfolder=subfolder) if frame else cache_handler.get(key, subfolder=subfolder)
+    return (value, state) if value is not None else (None, MISSING)
+
+
+def frame_rows(df) -> List[List[str]]:
+    """DataFrame values as display strings (missing values as ""), row by row."""
+    return [['' if pd.isna(value) else str(value) for value in row]
+            for row in df.itertuples(index=False, name=None)]
+
+
+def diff_frames(old_df, new_df, key_column: Optional[str] = None) -> Optional[TableDiff]:
+    """
+    Row diff between two versions of a displayed DataFrame.
+
+    Returns None when the frames can't be patched in place: columns differ or rows
+    aren't uniquely keyed by key_column (first column by default).
+    """
+    if old_df is None or new_df is None:
+        return None
+    columns = [str(column) for column in new_df.columns]
+    if columns != [str(column) for column in old_df.columns]:
+        return None
+    if key_column is not None and key_column not in columns:
+        key_column = None
+    return diff_tables(columns, frame_rows(old_df), frame_rows(new_df), key_column=key_column)
@@ -0,0 +1,143 @@
+# table_diff.py - keyed row diff between two versions of a CSV table
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Row = Sequence[str]
+
+
+class TableDiff:
+    """
+    Row-level changes that turn one version of a table into another.
+
+    Rows are matched on key_column. inserted holds whole rows, deleted holds keys,
+    modified maps key -> {column: new value} for only the cells that changed.
+    """
+    __slots__ = ('columns', 'key_column', 'inserted', 'deleted', 'modified')
+
+    def __init__(self, columns: Sequence[str], key_column: str):
+        self.columns = list(columns)
+        self.key_column = key_column
+        self.inserted: List[List[str]] = []
+        self.deleted: List[str] = []
+        self.modified: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def changed_rows(self) -> int:
+        return len(self.inserted) + len(self.deleted) + len(self.modified)
+
+    @property
+    def changed_cells(self) -> int:
+        return len(self.inserted) * len(self.columns) + sum(len(cells) for cells in self.modified.values())
+
+    def is_empty(self) -> bool:
+        return self.changed_rows == 0
+
+    def __repr__(self):
+        return (f"TableDiff(key={self.key_column!r}, inserted={len(self.inserted)}, "
+                f"deleted={len(self.deleted)}, modified={len(self.modified)})")
+
+
+def _index_rows(rows: Sequence[Row], key_position: int, width: int) -> Optional[Dict[str, List[str]]]:
+    """Map key -> normalized row, or None if a key is empty or repeated."""
+    index: Dict[str, List[str]] = {}
+    for row in rows:
+        values = [('' if value is None else str(value)) for value in row[:width]]
+        values.extend([''] * (width - len(values)))
+        key = values[key_position].strip()
+        if not key or key in index:
+            return None
+        index[key] = values
+    return index
+
+
+def diff_tables(columns: Sequence[str], before_rows: Sequence[Row], after_rows: Sequence[Row],
+                key_column: Optional[str] = None) -> Optional[TableDiff]:
+    """
+    Compute the inserted, deleted and modified rows between two versions of a table
+    that share the same columns.
+
+    Args:
+        columns: Column names of both versions.
+        before_rows / after_rows: Row value sequences in column order.
+        key_column: Column identifying a row; defaults to the first column.
+
+    Returns:
+        The TableDiff, or None when the versions cannot be matched row by row
+        (a key is empty or appears twice). Callers should then send the whole table.
+    """
+    columns = list(columns)
+    if not columns:
+        return None
+    key_column = key_column or columns[0]
+    if key_column not in columns:
+        raise ValueError(f"Key column {key_column!r} not in columns {columns}")
+    key_position = columns.index(key_column)
+    width = len(columns)
+
+    before = _index_rows(before_rows, key_position, width)
+    after = _index_rows(after_rows, key_position, width)
+    if before is None or after is None:
+        logger.debug(f"Rows are not uniquely keyed by {key_column!r}; no row diff possible.")
+        return None
+
+    diff = TableDiff(columns, key_column)
+    for key, values in after.items():
+        old = before.get(key)
+        if old is None:
+            diff.inserted.append(values)
+            continue
+        cells = {columns[i]: values[i] for i in range(width) if values[i] != old[i]}
+        if cells:
+            diff.modified[key] = cells
+    diff.deleted = [key for key in before if key not in after]
+    return diff
+
+
+def apply_table_diff(columns: Sequence[str], rows: Sequence[Row], diff: TableDiff) -> Tuple[List[List[str]], List[str]]:
+    """
+    Apply diff onto another version of the table (e.g. the latest remote copy).
+
+    Only the cells recorded in the diff are written, so concurrent edits to other
+    rows and cells are preserved. Row order is kept; inserted rows are appended.
+    An inserted key that already exists updates that row instead.
+
+    Returns:
+        (merged_rows, skipped_keys) where skipped_keys are modified rows that no
+        longer exist in the target version.
+
+    Raises:
+        ValueError: if columns differ from the columns the diff was computed on.
+    """
+    columns = list(columns)
+    if columns != diff.columns:
+        raise ValueError(f"Cannot apply diff for columns {diff.columns} to table with columns {columns}")
+    key_position = columns.index(diff.key_column)
+    positions = {column: i for i, column in enumerate(columns)}
+    width = len(columns)
+
+    deleted = set(diff.deleted)
+    inserted = {row[key_position].strip(): row for row in diff.inserted}
+    pending = dict(diff.modified)
+    merged: List[List[str]] = []
+
+    for row in rows:
+        values = [('' if value is None else str(value)) for value in row[:width]]
+        values.extend([''] * (width - len(values)))
+        key = values[key_position].strip()
+        if key in deleted:
+            continue
+        if key in inserted:
+            values = list(inserted.pop(key))
+        cells = pending.pop(key, None)
+        if cells:
+            for column, value in cells.items():
+                values[positions[column]] = value
+        merged.append(values)
+
+    merged.extend(list(row) for row in inserted.values())
+    skipped = list(pending)
+    if skipped:
+        logger.warning(f"{len(skipped)} modified row(s) no longer exist in the target table: {skipped[:10]}")
+    return merged, skipped
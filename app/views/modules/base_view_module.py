@@ -2,7 +2,13 @@
 import logging
 import sys
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel # Added imports for basic functionality
-from PyQt6.QtCore import pyqtSignal, Qt # Added Qt for alignment example
+from PyQt6.QtCore import pyqtSignal, Qt, QThreadPool # Added Qt for alignment example
+
+from app.core.invalidation import get_invalidation_bus
+from app.core.performance import get_resource_monitor
+from app.core.threading import Worker
+from app.core.tracing import bind, span
+from app.utils.freshness import FRESH, get_policy, load_cached
 
 # Attempt to import Config, though it's passed in __init__
 # from app.core.config import BRIDealConfig, get_config # Not strictly needed for import if always passed
@@ -22,6 +28,9 @@ class BaseViewModule(QWidget):
     # Signal to show a notification (message, type: info, warning, error)
     show_notification_signal = pyqtSignal(str, str)
 
+    # Carries InvalidationEvents from the invalidation bus (any thread) to on_invalidated on the UI thread
+    invalidated = pyqtSignal(object)
+
 
     def __init__(self, module_name="BaseModule", config=None, logger_instance=None, main_window=None, parent=None):
         """
@@ -55,6 +64,9 @@ class BaseViewModule(QWidget):
         # Basic UI setup (can be overridden by subclasses)
         # self._init_base_ui() # Optional: call a common UI setup
 
+        self._revalidating = set()  # cache keys with a background fetch in flight
+        self._invalidation_tokens = []
+
         self.logger.info(f"{self.module_name} initialized.")
 
     def setLayout(self, new_layout):
@@ -171,6 +183,125 @@ class BaseViewModule(QWidget):
         self.logger.debug(f"{self.module_name} - refresh_module_data called (base implementation).")
         self.load_module_data() # Default to calling load_module_data
 
+    def subscribe_invalidation(self, *keys):
+        """
+        Receive invalidation bus events for keys in on_invalidated (on the UI thread).
+
+        Args:
+            keys (str): Keys from app.core.invalidation (e.g. cache_key("price_book_data")).
+        """
+        bus = get_invalidation_bus()
+        if not self._invalidation_tokens:
+            self.invalidated.connect(self.on_invalidated)
+            # The lambda holds the token list, not self, so it can run after the widget is gone
+            tokens = self._invalidation_tokens
+            self.destroyed.connect(lambda *args: [bus.unsubscribe(token) for token in tokens])
+        for key in keys:
+            self._invalidation_tokens.append(bus.subscribe(key, self.invalidated.emit))
+
+    def report_memory(self, *attributes):
+        """
+        Include the deep size of these attributes under this module in the memory
+        budget report (ResourceMonitor.get_memory_budget_report).
+
+        Args:
+            attributes (str): Names of attributes holding the module's data (e.g. "price_book_data").
+        """
+        get_resource_monitor().register_owner(self, *attributes, module=self.module_name)
+
+    def on_invalidated(self, event):
+        """
+        Handle an invalidation of a subscribed key. The default revalidates the module's
+        data; subclasses holding data that can be updated in place should override this.
+        """
+        self.logger.info(f"{self.module_name}: {event.key} invalidated by {event.source} ({event.reason}).")
+        self.refresh_module_data()
+
+    def load_with_revalidation(self, cache_key, fetch_fn, render, apply_fresh, on_error,
+                               frame=False, subfolder="app_data", force=False, store=None):
+        """
+        Stale-while-revalidate load of a cached data set.
+
+        A cached value within its freshness policy (see app.utils.freshness) is
+        rendered immediately. If it is stale, missing or force is set, fetch_fn runs
+        on the thread pool, its result is written to the cache there, and then
+        handed to apply_fresh (which should patch what is on screen) or, when
+        nothing was rendered, to render.
+
+        Args:
+            cache_key (str): Cache key; also selects the freshness policy.
+            fetch_fn (callable): Fetches fresh data (runs on a worker thread).
+            render (callable): Renders a value from scratch.
+            apply_fresh (callable): Updates the already rendered view with a fresh value.
+            on_error (callable): Shows a fetch error when there is nothing on screen.
+            frame (bool): The entry is a DataFrame (get_frame/set_frame).
+            subfolder (str): Cache subfolder.
+            force (bool): Revalidate even if the cached value is fresh.
+            store (callable, optional): Predicate deciding whether a fetched value is cached.
+
+        Returns:
+            str: Freshness state of the cached value (fresh, stale, expired or missing).
+        """
+        with span(f"{self.module_name}: load {cache_key}", force=force) as load_span:
+            return self._load_with_revalidation(load_span, cache_key, fetch_fn, render, apply_fresh, on_error,
+                                                frame, subfolder, force, store)
+
+    def _load_with_revalidation(self, load_span, cache_key, fetch_fn, render, apply_fresh, on_error,
+                                frame, subfolder, force, store):
+        cache_handler = getattr(self, 'cache_handler', None)
+        policy = get_policy(self.config, cache_key)
+        with span("read cache", key=cache_key):
+            value, state = load_cached(cache_handler, cache_key, policy, subfolder=subfolder, frame=frame)
+        if load_span is not None:
+            load_span.set_attribute('cache_state', state)
+        rendered = value is not None
+        if rendered:
+            self.logger.info(f"{self.module_name}: rendering {state} cached '{cache_key}'.")
+            with span("render cached"):
+                render(value)
+        if state == FRESH and not force:
+            return state
+        if cache_key in self._revalidating:
+            self.logger.debug(f"{self.module_name}: '{cache_key}' is already being revalidated.")
+            return state
+        self.logger.info(f"{self.module_name}: fetching '{cache_key}' in the background "
+                         f"(cache {state}, {policy}).")
+
+        def fetch_and_store(status_callback=None):
+            fresh = fetch_fn(status_callback=status_callback)
+            if cache_handler is not None and fresh is not None and (store is None or store(fresh)):
+                if frame:
+                    cache_handler.set_frame(cache_key, fresh, subfolder=subfolder)
+                else:
+                    cache_handler.set(cache_key, fresh, subfolder=subfolder)
+            return fresh
+
+        def received(fresh):
+            self._revalidating.discard(cache_key)
+            if rendered:
+                with span("apply fresh"):
+                    apply_fresh(fresh)
+            else:
+                with span("render fresh"):
+                    render(fresh)
+
+        def failed(error):
+            self._revalidating.discard(cache_key)
+            if rendered:
+                self.logger.warning(f"{self.module_name}: revalidating '{cache_key}' failed; "
+                                    f"keeping cached data on screen: {error}")
+                self.show_notification(f"Could not refresh {self.module_name} data; showing cached data.", "warning")
+            else:
+                on_error(error)
+
+        self._revalidating.add(cache_key)
+        worker = Worker(fetch_and_store)
+        worker.span_name = f"fetch {cache_key}"
+        worker.signals.result.connect(bind(received))
+        worker.signals.error.connect(bind(failed))
+        QThreadPool.globalInstance().start(worker)
+        return state
+
 # Example Usage (for testing this base class standalone)
 if __name__ == '__main__':
     import sys
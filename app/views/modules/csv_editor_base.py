@@ -7,8 +7,8 @@ import pandas as pd
 import os
 import csv
 import io 
-import requests 
 import urllib.parse 
+import tempfile
 import time # Ensures 'time' module is available globally in this file
 from typing import Optional, List, Any 
 
@@ -21,7 +21,12 @@ from PyQt6.QtCore import Qt, pyqtSignal, QThreadPool
 from PyQt6.QtGui import QFont, QPalette, QColor 
 
 from app.views.modules.base_view_module import BaseViewModule
+from app.core.invalidation import csv_key, get_invalidation_bus
 from app.core.threading import Worker
+from app.services.integrations.graph_transport import get_graph_transport
+from app.services.integrations.upload_session import ResumableUpload, UploadSessionError
+from app.utils.csv_stream import iter_text_lines
+from app.utils.table_diff import apply_table_diff, diff_tables
 
 # Attempt to import EnhancedSharePointManager
 try:
@@ -38,6 +43,13 @@ class CsvEditorBase(BaseViewModule):
     """Enhanced base class for CSV editors with SharePoint integration and full functionality"""
     
     data_changed = pyqtSignal(str)
+
+    # Column that identifies a row when diffing against SharePoint (None = first column).
+    sync_key_column: Optional[str] = None
+    # Edits touching more than this fraction of rows are logged as large syncs (they are still merged).
+    DEFAULT_DIFF_SYNC_THRESHOLD = 0.3
+    # Re-merge attempts when the SharePoint file changes between download and upload.
+    DIFF_SYNC_MERGE_ATTEMPTS = 3
     
     def __init__(self, csv_file_path: str, module_name: str = "CSV Editor", 
                  config: Optional[dict] = None, 
@@ -59,6 +71,10 @@ class CsvEditorBase(BaseViewModule):
         self.data_df: pd.DataFrame = pd.DataFrame()
         self.is_modified: bool = False
         self.original_data: Optional[pd.DataFrame] = None
+        # Last table state known to match SharePoint; the base for diff sync. None = unknown.
+        self.sharepoint_baseline: Optional[pd.DataFrame] = None
+        self._synced_df: Optional[pd.DataFrame] = None
+        self.report_memory('data_df', 'original_data', 'sharepoint_baseline', '_synced_df')
         self.thread_pool: QThreadPool = QThreadPool.globalInstance()
         
         self.sharepoint_manager: Optional[object] = None 
@@ -356,7 +372,8 @@ class CsvEditorBase(BaseViewModule):
                 raise Exception("No suitable SharePoint manager available for download.")
 
             if csv_content:
-                df = pd.read_csv(io.StringIO(csv_content))
+                # Keep values as text so row keys and untouched cells round-trip unchanged.
+                df = pd.read_csv(io.StringIO(csv_content), dtype=str).fillna('')
                 return df
             else:
                 raise Exception(f"No content received from SharePoint for URL: {self.sharepoint_file_url}")
@@ -369,6 +386,7 @@ class CsvEditorBase(BaseViewModule):
         try:
             self.data_df = df
             self.original_data = df.copy()
+            self.sharepoint_baseline = df.copy()
             self._populate_table()
             self.data_df.to_csv(self.csv_file_path, index=False) 
             self.is_modified = False
@@ -407,7 +425,7 @@ class CsvEditorBase(BaseViewModule):
             QMessageBox.information(self, "No Changes", "No local changes to sync to SharePoint.")
             return
         
-        reply = QMessageBox.question(self, "Sync to SharePoint", "Upload local changes to SharePoint? This will overwrite the file on SharePoint.",
+        reply = QMessageBox.question(self, "Sync to SharePoint", "Upload local changes to SharePoint? Changed rows are merged into the SharePoint file.",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.No: return
         
@@ -447,35 +465,151 @@ class CsvEditorBase(BaseViewModule):
         if not graph_api_url:
             raise Exception(f"Could not convert SharePoint URL to Graph API URL: {self.sharepoint_file_url}")
 
-        csv_content_bytes = self.data_df.to_csv(index=False).encode('utf-8')
-
+        create_session_url = graph_api_url[:-len('/content')] + '/createUploadSession' \
+            if graph_api_url.endswith('/content') else graph_api_url
         headers = {
             'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'text/csv', 
             'User-Agent': 'BRIDeal-CsvEditor/1.1' # Updated user agent
         }
-        
-        self.logger.info(f"Uploading CSV to Graph API URL: {graph_api_url}")
-        self.logger.debug(f"Upload headers (token redacted): {{'Authorization': 'Bearer [...]', 'Content-Type': '{headers['Content-Type']}', 'User-Agent': '{headers['User-Agent']}'}}")
 
+        columns = [str(c) for c in self.data_df.columns]
+        local_rows = self.data_df.astype(str).values.tolist()
+        self._synced_df = None
         try:
-            response = requests.put(graph_api_url, headers=headers, data=csv_content_bytes, timeout=60)
-            response.raise_for_status() 
-            self.logger.info(f"Successfully uploaded to SharePoint. Status: {response.status_code}")
+            if self._diff_sync_to_sharepoint(create_session_url, headers, columns, local_rows):
+                return True
+            # Replace the whole file, but never over a version we have not seen
+            self._upload_rows(create_session_url, headers, columns, local_rows, if_match=self._current_etag())
+            self._synced_df = self.data_df.copy()
+            self.logger.info("Successfully uploaded to SharePoint.")
             return True
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = http_err.response.text if http_err.response is not None else str(http_err)
-            self.logger.error(f"HTTP error uploading to SharePoint: {http_err.response.status_code if http_err.response is not None else 'N/A'} - {error_detail}", exc_info=True)
-            raise Exception(f"SharePoint upload failed (HTTP {http_err.response.status_code if http_err.response is not None else 'N/A'}): {error_detail[:200]}")
-        except requests.exceptions.RequestException as req_err:
-            self.logger.error(f"Request error uploading to SharePoint: {req_err}", exc_info=True)
-            raise Exception(f"SharePoint upload failed (Request Error): {req_err}")
+        except UploadSessionError as upload_err:
+            if upload_err.status_code == 412:
+                self.logger.warning(f"SharePoint file changed during upload; not overwriting: {upload_err}")
+                raise Exception("The SharePoint file was changed by someone else while syncing. "
+                                "Reload it from SharePoint and apply your changes again.")
+            self.logger.error(f"Error uploading to SharePoint: {upload_err}", exc_info=True)
+            raise Exception(f"SharePoint upload failed (HTTP {upload_err.status_code or 'N/A'}): {str(upload_err)[:200]}")
         except Exception as e:
             self.logger.error(f"Unexpected error uploading to SharePoint: {e}", exc_info=True)
-            raise 
-    
+            raise
+
+    def _diff_sync_threshold(self) -> float:
+        value = self.config.get("CSV_DIFF_SYNC_THRESHOLD", self.DEFAULT_DIFF_SYNC_THRESHOLD) \
+            if hasattr(self.config, 'get') else self.DEFAULT_DIFF_SYNC_THRESHOLD
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return self.DEFAULT_DIFF_SYNC_THRESHOLD
+
+    def _diff_sync_to_sharepoint(self, create_session_url: str, headers: dict,
+                                 columns: List[str], local_rows: List[List[str]]) -> bool:
+        """
+        Patch-merge local edits into the current SharePoint copy.
+
+        The rows inserted, deleted or modified since sharepoint_baseline are applied
+        cell by cell onto the latest remote file, which is then uploaded only if it
+        still has the eTag it was downloaded with. Returns False when the caller
+        should fall back to a full upload instead.
+        """
+        baseline = self.sharepoint_baseline
+        manager = self.enhanced_sharepoint_manager
+        if baseline is None:
+            self.logger.info("No SharePoint baseline for this table; using full upload.")
+            return False
+        if [str(c) for c in baseline.columns] != columns:
+            self.logger.info("Columns changed since the last SharePoint sync; using full upload.")
+            return False
+
+        diff = diff_tables(columns, baseline.astype(str).values.tolist(), local_rows, self.sync_key_column)
+        if diff is None:
+            self.logger.info("Rows are not uniquely keyed; using full upload.")
+            return False
+        if diff.is_empty():
+            self.logger.info("No row changes since the last SharePoint sync; nothing to upload.")
+            self._synced_df = self.data_df.copy()
+            return True
+        threshold = self._diff_sync_threshold()
+        if diff.changed_rows > threshold * max(len(baseline), 1):
+            # Graph uploads the whole file either way; merging keeps other users' edits
+            self.logger.info(f"{diff!r} exceeds {threshold:.0%} of {len(baseline)} rows; merging anyway.")
+        if not (manager and hasattr(manager, 'resolve_items') and hasattr(manager, 'download_file_bytes')):
+            self.logger.info("SharePoint manager cannot fetch item eTags; using full upload.")
+            return False
+
+        for attempt in range(1, self.DIFF_SYNC_MERGE_ATTEMPTS + 1):
+            metadata = manager.resolve_items({'target': self.sharepoint_file_url}).get('target') or {}
+            etag = metadata.get('eTag')
+            if not etag:
+                self.logger.warning("Could not resolve the SharePoint item eTag; using full upload.")
+                return False
+            data = manager.download_file_bytes(self.sharepoint_file_url, item_metadata=metadata)
+            reader = csv.reader(iter_text_lines([data]))
+            remote_columns = [h.lstrip('\ufeff').strip() for h in next(reader, [])]
+            if remote_columns != columns:
+                self.logger.warning(f"SharePoint columns {remote_columns} differ from local columns; using full upload.")
+                return False
+
+            merged_rows, skipped = apply_table_diff(columns, [row for row in reader if row], diff)
+            if skipped:
+                self.logger.warning(f"Rows deleted on SharePoint were not re-created: {skipped[:10]}")
+            try:
+                self._upload_rows(create_session_url, headers, columns, merged_rows, if_match=etag)
+            except UploadSessionError as e:
+                if e.status_code == 412 and attempt < self.DIFF_SYNC_MERGE_ATTEMPTS:
+                    self.logger.warning(f"SharePoint file changed during sync (attempt {attempt}); merging again.")
+                    continue
+                raise
+            self._synced_df = pd.DataFrame(merged_rows, columns=columns)
+            self.logger.info(f"Merged {diff!r} into SharePoint ({diff.changed_cells} cell(s) changed).")
+            return True
+        return False
+
+    def _current_etag(self) -> Optional[str]:
+        """eTag of the SharePoint file as it is now, or None if the manager cannot resolve it."""
+        manager = self.enhanced_sharepoint_manager
+        if not (manager and hasattr(manager, 'resolve_items')):
+            return None
+        try:
+            metadata = manager.resolve_items({'target': self.sharepoint_file_url}).get('target') or {}
+        except Exception as e:
+            self.logger.warning(f"Could not resolve the SharePoint item eTag: {e}")
+            return None
+        return metadata.get('eTag')
+
+    def _upload_rows(self, create_session_url: str, headers: dict, columns: List[str],
+                     rows: List[List[str]], if_match: Optional[str] = None) -> None:
+        """Serialize rows to a temp CSV and stream it through a resumable upload session."""
+        fd, tmp_path = tempfile.mkstemp(suffix=".csv", prefix="brideal_csv_upload_")
+        os.close(fd)
+        try:
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+            self.logger.info(f"Uploading CSV ({os.path.getsize(tmp_path)} bytes) via upload session: {create_session_url}")
+            ResumableUpload(transport=get_graph_transport()).upload_file(create_session_url, headers, tmp_path,
+                                                                         if_match=if_match)
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
     def _sync_to_sharepoint_complete(self, result: bool):
         if result:
+            if self._synced_df is not None:
+                self.sharepoint_baseline = self._synced_df
+                if not self._synced_df.equals(self.data_df):
+                    # The merge picked up edits made on SharePoint since our last sync.
+                    before_merge = self.data_df
+                    self.data_df = self._synced_df.copy()
+                    self.original_data = self.data_df.copy()
+                    self._populate_table()
+                    self.data_df.to_csv(self.csv_file_path, index=False)
+                    self._update_file_info()
+                    self._publish_data_change("sharepoint_sync", before_merge)
+                self._synced_df = None
             self._update_status("Successfully synced to SharePoint")
             self.logger.info(f"Successfully uploaded changes to SharePoint for {self.csv_file_path}")
             self.is_modified = False 
@@ -514,6 +648,7 @@ class CsvEditorBase(BaseViewModule):
                 if df is not None and not df.empty:
                     self.data_df = df.fillna('') # Ensure NaN are empty strings
                     self.original_data = self.data_df.copy()
+                    self.sharepoint_baseline = self.data_df.copy()
                     self._populate_table()
                     self.data_df.to_csv(self.csv_file_path, index=False)
                     self.is_modified = False
@@ -617,6 +752,7 @@ class CsvEditorBase(BaseViewModule):
                 data.append(row_data)
             
             columns = [self.table.horizontalHeaderItem(i).text() for i in range(self.table.columnCount())]
+            before_save = self.original_data
             self.data_df = pd.DataFrame(data, columns=columns)
             self.data_df.to_csv(self.csv_file_path, index=False)
             self.original_data = self.data_df.copy()
@@ -625,11 +761,31 @@ class CsvEditorBase(BaseViewModule):
             self._update_modified_indicator(); self._update_file_info()
             self._update_status(f"Saved {len(self.data_df)} rows successfully")
             self.data_changed.emit(self.module_name)
+            self._publish_data_change("editor_save", before_save)
             self.logger.info(f"CSV data saved: {len(self.data_df)} rows to {self.csv_file_path}")
         except Exception as e:
             self.logger.error(f"Error saving CSV data: {e}", exc_info=True)
             self._show_error(f"Failed to save CSV file:\n{str(e)}"); self._update_status("Error saving data")
 
+    def _publish_data_change(self, reason: str, before: Optional[pd.DataFrame]):
+        """
+        Invalidate this CSV on the invalidation bus. The detail carries the full table and,
+        when the previous version is known and shares its columns, the row diff, so
+        subscribers can update their indexes without downloading the file again.
+        """
+        data_type = os.path.splitext(os.path.basename(self.csv_file_path))[0].lower()
+        columns = [str(column) for column in self.data_df.columns]
+        rows = self.data_df.astype(str).values.tolist()
+        try:
+            diff = None
+            if before is not None and [str(column) for column in before.columns] == columns:
+                diff = diff_tables(columns, before.astype(str).values.tolist(), rows, self.sync_key_column)
+            get_invalidation_bus().invalidate(csv_key(data_type), reason=reason, detail={
+                'columns': columns, 'rows': rows, 'diff': diff, 'path': self.csv_file_path
+            })
+        except Exception as e:
+            self.logger.error(f"Error publishing {data_type} change: {e}", exc_info=True)
+
     def refresh_data(self):
         if self.is_modified:
             reply = QMessageBox.question(self, "Unsaved Changes", "Discard unsaved changes and reload from file?",
@@ -11,7 +11,8 @@ import requests
 import urllib.parse
 # from urllib.parse import quote # quote is part of urllib.parse, no need for separate import
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from collections.abc import Mapping
 import logging
 import io
 
@@ -25,6 +26,16 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QFont, QIcon, QDoubleValidator, QPixmap
 
+from app.services.integrations.sharepoint_manager import GraphBatchRequest
+from app.services.integrations.graph_transport import get_graph_transport
+from app.services.integrations.drive_delta_sync import DriveDeltaSync
+from app.utils.content_store import ContentAddressedStore
+from app.core.invalidation import get_invalidation_bus, index_key
+from app.core.performance import get_resource_monitor
+from app.utils.csv_stream import (
+    CompactRecord, build_records, find_header, iter_text_lines, patch_records, read_csv_records
+)
+
 
 class WorkerSignals(QObject):
     result = pyqtSignal(object)
@@ -71,13 +82,21 @@ class EnhancedSharePointManager:
     """
     Enhanced SharePoint Manager that makes itself self-sufficient by fetching
     and using the Drive ID for all download operations.
+
+    Downloaded bodies are kept in an on-disk content-addressed store together with
+    their eTags; later downloads are conditional (If-None-Match) and a 304 is
+    served from the stored copy.
     """
 
-    def __init__(self, original_sharepoint_manager, logger=None):
+    def __init__(self, original_sharepoint_manager, logger=None, content_store_dir=None):
         self.original_manager = original_sharepoint_manager
         self.logger = logger or logging.getLogger(__name__)
         self.drive_id = None
         self.site_id = "briltd.sharepoint.com:/sites/ISGandAMS:"
+        self.http = get_graph_transport()
+        self.content_store = ContentAddressedStore(
+            content_store_dir or os.path.join(os.path.expanduser("~"), "brideal_sp_backups", "content_store")
+        )
 
     def _get_sharepoint_drive_id(self) -> Optional[str]:
         """ Fetches and caches the SharePoint Drive ID for the configured site. """
@@ -97,7 +116,7 @@ class EnhancedSharePointManager:
             'User-Agent': 'BRIDeal-GraphAPI/1.3'
         }
         try:
-            response = requests.get(drive_info_url, headers=headers, timeout=15)
+            response = self.http.get(drive_info_url, headers=headers, timeout=15)
             response.raise_for_status()
             drive_id = response.json().get("id")
             if drive_id:
@@ -131,27 +150,80 @@ class EnhancedSharePointManager:
             self.logger.error(f"Could not parse item path from URL '{sharepoint_url}': {e}")
             return None
 
-    def _make_authenticated_request(self, url: str) -> Optional[str]:
-        """Make an authenticated request to SharePoint/Graph API"""
+    def resolve_items(self, sharepoint_urls: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch driveItem metadata (id, eTag, cTag, size, downloadUrl) for several
+        SharePoint URLs in a single Graph $batch round trip.
+
+        Returns a dict keyed like sharepoint_urls; keys that could not be resolved are omitted.
+        """
+        if not sharepoint_urls or not self._get_sharepoint_drive_id():
+            return {}
         access_token = getattr(self.original_manager, 'access_token', None)
         if not access_token:
-            raise SharePointAuthenticationError("No access token attribute available on original manager.")
+            self.logger.error("Cannot resolve items: Access token is missing from original manager.")
+            return {}
+
+        batch = GraphBatchRequest(transport=self.http)
+        for key, sharepoint_url in sharepoint_urls.items():
+            item_path = self._get_item_path_from_sharepoint_url(sharepoint_url)
+            if not item_path:
+                self.logger.warning(f"Skipping '{key}': could not parse item path from URL: {sharepoint_url}")
+                continue
+            item_path_encoded = urllib.parse.quote(item_path.strip('/'), safe='/')
+            batch.add("GET",
+                      f"/drives/{self.drive_id}/root:/{item_path_encoded}?$select=id,name,eTag,cTag,size,@microsoft.graph.downloadUrl",
+                      request_id=key)
+        if not len(batch):
+            return {}
+
+        try:
+            responses = batch.execute({'Authorization': f'Bearer {access_token}'}, timeout=15)
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Graph $batch item lookup failed: {e}", exc_info=True)
+            return {}
+
+        metadata = {}
+        for key, response in responses.items():
+            if response.get('status') == 200 and response.get('body'):
+                metadata[key] = response['body']
+            else:
+                self.logger.warning(f"Item lookup for '{key}' failed with status {response.get('status')}: {response.get('body')}")
+        self.logger.info(f"Resolved {len(metadata)}/{len(batch)} SharePoint items in one $batch request.")
+        return metadata
 
+    def _open_authenticated_stream(self, url: str, use_auth: bool = True,
+                                   etag: Optional[str] = None) -> Optional[requests.Response]:
+        """
+        Open a streaming GET against SharePoint/Graph API.
+
+        Pre-authenticated download URLs (@microsoft.graph.downloadUrl) are fetched with use_auth=False.
+        When etag is given the request is conditional (If-None-Match).
+
+        Returns:
+            The open response (body not yet read), or None on 304 Not Modified.
+        """
         headers = {
-            'Authorization': f'Bearer {access_token}',
             'Accept': 'application/octet-stream',
             'User-Agent': 'BRIDeal-SharePoint-Client/1.3'
         }
+        if use_auth:
+            access_token = getattr(self.original_manager, 'access_token', None)
+            if not access_token:
+                raise SharePointAuthenticationError("No access token attribute available on original manager.")
+            headers['Authorization'] = f'Bearer {access_token}'
+        if etag:
+            headers['If-None-Match'] = etag
         self.logger.debug(f"Making authenticated Graph API request to: {url}")
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.http.get(url, headers=headers, timeout=30, stream=True)
             self.logger.debug(f"Response status: {response.status_code}")
+            if response.status_code == 304:
+                response.close()
+                return None
             response.raise_for_status()
-            return response.content.decode('utf-8-sig')
-        except UnicodeDecodeError:
-            self.logger.warning(f"UTF-8-SIG decoding failed for {url}, falling back to response.text.")
-            return response.text
+            return response
         except requests.exceptions.HTTPError as e:
             self.logger.error(f"HTTP Error {e.response.status_code} for URL: {url}. Response: {e.response.text}")
             raise SharePointAuthenticationError(f"HTTP {e.response.status_code}: {e.response.text}")
@@ -159,32 +231,89 @@ class EnhancedSharePointManager:
             self.logger.error(f"Request exception for URL {url}: {e}", exc_info=True)
             raise SharePointAuthenticationError(f"Request failed: {e}")
 
-    def download_file_content(self, sharepoint_url: str) -> Optional[str]:
+    def iter_file_chunks(self, sharepoint_url: str, item_metadata: Optional[Dict[str, Any]] = None,
+                         chunk_size: int = 65536) -> Iterator[bytes]:
         """
-        Standardized download method. It ensures the Drive ID is available and uses it
-        to construct a reliable Graph API call.
-        """
-        self.logger.info(f"Executing standardized download for: {sharepoint_url}")
+        Yield the bytes of a SharePoint file in chunks, using the local content store.
+
+        - If item_metadata (from resolve_items) has the same eTag as the stored copy,
+          the stored object is streamed without any request.
+        - If item_metadata carries a downloadUrl, a changed file is fetched from it directly.
+        - Otherwise the Graph /content URL is requested with If-None-Match and a
+          304 is served from the stored copy.
 
+        A downloaded body is written to the store while it is being yielded and only
+        replaces the stored copy once the whole body has been consumed.
+        """
         # Step 1: Ensure we have the Drive ID.
         if not self._get_sharepoint_drive_id():
-            self.logger.error("Download failed: Could not retrieve SharePoint Drive ID.")
-            return None
+            raise SharePointAuthenticationError("Could not retrieve SharePoint Drive ID.")
 
         # Step 2: Extract the relative item path from the full SharePoint URL.
         item_path = self._get_item_path_from_sharepoint_url(sharepoint_url)
         if not item_path:
-            self.logger.error(f"Download failed: Could not parse item path from URL: {sharepoint_url}")
-            return None
+            raise ValueError(f"Could not parse item path from URL: {sharepoint_url}")
 
-        # Step 3: Construct the reliable Graph API URL using the Drive ID.
-        item_path_encoded = urllib.parse.quote(item_path.strip('/'))
+        # Step 3: Construct the reliable Graph API URL using the Drive ID. It also keys the content store.
+        item_path_encoded = urllib.parse.quote(item_path.strip('/'), safe='/')
         graph_url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{item_path_encoded}:/content"
 
-        # Step 4: Make the authenticated request.
+        stored = self.content_store.lookup(graph_url)
+        metadata_etag = (item_metadata or {}).get('eTag')
+        if stored and metadata_etag and stored.get('etag') == metadata_etag:
+            self.logger.info(f"Content for {item_path} unchanged (eTag match); serving stored copy.")
+            yield from self.content_store.iter_object(stored['digest'], chunk_size)
+            return
+
+        # Step 4: Make the (conditional) request.
+        download_url = (item_metadata or {}).get('@microsoft.graph.downloadUrl')
+        if download_url:
+            response = self._open_authenticated_stream(download_url, use_auth=False)
+        else:
+            response = self._open_authenticated_stream(graph_url, etag=stored.get('etag') if stored else None)
+
+        if response is None and stored:
+            self.logger.info(f"Content for {item_path} not modified (304); serving stored copy.")
+            yield from self.content_store.iter_object(stored['digest'], chunk_size)
+            return
+        if response is None:
+            raise SharePointAuthenticationError(f"Got 304 for {item_path} but no stored copy exists.")
+
+        with response:
+            new_etag = metadata_etag or response.headers.get('ETag')
+            if not new_etag:
+                yield from response.iter_content(chunk_size)
+                return
+            with self.content_store.open_writer(graph_url, etag=new_etag) as sink:
+                for chunk in response.iter_content(chunk_size):
+                    sink.write(chunk)
+                    yield chunk
+
+    def download_file_bytes(self, sharepoint_url: str, item_metadata: Optional[Dict[str, Any]] = None) -> bytes:
+        """Download the whole file into memory; see iter_file_chunks() for the caching rules."""
+        return b"".join(self.iter_file_chunks(sharepoint_url, item_metadata=item_metadata))
+
+    def download_file_content(self, sharepoint_url: str, item_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Standardized download method. It ensures the Drive ID is available and uses it
+        to construct a reliable Graph API call.
+
+        If item_metadata from resolve_items carries a pre-authenticated downloadUrl,
+        the content is fetched from it directly without another Graph lookup.
+        """
+        self.logger.info(f"Executing standardized download for: {sharepoint_url}")
+
         try:
-            content = self._make_authenticated_request(graph_url)
-            if content and content.strip():
+            data = self.download_file_bytes(sharepoint_url, item_metadata=item_metadata)
+            if not data:
+                self.logger.warning("Standardized download returned empty content.")
+                return None
+            try:
+                content = data.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                self.logger.warning(f"UTF-8-SIG decoding failed for {sharepoint_url}, falling back to cp1252.")
+                content = data.decode('cp1252', errors='replace')
+            if content.strip():
                 self.logger.info(f"Standardized download successful: {len(content)} characters.")
                 return content
             else:
@@ -208,8 +337,25 @@ class EnhancedSharePointManager:
 
 class DealFormView(QWidget):
     status_updated = pyqtSignal(str)
+    # Carries InvalidationEvents for the reference indexes to the UI thread
+    reference_invalidated = pyqtSignal(object)
     MODULE_DISPLAY_NAME = "New Deal"
 
+    # Reference data type -> attribute holding its parsed rows.
+    REFERENCE_DATA_ATTRS = {
+        'customers': 'customers_data',
+        'salesmen': 'salesmen_data',
+        'products': 'equipment_products_data',
+        'parts': 'parts_data'
+    }
+    # Reference data type -> candidate names for its key column (first match wins).
+    REFERENCE_KEY_COLUMNS = {
+        'customers': ['Name', 'Customer Name', 'CustomerName'],
+        'salesmen': ['Name', 'Salesman Name', 'SalesmanName'],
+        'products': ['ProductCode', 'Product Code', 'Code'],
+        'parts': ['Part Number', 'Part No', 'Part #', 'PartNumber', 'Number']
+    }
+
     def __init__(self, module_name="DealForm", config=None, sharepoint_manager=None,
                  jd_quote_service=None, customer_linkage_client=None,
                  main_window=None, logger_instance=None, parent=None):
@@ -238,6 +384,9 @@ class DealFormView(QWidget):
         except OSError as e:
             self.logger.error(f"Error creating data directory {self._data_path}: {e}")
 
+        # Persisted Graph delta token; lets reloads skip CSVs that have not changed.
+        self.delta_sync = DriveDeltaSync(os.path.join(self._data_path, '.graph_delta_state.json'))
+
         self.sharepoint_direct_csv_urls = {
             'customers': 'https://briltd.sharepoint.com/sites/ISGandAMS/Shared%20Documents/App%20resources/customers.csv',
             'salesmen': 'https://briltd.sharepoint.com/sites/ISGandAMS/Shared%20Documents/App%20resources/salesmen.csv',
@@ -249,9 +398,18 @@ class DealFormView(QWidget):
         self.salesmen_data = {}
         self.equipment_products_data = {}
         self.parts_data = {}
+        get_resource_monitor().register_owner(self, 'customers_data', 'salesmen_data', 'equipment_products_data',
+                                              'parts_data', module=self.module_name)
         self.last_charge_to = ""
 
+        # Reference CSVs are downloaded and parsed in parallel; keep the fan-out small.
         self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max(1, int(self.config.get("REFERENCE_LOAD_CONCURRENCY", 3))))
+        self._reference_reload_pending = set()
+        self._reference_reload_failed = []
+        self._reference_reload_batch = []
+        self._reference_reload_queued = set()
+        self.last_reload_summary = {}
 
         if sharepoint_manager:
             self._initialize_enhanced_sharepoint_manager(sharepoint_manager)
@@ -259,6 +417,7 @@ class DealFormView(QWidget):
             self.logger.error("SharePoint manager is None. All SharePoint functionality will be disabled.")
 
         self.init_ui()
+        self._subscribe_reference_invalidation()
         self.load_initial_data()
 
         if self.main_window and hasattr(self.main_window, 'show_status_message'):
@@ -274,7 +433,7 @@ class DealFormView(QWidget):
              # Proactively fetch the ID on startup.
             self.sharepoint_manager_enhanced._get_sharepoint_drive_id()
 
-    def download_csv_via_graph_api(self, data_type: str) -> Optional[str]:
+    def download_csv_via_graph_api(self, data_type: str, item_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
         if not self.sharepoint_manager_enhanced:
             self.logger.error("No Enhanced SharePoint manager for Graph API download.")
             return None
@@ -285,75 +444,204 @@ class DealFormView(QWidget):
             return None
 
         self.logger.info(f"Initiating download for '{data_type}' via standardized download method.")
-        return self.sharepoint_manager_enhanced.download_file_content(sharepoint_url)
-
-    def reload_data_with_graph_api(self):
-        self.logger.info("Reloading all data using standardized Graph API (Drive ID) methods...")
-        reload_summary = {}
-        data_types_to_reload = ['customers', 'salesmen', 'products', 'parts']
-        any_successful_reload = False
-
-        for data_type in data_types_to_reload:
-            self.logger.info(f"--- Reloading '{data_type}' from Graph API ---")
-            content = self.download_csv_via_graph_api(data_type)
-
-            if content:
-                try:
-                    # Process content
-                    first_line_end = content.find('\n')
-                    header_line = content[:first_line_end] if first_line_end != -1 else content
-                    content_after_header = content[first_line_end + 1:] if first_line_end != -1 else ""
-
-                    if not header_line.strip():
-                        raise ValueError("Downloaded content has no header line.")
-
-                    header_reader = csv.reader(io.StringIO(header_line))
-                    raw_headers = next(header_reader, None)
-                    if not raw_headers:
-                        raise ValueError("Could not parse headers from downloaded content.")
-
-                    cleaned_headers = [header.lstrip('\ufeff').strip() for header in raw_headers]
-                    csv_file_like = io.StringIO(content_after_header)
-                    reader = csv.DictReader(csv_file_like, fieldnames=cleaned_headers)
-
-                    loader_map = {
-                        'customers': self._load_customers_data,
-                        'salesmen': self._load_salesmen_data,
-                        'products': self._load_equipment_data,
-                        'parts': self._load_parts_data
-                    }
-                    data_collection_map = {
-                        'customers': self.customers_data,
-                        'salesmen': self.salesmen_data,
-                        'products': self.equipment_products_data,
-                        'parts': self.parts_data
-                    }
-
-                    data_collection_map[data_type].clear()
-                    loader_map[data_type](reader, cleaned_headers)
-                    loaded_count = len(data_collection_map[data_type])
-
-                    reload_summary[data_type] = {'status': 'success', 'count': loaded_count}
-                    any_successful_reload = True
-                    self.logger.info(f"  Successfully processed {loaded_count} '{data_type}' records.")
-
-                    # Backup to local file
-                    local_file_name = self.config.get(f'{data_type.upper()}_CSV_FILE', f'{data_type}.csv')
-                    local_path = os.path.join(self._data_path, local_file_name)
-                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                    with open(local_path, 'w', encoding='utf-8', newline='') as f:
-                        f.write(content)
-                    self.logger.info(f"  Saved '{data_type}' backup to: {local_path}")
-
-                except Exception as e:
-                    self.logger.error(f"  Error processing/loading '{data_type}' content: {e}", exc_info=True)
-                    reload_summary[data_type] = {'status': 'error', 'message': str(e)}
-            else:
-                self.logger.warning(f"  No content downloaded for '{data_type}', skipping reload.")
-                reload_summary[data_type] = {'status': 'no_content'}
+        return self.sharepoint_manager_enhanced.download_file_content(sharepoint_url, item_metadata=item_metadata)
+
+    def _local_csv_path(self, data_type: str) -> str:
+        local_file_name = self.config.get(f'{data_type.upper()}_CSV_FILE', f'{data_type}.csv')
+        return os.path.join(self._data_path, local_file_name)
+
+    def _parse_csv_stream(self, data_type: str, chunks: Iterable[bytes]) -> Dict[str, CompactRecord]:
+        """Parse a CSV byte stream for data_type into a new collection, leaving the live one untouched."""
+        _, key_column, records = read_csv_records(iter_text_lines(chunks), self.REFERENCE_KEY_COLUMNS[data_type])
+        self.logger.debug(f"Parsed {len(records)} '{data_type}' records keyed by '{key_column}'")
+        return records
 
-        if any_successful_reload:
-            self._populate_autocompleters()
+    def _reference_types_to_download(self, data_types: List[str]) -> List[str]:
+        """
+        Use the drive delta feed to decide which reference CSVs must be downloaded.
+
+        Types whose items are unchanged since the stored delta token and that have a
+        local backup are served from _data_path instead. Without a usable token
+        (first run, expired token, delta failure) everything is downloaded.
+        """
+        manager = self.sharepoint_manager_enhanced
+        if not manager or not manager._get_sharepoint_drive_id():
+            return list(data_types)
+        access_token = getattr(manager.original_manager, 'access_token', None)
+        if not access_token:
+            return list(data_types)
+
+        # Always match against every reference type: the delta link committed after
+        # this reload moves past changes to types outside data_types as well.
+        tracked_paths = {}
+        for data_type in self.REFERENCE_DATA_ATTRS:
+            item_path = manager._get_item_path_from_sharepoint_url(self.sharepoint_direct_csv_urls.get(data_type, ''))
+            if item_path:
+                tracked_paths[data_type] = item_path
+
+        changed = self.delta_sync.changed_keys(manager.drive_id, access_token, tracked_paths)
+        if changed is None:
+            self.delta_sync.start_tracking(manager.drive_id, access_token)
+            return list(data_types)
+
+        # Changed types that are not reloaded now are forgotten, so the next pass reports them again.
+        skipped = changed.difference(data_types)
+        if skipped:
+            self.logger.info(f"Changed reference CSVs left for a later reload: {sorted(skipped)}")
+            self.delta_sync.forget_items(skipped)
+
+        return [data_type for data_type in data_types
+                if data_type in changed or data_type not in tracked_paths
+                or not os.path.exists(self._local_csv_path(data_type))]
+
+    def _plan_reference_reload(self, data_types: List[str]) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+        """Worker-thread step: decide what to download and resolve those items in one $batch."""
+        types_to_download = self._reference_types_to_download(data_types)
+        self.logger.info(f"Reference CSVs to download: {types_to_download or 'none (all unchanged)'}")
+
+        # Resolve the files to download in one $batch so each download goes straight to its downloadUrl.
+        item_metadata = {}
+        if self.sharepoint_manager_enhanced and types_to_download:
+            item_metadata = self.sharepoint_manager_enhanced.resolve_items(
+                {data_type: self.sharepoint_direct_csv_urls[data_type]
+                 for data_type in types_to_download if data_type in self.sharepoint_direct_csv_urls}
+            )
+        return types_to_download, item_metadata
+
+    def _fetch_reference_data(self, data_type: str, download: bool,
+                              item_metadata: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any], Optional[Dict], Optional[Dict]]:
+        """
+        Worker-thread step for one reference type: load the local copy (if unchanged) or
+        download it, then parse into a fresh collection.
+
+        Returns:
+            (data_type, summary, parsed collection or None, item metadata to record)
+        """
+        local_path = self._local_csv_path(data_type)
+
+        if not download:
+            self.logger.info(f"--- '{data_type}' unchanged on SharePoint; loading local copy {local_path} ---")
+            try:
+                with open(local_path, 'rb') as f:
+                    collection = self._parse_csv_stream(data_type, iter(lambda: f.read(65536), b""))
+                return data_type, {'status': 'unchanged', 'count': len(collection)}, collection, None
+            except Exception as e:
+                self.logger.warning(f"  Local copy for '{data_type}' unusable ({e}); downloading instead.")
+                if self.sharepoint_manager_enhanced:
+                    item_metadata = self.sharepoint_manager_enhanced.resolve_items(
+                        {data_type: self.sharepoint_direct_csv_urls[data_type]}).get(data_type)
+
+        sharepoint_url = self.sharepoint_direct_csv_urls.get(data_type)
+        if not self.sharepoint_manager_enhanced or not sharepoint_url:
+            self.logger.warning(f"  No SharePoint source for '{data_type}', skipping reload.")
+            return data_type, {'status': 'no_content'}, None, None
+
+        # Rows are parsed as chunks arrive; the same chunks are written to the local backup.
+        self.logger.info(f"--- Reloading '{data_type}' from Graph API ---")
+        partial_path = f"{local_path}.part"
+        try:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            with open(partial_path, 'wb') as backup:
+                def tee(chunks):
+                    for chunk in chunks:
+                        backup.write(chunk)
+                        yield chunk
+                collection = self._parse_csv_stream(
+                    data_type, tee(self.sharepoint_manager_enhanced.iter_file_chunks(sharepoint_url, item_metadata)))
+            os.replace(partial_path, local_path)
+            self.logger.info(f"  Successfully processed {len(collection)} '{data_type}' records; backup saved to: {local_path}")
+        except SharePointAuthenticationError as e:
+            self.logger.warning(f"  No content downloaded for '{data_type}' ({e}), skipping reload.")
+            self._discard_file(partial_path)
+            return data_type, {'status': 'no_content'}, None, None
+        except Exception as e:
+            self.logger.error(f"  Error processing/loading '{data_type}' content: {e}", exc_info=True)
+            self._discard_file(partial_path)
+            return data_type, {'status': 'error', 'message': str(e)}, None, None
+
+        return data_type, {'status': 'success', 'count': len(collection)}, collection, item_metadata
+
+    @staticmethod
+    def _discard_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def reload_data_with_graph_api(self, data_types: Optional[List[str]] = None):
+        """
+        Reload the reference CSVs in the background.
+
+        Planning (delta query and $batch resolve) runs on one worker, then each type is
+        loaded on its own worker from self.thread_pool. Each collection is swapped in and
+        its completers refreshed as soon as that type lands, so small files are usable
+        before the parts file finishes. The per-type summary ends up in last_reload_summary.
+
+        Args:
+            data_types: Reference types to reload (all by default). Types requested while
+                a reload is running are reloaded once it finishes.
+        """
+        data_types_to_reload = [t for t in (data_types or self.REFERENCE_DATA_ATTRS) if t in self.REFERENCE_DATA_ATTRS]
+        if self._reference_reload_pending:
+            self.logger.info(f"Reference data reload already in progress ({sorted(self._reference_reload_pending)}); "
+                             f"queueing {data_types_to_reload}.")
+            self._reference_reload_queued.update(data_types_to_reload)
+            return
+        if not data_types_to_reload:
+            return
+
+        self.logger.info(f"Reloading {data_types_to_reload} using standardized Graph API (Drive ID) methods...")
+        self._reference_reload_pending = set(data_types_to_reload)
+        self._reference_reload_batch = data_types_to_reload
+        self._reference_reload_failed = []
+        self.last_reload_summary = {}
+
+        worker = Worker(self._plan_reference_reload, data_types_to_reload)
+        worker.signals.result.connect(lambda plan: self._dispatch_reference_loads(data_types_to_reload, *plan))
+        worker.signals.error.connect(lambda err: self._on_reference_plan_error(data_types_to_reload, err))
+        self.thread_pool.start(worker)
+
+    def _on_reference_plan_error(self, data_types: List[str], error_info):
+        self.logger.error(f"Planning reference data reload failed, downloading everything: {error_info[1]}")
+        self._dispatch_reference_loads(data_types, list(data_types), {})
+
+    def _dispatch_reference_loads(self, data_types: List[str], types_to_download: List[str],
+                                  item_metadata: Dict[str, Dict[str, Any]]):
+        # Local copies first, then downloads smallest-first so the quick ones land early.
+        ordered = sorted(data_types, key=lambda t: (t in types_to_download,
+                                                    (item_metadata.get(t) or {}).get('size') or 0))
+        for data_type in ordered:
+            worker = Worker(self._fetch_reference_data, data_type,
+                            data_type in types_to_download, item_metadata.get(data_type))
+            worker.signals.result.connect(self._on_reference_data_loaded)
+            worker.signals.error.connect(
+                lambda err, data_type=data_type: self._on_reference_data_loaded(
+                    (data_type, {'status': 'error', 'message': str(err[1])}, None, None)))
+            self.thread_pool.start(worker)
+
+    def _on_reference_data_loaded(self, result):
+        """UI-thread step: swap in one type's collection and refresh only its completers."""
+        data_type, summary, collection, item_metadata = result
+        self.last_reload_summary[data_type] = summary
+
+        if collection is not None:
+            setattr(self, self.REFERENCE_DATA_ATTRS[data_type], collection)
+            self._populate_autocompleters([data_type])
+            if summary.get('status') == 'success':
+                self.delta_sync.record_items({data_type: item_metadata})
+        else:
+            self._reference_reload_failed.append(data_type)
+
+        self._reference_reload_pending.discard(data_type)
+        if not self._reference_reload_pending:
+            self._finish_reference_reload()
+
+    def _finish_reference_reload(self):
+        # Failed types are forgotten so the next delta pass downloads them again.
+        self.delta_sync.forget_items(self._reference_reload_failed)
+        self.delta_sync.commit()
+
+        if len(self._reference_reload_failed) < len(self._reference_reload_batch):
             msg = "✅ Data reload from SharePoint successful."
             self._show_status_message(msg, 7000)
             self.logger.info(msg)
@@ -362,7 +650,56 @@ class DealFormView(QWidget):
             self._show_status_message(msg, 7000)
             self.logger.warning(msg)
 
-        return reload_summary
+        if self._reference_reload_queued:
+            queued = [t for t in self.REFERENCE_DATA_ATTRS if t in self._reference_reload_queued]
+            self._reference_reload_queued = set()
+            self.reload_data_with_graph_api(queued)
+
+    def _subscribe_reference_invalidation(self):
+        """Follow invalidations of the reference CSVs (e.g. saves in the CSV editors)."""
+        bus = get_invalidation_bus()
+        self.reference_invalidated.connect(self._on_reference_invalidated)
+        tokens = [bus.subscribe(index_key("deal_form", data_type), self.reference_invalidated.emit)
+                  for data_type in self.REFERENCE_DATA_ATTRS]
+        self.destroyed.connect(lambda *args: [bus.unsubscribe(token) for token in tokens])
+
+    def _on_reference_invalidated(self, event):
+        """
+        UI-thread step: update one reference collection after its CSV changed.
+
+        The publisher's row diff is applied to the live collection when it can be; otherwise
+        the collection is rebuilt from the full table in the event. Without either, only
+        that type is reloaded.
+        """
+        data_type = event.key.rsplit('.', 1)[-1]
+        attr = self.REFERENCE_DATA_ATTRS.get(data_type)
+        if attr is None:
+            return
+        detail = event.detail if isinstance(event.detail, dict) else {}
+        candidates = self.REFERENCE_KEY_COLUMNS[data_type]
+        collection = None
+
+        diff = detail.get('diff')
+        current = getattr(self, attr)
+        if diff is not None and current:
+            key_column = find_header([column.strip() for column in diff.columns], candidates)
+            if key_column is not None:
+                collection = patch_records(current, diff, key_column)
+        how = f"patched {diff.changed_rows} row(s)" if collection is not None else "rebuilt"
+        if collection is None and detail.get('columns') and detail.get('rows') is not None:
+            try:
+                _, _, collection = build_records(detail['columns'], detail['rows'], candidates)
+            except ValueError as e:
+                self.logger.warning(f"Can't index '{data_type}' from the {event.reason} event: {e}")
+
+        if collection is None:
+            self.logger.info(f"'{data_type}' invalidated ({event.reason}); reloading it.")
+            self.reload_data_with_graph_api([data_type])
+            return
+
+        setattr(self, attr, collection)
+        self._populate_autocompleters([data_type])
+        self.logger.info(f"'{data_type}' reference data {how} after {event.reason}; {len(collection)} records.")
 
     def debug_sharepoint_graph_api(self):
         # This method can be simplified or removed as the core logic is now unified.
@@ -416,10 +753,10 @@ class DealFormView(QWidget):
         self.equipment_products_data.clear()
         self.parts_data.clear()
 
-        # The reload method now uses the standardized download logic
+        # The reload runs in the background; completers fill in as each type arrives.
         self.reload_data_with_graph_api()
 
-        self.logger.info("Finished initial data loading sequence.")
+        self.logger.info("Initial data loading started.")
 
     # All _load_*_data and other UI methods remain the same
     # ... (rest of the file from the previous version)
@@ -458,7 +795,7 @@ class DealFormView(QWidget):
             return False
 
     def _load_customers_data(self, reader, headers):
-        name_key = self._find_header_key(headers, ['Name', 'Customer Name', 'CustomerName'])
+        name_key = self._find_header_key(headers, self.REFERENCE_KEY_COLUMNS['customers'])
         if not name_key:
             self.logger.error(f"Could not find suitable 'Name' column in customers CSV. Headers: {headers}")
             return
@@ -471,7 +808,7 @@ class DealFormView(QWidget):
         self.logger.info(f"Loaded {count} customers")
 
     def _load_salesmen_data(self, reader, headers):
-        name_key = self._find_header_key(headers, ['Name', 'Salesman Name', 'SalesmanName'])
+        name_key = self._find_header_key(headers, self.REFERENCE_KEY_COLUMNS['salesmen'])
         if not name_key:
             self.logger.error(f"Could not find suitable 'Name' column in salesmen CSV. Headers: {headers}")
             return
@@ -484,7 +821,7 @@ class DealFormView(QWidget):
         self.logger.info(f"Loaded {count} salespeople")
 
     def _load_equipment_data(self, reader, headers):
-        code_key = self._find_header_key(headers, ['ProductCode', 'Product Code', 'Code'])
+        code_key = self._find_header_key(headers, self.REFERENCE_KEY_COLUMNS['products'])
         if not code_key:
             self.logger.error(f"Could not find suitable 'ProductCode' column in products CSV. Headers: {headers}")
             return
@@ -497,7 +834,7 @@ class DealFormView(QWidget):
         self.logger.info(f"Loaded {count} equipment products")
 
     def _load_parts_data(self, reader, headers):
-        number_key_candidates = ['Part Number', 'Part No', 'Part #', 'PartNumber', 'Number']
+        number_key_candidates = self.REFERENCE_KEY_COLUMNS['parts']
         number_key = self._find_header_key(headers, number_key_candidates)
         if not number_key:
             self.logger.error(f"Could not find suitable part number column in parts CSV. Headers: {headers}. Candidates: {number_key_candidates}")
@@ -525,55 +862,72 @@ class DealFormView(QWidget):
         self.logger.warning(f"No match found for any of {possible_keys} in actual CSV headers {headers}")
         return None
 
-    def _populate_autocompleters(self):
-        try:
-            customer_names = list(self.customers_data.keys())
-            if hasattr(self, 'customer_name_completer'):
-                customer_model = QStringListModel(customer_names)
-                self.customer_name_completer.setModel(customer_model)
-            self.logger.debug(f"Populated customer completer with {len(customer_names)} items")
-            salesperson_names = list(self.salesmen_data.keys())
-            if hasattr(self, 'salesperson_completer'):
-                salesperson_model = QStringListModel(salesperson_names)
-                self.salesperson_completer.setModel(salesperson_model)
-            self.logger.debug(f"Populated salesperson completer with {len(salesperson_names)} items")
-            product_names = []
-            product_codes = []
-            for product_code, product_info in self.equipment_products_data.items():
-                product_codes.append(product_code)
-                name_key = self._find_key_case_insensitive(product_info, "ProductName")
-                if name_key and product_info.get(name_key):
-                    product_names.append(product_info[name_key])
-            if hasattr(self, 'equipment_product_name_completer'):
-                product_name_model = QStringListModel(list(set(product_names)))
-                self.equipment_product_name_completer.setModel(product_name_model)
-            if hasattr(self, 'product_code_completer'):
-                product_code_model = QStringListModel(list(set(product_codes)))
-                self.product_code_completer.setModel(product_code_model)
-            if hasattr(self, 'trade_name_completer'):
-                trade_model = QStringListModel(list(set(product_names)))
-                self.trade_name_completer.setModel(trade_model)
-            self.logger.debug(f"Populated equipment/trade completers: {len(product_names)} names, {len(product_codes)} codes")
-            part_numbers = []
-            part_names = []
-            for part_number, part_info in self.parts_data.items():
-                part_numbers.append(part_number)
-                name_key = self._find_key_case_insensitive(part_info, "Part Name") or \
-                           self._find_key_case_insensitive(part_info, "Description")
-                if name_key and part_info.get(name_key):
-                    part_names.append(part_info[name_key])
-            if hasattr(self, 'part_number_completer'):
-                part_number_model = QStringListModel(list(set(part_numbers)))
-                self.part_number_completer.setModel(part_number_model)
-            if hasattr(self, 'part_name_completer'):
-                part_name_model = QStringListModel(list(set(part_names)))
-                self.part_name_completer.setModel(part_name_model)
-            self.logger.debug(f"Populated parts completers: {len(part_numbers)} numbers, {len(part_names)} names")
-        except Exception as e:
-            self.logger.error(f"Error populating autocompleters: {e}", exc_info=True)
+    def _populate_autocompleters(self, data_types: Optional[List[str]] = None):
+        """Refresh the completers fed by data_types (all reference types by default)."""
+        populators = {
+            'customers': self._populate_customer_completers,
+            'salesmen': self._populate_salesperson_completers,
+            'products': self._populate_equipment_completers,
+            'parts': self._populate_parts_completers
+        }
+        for data_type in (data_types or populators):
+            try:
+                populators[data_type]()
+            except Exception as e:
+                self.logger.error(f"Error populating '{data_type}' autocompleters: {e}", exc_info=True)
+
+    def _populate_customer_completers(self):
+        customer_names = list(self.customers_data.keys())
+        if hasattr(self, 'customer_name_completer'):
+            customer_model = QStringListModel(customer_names)
+            self.customer_name_completer.setModel(customer_model)
+        self.logger.debug(f"Populated customer completer with {len(customer_names)} items")
+
+    def _populate_salesperson_completers(self):
+        salesperson_names = list(self.salesmen_data.keys())
+        if hasattr(self, 'salesperson_completer'):
+            salesperson_model = QStringListModel(salesperson_names)
+            self.salesperson_completer.setModel(salesperson_model)
+        self.logger.debug(f"Populated salesperson completer with {len(salesperson_names)} items")
+
+    def _populate_equipment_completers(self):
+        product_names = []
+        product_codes = []
+        for product_code, product_info in self.equipment_products_data.items():
+            product_codes.append(product_code)
+            name_key = self._find_key_case_insensitive(product_info, "ProductName")
+            if name_key and product_info.get(name_key):
+                product_names.append(product_info[name_key])
+        if hasattr(self, 'equipment_product_name_completer'):
+            product_name_model = QStringListModel(list(set(product_names)))
+            self.equipment_product_name_completer.setModel(product_name_model)
+        if hasattr(self, 'product_code_completer'):
+            product_code_model = QStringListModel(list(set(product_codes)))
+            self.product_code_completer.setModel(product_code_model)
+        if hasattr(self, 'trade_name_completer'):
+            trade_model = QStringListModel(list(set(product_names)))
+            self.trade_name_completer.setModel(trade_model)
+        self.logger.debug(f"Populated equipment/trade completers: {len(product_names)} names, {len(product_codes)} codes")
+
+    def _populate_parts_completers(self):
+        part_numbers = []
+        part_names = []
+        for part_number, part_info in self.parts_data.items():
+            part_numbers.append(part_number)
+            name_key = self._find_key_case_insensitive(part_info, "Part Name") or \
+                       self._find_key_case_insensitive(part_info, "Description")
+            if name_key and part_info.get(name_key):
+                part_names.append(part_info[name_key])
+        if hasattr(self, 'part_number_completer'):
+            part_number_model = QStringListModel(list(set(part_numbers)))
+            self.part_number_completer.setModel(part_number_model)
+        if hasattr(self, 'part_name_completer'):
+            part_name_model = QStringListModel(list(set(part_names)))
+            self.part_name_completer.setModel(part_name_model)
+        self.logger.debug(f"Populated parts completers: {len(part_numbers)} numbers, {len(part_names)} names")
 
     def _find_key_case_insensitive(self, data_dict: Dict, target_key: str) -> Optional[str]:
-        if not isinstance(data_dict, dict) or not isinstance(target_key, str):
+        if not isinstance(data_dict, Mapping) or not isinstance(target_key, str):
             self.logger.warning(f"Invalid input to _find_key_case_insensitive: data_dict type {type(data_dict)}, target_key type {type(target_key)}")
             return None
         # Ensure target_key is a string before calling lower() and strip()
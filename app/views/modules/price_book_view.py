@@ -1,6 +1,7 @@
 # BRIDeal_refactored/app/views/modules/price_book_view.py
 import logging
 import pandas as pd
+from datetime import datetime, timedelta
 import io 
 import json
 import os
@@ -15,16 +16,19 @@ from PyQt6.QtGui import QFont, QColor, QDoubleValidator
 
 # Refactored local imports
 from app.views.modules.base_view_module import BaseViewModule
+from app.core.invalidation import cache_key
 from app.core.config import BRIDealConfig, get_config 
 from app.utils.cache_handler import CacheHandler
-from app.core.threading import Worker
+from app.utils.freshness import diff_frames
 from app.services.integrations.sharepoint_manager import SharePointExcelManager 
+from app.views.widgets.table_patch import patch_table_widget
 
 logger = logging.getLogger(__name__)
 
 # Configuration keys or constants
 CONFIG_KEY_PRICEBOOK_SHEET_NAME = "PRICEBOOK_SHAREPOINT_SHEET_NAME" 
 DEFAULT_PRICEBOOK_SHEET_NAME = "App Source" # Fallback based on previous logs
+CONFIG_KEY_PRICEBOOK_KEY_COLUMN = "PRICEBOOK_KEY_COLUMN" # Column identifying a row; first column if unset
 PRICEBOOK_CACHE_KEY = "price_book_data"
 
 class PriceBookTableModel(QSortFilterProxyModel):
@@ -363,8 +367,10 @@ class PriceBookView(BaseViewModule):
 
         self.thread_pool = QThreadPool.globalInstance()
         self.price_book_data = pd.DataFrame()
+        self.report_memory('price_book_data')
 
         self._init_ui()
+        self.subscribe_invalidation(cache_key(PRICEBOOK_CACHE_KEY))
         self.load_module_data()
 
     def _init_ui(self):
@@ -480,36 +486,49 @@ class PriceBookView(BaseViewModule):
     def get_icon_name(self): 
         return "price_book_icon.png"
         
-    def load_module_data(self):
-        """Load price book data, trying cache first then SharePoint."""
+    def load_module_data(self, force_refresh: bool = False):
+        """Render cached price book data immediately and revalidate it from SharePoint when stale."""
         super().load_module_data()
         self.logger.info("Loading price book data...")
+        if self.cache_handler and not self.cache_handler.has_frame(PRICEBOOK_CACHE_KEY, subfolder="app_data"):
+            self._load_legacy_json_cache()
+        if self.price_book_data.empty:
+            self._show_status_row("📊 Loading price book data...")
+
+        self.load_with_revalidation(
+            PRICEBOOK_CACHE_KEY,
+            self._fetch_price_book_from_sharepoint,
+            render=self._price_book_data_received,
+            apply_fresh=self._apply_fresh_price_book,
+            on_error=self._handle_data_load_error,
+            frame=True,
+            force=force_refresh,
+            store=lambda df: not df.empty
+        )
+
+    def _show_status_row(self, message: str):
         self.search_input.setEnabled(False)
         self.price_table.setRowCount(1) 
         self.price_table.setColumnCount(1) 
         self.price_table.setHorizontalHeaderLabels(["Status"])
-        self.price_table.setItem(0, 0, QTableWidgetItem("📊 Loading price book data..."))
-
-        cached_data_json = self.cache_handler.get(PRICEBOOK_CACHE_KEY, subfolder="app_data") if self.cache_handler else None
-        if cached_data_json:
-            try:
-                df = pd.read_json(io.StringIO(cached_data_json), orient='split')
-                self.price_book_data = df
-                self._populate_table(df)
-                self.search_input.setEnabled(True)
-                self.logger.info("Price book data loaded from cache.")
-                return 
-            except Exception as e:
-                self.logger.warning(f"Failed to load price book from cached JSON: {e}. Fetching fresh.")
-        
-        if not self.sharepoint_manager:
-            self._handle_data_load_error(("", "SharePointManager not available.", ""))
-            return
+        self.price_table.setItem(0, 0, QTableWidgetItem(message))
 
-        worker = Worker(self._fetch_price_book_from_sharepoint)
-        worker.signals.result.connect(self._price_book_data_received)
-        worker.signals.error.connect(self._handle_data_load_error)
-        self.thread_pool.start(worker)
+    def _load_legacy_json_cache(self):
+        """Read a cache entry written as a DataFrame JSON string and convert it to a frame entry."""
+        cached_data_json = self.cache_handler.get(PRICEBOOK_CACHE_KEY, subfolder="app_data")
+        if not cached_data_json:
+            return None
+        try:
+            df = pd.read_json(io.StringIO(cached_data_json), orient='split')
+        except Exception as e:
+            self.logger.warning(f"Failed to load price book from cached JSON: {e}. Fetching fresh.")
+            return None
+        # Keep the original write time so an old entry is still revalidated as stale
+        age = self.cache_handler.get_age(PRICEBOOK_CACHE_KEY, subfolder="app_data") or 0.0
+        self.cache_handler.delete(PRICEBOOK_CACHE_KEY, subfolder="app_data")
+        self.cache_handler.set_frame(PRICEBOOK_CACHE_KEY, df, subfolder="app_data",
+                                     timestamp=datetime.now() - timedelta(seconds=age))
+        return df
 
     def _fetch_price_book_from_sharepoint(self, status_callback=None):
         if status_callback:
@@ -534,19 +553,37 @@ class PriceBookView(BaseViewModule):
 
     def _price_book_data_received(self, df: pd.DataFrame):
         self.price_book_data = df
-        if not df.empty and self.cache_handler:
-            try:
-                df_json = df.to_json(orient='split', date_format='iso') 
-                self.cache_handler.set(PRICEBOOK_CACHE_KEY, df_json, subfolder="app_data")
-                self.logger.info("Price book data fetched and cached.")
-            except Exception as e:
-                self.logger.error(f"Error caching price book data: {e}")
-        elif df.empty:
-            self.logger.info("Fetched price book data is empty.")
+        if df.empty:
+            self.logger.info("Price book data is empty.")
             
         self._populate_table(df)
         self.search_input.setEnabled(True)
 
+    def _apply_fresh_price_book(self, df: pd.DataFrame):
+        """Patch the displayed table with revalidated data, repopulating only if the shape changed."""
+        key_column = self.config.get(CONFIG_KEY_PRICEBOOK_KEY_COLUMN, None) if self.config else None
+        diff = None if self.price_book_data.empty or df.empty else diff_frames(self.price_book_data, df, key_column)
+        if diff is None:
+            self._price_book_data_received(df)
+            return
+
+        self.price_book_data = df
+        if diff.is_empty():
+            self.logger.info("Price book is up to date.")
+            return
+        patch_table_widget(self.price_table, diff, self._make_item)
+        self._filter_table(self.search_input.text())
+        self.search_input.setEnabled(True)
+        self.logger.info(f"Price book updated in place: {diff}")
+
+    def _make_item(self, col_name: str, item_text: str) -> QTableWidgetItem:
+        table_item = QTableWidgetItem(item_text)
+        # Highlight price columns
+        if any(price_word in col_name.lower() for price_word in ['price', 'cost', 'amount']):
+            table_item.setForeground(QColor("#155724"))
+            table_item.setBackground(QColor("#f8fff8"))
+        return table_item
+
     def _populate_table(self, df: pd.DataFrame):
         self.price_table.setRowCount(0) 
         if df.empty:
@@ -568,14 +605,7 @@ class PriceBookView(BaseViewModule):
             for j, col_name in enumerate(actual_columns):
                 value = row[col_name]
                 item_text = str(value) if pd.notna(value) else ""
-                table_item = QTableWidgetItem(item_text)
-                
-                # Highlight price columns
-                if any(price_word in col_name.lower() for price_word in ['price', 'cost', 'amount']):
-                    table_item.setForeground(QColor("#155724"))
-                    table_item.setBackground(QColor("#f8fff8"))
-                
-                self.price_table.setItem(i, j, table_item)
+                self.price_table.setItem(i, j, self._make_item(col_name, item_text))
         
         # Set specific column widths for common columns
         for j, col_name in enumerate(actual_columns):
@@ -628,23 +658,18 @@ class PriceBookView(BaseViewModule):
         self.search_input.setEnabled(False)
 
     def refresh_module_data(self):
-        super().refresh_module_data() 
+        """Revalidate from SharePoint, keeping the current table on screen until fresh data arrives."""
         self.logger.info("Refreshing price book data triggered.")
-        self.search_input.setEnabled(False)
-        self.price_table.setRowCount(1)
-        self.price_table.setColumnCount(1) 
-        self.price_table.setHorizontalHeaderLabels(["Status"])
-        self.price_table.setItem(0, 0, QTableWidgetItem("🔄 Refreshing data from SharePoint..."))
 
         if not self.sharepoint_manager:
-            self._handle_data_load_error(("", "SharePointManager not available for refresh.", ""))
-            return
-        
-        if not hasattr(self.sharepoint_manager, 'is_properly_configured') or not self.sharepoint_manager.is_properly_configured:
-            self._handle_data_load_error(("", "SharePointManager is not properly configured (check credentials in .env).", ""))
+            message = "SharePointManager not available for refresh."
+        elif not getattr(self.sharepoint_manager, 'is_properly_configured', False):
+            message = "SharePointManager is not properly configured (check credentials in .env)."
+        else:
+            self.load_module_data(force_refresh=True)
             return
 
-        worker = Worker(self._fetch_price_book_from_sharepoint) 
-        worker.signals.result.connect(self._price_book_data_received)
-        worker.signals.error.connect(self._handle_data_load_error)
-        self.thread_pool.start(worker)
\ No newline at end of file
+        if self.price_book_data.empty:
+            self._handle_data_load_error(("", message, ""))
+        else:
+            self.show_notification(message, "warning")
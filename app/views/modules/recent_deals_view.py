@@ -13,9 +13,9 @@ from PyQt6.QtCore import Qt, pyqtSignal, QSize, QThreadPool, QTimer
 from PyQt6.QtGui import QFont, QIcon, QColor
 
 from app.views.modules.base_view_module import BaseViewModule
+from app.core.invalidation import RECENT_DEALS_FILE, cache_key, get_invalidation_bus
 from app.core.config import BRIDealConfig, get_config
 from app.utils.cache_handler import CacheHandler
-from app.core.threading import Worker
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +69,7 @@ class RecentDealsView(BaseViewModule):
         self.filtered_deals_data: List[Dict[str, Any]] = []
         
         self._init_ui()
+        self.subscribe_invalidation(cache_key(RECENT_DEALS_CACHE_KEY))
         self.load_module_data()
 
     def get_icon_name(self) -> str:
@@ -221,51 +222,40 @@ class RecentDealsView(BaseViewModule):
         main_layout.addWidget(self.status_label)
 
 
-    def load_module_data(self):
-        """Load recent deals data with enhanced tracking"""
+    def load_module_data(self, force_refresh: bool = False):
+        """Show cached recent deals immediately and re-read the deals log in the background when stale."""
         super().load_module_data()
         self.logger.info("Loading recent deals data...")
-        self.deals_list_widget.clear()
-        self.summary_label.setText("Loading...")
-        
-        # Show loading indicator
-        loading_item = QListWidgetItem("📊 Loading recent deals...")
-        loading_item.setData(Qt.ItemDataRole.UserRole, {"type": "placeholder"})
-        loading_item.setFlags(loading_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-        self.deals_list_widget.addItem(loading_item)
 
-        # Load data in background
-        worker = Worker(self._fetch_deals_from_source)
-        worker.signals.result.connect(self._populate_deals_list)
-        worker.signals.error.connect(self._handle_data_load_error)
-        self.thread_pool.start(worker)
+        # A deals log written after the cache entry makes the cache out of date whatever its age
+        if not force_refresh and self.cache_handler and os.path.exists(self.recent_deals_file):
+            cache_age = self.cache_handler.get_age(RECENT_DEALS_CACHE_KEY, subfolder="app_data")
+            file_age = datetime.now().timestamp() - os.path.getmtime(self.recent_deals_file)
+            force_refresh = cache_age is not None and file_age < cache_age
+
+        if not self.recent_deals_data:
+            self.deals_list_widget.clear()
+            self.summary_label.setText("Loading...")
+            
+            # Show loading indicator
+            loading_item = QListWidgetItem("📊 Loading recent deals...")
+            loading_item.setData(Qt.ItemDataRole.UserRole, {"type": "placeholder"})
+            loading_item.setFlags(loading_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
+            self.deals_list_widget.addItem(loading_item)
+
+        self.load_with_revalidation(
+            RECENT_DEALS_CACHE_KEY,
+            self._fetch_deals_from_source,
+            render=self._populate_deals_list,
+            apply_fresh=self._apply_fresh_deals,
+            on_error=self._handle_data_load_error,
+            force=force_refresh
+        )
 
     def _fetch_deals_from_source(self, status_callback=None) -> List[Dict[str, Any]]:
         """Fetch deals that have actually generated CSV or email output."""
         if status_callback:
             status_callback.emit("Fetching completed deals...")
-        
-        # Try cache first
-        cached_deals = None
-        cache_valid = False
-        
-        if self.cache_handler:
-            try:
-                cached_deals = self.cache_handler.get(RECENT_DEALS_CACHE_KEY, subfolder="app_data")
-                if cached_deals and isinstance(cached_deals, list):
-                    # Check if cache is recent (less than 5 minutes old)
-                    cache_time = self.cache_handler.get(f"{RECENT_DEALS_CACHE_KEY}_timestamp", subfolder="app_data")
-                    if cache_time:
-                        cache_age = datetime.now().timestamp() - cache_time
-                        if cache_age < 300:  # 5 minutes
-                            cache_valid = True
-            except Exception as e:
-                self.logger.warning(f"Error reading from cache: {e}")
-                cached_deals = None
-        
-        if cache_valid and cached_deals:
-            self.logger.info("Loaded recent deals from cache.")
-            return cached_deals
 
         # Load from file
         if not os.path.exists(self.recent_deals_file):
@@ -295,14 +285,6 @@ class RecentDealsView(BaseViewModule):
             # Limit to max deals
             limited_deals = completed_deals[:self.max_deals_to_display]
             
-            # Cache the results with proper error handling
-            if self.cache_handler:
-                try:
-                    self.cache_handler.set(RECENT_DEALS_CACHE_KEY, limited_deals, subfolder="app_data")
-                    self.cache_handler.set(f"{RECENT_DEALS_CACHE_KEY}_timestamp", datetime.now().timestamp(), subfolder="app_data")
-                except Exception as e:
-                    self.logger.warning(f"Error caching deals data: {e}")
-            
             self.logger.info(f"Loaded {len(limited_deals)} completed deals from {self.recent_deals_file}")
             return limited_deals
             
@@ -337,6 +319,24 @@ class RecentDealsView(BaseViewModule):
         self.recent_deals_data = deals_data
         self._apply_filters()
 
+    def _apply_fresh_deals(self, deals_data: List[Dict[str, Any]]):
+        """Update the displayed list with re-read deals, leaving it untouched if nothing changed."""
+        if deals_data == self.recent_deals_data:
+            self.logger.info("Recent deals are up to date.")
+            return
+        selected = self.deals_list_widget.currentItem()
+        selected_data = selected.data(Qt.ItemDataRole.UserRole) if selected else None
+        self._populate_deals_list(deals_data)
+
+        # Keep the selection on the same deal
+        if selected_data and "deal_data" in selected_data:
+            for row in range(self.deals_list_widget.count()):
+                item_data = self.deals_list_widget.item(row).data(Qt.ItemDataRole.UserRole)
+                if item_data and item_data.get("deal_data") == selected_data["deal_data"]:
+                    self.deals_list_widget.setCurrentRow(row)
+                    break
+        self.logger.info(f"Recent deals updated: {len(deals_data)} deals.")
+
     def _apply_filters(self):
         """Apply the current filters to the deals list"""
         if not self.recent_deals_data:
@@ -660,39 +660,9 @@ class RecentDealsView(BaseViewModule):
             QMessageBox.critical(self, "Export Error", f"Failed to export deals list:\n{e}")
 
     def refresh_module_data(self):
-        """Refresh the deals list with proper cache clearing"""
-        super().refresh_module_data()
+        """Re-read the deals log, keeping the current list on screen until it arrives."""
         self.logger.info("Refreshing recent deals list...")
-        
-        # Clear cache with proper error handling - use clear_cache instead of delete
-        if self.cache_handler:
-            try:
-                # Use clear_cache method instead of delete to avoid AttributeError
-                if hasattr(self.cache_handler, 'clear_cache'):
-                    self.cache_handler.clear_cache(subfolder="app_data")
-                elif hasattr(self.cache_handler, 'clear'):
-                    # Alternative method name
-                    self.cache_handler.clear(subfolder="app_data")
-                else:
-                    # Manual cache clearing if no clear method exists
-                    cache_dir = self.cache_handler.cache_dir
-                    if cache_dir:
-                        app_data_cache = os.path.join(cache_dir, "app_data")
-                        if os.path.exists(app_data_cache):
-                            cache_files = [
-                                os.path.join(app_data_cache, f"{RECENT_DEALS_CACHE_KEY}.json"),
-                                os.path.join(app_data_cache, f"{RECENT_DEALS_CACHE_KEY}_timestamp.json")
-                            ]
-                            for cache_file in cache_files:
-                                if os.path.exists(cache_file):
-                                    os.remove(cache_file)
-                                    self.logger.debug(f"Removed cache file: {cache_file}")
-                
-                self.logger.info("Cache cleared successfully")
-            except Exception as e:
-                self.logger.warning(f"Error clearing cache (non-critical): {e}")
-        
-        self.load_module_data()
+        self.load_module_data(force_refresh=True)
 
     def show_notification(self, message: str, level: str = "info"):
         """Show notification message"""
@@ -750,6 +720,7 @@ def _save_deal_to_recent_enhanced(deal_data_dict: Dict[str, Any], csv_generated:
         with open(recent_deals_file, 'w', encoding='utf-8') as f:
             json.dump(recent_deals_list, f, indent=2)
         logger_instance.info(f"Deal saved to recent deals log. Count: {len(recent_deals_list)}.")
+        get_invalidation_bus().invalidate(RECENT_DEALS_FILE, reason="deal_saved")
         return True
     except Exception as e:
         logger_instance.error(f"Error saving to recent deals file '{recent_deals_file}': {e}", exc_info=True)
@@ -1,6 +1,7 @@
 # bridleal_refactored/app/views/modules/used_inventory_view.py
 import logging
 import pandas as pd
+from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit,
@@ -11,10 +12,12 @@ from PyQt6.QtGui import QFont, QColor
 
 # Refactored local imports
 from app.views.modules.base_view_module import BaseViewModule
+from app.core.invalidation import cache_key
 from app.core.config import BRIDealConfig, get_config # Provided by BaseViewModule
 from app.utils.cache_handler import CacheHandler
-from app.core.threading import Worker
+from app.utils.freshness import diff_frames
 from app.services.integrations.sharepoint_manager import SharePointExcelManager 
+from app.views.widgets.table_patch import patch_table_widget
 import io
 logger = logging.getLogger(__name__)
 
@@ -66,8 +69,10 @@ class UsedInventoryView(BaseViewModule):
 
         self.thread_pool = QThreadPool.globalInstance()
         self.inventory_data = pd.DataFrame() # Store data as DataFrame
+        self.report_memory('inventory_data')
 
         self._init_ui()
+        self.subscribe_invalidation(cache_key(USED_INVENTORY_CACHE_KEY))
         self.load_module_data()
 
     def _init_ui(self):
@@ -127,35 +132,45 @@ class UsedInventoryView(BaseViewModule):
         """)
         main_layout.addWidget(self.inventory_table)
     def get_icon_name(self): return "used_inventory_icon.png"
-    def load_module_data(self):
-        """Load used inventory data, trying cache first then SharePoint."""
+    def load_module_data(self, force_refresh: bool = False):
+        """Render cached used inventory immediately and revalidate it from SharePoint when stale."""
         super().load_module_data()
         self.logger.info("Loading used inventory data...")
-        self.search_input.setEnabled(False)
-        self.inventory_table.setRowCount(0)
-        self.inventory_table.setHorizontalHeaderLabels(["Status"])
-        self.inventory_table.setItem(0,0, QTableWidgetItem("Loading inventory..."))
+        if not self.cache_handler.has_frame(USED_INVENTORY_CACHE_KEY, subfolder="app_data"):
+            self._load_legacy_json_cache()
+        if self.inventory_data.empty:
+            self.search_input.setEnabled(False)
+            self.inventory_table.setRowCount(0)
+            self.inventory_table.setHorizontalHeaderLabels(["Status"])
+            self.inventory_table.setItem(0,0, QTableWidgetItem("Loading inventory..."))
+
+        self.load_with_revalidation(
+            USED_INVENTORY_CACHE_KEY,
+            self._fetch_inventory_from_sharepoint,
+            render=self._inventory_data_received,
+            apply_fresh=self._apply_fresh_inventory,
+            on_error=self._handle_data_load_error,
+            frame=True,
+            force=force_refresh,
+            store=lambda df: not df.empty
+        )
 
+    def _load_legacy_json_cache(self):
+        """Read a cache entry written as a DataFrame JSON string and convert it to a frame entry."""
         cached_data_json = self.cache_handler.get(USED_INVENTORY_CACHE_KEY, subfolder="app_data")
-        if cached_data_json:
-            try:
-                df = pd.read_json(io.StringIO(cached_data_json), orient='split')
-                self.inventory_data = df
-                self._populate_table(df)
-                self.search_input.setEnabled(True)
-                self.logger.info("Used inventory data loaded from cache.")
-                return
-            except Exception as e:
-                self.logger.warning(f"Failed to load used inventory from cached JSON: {e}. Fetching fresh.")
-        
-        if not self.sharepoint_manager:
-            self._handle_data_load_error(("", "SharePointManager not available.", ""))
-            return
-
-        worker = Worker(self._fetch_inventory_from_sharepoint)
-        worker.signals.result.connect(self._inventory_data_received)
-        worker.signals.error.connect(self._handle_data_load_error)
-        self.thread_pool.start(worker)
+        if not cached_data_json:
+            return None
+        try:
+            df = pd.read_json(io.StringIO(cached_data_json), orient='split')
+        except Exception as e:
+            self.logger.warning(f"Failed to load used inventory from cached JSON: {e}. Fetching fresh.")
+            return None
+        # Keep the original write time so an old entry is still revalidated as stale
+        age = self.cache_handler.get_age(USED_INVENTORY_CACHE_KEY, subfolder="app_data") or 0.0
+        self.cache_handler.delete(USED_INVENTORY_CACHE_KEY, subfolder="app_data")
+        self.cache_handler.set_frame(USED_INVENTORY_CACHE_KEY, df, subfolder="app_data",
+                                     timestamp=datetime.now() - timedelta(seconds=age))
+        return df
 
     def _fetch_inventory_from_sharepoint(self, status_callback=None):
         """Worker function to fetch used inventory DataFrame from SharePoint."""
@@ -173,18 +188,39 @@ class UsedInventoryView(BaseViewModule):
         return df
 
     def _inventory_data_received(self, df: pd.DataFrame):
-        """Handles successfully fetched DataFrame for inventory."""
+        """Renders an inventory DataFrame (cached or fetched) from scratch."""
         self.inventory_data = df
-        if not df.empty:
-            df_json = df.to_json(orient='split', date_format='iso')
-            self.cache_handler.set(USED_INVENTORY_CACHE_KEY, df_json, subfolder="app_data")
-            self.logger.info("Used inventory data fetched and cached.")
-        else:
-            self.logger.info("Fetched used inventory data is empty.")
+        if df.empty:
+            self.logger.info("Used inventory data is empty.")
             
         self._populate_table(df)
         self.search_input.setEnabled(True)
 
+    def _apply_fresh_inventory(self, df: pd.DataFrame):
+        """Patches the displayed table with revalidated data, repopulating only if the shape changed."""
+        key_column = "StockNumber" if "StockNumber" in df.columns else None
+        diff = None if self.inventory_data.empty or df.empty else diff_frames(self.inventory_data, df, key_column)
+        if diff is None:
+            self._inventory_data_received(df)
+            return
+
+        self.inventory_data = df
+        if diff.is_empty():
+            self.logger.info("Used inventory is up to date.")
+            return
+        touched = patch_table_widget(self.inventory_table, diff, lambda column, text: QTableWidgetItem(text))
+
+        # Keep the full row data on the first column's item current for changed rows
+        positions = {('' if pd.isna(value) else str(value)).strip(): i
+                     for i, value in enumerate(df[diff.key_column].tolist())}
+        for key, row in touched.items():
+            first_column_item = self.inventory_table.item(row, 0)
+            if first_column_item is not None and key in positions:
+                first_column_item.setData(Qt.ItemDataRole.UserRole, df.iloc[positions[key]].to_dict())
+        self._filter_table(self.search_input.text())
+        self.search_input.setEnabled(True)
+        self.logger.info(f"Used inventory updated in place: {diff}")
+
     def _populate_table(self, df: pd.DataFrame):
         """Populates the QTableWidget with inventory data."""
         self.inventory_table.setRowCount(0)
@@ -278,24 +314,17 @@ class UsedInventoryView(BaseViewModule):
 
 
     def refresh_module_data(self):
-        """Refreshes used inventory data from source."""
-        super().refresh_module_data() # Calls base, which can call self.load_module_data()
+        """Revalidates used inventory from source, keeping the current table on screen."""
         self.logger.info("Refreshing used inventory data triggered.")
-        # load_module_data will try cache first, then fetch.
-        # To force fresh fetch:
-        self.search_input.setEnabled(False)
-        self.inventory_table.setRowCount(0)
-        self.inventory_table.setHorizontalHeaderLabels(["Status"])
-        self.inventory_table.setItem(0,0, QTableWidgetItem("Refreshing inventory from source..."))
 
         if not self.sharepoint_manager:
-            self._handle_data_load_error(("", "SharePointManager not available for refresh.", ""))
+            if self.inventory_data.empty:
+                self._handle_data_load_error(("", "SharePointManager not available for refresh.", ""))
+            else:
+                self.show_notification("SharePointManager not available for refresh.", "warning")
             return
 
-        worker = Worker(self._fetch_inventory_from_sharepoint) # Fetches fresh
-        worker.signals.result.connect(self._inventory_data_received)
-        worker.signals.error.connect(self._handle_data_load_error)
-        self.thread_pool.start(worker)
+        self.load_module_data(force_refresh=True)
 
 # Example Usage
 if __name__ == '__main__':
@@ -0,0 +1,77 @@
+# app/views/widgets/table_patch.py
+import logging
+from typing import Callable, Dict
+
+from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem
+
+from app.utils.table_diff import TableDiff
+
+logger = logging.getLogger(__name__)
+
+
+def patch_table_widget(table: QTableWidget, diff: TableDiff,
+                       make_item: Callable[[str, str], QTableWidgetItem]) -> Dict[str, int]:
+    """
+    Apply a row diff to a QTableWidget in place instead of repopulating it.
+
+    Rows are located by the text of the diff's key column, so the current sort
+    order, scroll position and selection of untouched rows are kept.
+
+    Args:
+        table: Table whose columns are diff.columns, in order.
+        diff: Changes from the displayed data to the new data.
+        make_item: Builds the item for a new cell from (column name, text).
+
+    Returns:
+        Row index of every modified or inserted key, for callers that keep
+        per-row data (e.g. UserRole) in sync.
+    """
+    key_position = diff.columns.index(diff.key_column)
+    sorting_enabled = table.isSortingEnabled()
+    table.setSortingEnabled(False)
+    table.setUpdatesEnabled(False)
+    try:
+        rows = _rows_by_key(table, key_position)
+        for row in sorted((rows[key] for key in diff.deleted if key in rows), reverse=True):
+            table.removeRow(row)
+
+        rows = _rows_by_key(table, key_position)
+        touched: Dict[str, int] = {}
+        for key, cells in diff.modified.items():
+            row = rows.get(key)
+            if row is None:
+                logger.debug(f"Row '{key}' is not in the table; skipping its update.")
+                continue
+            for column, text in cells.items():
+                position = diff.columns.index(column)
+                item = table.item(row, position)
+                if item is None:
+                    table.setItem(row, position, make_item(column, text))
+                else:
+                    item.setText(text)
+            touched[key] = row
+
+        for values in diff.inserted:
+            row = table.rowCount()
+            table.insertRow(row)
+            for position, column in enumerate(diff.columns):
+                table.setItem(row, position, make_item(column, values[position]))
+            touched[values[key_position].strip()] = row
+    finally:
+        table.setUpdatesEnabled(True)
+        table.setSortingEnabled(sorting_enabled)
+
+    if sorting_enabled:
+        # Re-sorting moved rows; report where the touched rows ended up.
+        rows = _rows_by_key(table, key_position)
+        touched = {key: rows[key] for key in touched if key in rows}
+    return touched
+
+
+def _rows_by_key(table: QTableWidget, key_position: int) -> Dict[str, int]:
+    rows = {}
+    for row in range(table.rowCount()):
+        item = table.item(row, key_position)
+        if item is not None:
+            rows[item.text().strip()] = row
+    return rows